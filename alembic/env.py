@@ -27,6 +27,8 @@ sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), ".."
 # Import all models here so that Alembic's autogenerate can detect them
 from autostock.database.models import market
 from autostock.database.models import tracking
+from autostock.database.models import sync
+from autostock.database.models import version
 
 # Import the engine directly from our project
 from autostock.database.engine import engine
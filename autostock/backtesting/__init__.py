@@ -0,0 +1,25 @@
+# 向量化回测引擎见 vectorized.py，绩效指标见 metrics.py，多进程参数扫描见 sweep.py。
+# backtrader 数据源见 datafeed.py（依赖 backtrader，需要时单独导入）。
+
+from .sweep import ParameterSweep, SharedPanel, Trial, parameter_grid
+from .vectorized import (
+    BacktestResult,
+    TradingRules,
+    equal_weights,
+    hold_from_signals,
+    price_limit_rates,
+    run_backtest,
+)
+
+__all__ = [
+    "run_backtest",
+    "BacktestResult",
+    "TradingRules",
+    "hold_from_signals",
+    "equal_weights",
+    "price_limit_rates",
+    "ParameterSweep",
+    "SharedPanel",
+    "Trial",
+    "parameter_grid",
+]
@@ -0,0 +1,248 @@
+"""
+DataManager 与 backtrader 的数据集成。
+
+backtrader 自带的 PandasData 在预加载时对每根K线调用一次 `_load`，逐行经过 DataFrame.iloc 和日期转换；
+而且每次 `cerebro.run()` 都要重新读取文件、构造 DataFrame。几百只股票、十年日线时，加载数据往往比策略本身还慢。
+
+这里的做法：
+
+1. `MarketData` 通过一次 `DataManager.get_daily_panel` 读取全部需要的股票，把每个字段压缩成一个
+   按股票连续存放的 float64 数组（只保留有数据的交易日），每只股票的数据是其中的一段切片（视图，不复制）；
+2. `ArrayData.preload` 把切片整体拷贝进 line 的缓冲区（每条 line 一次内存拷贝），不再逐行调用 Python；
+3. `load_market_data` 在进程内缓存 MarketData，数据版本（DataTracking）不变时，多次回测直接复用同一份数组。
+
+用法::
+
+    data = load_market_data(manager, symbols, start_date=date(2015, 1, 1))
+    for symbol in symbols:
+        cerebro.adddata(data.feed(symbol))
+"""
+
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import date
+
+import backtrader as bt
+import numpy as np
+
+from autostock.datamanager.ops import tracking_ops
+from autostock.datamanager.panel import DailyPanel
+
+# backtrader 数据源的价格/成交量 line 与日线字段同名
+PRICE_FIELDS = ("open", "high", "low", "close", "volume")
+
+# backtrader 的日期数值为公历序数（0001-01-01 为 1）加上当天经过的比例，日线取当天零点
+_ORDINAL_EPOCH = np.datetime64("0001-01-01", "D")
+
+# 进程内最多缓存的 MarketData 数量（按最近使用淘汰）
+MARKET_DATA_CACHE_SIZE = 4
+
+_cache: OrderedDict[tuple, tuple[tuple, "MarketData"]] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def date_numbers(dates: np.ndarray) -> np.ndarray:
+    """
+    将 datetime64 日期批量转换为 backtrader 的日期数值（与 `bt.date2num` 对零点时间的结果一致）。
+    """
+    days = np.asarray(dates).astype("datetime64[D]") - _ORDINAL_EPOCH
+    return days.astype(np.int64).astype(np.float64) + 1.0
+
+
+class ArrayData(bt.feed.DataBase):
+    """
+    由 NumPy 数组提供数据的 backtrader 数据源。
+
+    `arrays` 为 line 名称 -> 一维 float64 数组，必须包含按时间升序的 "datetime"（backtrader 日期数值），
+    缺少的价格 line 填 NaN，缺少的 openinterest 填 0。数组只被读取，多个数据源可以共享同一份数组。
+    """
+
+    params = (("arrays", None),)
+
+    def start(self):
+        super().start()
+        self._columns = {alias: self._values(alias) for alias in self.getlinealiases()}
+        self._cursor = 0
+
+    def preload(self):
+        if not self._can_fill():
+            # 有过滤器、时区转换或者有限长度缓冲区时，交给 backtrader 逐行加载
+            return super().preload()
+        dates = self.p.arrays["datetime"]
+        lo = int(np.searchsorted(dates, self.fromdate, side="left"))
+        hi = int(np.searchsorted(dates, self.todate, side="right"))
+        for alias, values in self._columns.items():
+            # array.array 只接受字节视图，cast 不复制数据
+            getattr(self.lines, alias).array.frombytes(
+                memoryview(values[lo:hi]).cast("B")
+            )
+        # 与逐行加载结束后的状态一致：数据已经全部读完（否则 runonce=False 时
+        # backtrader 在缓冲区用完后会再次调用 _load，从头重复提供数据），整体回到起点等待策略逐根推进
+        self._cursor = len(dates)
+        self._last()
+        self.home()
+
+    def _load(self):
+        # 不预加载时（例如 cerebro.run(preload=False)）逐根K线提供数据，起止日期由 load() 检查
+        dates = self.p.arrays["datetime"]
+        if self._cursor >= len(dates):
+            return False
+        for alias, values in self._columns.items():
+            getattr(self.lines, alias)[0] = values[self._cursor]
+        self._cursor += 1
+        return True
+
+    def _values(self, alias: str) -> np.ndarray:
+        values = self.p.arrays.get(alias)
+        if values is None:
+            fill = 0.0 if alias == "openinterest" else np.nan
+            values = np.full(len(self.p.arrays["datetime"]), fill)
+        return np.ascontiguousarray(values, dtype=np.float64)
+
+    def _can_fill(self) -> bool:
+        if self._filters or self._ffilters or self._barstack or self._tzinput:
+            return False
+        return all(
+            isinstance(line.array, array) and len(line.array) == 0
+            for line in self.lines
+        )
+
+
+class MarketData:
+    """
+    预加载到内存的多只股票日线数据。
+
+    每个字段是一个按股票连续存放的 float64 数组，第 i 只股票的数据位于 [offsets[i], offsets[i+1])，
+    只包含该股票有收盘价的交易日。`feed` 创建的数据源共享这些数组，可以在同一进程内的多次回测中反复使用。
+    """
+
+    def __init__(self, panel: DailyPanel):
+        valid = ~np.isnan(panel["close"])
+        self.symbols = list(panel.symbols)
+        self.fields = [name for name in PRICE_FIELDS if name in panel.fields]
+        self.offsets = np.concatenate([[0], np.cumsum(valid.sum(axis=0))])
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        # 转置后按布尔掩码取值得到 股票 x 日期 的行主序结果，同一只股票的数据在内存中相邻
+        mask = valid.T
+        dates = np.broadcast_to(date_numbers(panel.dates), mask.shape)
+        self.arrays = {"datetime": dates[mask]}
+        for name in self.fields:
+            self.arrays[name] = panel[name].T[mask]
+
+    @classmethod
+    def load(
+        cls,
+        manager,
+        symbols: list[str] | None = None,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        fields: tuple[str, ...] = PRICE_FIELDS,
+    ) -> "MarketData":
+        """
+        通过一次 `DataManager.get_daily_panel` 加载数据（不使用进程内缓存）。
+        """
+        fields = list(dict.fromkeys(["close", *fields]))
+        return cls(manager.get_daily_panel(symbols, fields, start_date, end_date))
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._index
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(values.nbytes for values in self.arrays.values())
+
+    def arrays_for(self, symbol: str) -> dict[str, np.ndarray]:
+        """
+        返回一只股票各字段的数组视图（不复制），没有数据的股票为空数组。
+
+        :raises KeyError: 股票不在预加载的数据中。
+        """
+        if symbol not in self._index:
+            raise KeyError(f"{symbol} is not in the preloaded market data.")
+        i = self._index[symbol]
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return {name: values[lo:hi] for name, values in self.arrays.items()}
+
+    def feed(self, symbol: str, **kwargs) -> ArrayData:
+        """
+        为一只股票创建 backtrader 数据源。每次 `cerebro.run()` 都应使用新建的数据源，数组本身被共享。
+
+        :param symbol: 股票代码，同时作为数据源的默认名称。
+        :param kwargs: 其他数据源参数，例如 fromdate、todate。
+        """
+        kwargs.setdefault("name", symbol)
+        return ArrayData(arrays=self.arrays_for(symbol), **kwargs)
+
+    def feeds(self, symbols: list[str] | None = None, **kwargs) -> list[ArrayData]:
+        """
+        为多只股票创建数据源，None 表示全部股票。
+        """
+        return [self.feed(symbol, **kwargs) for symbol in symbols or self.symbols]
+
+
+def load_market_data(
+    manager,
+    symbols: list[str] | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    fields: tuple[str, ...] = PRICE_FIELDS,
+    use_cache: bool = True,
+) -> MarketData:
+    """
+    加载回测用的日线数据，同一进程内相同的请求复用已加载的数组。
+
+    缓存以数据目录、股票列表、字段和日期范围为键，并记录加载时这些股票的日线数据版本；
+    之后有股票同步了新数据（版本变化）时重新加载。
+
+    :param manager: DataManager。
+    :param symbols: 股票代码列表，None 表示所有有日线数据的股票。
+    :param start_date: 开始日期。
+    :param end_date: 结束日期。
+    :param fields: 需要的字段，close 总会被加载。
+    :param use_cache: 是否使用进程内缓存。
+    :return: MarketData。
+    """
+    versions = tracking_ops.get_daily_data_versions(symbols)
+    if symbols is None:
+        symbols = sorted(versions)
+    key = (
+        str(manager.data_path.resolve()),
+        manager.daily_layout,
+        tuple(symbols),
+        tuple(fields),
+        start_date,
+        end_date,
+    )
+    current = tuple(versions.get(symbol) for symbol in symbols)
+    if use_cache:
+        with _cache_lock:
+            cached = _cache.get(key)
+            if cached is not None and cached[0] == current:
+                _cache.move_to_end(key)
+                return cached[1]
+
+    data = MarketData.load(manager, symbols, start_date, end_date, fields)
+    print(
+        f"INFO: Preloaded {len(symbols)} symbols for backtesting "
+        f"({data.nbytes / 1024 / 1024:.1f} MB)."
+    )
+    if use_cache:
+        with _cache_lock:
+            _cache[key] = (current, data)
+            _cache.move_to_end(key)
+            while len(_cache) > MARKET_DATA_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return data
+
+
+def clear_market_data_cache() -> None:
+    """
+    清空进程内缓存的 MarketData。
+    """
+    with _cache_lock:
+        _cache.clear()
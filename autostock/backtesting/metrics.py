@@ -0,0 +1,236 @@
+"""
+绩效指标计算。
+
+所有函数都接受一条净值曲线 (日期数,) 或多条净值曲线 (日期数, 曲线数)（例如参数扫描的全部结果），
+按第0维（时间）计算，多条曲线时返回每条曲线的指标。净值曲线中的 NaN（尚未开始）会被忽略。
+"""
+
+import numpy as np
+
+# A股每年约244个交易日
+TRADING_DAYS_PER_YEAR = 244
+
+
+def daily_returns(equity: np.ndarray) -> np.ndarray:
+    """
+    日收益率，第一天为 NaN。
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    returns = np.full(equity.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[1:] = equity[1:] / equity[:-1] - 1.0
+    return returns
+
+
+def total_return(equity: np.ndarray) -> np.ndarray | float:
+    """
+    区间总收益率：最后一个净值 / 第一个有效净值 - 1。
+    """
+    first, last = _first_last(equity)
+    return last / first - 1.0
+
+
+def annualized_return(
+    equity: np.ndarray, periods_per_year: int = TRADING_DAYS_PER_YEAR
+) -> np.ndarray | float:
+    """
+    年化收益率（复利）。
+    """
+    first, last = _first_last(equity)
+    periods = np.maximum(np.sum(~np.isnan(np.asarray(equity, float)), axis=0) - 1, 1)
+    with np.errstate(invalid="ignore"):
+        return (last / first) ** (periods_per_year / periods) - 1.0
+
+
+def annualized_volatility(
+    equity: np.ndarray, periods_per_year: int = TRADING_DAYS_PER_YEAR
+) -> np.ndarray | float:
+    """
+    年化波动率（日收益率的样本标准差 * sqrt(年交易日数)）。
+    """
+    returns = daily_returns(equity)
+    return _nanstd(returns) * np.sqrt(periods_per_year)
+
+
+def sharpe_ratio(
+    equity: np.ndarray,
+    risk_free: float = 0.0,
+    periods_per_year: int = TRADING_DAYS_PER_YEAR,
+) -> np.ndarray | float:
+    """
+    年化夏普比率。
+
+    :param risk_free: 年化无风险利率，按交易日平均分摊。
+    """
+    excess = daily_returns(equity) - risk_free / periods_per_year
+    std = _nanstd(excess)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(
+            std > 0, _nanmean(excess) / std * np.sqrt(periods_per_year), np.nan
+        )[()]
+
+
+def sortino_ratio(
+    equity: np.ndarray,
+    risk_free: float = 0.0,
+    periods_per_year: int = TRADING_DAYS_PER_YEAR,
+) -> np.ndarray | float:
+    """
+    年化索提诺比率，分母为下行偏差（只计负的超额收益，按全部天数平均）。
+    """
+    excess = daily_returns(equity) - risk_free / periods_per_year
+    downside = np.sqrt(_nanmean(np.minimum(excess, 0.0) ** 2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(
+            downside > 0,
+            _nanmean(excess) / downside * np.sqrt(periods_per_year),
+            np.nan,
+        )[()]
+
+
+def drawdown(equity: np.ndarray) -> np.ndarray:
+    """
+    每天相对于此前最高净值的回撤（<= 0）。
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    peak = np.fmax.accumulate(equity, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return equity / peak - 1.0
+
+
+def max_drawdown(equity: np.ndarray) -> np.ndarray | float:
+    """
+    最大回撤（负数，例如 -0.25 表示最大回撤25%）。
+    """
+    dd = drawdown(equity)
+    return np.where(np.isnan(dd).all(axis=0), np.nan, np.nanmin(_fill(dd), axis=0))[()]
+
+
+def max_drawdown_duration(equity: np.ndarray) -> np.ndarray | int:
+    """
+    最长的回撤持续天数（从创出新高到重新创出新高之间的交易日数）。
+    """
+    underwater = drawdown(equity) < 0
+    if underwater.ndim == 1:
+        underwater = underwater[:, None]
+    # 每段连续的水下天数：当前位置减去上一次不在水下的位置
+    days = np.arange(len(underwater))[:, None]
+    last_dry = np.maximum.accumulate(np.where(underwater, -1, days), axis=0)
+    longest = np.max(days - last_dry, axis=0, initial=0)
+    return longest[0] if np.ndim(equity) == 1 else longest
+
+
+def calmar_ratio(
+    equity: np.ndarray, periods_per_year: int = TRADING_DAYS_PER_YEAR
+) -> np.ndarray | float:
+    """
+    卡玛比率：年化收益率 / |最大回撤|。
+    """
+    mdd = np.abs(max_drawdown(equity))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(
+            mdd > 0, annualized_return(equity, periods_per_year) / mdd, np.nan
+        )[()]
+
+
+def win_rate(equity: np.ndarray) -> np.ndarray | float:
+    """
+    日胜率：收益为正的交易日占有收益变化的交易日的比例。
+    """
+    returns = daily_returns(equity)
+    moved = ~np.isnan(returns) & (returns != 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (np.sum(returns > 0, axis=0) / np.sum(moved, axis=0))[()]
+
+
+def summary(
+    equity: np.ndarray,
+    benchmark: np.ndarray | None = None,
+    risk_free: float = 0.0,
+    periods_per_year: int = TRADING_DAYS_PER_YEAR,
+) -> dict[str, np.ndarray | float]:
+    """
+    常用指标汇总。
+
+    :param equity: 净值曲线。
+    :param benchmark: 基准净值曲线（日期与 `equity` 对齐），给出时增加超额收益、信息比率和贝塔。
+    :param risk_free: 年化无风险利率。
+    :param periods_per_year: 每年的交易日数。
+    :return: 指标名 -> 数值（多条曲线时为数组）。
+    """
+    result = {
+        "total_return": total_return(equity),
+        "annual_return": annualized_return(equity, periods_per_year),
+        "annual_volatility": annualized_volatility(equity, periods_per_year),
+        "sharpe": sharpe_ratio(equity, risk_free, periods_per_year),
+        "sortino": sortino_ratio(equity, risk_free, periods_per_year),
+        "max_drawdown": max_drawdown(equity),
+        "max_drawdown_days": max_drawdown_duration(equity),
+        "calmar": calmar_ratio(equity, periods_per_year),
+        "win_rate": win_rate(equity),
+    }
+    if benchmark is not None:
+        result.update(relative_metrics(equity, benchmark, periods_per_year))
+    return result
+
+
+def relative_metrics(
+    equity: np.ndarray,
+    benchmark: np.ndarray,
+    periods_per_year: int = TRADING_DAYS_PER_YEAR,
+) -> dict[str, np.ndarray | float]:
+    """
+    相对于基准的指标：年化超额收益、跟踪误差、信息比率和贝塔。
+    """
+    returns = daily_returns(equity)
+    bench = daily_returns(benchmark)
+    if returns.ndim == 2 and bench.ndim == 1:
+        bench = bench[:, None]
+    active = returns - bench
+    tracking_error = _nanstd(active) * np.sqrt(periods_per_year)
+    both = ~np.isnan(returns) & ~np.isnan(bench)
+    r = np.where(both, returns, np.nan)
+    b = np.where(both, bench, np.nan)
+    covariance = _nanmean((r - _nanmean(r)) * (b - _nanmean(b)))
+    variance = _nanmean((b - _nanmean(b)) ** 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "excess_return": annualized_return(equity, periods_per_year)
+            - annualized_return(benchmark, periods_per_year),
+            "tracking_error": tracking_error,
+            "information_ratio": np.where(
+                tracking_error > 0,
+                _nanmean(active) * periods_per_year / tracking_error,
+                np.nan,
+            )[()],
+            "beta": np.where(variance > 0, covariance / variance, np.nan)[()],
+        }
+
+
+def _first_last(equity: np.ndarray) -> tuple:
+    equity = np.asarray(equity, dtype=np.float64)
+    valid = ~np.isnan(equity)
+    first_row = np.argmax(valid, axis=0)
+    last_row = len(equity) - 1 - np.argmax(valid[::-1], axis=0)
+    if equity.ndim == 1:
+        return equity[first_row], equity[last_row]
+    columns = np.arange(equity.shape[1])
+    return equity[first_row, columns], equity[last_row, columns]
+
+
+def _fill(values: np.ndarray) -> np.ndarray:
+    # 全为 NaN 的列用 0 填充，避免 nanmin/nanmean 的警告（结果之后会被置为 NaN）
+    return np.where(np.isnan(values).all(axis=0), 0.0, values)
+
+
+def _nanmean(values: np.ndarray) -> np.ndarray | float:
+    count = np.sum(~np.isnan(values), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (np.nansum(values, axis=0) / count)[()]
+
+
+def _nanstd(values: np.ndarray) -> np.ndarray | float:
+    count = np.sum(~np.isnan(values), axis=0)
+    mean = _nanmean(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.sqrt(np.nansum((values - mean) ** 2, axis=0) / (count - 1))[()]
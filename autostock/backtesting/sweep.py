@@ -0,0 +1,555 @@
+"""
+多进程参数扫描。
+
+同一个策略在数百组参数、多个股票池上回测时，瓶颈不在单次回测，而在每次都重新加载数据、只用到一个核。这里：
+
+1. `SharedPanel` 把日线面板的全部字段放进一块共享内存，工作进程直接映射为只读数组，不复制、不重新加载；
+   每个股票池的子面板在主进程中各复制一次到单独的共享内存，工作进程同样只做映射；
+2. `ParameterSweep.run` 把试验分发到进程池，结果完成一个收集一个，分批写入 DuckDB 结果表 `sweep_results`；
+3. 每个试验以参数（和股票池）的哈希为键，中断后重新运行同名扫描会跳过已经完成的试验；
+4. 最优指标连续若干个试验没有提升、或者达到目标值时可以提前停止。
+
+目标函数必须定义在模块顶层（工作进程按名字导入），签名为 `objective(panel, **params) -> dict[str, float]`，
+返回的每个指标成为结果表的一列，其中必须包含用于排序和提前停止的 `metric`::
+
+    def ma_cross(panel, fast, slow):
+        ...
+        return run_backtest(panel, weights).metrics()
+
+    sweep = ParameterSweep("ma_cross", ma_cross, panel, metric="sharpe")
+    results = sweep.run(parameter_grid(fast=[5, 10, 20], slow=[30, 60, 120]), patience=50)
+"""
+
+import hashlib
+import itertools
+import json
+import math
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from multiprocessing import get_context, shared_memory
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from autostock.core.config import get_settings
+from autostock.datamanager.panel import DailyPanel
+
+RESULTS_TABLE = "sweep_results"
+
+# 结果表的固定列，其余列是目标函数返回的指标（DOUBLE），第一次出现时自动添加
+BASE_COLUMNS = {
+    "sweep": "VARCHAR",
+    "trial": "VARCHAR",
+    "params": "VARCHAR",
+    "universe": "VARCHAR",
+    "status": "VARCHAR",
+    "error": "VARCHAR",
+    "elapsed": "DOUBLE",
+    "finished_at": "TIMESTAMP",
+}
+
+
+@dataclass(frozen=True)
+class SharedPanelHandle:
+    """
+    在进程间传递的共享面板描述。只包含元数据，字段数据在名为 `name` 的共享内存中。
+    """
+
+    name: str
+    fields: tuple[str, ...]
+    dates: np.ndarray
+    symbols: tuple[str, ...]
+
+    def attach(self) -> tuple[shared_memory.SharedMemory, DailyPanel]:
+        """
+        映射共享内存，返回共享内存对象（调用方需要保持引用）和只读面板。
+        """
+        shm = shared_memory.SharedMemory(name=self.name)
+        return shm, _panel_view(shm, self, writeable=False)
+
+
+class SharedPanel:
+    """
+    放在共享内存中的 DailyPanel，所有字段存放在同一块 (字段数, 日期数, 股票数) 的共享内存里。
+
+    创建者负责释放（`close()` 或 with 语句）。同一个 SharedPanel 可以传给多个 `ParameterSweep`，
+    避免每次扫描都重新复制数据；创建后原来的 DailyPanel 可以丢弃，`panel` 属性是共享内存上的视图。
+    """
+
+    def __init__(self, panel: DailyPanel):
+        fields = tuple(panel.fields)
+        rows, columns = panel.shape
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=max(len(fields) * rows * columns * 8, 1)
+        )
+        self.handle = SharedPanelHandle(
+            name=self._shm.name,
+            fields=fields,
+            dates=np.asarray(panel.dates),
+            symbols=tuple(panel.symbols),
+        )
+        shared = _panel_view(self._shm, self.handle, writeable=True)
+        for name in fields:
+            shared.fields[name][...] = panel[name]
+        self.panel = _panel_view(self._shm, self.handle, writeable=False)
+
+    @property
+    def nbytes(self) -> int:
+        return self._shm.size if self._shm is not None else 0
+
+    def close(self) -> None:
+        """
+        释放共享内存。之后 `panel` 不再可用。
+        """
+        if self._shm is None:
+            return
+        self.panel = None
+        self._shm.unlink()
+        try:
+            self._shm.close()
+        except BufferError:
+            # 调用方仍持有数组视图，映射在这些视图被回收后才会解除
+            pass
+        self._shm = None
+
+    def __enter__(self) -> "SharedPanel":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _panel_view(
+    shm: shared_memory.SharedMemory, handle: SharedPanelHandle, writeable: bool
+) -> DailyPanel:
+    shape = (len(handle.fields), len(handle.dates), len(handle.symbols))
+    block = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    block.flags.writeable = writeable
+    return DailyPanel(
+        dates=handle.dates,
+        symbols=list(handle.symbols),
+        fields={name: block[i] for i, name in enumerate(handle.fields)},
+    )
+
+
+@dataclass(frozen=True)
+class Trial:
+    """
+    一次试验：一组参数，以及可选的股票池名称。
+    """
+
+    params: dict[str, Any]
+    universe: str | None = None
+
+    @property
+    def key(self) -> str:
+        """
+        试验的唯一标识（参数和股票池的哈希），用于断点续跑。
+        """
+        text = json.dumps([self.params, self.universe], sort_keys=True, default=str)
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class TrialResult:
+    trial: Trial
+    status: str
+    metrics: dict[str, float] = field(default_factory=dict)
+    error: str | None = None
+    elapsed: float = 0.0
+    finished_at: datetime = field(default_factory=datetime.now)
+
+
+def parameter_grid(**axes) -> list[dict[str, Any]]:
+    """
+    参数网格：各参数取值的笛卡尔积。不是列表/元组/range 的取值视为固定参数。
+
+    例如 `parameter_grid(fast=[5, 10], slow=[20, 60], rules="default")` 返回4组参数。
+    """
+    names = list(axes)
+    values = [
+        list(value) if isinstance(value, (list, tuple, range)) else [value]
+        for value in axes.values()
+    ]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+# ---------------------------------------------------------------------- 工作进程
+
+# 每个工作进程在初始化时映射一次共享面板，之后的所有试验共用
+_worker: dict[str, Any] = {}
+
+
+def _init_worker(
+    handle: SharedPanelHandle,
+    objective: Callable[..., dict],
+    universes: dict[str, SharedPanelHandle] | None,
+) -> None:
+    shm, panel = handle.attach()
+    _worker.update(
+        shm=shm,
+        panel=panel,
+        objective=objective,
+        universes=universes or {},
+        subsets={},
+    )
+
+
+def _worker_panel(universe: str | None) -> DailyPanel:
+    if universe is None:
+        return _worker["panel"]
+    subsets = _worker["subsets"]
+    if universe not in subsets:
+        # 股票池的子面板由主进程放在共享内存中，这里只映射，不复制
+        subsets[universe] = _worker["universes"][universe].attach()
+    return subsets[universe][1]
+
+
+def _run_trial(trial: Trial) -> TrialResult:
+    started = time.perf_counter()
+    try:
+        metrics = _worker["objective"](_worker_panel(trial.universe), **trial.params)
+        metrics = {str(name): float(value) for name, value in dict(metrics).items()}
+        reserved = set(metrics) & set(BASE_COLUMNS)
+        if reserved:
+            raise ValueError(f"Metric names clash with result columns: {reserved}")
+        return TrialResult(trial, "ok", metrics, elapsed=time.perf_counter() - started)
+    except Exception:
+        return TrialResult(
+            trial,
+            "error",
+            error=traceback.format_exc(limit=5),
+            elapsed=time.perf_counter() - started,
+        )
+
+
+# ---------------------------------------------------------------------- 扫描
+
+
+class _EarlyStopping:
+    """
+    最优指标连续 `patience` 个试验没有提升，或者达到 `target` 时停止。
+    指标为 NaN 的试验（例如没有交易）和失败的试验算作没有提升。
+    """
+
+    def __init__(self, maximize: bool, patience: int | None, target: float | None):
+        self.sign = 1.0 if maximize else -1.0
+        self.patience = patience
+        self.target = target
+        self.best = math.nan
+        self.since_best = 0
+
+    def update(self, value: float | None) -> bool:
+        if value is not None and not math.isnan(value):
+            if math.isnan(self.best) or self.sign * (value - self.best) > 0:
+                self.best = value
+                self.since_best = 0
+            else:
+                self.since_best += 1
+        else:
+            self.since_best += 1
+        return self.should_stop
+
+    @property
+    def should_stop(self) -> bool:
+        if self.target is not None and not math.isnan(self.best):
+            if self.sign * (self.best - self.target) >= 0:
+                return True
+        return self.patience is not None and self.since_best >= self.patience
+
+
+class ParameterSweep:
+    """
+    多进程参数扫描，结果写入 DuckDB 结果表。
+
+    结果默认保存在 `{data_path}/sweeps.duckdb`，与行情数据库分开，扫描过程中不占用行情库的写锁；
+    只有写入结果的瞬间才打开结果库，Notebook 可以在扫描进行时查询已完成的结果。
+    同一个结果库同一时间只应有一个扫描在写入。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        objective: Callable[..., dict],
+        panel: DailyPanel | SharedPanel,
+        universes: dict[str, list[str]] | None = None,
+        metric: str = "sharpe",
+        maximize: bool = True,
+        workers: int | None = None,
+        results_path: str | Path | None = None,
+        mp_context: str = "spawn",
+    ):
+        """
+        :param name: 扫描名称，相同名称的扫描共享结果（断点续跑）。
+        :param objective: 目标函数 `objective(panel, **params) -> dict[str, float]`，必须定义在模块顶层。
+        :param panel: 日线面板；传入 SharedPanel 时直接使用，否则在 `run` 期间复制到共享内存。
+        :param universes: 股票池名称 -> 股票代码列表。给出时每组参数在每个股票池上各运行一次，
+                          目标函数收到的是只包含该股票池的面板。`run` 期间每个股票池的子面板
+                          在共享内存中保存一份（所有工作进程共用），共占用
+                          字段数 x 日期数 x 各股票池股票数之和 x 8 字节。
+        :param metric: 用于排序和提前停止的指标名，目标函数必须返回它，否则扫描报错停止。
+        :param maximize: 指标越大越好（False 表示越小越好，例如最大回撤的绝对值）。
+        :param workers: 工作进程数，None 表示 CPU 核数。
+        :param results_path: 结果库路径。
+        :param mp_context: 进程启动方式。默认 spawn：工作进程不继承父进程的 DuckDB 连接和线程。
+        """
+        self.name = name
+        self.objective = objective
+        self.panel = panel
+        self.universes = universes
+        self.metric = metric
+        self.maximize = maximize
+        self.workers = workers or os.cpu_count() or 1
+        self.results_path = Path(
+            results_path or Path(get_settings().data_path) / "sweeps.duckdb"
+        )
+        self.mp_context = mp_context
+
+    def trials(self, grid: Iterable[dict | Trial]) -> list[Trial]:
+        """
+        把参数组展开为试验（有股票池时与每个股票池组合），去掉重复的试验。
+        """
+        trials: dict[str, Trial] = {}
+        for item in grid:
+            if isinstance(item, Trial):
+                candidates = [item]
+            elif self.universes:
+                candidates = [
+                    Trial(dict(item), universe) for universe in self.universes
+                ]
+            else:
+                candidates = [Trial(dict(item))]
+            for trial in candidates:
+                trials.setdefault(trial.key, trial)
+        return list(trials.values())
+
+    def run(
+        self,
+        grid: Iterable[dict | Trial],
+        patience: int | None = None,
+        target: float | None = None,
+        resume: bool = True,
+        flush_every: int = 50,
+        flush_interval: float = 5.0,
+    ) -> pd.DataFrame:
+        """
+        运行扫描。
+
+        :param grid: 参数组（字典）或试验的序列，例如 `parameter_grid(...)` 的结果。
+        :param patience: 最优指标连续这么多个试验没有提升时停止，None 表示不提前停止。
+        :param target: 最优指标达到该值时停止。
+        :param resume: 跳过结果表中已经成功完成的试验（失败的试验会重新运行）。
+                       提前停止的状态也从已有结果恢复。
+        :param flush_every: 每积累这么多个结果写入一次结果表。
+        :param flush_interval: 距上次写入超过这么多秒时也写入一次。
+        :return: 本扫描的全部结果，见 `results()`。
+        """
+        trials = self.trials(grid)
+        stopping = _EarlyStopping(self.maximize, patience, target)
+        done = self._completed() if resume else {}
+        for value in done.values():
+            stopping.update(value)
+        queue = iter([trial for trial in trials if trial.key not in done])
+        remaining = len(trials) - sum(trial.key in done for trial in trials)
+        print(
+            f"INFO: Sweep '{self.name}': {len(trials)} trials, {len(trials) - remaining} "
+            f"already done, running {remaining} on {self.workers} workers."
+        )
+        if remaining == 0 or stopping.should_stop:
+            return self.results()
+
+        owned = not isinstance(self.panel, SharedPanel)
+        shared = SharedPanel(self.panel) if owned else self.panel
+        subsets = {
+            universe: SharedPanel(shared.panel.select(symbols))
+            for universe, symbols in (self.universes or {}).items()
+        }
+        buffer: list[TrialResult] = []
+        finished = failed = 0
+        last_flush = time.monotonic()
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=get_context(self.mp_context),
+            initializer=_init_worker,
+            initargs=(
+                shared.handle,
+                self.objective,
+                {universe: subset.handle for universe, subset in subsets.items()},
+            ),
+        )
+        try:
+            pending = set()
+            exhausted = stopped = False
+            while pending or not (exhausted or stopped):
+                # 只保持少量排队中的试验，提前停止时不必取消大量已提交的任务
+                while not (exhausted or stopped) and len(pending) < self.workers * 2:
+                    trial = next(queue, None)
+                    if trial is None:
+                        exhausted = True
+                    else:
+                        pending.add(pool.submit(_run_trial, trial))
+                completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    result = future.result()
+                    buffer.append(result)
+                    finished += 1
+                    if result.status == "ok" and self.metric not in result.metrics:
+                        # 指标名写错时所有试验都会被当作没有提升，不能静默地跑完；
+                        # 这个试验记为失败，改正后重新运行时不会被跳过
+                        result.status = "error"
+                        result.error = (
+                            f"Objective did not return metric '{self.metric}', "
+                            f"got {sorted(result.metrics)}."
+                        )
+                        raise ValueError(result.error)
+                    failed += result.status != "ok"
+                    if stopping.update(result.metrics.get(self.metric)) and not stopped:
+                        stopped = True
+                        print(
+                            f"INFO: Sweep '{self.name}' stopped early, "
+                            f"best {self.metric}={stopping.best:.4f}."
+                        )
+                if len(buffer) >= flush_every or (
+                    buffer and time.monotonic() - last_flush >= flush_interval
+                ):
+                    self._write(buffer)
+                    buffer.clear()
+                    last_flush = time.monotonic()
+                    print(
+                        f"INFO: Sweep '{self.name}': {finished}/{remaining} trials, "
+                        f"best {self.metric}={stopping.best:.4f}."
+                    )
+        finally:
+            # 中断（包括 Ctrl+C）时保存已经完成的结果，下次运行从这里继续
+            pool.shutdown(wait=True, cancel_futures=True)
+            if buffer:
+                self._write(buffer)
+            for subset in subsets.values():
+                subset.close()
+            if owned:
+                shared.close()
+        if failed:
+            print(
+                f"WARN: Sweep '{self.name}': {failed} trials failed, "
+                f"see the error column in {RESULTS_TABLE}."
+            )
+        return self.results()
+
+    def results(self) -> pd.DataFrame:
+        """
+        读取本扫描的全部结果，按指标从优到劣排序。参数展开为 `param_` 前缀的列，
+        不属于本扫描的指标列（全为空）会被去掉。
+        """
+        if not self.results_path.exists():
+            return pd.DataFrame(columns=list(BASE_COLUMNS))
+        with duckdb.connect(str(self.results_path)) as con:
+            if RESULTS_TABLE not in _tables(con):
+                return pd.DataFrame(columns=list(BASE_COLUMNS))
+            df = con.execute(
+                f"SELECT * FROM {RESULTS_TABLE} WHERE sweep = ?", [self.name]
+            ).df()
+        metrics = [c for c in df.columns if c not in BASE_COLUMNS]
+        df = df.drop(columns=[c for c in metrics if df[c].isna().all()])
+        params = pd.json_normalize([json.loads(p) for p in df["params"]]).add_prefix(
+            "param_"
+        )
+        df = pd.concat([params, df.reset_index(drop=True)], axis=1)
+        if self.metric in df.columns:
+            df = df.sort_values(
+                self.metric, ascending=not self.maximize, na_position="last"
+            )
+        return df.reset_index(drop=True)
+
+    def best(self) -> dict[str, Any] | None:
+        """
+        指标最优的试验的参数，没有成功的试验时返回 None。
+        """
+        df = self.results()
+        if self.metric not in df.columns:
+            return None
+        df = df[(df["status"] == "ok") & df[self.metric].notna()]
+        return json.loads(df["params"].iloc[0]) if len(df) else None
+
+    def _completed(self) -> dict[str, float]:
+        """
+        已经成功完成的试验 -> 指标值，按完成时间排序。
+        """
+        if not self.results_path.exists():
+            return {}
+        with duckdb.connect(str(self.results_path)) as con:
+            columns = _tables(con).get(RESULTS_TABLE)
+            if columns is None:
+                return {}
+            value = _quote(self.metric) if self.metric in columns else "NULL"
+            if self.metric not in columns:
+                print(
+                    f"WARN: Sweep '{self.name}': no '{self.metric}' column in "
+                    f"{RESULTS_TABLE}, completed trials do not count for early stopping."
+                )
+            rows = con.execute(
+                f"SELECT trial, {value} FROM {RESULTS_TABLE} "
+                "WHERE sweep = ? AND status = 'ok' ORDER BY finished_at",
+                [self.name],
+            ).fetchall()
+        return {
+            trial: math.nan if value is None else float(value) for trial, value in rows
+        }
+
+    def _write(self, results: list[TrialResult]) -> None:
+        metrics = sorted({name for result in results for name in result.metrics})
+        batch = pd.DataFrame(
+            {
+                "sweep": self.name,
+                "trial": [r.trial.key for r in results],
+                "params": [
+                    json.dumps(r.trial.params, sort_keys=True, default=str)
+                    for r in results
+                ],
+                "universe": [r.trial.universe for r in results],
+                "status": [r.status for r in results],
+                "error": [r.error for r in results],
+                "elapsed": [r.elapsed for r in results],
+                "finished_at": [r.finished_at for r in results],
+            }
+            | {name: [r.metrics.get(name, np.nan) for r in results] for name in metrics}
+        )
+        self.results_path.parent.mkdir(parents=True, exist_ok=True)
+        with duckdb.connect(str(self.results_path)) as con:
+            columns = ", ".join(f"{c} {t}" for c, t in BASE_COLUMNS.items())
+            con.execute(f"CREATE TABLE IF NOT EXISTS {RESULTS_TABLE} ({columns})")
+            for name in metrics:
+                con.execute(
+                    f"ALTER TABLE {RESULTS_TABLE} "
+                    f"ADD COLUMN IF NOT EXISTS {_quote(name)} DOUBLE"
+                )
+            con.register("batch", batch)
+            con.execute("BEGIN TRANSACTION")
+            # 重新运行的试验（之前失败的）覆盖旧结果
+            con.execute(
+                f"DELETE FROM {RESULTS_TABLE} WHERE sweep = ? "
+                "AND trial IN (SELECT trial FROM batch)",
+                [self.name],
+            )
+            con.execute(f"INSERT INTO {RESULTS_TABLE} BY NAME SELECT * FROM batch")
+            con.execute("COMMIT")
+
+
+def _tables(con: duckdb.DuckDBPyConnection) -> dict[str, set[str]]:
+    rows = con.execute(
+        "SELECT table_name, column_name FROM information_schema.columns"
+    ).fetchall()
+    tables: dict[str, set[str]] = {}
+    for table, column in rows:
+        tables.setdefault(table, set()).add(column)
+    return tables
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
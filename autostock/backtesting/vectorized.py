@@ -0,0 +1,392 @@
+"""
+向量化回测引擎。
+
+与 backtrader 逐根K线、逐只股票调用 Python 代码不同，这里按交易日循环，每天对全部股票做一次数组运算：
+输入是 `DailyPanel` 和同形状的目标仓位矩阵（每天收盘后决定的各股票目标权重），
+输出每天的净值、现金、成交额和费用。全市场5000只股票、10年的回测只需要几秒。
+
+A股交易规则：
+- 信号在第 t 天收盘后产生，第 t+1 天按开盘价（或收盘价）成交，不使用未来数据；
+- 买入数量向下取整到一手（100股）的整数倍，卖出清仓时卖出全部持股；
+- 只调整目标权重发生变化的股票（可选定期全部再平衡），价格波动造成的权重偏离不会引起交易；
+- 涨停时不能买入、跌停时不能卖出，停牌（价格为 NaN）时不能交易、按最近的收盘价估值；
+  未能成交的调仓在之后的交易日按当时的目标权重继续执行；
+- 每天只在一个价格上调仓一次（先卖后买，卖出所得当天可用），因此当天买入的股票不会在当天卖出（T+1）；
+- 佣金双向收取（有最低佣金），印花税只在卖出时收取，过户费双向收取。
+
+    weights = equal_weights(hold_from_signals(entries, exits), max_positions=20)
+    result = run_backtest(panel, weights, initial_cash=1_000_000)
+    result.metrics()["sharpe"]
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from autostock.backtesting import metrics
+from autostock.datamanager.panel import DailyPanel
+
+# 股票代码前缀 -> 涨跌幅限制，按顺序匹配（更长的前缀必须排在前面）
+PRICE_LIMIT_RULES = [
+    (("sh688", "sz300", "sz301"), 0.20),
+    (("bj",), 0.30),
+]
+DEFAULT_PRICE_LIMIT = 0.10
+# 用不复权价格判断涨跌停时允许的价格误差：半个最小价位（0.005元）。
+# 涨跌停价已经四舍五入到分，误差只用于吸收浮点误差，离涨跌停价一个价位（如 10.99）不算涨跌停
+LIMIT_PRICE_TOLERANCE = 0.005
+# 用前复权价格判断涨跌停时允许的涨跌幅误差。前复权价格整体乘以了复权因子，
+# 绝对价格误差随复权因子变化，而涨跌幅不受影响；0.1% 覆盖5元以上股票涨跌停价四舍五入到分的误差
+LIMIT_RETURN_TOLERANCE = 0.001
+
+
+@dataclass(frozen=True)
+class TradingRules:
+    """
+    交易费用和规则。默认值为常见的A股费率。
+    """
+
+    # 佣金费率（双向）
+    commission_rate: float = 0.00025
+    # 每笔最低佣金（元）
+    min_commission: float = 5.0
+    # 印花税（仅卖出），2023年8月28日起为万分之五
+    stamp_duty_rate: float = 0.0005
+    # 过户费（双向）
+    transfer_fee_rate: float = 0.00001
+    # 每手股数
+    lot_size: int = 100
+    # 是否限制涨停买入、跌停卖出
+    enforce_price_limits: bool = True
+
+    def buy_fees(self, value: np.ndarray) -> np.ndarray:
+        return (
+            np.maximum(value * self.commission_rate, self.min_commission)
+            + value * self.transfer_fee_rate
+        )
+
+    def sell_fees(self, value: np.ndarray) -> np.ndarray:
+        return self.buy_fees(value) + value * self.stamp_duty_rate
+
+
+def price_limit_rates(symbols: list[str]) -> np.ndarray:
+    """
+    按股票代码判断涨跌幅限制：科创板、创业板20%，北交所30%，其他10%。
+
+    ST股票（5%）和新股上市初期无法从代码判断，需要时可以向 `run_backtest` 传入自己的限制。
+    """
+    codes = pd.Series(symbols, dtype=object).astype(str)
+    rates = np.full(len(codes), DEFAULT_PRICE_LIMIT)
+    assigned = np.zeros(len(codes), dtype=bool)
+    for prefixes, rate in PRICE_LIMIT_RULES:
+        match = codes.str.startswith(prefixes).to_numpy(bool) & ~assigned
+        rates[match] = rate
+        assigned |= match
+    return rates
+
+
+def hold_from_signals(entries: np.ndarray, exits: np.ndarray) -> np.ndarray:
+    """
+    由买入/卖出信号矩阵得到持有状态矩阵：出现买入信号后持有，直到出现卖出信号。
+
+    同一天同时出现两种信号时以卖出为准。
+
+    :param entries: 买入信号，(日期数, 股票数) 的布尔矩阵。
+    :param exits: 卖出信号，同形状的布尔矩阵。
+    :return: 持有状态布尔矩阵。
+    """
+    entries = np.asarray(entries, dtype=bool)
+    exits = np.asarray(exits, dtype=bool)
+    events = entries | exits
+    # 每个位置上最近一次信号所在的行，之后取该行的信号类型
+    rows = np.arange(len(events))[:, None]
+    last_event = np.maximum.accumulate(np.where(events, rows, -1), axis=0)
+    held = np.take_along_axis(entries & ~exits, np.maximum(last_event, 0), axis=0)
+    return held & (last_event >= 0)
+
+
+def equal_weights(held: np.ndarray, max_positions: int | None = None) -> np.ndarray:
+    """
+    把持有状态矩阵转换为等权重的目标仓位。
+
+    :param held: 持有状态布尔矩阵。
+    :param max_positions: 单只股票的权重不超过 1 / max_positions（持有的股票少于该数量时保留现金）。
+                          None 表示总是满仓。
+    :return: 目标权重矩阵，每行之和不超过1。
+    """
+    held = np.asarray(held, dtype=bool)
+    count = held.sum(axis=1, keepdims=True).astype(np.float64)
+    if max_positions is not None:
+        count = np.maximum(count, max_positions)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(held, 1.0 / count, 0.0)
+
+
+@dataclass
+class BacktestResult:
+    """
+    回测结果，每个数组的第0维对应 `dates`。
+    """
+
+    dates: np.ndarray
+    symbols: list[str]
+    # 每天收盘后的总资产
+    equity: np.ndarray
+    cash: np.ndarray
+    # 当天的成交金额（买入+卖出）
+    turnover: np.ndarray
+    # 当天的交易费用（佣金、印花税、过户费）
+    fees: np.ndarray
+    # 当天成交的笔数
+    trades: np.ndarray
+    # 当天因涨跌停未能成交的订单数
+    blocked: np.ndarray
+    # 每天收盘后各股票的持股数 (日期数, 股票数)，`record_positions=False` 时为 None
+    positions: np.ndarray | None = None
+
+    @property
+    def returns(self) -> np.ndarray:
+        return metrics.daily_returns(self.equity)
+
+    def metrics(self, benchmark: np.ndarray | None = None, **kwargs) -> dict:
+        """
+        绩效指标，见 `metrics.summary`。另外加入总成交额、总费用和换手率。
+        """
+        result = metrics.summary(self.equity, benchmark, **kwargs)
+        average_equity = float(np.nanmean(self.equity))
+        years = max(len(self.dates) - 1, 1) / metrics.TRADING_DAYS_PER_YEAR
+        result["total_fees"] = float(self.fees.sum())
+        result["total_trades"] = int(self.trades.sum())
+        # 年化单边换手率
+        result["annual_turnover"] = (
+            float(self.turnover.sum()) / 2 / average_equity / years
+        )
+        return result
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        每日结果的DataFrame，以交易日为索引。
+        """
+        return pd.DataFrame(
+            {
+                "equity": self.equity,
+                "cash": self.cash,
+                "turnover": self.turnover,
+                "fees": self.fees,
+                "trades": self.trades,
+                "blocked": self.blocked,
+            },
+            index=pd.DatetimeIndex(self.dates, name="trade_date"),
+        )
+
+
+def run_backtest(
+    panel: DailyPanel,
+    weights: np.ndarray,
+    initial_cash: float = 1_000_000.0,
+    rules: TradingRules | None = None,
+    execution: str = "open",
+    limit_rates: np.ndarray | None = None,
+    unadjusted: DailyPanel | None = None,
+    rebalance_every: int | None = None,
+    record_positions: bool = True,
+) -> BacktestResult:
+    """
+    按目标仓位矩阵回测。
+
+    :param panel: 日线面板，需要 "close" 字段，按开盘价成交时还需要 "open"。
+    :param weights: 目标权重矩阵，形状与面板相同。第 t 行是第 t 天收盘后决定的目标仓位，
+                    在第 t+1 天成交。NaN 视为0，每行之和应不超过1。
+    :param initial_cash: 初始资金。
+    :param rules: 交易规则和费率，默认 `TradingRules()`。
+    :param execution: 成交价格，"open" 或 "close"。
+    :param limit_rates: 各股票的涨跌幅限制，默认按代码判断（见 `price_limit_rates`）。
+    :param unadjusted: 与 `panel` 形状相同的不复权价格面板（"close" 和成交价字段），只用于判断涨跌停：
+                       按昨收计算到分的涨跌停价，与交易所规则一致。不提供时用 `panel` 的前复权价格
+                       按涨跌幅判断（见 `LIMIT_RETURN_TOLERANCE`），低价股可能误判。
+    :param rebalance_every: 每隔多少个交易日把所有持仓调回目标权重。默认只在目标权重变化时
+                            调整对应的股票，价格波动造成的权重偏离不会引起交易。
+    :param record_positions: 是否记录每天的持股矩阵。
+    :return: BacktestResult。
+    """
+    if execution not in ("open", "close"):
+        raise ValueError(f"Unknown execution price '{execution}'.")
+    rules = rules or TradingRules()
+    close = panel["close"]
+    price = panel[execution]
+    weights = np.nan_to_num(np.asarray(weights, dtype=np.float64), nan=0.0)
+    if weights.shape != close.shape:
+        raise ValueError(
+            f"weights shape {weights.shape} does not match the panel {close.shape}."
+        )
+    if limit_rates is None:
+        limit_rates = price_limit_rates(panel.symbols)
+    if unadjusted is not None:
+        if unadjusted.shape != close.shape:
+            raise ValueError(
+                f"unadjusted panel shape {unadjusted.shape} does not match the panel {close.shape}."
+            )
+        limit_close, limit_price = unadjusted["close"], unadjusted[execution]
+    else:
+        limit_close, limit_price = close, price
+    days, symbols = close.shape
+
+    cash = float(initial_cash)
+    shares = np.zeros(symbols)
+    # 各股票最近的收盘价，用于估值和计算涨跌停价；从未交易过的股票为0
+    last_close = np.zeros(symbols)
+    # 判断涨跌停用的昨收（提供了不复权价格时为不复权收盘价）
+    limit_prev = last_close if unadjusted is None else np.zeros(symbols)
+    result = BacktestResult(
+        dates=panel.dates,
+        symbols=list(panel.symbols),
+        equity=np.full(days, np.nan),
+        cash=np.full(days, np.nan),
+        turnover=np.zeros(days),
+        fees=np.zeros(days),
+        trades=np.zeros(days, dtype=np.int64),
+        blocked=np.zeros(days, dtype=np.int64),
+        positions=np.zeros((days, symbols)) if record_positions else None,
+    )
+
+    # 目标权重变化后尚未完成调仓的股票（停牌或涨跌停时保留到之后的交易日）
+    pending = np.zeros(symbols, dtype=bool)
+    previous = np.zeros(symbols)
+    for t in range(days):
+        if t > 0:
+            target_weights = weights[t - 1]
+            pending |= target_weights != previous
+            if rebalance_every and t % rebalance_every == 0:
+                pending |= (target_weights > 0) | (shares > 0)
+            previous = target_weights
+            if pending.any():
+                cash = _rebalance(
+                    t,
+                    price[t],
+                    target_weights,
+                    pending,
+                    shares,
+                    last_close,
+                    cash,
+                    _price_limit_blocked(
+                        limit_price[t], limit_prev, limit_rates, unadjusted is not None
+                    ),
+                    rules,
+                    result,
+                )
+        np.copyto(last_close, close[t], where=~np.isnan(close[t]))
+        if unadjusted is not None:
+            np.copyto(limit_prev, limit_close[t], where=~np.isnan(limit_close[t]))
+        result.cash[t] = cash
+        result.equity[t] = cash + shares @ last_close
+        if record_positions:
+            result.positions[t] = shares
+    return result
+
+
+def _rebalance(
+    t: int,
+    price: np.ndarray,
+    target_weights: np.ndarray,
+    pending: np.ndarray,
+    shares: np.ndarray,
+    last_close: np.ndarray,
+    cash: float,
+    limits: tuple[np.ndarray, np.ndarray],
+    rules: TradingRules,
+    result: BacktestResult,
+) -> float:
+    """
+    按第 t 天的成交价把 `pending` 中的股票调整到目标权重，原地修改 `shares` 和 `pending`，
+    返回调仓后的现金。`limits` 是各股票当天的 (是否涨停, 是否跌停)，见 `_price_limit_blocked`。
+    """
+    tradable = ~np.isnan(price) & (price > 0)
+    mark = np.where(tradable, price, last_close)
+    value = cash + shares @ mark
+
+    columns = np.flatnonzero(pending & tradable)
+    if not columns.size:
+        return cash
+    lot = rules.lot_size
+    fill = price[columns]
+    target = np.floor(target_weights[columns] * value / (fill * lot)) * lot
+    delta = target - shares[columns]
+
+    blocked = np.zeros(columns.size, dtype=bool)
+    if rules.enforce_price_limits:
+        at_up, at_down = limits[0][columns], limits[1][columns]
+        blocked = ((delta > 0) & at_up) | ((delta < 0) & at_down)
+    pending[columns[~blocked]] = False
+
+    # 先卖出，所得资金当天即可用于买入
+    selling = ~blocked & (delta < 0)
+    sell_columns = columns[selling]
+    sell_value = -delta[selling] * fill[selling]
+    sell_fees = rules.sell_fees(sell_value)
+    cash += float(sell_value.sum() - sell_fees.sum())
+    shares[sell_columns] = target[selling]
+
+    buying = ~blocked & (delta > 0)
+    buy_columns = columns[buying]
+    buy_shares, buy_value, buy_fees = _affordable(
+        delta[buying], fill[buying], cash, rules
+    )
+    cash -= float(buy_value.sum() + buy_fees.sum())
+    shares[buy_columns] += buy_shares
+
+    result.turnover[t] = float(sell_value.sum() + buy_value.sum())
+    result.fees[t] = float(sell_fees.sum() + buy_fees.sum())
+    result.trades[t] = int(sell_columns.size + np.count_nonzero(buy_shares))
+    result.blocked[t] = int(blocked.sum())
+    return cash
+
+
+def _price_limit_blocked(
+    price: np.ndarray, prev: np.ndarray, rates: np.ndarray, unadjusted: bool
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    判断成交价是否处于涨停/跌停。没有昨收（从未交易过）的股票不受限制。
+
+    :param unadjusted: 价格是否为不复权价格。是则按昨收计算到分的涨跌停价，允许半个最小价位的浮点误差；
+                       否则价格是前复权的，按相对昨收的涨跌幅判断。
+    :return: (是否涨停, 是否跌停)
+    """
+    has_prev = prev > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if unadjusted:
+            limit_up = np.floor(prev * (1 + rates) * 100 + 0.5) / 100
+            limit_down = np.floor(prev * (1 - rates) * 100 + 0.5) / 100
+            at_up = price >= limit_up - LIMIT_PRICE_TOLERANCE
+            at_down = price <= limit_down + LIMIT_PRICE_TOLERANCE
+        else:
+            change = price / prev - 1
+            at_up = change >= rates - LIMIT_RETURN_TOLERANCE
+            at_down = change <= -rates + LIMIT_RETURN_TOLERANCE
+    return has_prev & at_up, has_prev & at_down
+
+
+def _affordable(
+    quantity: np.ndarray, price: np.ndarray, cash: float, rules: TradingRules
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    现金不足以完成全部买入时，按比例缩减各笔买入（仍为整手），使总成本不超过现金。
+    """
+    lot = rules.lot_size
+    for _ in range(5):
+        value = quantity * price
+        fees = np.where(quantity > 0, rules.buy_fees(value), 0.0)
+        cost = float(value.sum() + fees.sum())
+        if cost <= cash or not quantity.any():
+            return quantity, value, fees
+        scale = max(cash, 0.0) / cost
+        quantity = np.floor(quantity * scale / lot) * lot
+    # 最低佣金可能使缩减后仍然超出，此时只保留成本最低、总额不超过现金的若干笔
+    value = quantity * price
+    fees = np.where(quantity > 0, rules.buy_fees(value), 0.0)
+    order = np.argsort(value + fees)
+    drop = order[np.cumsum((value + fees)[order]) > cash]
+    quantity[drop] = 0.0
+    value[drop] = 0.0
+    fees[drop] = 0.0
+    return quantity, value, fees
@@ -0,0 +1,419 @@
+"""
+autostock 命令行入口。
+
+    autostock sync overview
+    autostock sync daily --incremental
+    autostock query history sz000001 --start 2024-01-01
+    autostock query overview --industry 银行
+    autostock monitor --interval 5
+    autostock health
+
+只读命令（query、health）直接用 DuckDB 读取 Parquet 文件和数据库，不导入
+pandas、SQLModel、akshare 等重量级模块；这些模块只在 sync、monitor 命令中按需导入。
+因此本模块顶层只能导入标准库和 `autostock.core.config`，
+启动时间可以用 `scripts/benchmark_cli_startup.py` 检查。
+"""
+
+import argparse
+import csv
+import os
+import sys
+import unicodedata
+from datetime import date
+from pathlib import Path
+
+from autostock.core.config import Settings, get_settings
+
+# health 命令检查的数据表
+EXPECTED_TABLES = [
+    "market_overview",
+    "data_tracking",
+    "sync_run",
+    "sync_checkpoint",
+    "data_version",
+    "alembic_version",
+]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # 命令行参数写回环境变量并重新读取全局配置，而不只是替换传给命令的 settings：
+    # 数据库引擎和连接管理器（快照目录）在命令中才按需导入，它们读取的是同一份全局配置。
+    # 没有设置 AUTOSTOCK_DATABASE_URL 时数据库也随数据目录移动，跟踪信息与数据文件不会分离
+    if args.data_path:
+        os.environ["AUTOSTOCK_DATA_PATH"] = args.data_path
+    if args.allow_stale_cache:
+        os.environ["AUTOSTOCK_CACHE_ALLOW_STALE"] = "1"
+    get_settings.cache_clear()
+    settings = get_settings()
+    if not hasattr(args, "handler"):
+        parser.print_help()
+        return 1
+    return args.handler(args, settings)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="autostock", description="A-share data management tools."
+    )
+    parser.add_argument(
+        "--data-path",
+        help="data root directory (default: AUTOSTOCK_DATA_PATH); the database "
+        "moves with it to DATA_PATH/market.db unless AUTOSTOCK_DATABASE_URL is set",
+    )
+    parser.add_argument(
+        "--allow-stale-cache",
+        action="store_true",
+        help="reuse expired cached responses instead of refetching "
+        "(default: AUTOSTOCK_CACHE_ALLOW_STALE)",
+    )
+    commands = parser.add_subparsers(title="commands")
+
+    # --- sync ---
+    sync = commands.add_parser("sync", help="fetch data from the network")
+    sync_commands = sync.add_subparsers(title="targets")
+
+    overview = sync_commands.add_parser(
+        "overview", help="refresh the market overview and tracked stocks"
+    )
+    overview.set_defaults(handler=cmd_sync_overview)
+
+    daily = sync_commands.add_parser("daily", help="sync daily history")
+    daily.add_argument("--codes", nargs="+", help="symbols, e.g. sz000001 sh600000")
+    daily.add_argument("--incremental", action="store_true")
+    daily.add_argument(
+        "--resume", action="store_true", help="continue the last unfinished run"
+    )
+    daily.add_argument(
+        "--layout", choices=["per_symbol", "dataset"], default="per_symbol"
+    )
+    daily.add_argument("--workers", type=int, default=8, help="fetch workers")
+    daily.add_argument("--rps", type=float, default=8.0, help="requests per second")
+    daily.set_defaults(handler=cmd_sync_daily)
+
+    # --- query ---
+    query = commands.add_parser("query", help="read local data")
+    query_commands = query.add_subparsers(title="targets")
+
+    history = query_commands.add_parser("history", help="daily history of a symbol")
+    history.add_argument("symbol")
+    history.add_argument("--start", type=date.fromisoformat, help="YYYY-MM-DD")
+    history.add_argument("--end", type=date.fromisoformat, help="YYYY-MM-DD")
+    history.add_argument(
+        "--columns", help="comma-separated columns, e.g. open,close,volume"
+    )
+    history.add_argument("--limit", type=int, default=20, help="0 for all rows")
+    history.add_argument("--csv", action="store_true", help="print CSV")
+    history.set_defaults(handler=cmd_query_history)
+
+    overview = query_commands.add_parser("overview", help="market overview")
+    overview.add_argument("--symbol", nargs="+")
+    overview.add_argument("--industry")
+    overview.add_argument("--market-type")
+    overview.add_argument("--limit", type=int, default=20, help="0 for all rows")
+    overview.add_argument("--csv", action="store_true", help="print CSV")
+    overview.set_defaults(handler=cmd_query_overview)
+
+    # --- monitor ---
+    monitor = commands.add_parser("monitor", help="watch realtime market quotes")
+    monitor.add_argument(
+        "--interval", type=float, default=5.0, help="polling interval in seconds"
+    )
+    monitor.add_argument("--ticks", type=int, default=0, help="0 to run until Ctrl+C")
+    monitor.add_argument(
+        "--top", type=int, default=5, help="fastest movers to print per tick"
+    )
+    monitor.set_defaults(handler=cmd_monitor)
+
+    # --- health ---
+    health = commands.add_parser("health", help="check database and data files")
+    health.set_defaults(handler=cmd_health)
+    return parser
+
+
+def cmd_sync_overview(args: argparse.Namespace, settings: Settings) -> int:
+    manager = _create_manager(settings)
+    result = manager.sync_market_overview()
+    return 0 if result["records"] else 1
+
+
+def cmd_sync_daily(args: argparse.Namespace, settings: Settings) -> int:
+    manager = _create_manager(settings, daily_layout=args.layout)
+    summary = manager.sync_daily_history(
+        codes=args.codes,
+        workers=args.workers,
+        requests_per_second=args.rps,
+        incremental=args.incremental,
+        resume=args.resume,
+    )
+    return 1 if summary.failed else 0
+
+
+def cmd_query_history(args: argparse.Namespace, settings: Settings) -> int:
+    import duckdb
+
+    data_path = Path(settings.data_path)
+    file_path = data_path / "daily" / f"{args.symbol}.parquet"
+    from_dataset = not file_path.exists()
+    if not from_dataset:
+        source = f"read_parquet('{_quote(file_path.as_posix())}')"
+        conditions = []
+    else:
+        dataset_files = list((data_path / "daily_dataset").glob("year=*/*.parquet"))
+        if not dataset_files:
+            print(f"ERROR: No daily data for {args.symbol} under {data_path}.")
+            return 1
+        source = (
+            f"read_parquet('{_quote((data_path / 'daily_dataset').as_posix())}"
+            f"/*/*.parquet', hive_partitioning = true)"
+        )
+        conditions = [f"symbol = {_literal(args.symbol)}"]
+
+    if args.start:
+        conditions.append(f"trade_date >= DATE {_literal(args.start.isoformat())}")
+    if args.end:
+        conditions.append(f"trade_date <= DATE {_literal(args.end.isoformat())}")
+
+    columns = "*"
+    if args.columns:
+        names = [c.strip() for c in args.columns.split(",") if c.strip()]
+        columns = ", ".join(
+            '"' + c.replace('"', '""') + '"'
+            for c in ["trade_date"] + [c for c in names if c != "trade_date"]
+        )
+    elif from_dataset:
+        # 分区列不属于日线数据
+        columns = "* EXCLUDE (year)"
+
+    sql = f"SELECT {columns} FROM {source}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if args.limit > 0:
+        # 默认只显示最近的若干个交易日
+        sql = (
+            f"SELECT * FROM ({sql} ORDER BY trade_date DESC LIMIT {int(args.limit)}) "
+            f"ORDER BY trade_date"
+        )
+    else:
+        sql += " ORDER BY trade_date"
+
+    con = duckdb.connect()
+    try:
+        _print_result(con.execute(sql), args.csv)
+    except duckdb.Error as e:
+        print(f"ERROR: {e}")
+        return 1
+    finally:
+        con.close()
+    return 0
+
+
+def cmd_query_overview(args: argparse.Namespace, settings: Settings) -> int:
+    con = _connect_database(settings)
+    if con is None:
+        return 1
+
+    conditions = []
+    if args.symbol:
+        conditions.append(f"symbol IN ({', '.join(map(_literal, args.symbol))})")
+    if args.industry:
+        conditions.append(f"industry = {_literal(args.industry)}")
+    if args.market_type:
+        conditions.append(f"market_type = {_literal(args.market_type)}")
+
+    sql = "SELECT * FROM market_overview"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY symbol"
+    if args.limit > 0:
+        sql += f" LIMIT {int(args.limit)}"
+
+    try:
+        _print_result(con.execute(sql), args.csv)
+    except Exception as e:
+        print(f"ERROR: {e}")
+        return 1
+    finally:
+        con.close()
+    return 0
+
+
+def cmd_monitor(args: argparse.Namespace, settings: Settings) -> int:
+    from autostock.core.logging import configure_logging
+    from autostock.datamanager.fetcher import AkshareFetcher
+    from autostock.monitor import MarketMonitor
+
+    configure_logging(settings)
+    monitor = MarketMonitor(AkshareFetcher())
+
+    def report(tick) -> None:
+        stats = tick.stats
+        print(
+            f"{tick.time:%H:%M:%S}  adv {stats.advancing}  dec {stats.declining}  "
+            f"flat {stats.flat} | limit up {stats.limit_up}  down {stats.limit_down}  "
+            f"broken {stats.limit_up_broken} | surging {stats.surging} | "
+            f"changed {len(tick.changes)} ({tick.elapsed * 1000:.1f}ms)"
+        )
+        for label, symbols in (
+            ("limit up", tick.new_limit_up),
+            ("limit down", tick.new_limit_down),
+            ("surge", tick.new_surges),
+        ):
+            if symbols and monitor.ticks > 1:
+                print(f"   new {label}: {' '.join(symbols[:10])}")
+        if args.top > 0:
+            movers = monitor.top_movers(args.top)
+            if not movers.empty:
+                print(
+                    "   fastest: "
+                    + "  ".join(
+                        f"{row.symbol} {row.speed:+.2f}%"
+                        for row in movers.itertuples(index=False)
+                    )
+                )
+
+    processed = monitor.run(
+        interval=args.interval, max_ticks=args.ticks or None, on_tick=report
+    )
+    return 0 if processed else 1
+
+
+def cmd_health(args: argparse.Namespace, settings: Settings) -> int:
+    print("🚀 Running health check...")
+    healthy = True
+
+    con = _connect_database(settings)
+    if con is None:
+        healthy = False
+    else:
+        from autostock.database.connection import SNAPSHOT_TABLES, ConnectionManager
+
+        source = ConnectionManager.source_of(con)
+        print(
+            f"✅ Database connection successful ({settings.database_path}, {source})."
+        )
+        # 数据库被占用时只能看到快照中的表
+        expected = EXPECTED_TABLES if source == "database" else SNAPSHOT_TABLES
+        try:
+            tables = {row[0] for row in con.execute("SHOW TABLES").fetchall()}
+            for table in expected:
+                if table not in tables:
+                    print(f"❌ Table '{table}' does not exist.")
+                    healthy = False
+                    continue
+                count = con.execute(f'SELECT count(*) FROM "{table}"').fetchone()[0]
+                print(f"✅ Table '{table}' exists with {count} rows.")
+            if "alembic_version" in tables:
+                version = con.execute(
+                    "SELECT version_num FROM alembic_version"
+                ).fetchone()
+                print(f"   Migration version: {version[0] if version else 'none'}")
+            if "sync_run" in tables:
+                run = con.execute(
+                    "SELECT run_id, status, total, succeeded, failed, started_at "
+                    "FROM sync_run ORDER BY started_at DESC LIMIT 1"
+                ).fetchone()
+                if run is not None:
+                    print(
+                        f"   Last sync run {run[0]}: {run[1]}, "
+                        f"{run[3]}/{run[2]} succeeded, {run[4]} failed, "
+                        f"started {run[5]}"
+                    )
+        finally:
+            con.close()
+
+    data_path = Path(settings.data_path)
+    daily_files = sum(1 for _ in (data_path / "daily").glob("*.parquet"))
+    dataset_years = sorted(
+        p.name for p in (data_path / "daily_dataset").glob("year=*") if p.is_dir()
+    )
+    print(f"✅ Data path: {data_path.resolve()}")
+    print(f"   Per-symbol daily files: {daily_files}")
+    if dataset_years:
+        print(
+            f"   Daily dataset: {len(dataset_years)} year(s), "
+            f"{dataset_years[0]} .. {dataset_years[-1]}"
+        )
+    cache_bytes = sum(p.stat().st_size for p in (data_path / "cache").glob("*/*"))
+    print(f"   Raw response cache: {cache_bytes / 1024 / 1024:.1f} MB")
+    print("🏁 Health check finished.")
+    return 0 if healthy else 1
+
+
+def _create_manager(settings: Settings, **kwargs):
+    # 只有 sync 命令需要 DataManager（会导入 pandas、SQLModel 和数据库引擎）
+    from autostock.core.logging import configure_logging
+    from autostock.datamanager.manager import DataManager
+
+    configure_logging(settings)
+    return DataManager(
+        data_path=settings.data_path,
+        allow_stale_cache=settings.cache_allow_stale,
+        **kwargs,
+    )
+
+
+def _connect_database(settings: Settings):
+    """
+    打开一个只读连接：优先只读打开数据库文件，数据库被同步任务占用时改为读取快照。
+    失败时返回None。
+    """
+    import duckdb
+
+    from autostock.database.connection import ConnectionManager
+
+    manager = ConnectionManager(
+        settings.database_path, Path(settings.data_path) / "snapshot"
+    )
+    if not manager.database_path.exists() and not any(
+        manager.snapshot_dir.glob("*.parquet")
+    ):
+        print(f"❌ Database file not found: {manager.database_path}")
+        return None
+    try:
+        return manager.open_reader()
+    except duckdb.Error as e:
+        print(f"❌ Database connection failed: {e}")
+        return None
+
+
+def _print_result(result, as_csv: bool) -> None:
+    columns = [d[0] for d in result.description]
+    rows = result.fetchall()
+    if as_csv:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(columns)
+        writer.writerows(rows)
+        return
+
+    cells = [columns] + [["" if v is None else str(v) for v in row] for row in rows]
+    widths = [max(_display_width(row[i]) for row in cells) for i in range(len(columns))]
+    for index, row in enumerate(cells):
+        print(
+            "  ".join(
+                value + " " * (width - _display_width(value))
+                for value, width in zip(row, widths)
+            )
+        )
+        if index == 0:
+            print("  ".join("-" * width for width in widths))
+    print(f"({len(rows)} rows)")
+
+
+def _display_width(value: str) -> int:
+    # 中文等全角字符在终端中占两列
+    return sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in value)
+
+
+def _quote(value: str) -> str:
+    return value.replace("'", "''")
+
+
+def _literal(value: str) -> str:
+    # 不使用参数绑定：DuckDB 绑定任何参数时都会导入 pandas，使启动时间增加数百毫秒
+    return f"'{_quote(value)}'"
+
+
+if __name__ == "__main__":
+    sys.exit(main())
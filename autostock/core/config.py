@@ -0,0 +1,71 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import PurePath
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    全局配置。所有字段都可以通过 `AUTOSTOCK_` 前缀的环境变量覆盖，
+    例如 `AUTOSTOCK_DB_ECHO=1` 打开SQL日志。
+
+    本模块只依赖标准库，命令行等需要快速启动的入口可以放心导入。
+    """
+
+    # 数据库连接地址。注意：这里的路径是相对于项目根目录的相对路径。
+    # 没有设置 AUTOSTOCK_DATABASE_URL 时为 `data_path` 下的 market.db，数据库与它跟踪的数据文件总在一起
+    database_url: str = "duckdb:///datas/market.db"
+    # 是否打印每一条SQL语句（调试用）
+    db_echo: bool = False
+    # 数据存储的根目录
+    data_path: str = "./datas"
+    # 根logger的日志级别
+    log_level: str = "WARNING"
+    # 是否使用已过期的原始响应缓存（datas/cache），用于离线重新清洗/导入
+    cache_allow_stale: bool = False
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        defaults = cls()
+        data_path = os.environ.get("AUTOSTOCK_DATA_PATH", defaults.data_path)
+        return cls(
+            database_url=os.environ.get(
+                "AUTOSTOCK_DATABASE_URL", database_url_for(data_path)
+            ),
+            db_echo=_env_bool("AUTOSTOCK_DB_ECHO", defaults.db_echo),
+            data_path=data_path,
+            log_level=os.environ.get("AUTOSTOCK_LOG_LEVEL", defaults.log_level).upper(),
+            cache_allow_stale=_env_bool(
+                "AUTOSTOCK_CACHE_ALLOW_STALE", defaults.cache_allow_stale
+            ),
+        )
+
+    @property
+    def database_path(self) -> str:
+        """
+        DuckDB 数据库文件的路径（去掉 `duckdb:///` 前缀）。
+        """
+        return self.database_url.split(":///", 1)[-1]
+
+
+def database_url_for(data_path: str) -> str:
+    """
+    数据目录下默认的数据库连接地址，默认数据目录 "./datas" 对应 "duckdb:///datas/market.db"。
+    """
+    return f"duckdb:///{PurePath(data_path, 'market.db').as_posix()}"
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    获取全局配置（进程内只从环境变量读取一次）。
+    """
+    return Settings.from_env()
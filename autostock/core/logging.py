@@ -0,0 +1,21 @@
+import logging
+
+from autostock.core.config import Settings, get_settings
+
+
+def configure_logging(settings: Settings | None = None) -> None:
+    """
+    按配置设置根logger。由程序入口（命令行、脚本）显式调用，库模块在导入时不修改日志配置。
+
+    已有的handler会被替换，确保此处的配置是唯一生效的配置。
+    SQLAlchemy 的日志只在打开 `db_echo` 时输出。
+    """
+    settings = settings or get_settings()
+    logging.basicConfig(
+        level=settings.log_level,
+        format="%(levelname)s: %(message)s",
+        force=True,
+    )
+    logging.getLogger("sqlalchemy").setLevel(
+        logging.INFO if settings.db_echo else logging.WARNING
+    )
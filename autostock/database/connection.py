@@ -0,0 +1,232 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterator
+
+import duckdb
+
+from autostock.core.config import get_settings
+
+# 定期导出为快照、供其他进程只读访问的表
+SNAPSHOT_TABLES = ("market_overview", "data_tracking", "sync_run", "data_version")
+
+
+class ConnectionManager:
+    """
+    DuckDB 连接管理。
+
+    DuckDB 同一时间只允许一个进程以读写模式打开数据库文件，且持有写锁时其他进程连只读打开都不行。
+    因此：
+
+    - 每个进程最多持有一个读写连接（`writer()`），SQLAlchemy 引擎和本进程内的读取
+      都通过它的 `cursor()` 获得独立的连接，共享同一个数据库实例，读取不会阻塞写入；
+    - 其他进程（Notebook、Panel界面、命令行）通过 `reader()` 读取：数据库未被占用时只读打开文件，
+      被同步任务占用时自动改为读取写入进程定期导出的Parquet快照（`snapshot/{table}.parquet`）。
+
+    本模块只依赖 duckdb 和标准库（pyarrow/pandas 在用到时才导入），命令行可以直接使用。
+    """
+
+    def __init__(
+        self,
+        database_path: str | Path,
+        snapshot_dir: str | Path,
+        snapshot_tables: tuple[str, ...] = SNAPSHOT_TABLES,
+        snapshot_interval: float = 30.0,
+    ):
+        """
+        :param database_path: DuckDB 数据库文件路径。
+        :param snapshot_dir: 快照目录。
+        :param snapshot_tables: 需要导出快照的表。
+        :param snapshot_interval: 两次快照之间的最短间隔（秒），同步过程中的频繁提交不会每次都导出。
+        """
+        self.database_path = Path(database_path)
+        self.snapshot_dir = Path(snapshot_dir)
+        self.snapshot_tables = snapshot_tables
+        self.snapshot_interval = snapshot_interval
+        self._writer: duckdb.DuckDBPyConnection | None = None
+        self._lock = threading.Lock()
+        # 第一次导出不受间隔限制（time.monotonic() 的起点不确定，可能小于间隔）
+        self._last_snapshot = float("-inf")
+
+    # ------------------------------------------------------------------ 写入端
+
+    def writer(self) -> duckdb.DuckDBPyConnection:
+        """
+        返回本进程唯一的读写连接，首次调用时打开数据库文件（并获得写锁）。
+        不要在多个线程中共享这个对象，需要并发访问时使用 `cursor()`。
+        """
+        with self._lock:
+            if self._writer is None:
+                self.database_path.parent.mkdir(parents=True, exist_ok=True)
+                self._writer = duckdb.connect(str(self.database_path))
+            return self._writer
+
+    def cursor(self) -> duckdb.DuckDBPyConnection:
+        """
+        从读写连接派生一个新连接：与读写连接共享数据库实例，可以在另一个线程中独立使用。
+        """
+        return self.writer().cursor()
+
+    @property
+    def has_writer(self) -> bool:
+        return self._writer is not None
+
+    def close(self) -> None:
+        """
+        关闭读写连接并释放写锁。之后再次调用 `writer()` 会重新打开数据库。
+        """
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def write_frame(self, table: str, data: Any) -> int:
+        """
+        将一个 DataFrame 或 Arrow 表按列名批量插入到指定表中（不经过ORM）。
+
+        :param table: 目标表名。
+        :param data: pandas.DataFrame、pyarrow.Table 或 RecordBatchReader。
+        :return: 插入的行数。
+        """
+        conn = self.cursor()
+        try:
+            conn.register("incoming_frame", data)
+            conn.execute(f'INSERT INTO "{table}" BY NAME SELECT * FROM incoming_frame')
+            return conn.execute("SELECT count(*) FROM incoming_frame").fetchone()[0]
+        finally:
+            conn.close()
+
+    def publish_snapshot(self, force: bool = False) -> bool:
+        """
+        把 `snapshot_tables` 导出为 zstd 压缩的Parquet快照，供其他进程在写锁被占用时读取。
+
+        每个文件先写入临时文件再重命名，读取方看到的总是完整的快照。
+        只有持有读写连接的进程才会导出。
+
+        :param force: 忽略 `snapshot_interval` 立即导出（例如同步结束时）。
+        :return: 是否导出了快照。
+        """
+        if self._writer is None:
+            return False
+        now = time.monotonic()
+        if not force and now - self._last_snapshot < self.snapshot_interval:
+            return False
+
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        conn = self.cursor()
+        try:
+            tables = {row[0] for row in conn.execute("SHOW TABLES").fetchall()}
+            for table in self.snapshot_tables:
+                if table not in tables:
+                    continue
+                target = self.snapshot_dir / f"{table}.parquet"
+                tmp_file = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+                conn.execute(
+                    f"COPY \"{table}\" TO '{_quote(tmp_file.as_posix())}' "
+                    f"(FORMAT parquet, COMPRESSION zstd)"
+                )
+                os.replace(tmp_file, target)
+        finally:
+            conn.close()
+        self._last_snapshot = now
+        return True
+
+    # ------------------------------------------------------------------ 读取端
+
+    @contextmanager
+    def reader(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """
+        获取一个只读用途的连接，用完自动关闭。
+
+        - 本进程持有读写连接时，返回它的 `cursor()`（看到的是已提交的最新数据）；
+        - 否则尝试以只读方式打开数据库文件；
+        - 数据库被其他进程占用时，返回一个内存连接，其中每张快照表都是指向快照Parquet的视图。
+          此时数据最多落后 `snapshot_interval` 秒。可以通过 `source_of(conn)` 判断来源。
+        """
+        conn = self.open_reader()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def query_arrow(self, sql: str, params: Any = None):
+        """
+        执行只读查询并以 pyarrow.Table 返回结果（列式数据直接从 DuckDB 交换，不构造ORM对象）。
+        """
+        with self.reader() as conn:
+            result = conn.execute(sql, params) if params else conn.execute(sql)
+            return to_arrow_table(result)
+
+    def query_df(self, sql: str, params: Any = None):
+        """
+        执行只读查询并以 pandas.DataFrame 返回结果。
+        """
+        with self.reader() as conn:
+            result = conn.execute(sql, params) if params else conn.execute(sql)
+            return result.df()
+
+    @staticmethod
+    def source_of(conn: duckdb.DuckDBPyConnection) -> str:
+        """
+        返回 `reader()` 所给连接的数据来源："database" 或 "snapshot"。
+        """
+        snapshot_views = conn.execute(
+            "SELECT count(*) FROM duckdb_views() WHERE comment = 'autostock snapshot'"
+        ).fetchone()[0]
+        return "snapshot" if snapshot_views else "database"
+
+    def open_reader(self) -> duckdb.DuckDBPyConnection:
+        """
+        与 `reader()` 相同，但由调用方负责关闭返回的连接。
+        """
+        if self._writer is not None:
+            return self.cursor()
+        if not self.database_path.exists():
+            return self._open_snapshot()
+        try:
+            return duckdb.connect(str(self.database_path), read_only=True)
+        except (duckdb.IOException, duckdb.ConnectionException) as e:
+            # 数据库正在被其他进程写入
+            if not any(self.snapshot_dir.glob("*.parquet")):
+                raise
+            print(f"INFO: Database is locked ({e}), reading from snapshot.")
+            return self._open_snapshot()
+
+    def _open_snapshot(self) -> duckdb.DuckDBPyConnection:
+        conn = duckdb.connect()
+        for path in sorted(self.snapshot_dir.glob("*.parquet")):
+            table = path.stem
+            conn.execute(
+                f'CREATE VIEW "{table}" AS '
+                f"SELECT * FROM read_parquet('{_quote(path.as_posix())}')"
+            )
+            conn.execute(f"COMMENT ON VIEW \"{table}\" IS 'autostock snapshot'")
+        return conn
+
+
+def to_arrow_table(result: duckdb.DuckDBPyConnection):
+    """
+    将查询结果取为 pyarrow.Table（兼容不同版本的 duckdb）。
+    """
+    # duckdb 1.4 起 fetch_arrow_table 更名为 to_arrow_table
+    if hasattr(result, "to_arrow_table"):
+        return result.to_arrow_table()
+    return result.fetch_arrow_table()
+
+
+def _quote(value: str) -> str:
+    return value.replace("'", "''")
+
+
+@lru_cache(maxsize=1)
+def get_connection_manager() -> ConnectionManager:
+    """
+    获取进程内唯一的连接管理器，数据库路径和快照目录来自全局配置。
+    """
+    settings = get_settings()
+    return ConnectionManager(
+        settings.database_path, Path(settings.data_path) / "snapshot"
+    )
@@ -1,10 +1,21 @@
+from duckdb_engine import ConnectionWrapper
 from sqlmodel import create_engine
 
+from autostock.core.config import get_settings
+from autostock.database.connection import get_connection_manager
+
 # 我们根据项目计划，使用 DuckDB，数据库文件存放在根目录的 `datas` 文件夹下
 # 注意：这里的路径是相对于项目根目录的相对路径。
 # 在 Alembic 配置中，我们需要确保它能正确解析这个路径。
-DATABASE_URL = "duckdb:///datas/market.db"
+# 地址和SQL日志开关来自全局配置（环境变量 AUTOSTOCK_DATABASE_URL / AUTOSTOCK_DB_ECHO）。
+settings = get_settings()
+DATABASE_URL = settings.database_url
 
 # 创建数据库引擎
 # 移除了 connect_args={"check_same_thread": False}，因为它与 duckdb 不兼容
-engine = create_engine(DATABASE_URL, echo=True)
+# 连接池中的每个连接都是进程内唯一读写连接的 cursor()，整个进程只持有一把写锁
+engine = create_engine(
+    DATABASE_URL,
+    echo=settings.db_echo,
+    creator=lambda: ConnectionWrapper(get_connection_manager().cursor()),
+)
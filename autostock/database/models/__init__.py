@@ -3,5 +3,7 @@
 
 from .market import MarketOverview
 from .tracking import DataTracking
+from .sync import SyncRun, SyncCheckpoint
+from .version import DataVersion
 
-__all__ = ["MarketOverview", "DataTracking"]
+__all__ = ["MarketOverview", "DataTracking", "SyncRun", "SyncCheckpoint", "DataVersion"]
@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import Field, SQLModel
+
+
+class SyncRun(SQLModel, table=True):
+    __tablename__ = "sync_run"
+
+    # 运行的唯一标识（uuid4 的十六进制字符串）
+    run_id: str = Field(primary_key=True)
+    # 同步任务类型，例如 'daily_history'
+    kind: str = Field(index=True)
+    # running / completed / failed / interrupted
+    status: str = Field(default="running")
+    # 启动参数（JSON字符串），便于排查问题
+    params: Optional[str] = None
+
+    # 统计信息
+    total: int = Field(default=0)
+    succeeded: int = Field(default=0)
+    skipped: int = Field(default=0)
+    failed: int = Field(default=0)
+
+    started_at: datetime = Field(default_factory=datetime.now, nullable=False)
+    finished_at: Optional[datetime] = None
+    updated_at: datetime = Field(
+        default_factory=datetime.now,
+        nullable=False,
+        sa_column_kwargs={"onupdate": datetime.now},
+    )
+
+
+class SyncCheckpoint(SQLModel, table=True):
+    __tablename__ = "sync_checkpoint"
+
+    run_id: str = Field(primary_key=True)
+    symbol: str = Field(primary_key=True)
+    # pending / done / skipped / failed
+    status: str = Field(default="pending")
+    # 失败时最后一次的错误信息
+    error: Optional[str] = None
+    updated_at: datetime = Field(default_factory=datetime.now, nullable=False)
@@ -0,0 +1,12 @@
+from datetime import datetime
+from sqlmodel import Field, SQLModel
+
+
+class DataVersion(SQLModel, table=True):
+    __tablename__ = "data_version"
+
+    # 数据集名称，例如 'market_overview'
+    name: str = Field(primary_key=True)
+    # 数据集每次更新后加1，进程内的缓存据此判断是否需要重新加载
+    version: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.now, nullable=False)
@@ -0,0 +1,179 @@
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from autostock.database.connection import get_connection_manager
+from autostock.datamanager.ops import daily_ops, sync_ops, tracking_ops
+from autostock.datamanager.session import get_session
+
+
+class TrackingUpdateBuffer:
+    """
+    在同步过程中暂存日线跟踪信息的更新，并按批次写入数据库。
+
+    每累计 `flush_every` 只股票执行一次批量 UPDATE（一个事务），
+    而不是每只股票单独开启一个会话并提交。
+
+    跟踪信息总是在对应的Parquet文件写入之后才被记录，所以即使同步中途被打断、
+    缓冲区中尚未提交的记录丢失，跟踪表也只会比实际文件"更旧"，
+    下一次（增量）同步会重新获取这些股票并按交易日去重合并，不会产生错误数据。
+
+    给定 `run_id` 时，同一个事务中还会更新该次运行的检查点：
+    成功的股票在跟踪信息写入的同时被标记为 done，断点续传不会再处理它们。
+    """
+
+    def __init__(self, flush_every: int = 200, run_id: str | None = None):
+        """
+        :param flush_every: 每累计多少只股票提交一次。
+        :param run_id: 同步运行标识，为None时不记录检查点。
+        """
+        self.flush_every = max(1, flush_every)
+        self.run_id = run_id
+        self._pending: list[dict] = []
+        self._checkpoints: list[dict] = []
+        self.commits = 0
+        self.records = 0
+        self.seconds = 0.0
+
+    def add(self, symbol: str, daily_data: pd.DataFrame) -> None:
+        """
+        记录一只股票的同步结果，缓冲区满时自动写入。
+        """
+        if daily_data.empty:
+            return
+        trade_dates = pd.to_datetime(daily_data["trade_date"])
+        self._pending.append(
+            {
+                "symbol": symbol,
+                "daily_start_date": trade_dates.min().date(),
+                "daily_end_date": trade_dates.max().date(),
+                "daily_last_sync": datetime.now(),
+            }
+        )
+        self.mark(symbol, "done")
+
+    def mark(self, symbol: str, status: str, error: str | None = None) -> None:
+        """
+        记录一只股票在本次运行中的检查点状态（done / skipped / failed）。
+        没有 `run_id` 时忽略。
+        """
+        if self.run_id is not None:
+            self._checkpoints.append(
+                {
+                    "symbol": symbol,
+                    "status": status,
+                    "error": error,
+                    "updated_at": datetime.now(),
+                }
+            )
+        if max(len(self._pending), len(self._checkpoints)) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        将缓冲区中的所有记录用一个事务写入数据库。
+        """
+        if not self._pending and not self._checkpoints:
+            return
+        started = time.perf_counter()
+        with get_session() as session:
+            # 检查点与跟踪信息在同一个事务中提交
+            if self._checkpoints:
+                sync_ops.bulk_update_checkpoints(
+                    session, self.run_id, pd.DataFrame(self._checkpoints)
+                )
+            if self._pending:
+                self.records += tracking_ops.bulk_update_daily_tracking_info(
+                    session, pd.DataFrame(self._pending)
+                )
+        self._pending.clear()
+        self._checkpoints.clear()
+        # 同步过程中定期刷新快照，其他进程可以看到进度
+        get_connection_manager().publish_snapshot()
+        self.commits += 1
+        self.seconds += time.perf_counter() - started
+
+    def __enter__(self) -> "TrackingUpdateBuffer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # 无论同步正常结束、出错还是被 Ctrl-C 打断，都提交已完成股票的跟踪信息
+        self.flush()
+
+
+class DailyDatasetWriteBuffer:
+    """
+    在同步过程中暂存清洗后的日线数据，按批次写入按年分区的数据集。
+
+    每攒够 `flush_every` 只股票，把这一批按年份写成暂存分片（不重写已有的年份文件），
+    整次运行结束（包括出错或被 Ctrl-C 打断）时再把所有分片合并进数据集，
+    每个涉及到的年份文件在一次运行中只重写一次。
+
+    合并完成后才把这些股票交给跟踪信息缓冲区，保证跟踪表不会领先于读者可见的数据。
+    进程被强行终止时已暂存的股票没有跟踪信息和检查点，续传会重新处理它们；
+    留下的分片会在下一次合并时一并合并（新分片优先），不会产生错误数据。
+    """
+
+    def __init__(
+        self,
+        data_path: Path,
+        tracking: TrackingUpdateBuffer,
+        flush_every: int = 500,
+    ):
+        self.data_path = data_path
+        self.tracking = tracking
+        self.flush_every = max(1, flush_every)
+        self._pending: list[tuple[str, pd.DataFrame]] = []
+        # 已写入分片、等待合并后登记跟踪信息的股票，只保留首尾交易日
+        self._staged: list[tuple[str, pd.DataFrame]] = []
+        self.seconds = 0.0
+
+    def add(self, symbol: str, daily_data: pd.DataFrame) -> None:
+        """
+        暂存一只股票的日线数据，缓冲区满时自动写入分片。
+        """
+        if daily_data.empty:
+            return
+        self._pending.append((symbol, daily_data))
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        将缓冲区中的所有股票写成暂存分片。
+        """
+        if not self._pending:
+            return
+        started = time.perf_counter()
+        daily_ops.stage_daily_dataset(
+            pd.concat([df for _, df in self._pending], ignore_index=True),
+            self.data_path,
+        )
+        self.seconds += time.perf_counter() - started
+        for symbol, daily_data in self._pending:
+            trade_dates = pd.to_datetime(daily_data["trade_date"])
+            span = pd.DataFrame({"trade_date": [trade_dates.min(), trade_dates.max()]})
+            self._staged.append((symbol, span))
+        self._pending.clear()
+
+    def close(self) -> None:
+        """
+        写入剩余的股票，把所有分片合并进数据集，并登记其跟踪信息。
+        """
+        self.flush()
+        if not self._staged:
+            return
+        started = time.perf_counter()
+        daily_ops.compact_daily_dataset(self.data_path)
+        self.seconds += time.perf_counter() - started
+        for symbol, span in self._staged:
+            self.tracking.add(symbol, span)
+        self._staged.clear()
+
+    def __enter__(self) -> "DailyDatasetWriteBuffer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
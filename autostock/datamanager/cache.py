@@ -0,0 +1,98 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable
+
+import pandas as pd
+
+
+class DailyFrameCache:
+    """
+    进程内的日线DataFrame缓存，按占用字节数（而不是条目数）限制大小，LRU淘汰。
+
+    每个条目带有一个版本号（例如数据文件的修改时间），读取时版本号不一致即视为失效。
+    `get` 返回的是缓存中的原对象而不是副本，持有者不得修改它；
+    需要交给外部调用方时应先复制（DataManager.get_daily_history 返回的总是切片后的副本）。
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024):
+        """
+        :param max_bytes: 缓存允许占用的最大字节数。小于等于0表示禁用缓存。
+        """
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, tuple[Hashable, pd.DataFrame, int]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, version: Hashable) -> pd.DataFrame | None:
+        """
+        获取缓存的DataFrame（缓存中的原对象，调用方不得修改）。
+
+        :param key: 缓存键，例如股票代码。
+        :param version: 当前数据版本，与缓存时的版本不一致则视为未命中。
+        :return: 命中时返回缓存的DataFrame，否则返回None。
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, version: Hashable, df: pd.DataFrame) -> None:
+        """
+        放入一个DataFrame，必要时淘汰最久未使用的条目。超过整个缓存容量的DataFrame不会被缓存。
+        """
+        if self.max_bytes <= 0:
+            return
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, df, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """
+        使指定条目失效；不指定时清空整个缓存。
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self.current_bytes = 0
+            elif key in self._entries:
+                self._remove(key)
+
+    def stats(self) -> dict[str, int | float]:
+        """
+        返回缓存的命中统计。
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, nbytes = self._entries.pop(key)
+        self.current_bytes -= nbytes
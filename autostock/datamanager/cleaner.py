@@ -1,10 +1,94 @@
+from typing import Mapping
+
 import pandas as pd
 import numpy as np
 
+# 股票代码前缀 -> 交易所前缀（sh/sz/bj），按顺序匹配
+EXCHANGE_PREFIX_RULES = [
+    (("6",), "sh"),
+    (("0", "3"), "sz"),
+    (("8", "4"), "bj"),
+]
+
+# 股票代码前缀 -> 市场类型，按顺序匹配（更长的前缀必须排在前面）
+MARKET_TYPE_RULES = [
+    (("688",), "科创板"),
+    (("300",), "创业板"),
+    (("8", "4"), "北交所"),
+    (("60",), "沪市主板"),
+    (("00",), "深市主板"),
+]
+
+# 日线原始列名 -> 标准列名
+DAILY_COLUMN_MAPPING = {
+    "日期": "trade_date",
+    "开盘": "open",
+    "收盘": "close",
+    "最高": "high",
+    "最低": "low",
+    "成交量": "volume",
+    "成交额": "turnover",
+    "换手率": "turnover_rate",
+}
+
+DAILY_NUMERIC_COLUMNS = [
+    "open",
+    "close",
+    "high",
+    "low",
+    "volume",
+    "turnover",
+    "turnover_rate",
+]
+
+DAILY_FINAL_COLUMNS = ["trade_date", "symbol"] + DAILY_NUMERIC_COLUMNS
+
+
+def _match_prefixes(
+    codes: pd.Series, rules: list[tuple[tuple[str, ...], str]], default: str
+) -> np.ndarray:
+    """
+    按前缀规则对整列股票代码做一次向量化分类。
+    """
+    conditions = [
+        codes.str.startswith(prefixes).to_numpy(bool) for prefixes, _ in rules
+    ]
+    choices = [value for _, value in rules]
+    return np.select(conditions, choices, default=default).astype(object)
+
+
+def standardize_symbols(codes: pd.Series) -> pd.Series:
+    """
+    将纯数字股票代码向量化地转换为带交易所前缀的代码 (e.g., 600000 -> sh600000)。
+    无法识别的代码保持不变。
+
+    :param codes: 股票代码序列。
+    :return: 标准化后的股票代码序列。
+    """
+    codes = codes.astype(str)
+    prefixes = _match_prefixes(codes, EXCHANGE_PREFIX_RULES, default="")
+    return pd.Series(prefixes, index=codes.index) + codes
+
+
+def classify_market_types(codes: pd.Series) -> pd.Series:
+    """
+    根据股票代码前缀向量化地判断市场类型。
+
+    :param codes: 股票代码序列，可以带交易所前缀 (sh/sz/bj) 或后缀 (.SH/.SZ)。
+    :return: 市场类型序列，无法识别的为 "未知"。
+    """
+    digits = codes.astype(str).str.replace(r"^(sh|sz|bj)", "", regex=True)
+    return pd.Series(
+        _match_prefixes(digits, MARKET_TYPE_RULES, default="未知"), index=codes.index
+    )
+
 
 class DataCleaner:
     """
     负责清洗从不同数据源获取的原始DataFrame。
+
+    所有转换都按整列进行（向量化的字符串前缀匹配、一次性的类型转换），
+    不对单个代码或单行调用Python函数。
     """
 
     @staticmethod
@@ -42,30 +126,12 @@ class DataCleaner:
         for col in numeric_cols:
             df[col] = pd.to_numeric(df[col], errors="coerce")
 
-        # 标准化股票代码
-        def standardize_symbol(symbol: str) -> str:
-            if symbol.startswith("6"):
-                return f"{symbol}.SH"
-            else:
-                return f"{symbol}.SZ"
-
-        df["symbol"] = df["symbol"].astype(str).apply(standardize_symbol)
+        # 标准化股票代码 (e.g., 600000 -> 600000.SH)
+        codes = df["symbol"].astype(str)
+        df["symbol"] = codes + np.where(codes.str.startswith("6"), ".SH", ".SZ")
 
         # 判断市场类型
-        def get_market_type(symbol: str) -> str:
-            if symbol.startswith("688"):
-                return "科创板"
-            if symbol.startswith("300"):
-                return "创业板"
-            if symbol.startswith("8") or symbol.startswith("4"):
-                return "北交所"
-            if symbol.startswith("60"):
-                return "沪市主板"
-            if symbol.startswith("00"):
-                return "深市主板"
-            return "未知"
-
-        df["market_type"] = df["symbol"].apply(get_market_type)
+        df["market_type"] = classify_market_types(codes)
 
         # 填充其他字段为默认值或None
         df["industry"] = None  # 行业信息需要从其他接口获取
@@ -87,58 +153,6 @@ class DataCleaner:
         ]
         return df[final_columns]
 
-    @staticmethod
-    def clean_daily_history(raw_df: pd.DataFrame) -> pd.DataFrame:
-        """
-        清洗从 akshare.stock_zh_a_hist() 获取的日线历史数据DataFrame。
-
-        :param raw_df: 原始DataFrame
-        :return: 清洗后的DataFrame
-        """
-        if raw_df.empty:
-            return pd.DataFrame()
-
-        df = raw_df.copy()
-
-        # 1. 定义列名映射关系
-        column_mapping = {
-            "日期": "trade_date",
-            "开盘": "open",
-            "收盘": "close",
-            "最高": "high",
-            "最低": "low",
-            "成交量": "volume",
-            "成交额": "amount",
-            "换手率": "turnover_rate",
-        }
-
-        # 2. 选择并重命名我们需要的列
-        df = df[list(column_mapping.keys())]
-        df.rename(columns=column_mapping, inplace=True)
-
-        # 3. 数据类型转换
-        df["trade_date"] = pd.to_datetime(df["trade_date"]).dt.date
-        numeric_cols = [
-            "open",
-            "close",
-            "high",
-            "low",
-            "volume",
-            "amount",
-            "turnover_rate",
-        ]
-        for col in numeric_cols:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-
-        # 4. 成交量单位从"手"转换为"股"
-        df["volume"] = df["volume"] * 100
-
-        # 5. 确保数据按日期升序排列
-        df.sort_values(by="trade_date", ascending=True, inplace=True)
-        df.reset_index(drop=True, inplace=True)
-
-        return df
-
     def clean_market_overview(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         清洗从Akshare获取的A股市场概览DataFrame。
@@ -158,10 +172,7 @@ class DataCleaner:
         }
 
         # 只重命名DataFrame中实际存在的列
-        df.rename(
-            columns={k: v for k, v in rename_map.items() if k in df.columns},
-            inplace=True,
-        )
+        df = df.rename(columns={k: v for k, v in rename_map.items() if k in df.columns})
 
         # 增加一个更新时间戳
         df["updated_at"] = pd.Timestamp.now()
@@ -171,42 +182,17 @@ class DataCleaner:
         if "list_date" in df.columns:
             df["list_date"] = pd.to_datetime(df["list_date"], errors="coerce").dt.date
 
-        if "updated_at" in df.columns:
-            df["updated_at"] = pd.to_datetime(df["updated_at"])
-
         # 标准化股票代码 (e.g., 600000 -> sh600000)
-        def standardize_symbol(symbol: str) -> str:
-            if symbol.startswith("6"):
-                return f"sh{symbol}"
-            elif symbol.startswith("0") or symbol.startswith("3"):
-                return f"sz{symbol}"
-            elif symbol.startswith("8") or symbol.startswith("4"):
-                return f"bj{symbol}"
-            else:
-                return symbol
-
-        df["symbol"] = df["symbol"].astype(str).apply(standardize_symbol)
-
-        # 选择我们模型中需要的列
-        required_columns = [
-            "symbol",
-            "name",
-            "industry",
-            "market_type",
-            "list_date",
-            "status",
-            "last_price",
-            "updated_at",
-        ]
-        df = df[required_columns]
+        codes = df["symbol"].astype(str)
+        df["symbol"] = standardize_symbols(codes)
+
+        # 接口没有提供板块信息时，根据代码前缀判断市场类型
+        if "market_type" not in df.columns:
+            df["market_type"] = classify_market_types(codes)
 
         # 数据类型和空值处理
-        df["pe_ratio"] = pd.to_numeric(df["pe_ratio"], errors="coerce").replace(
-            [np.nan], [None]
-        )
-        df["last_price"] = pd.to_numeric(df["last_price"], errors="coerce")
-        df["change_pct"] = pd.to_numeric(df["change_pct"], errors="coerce")
-        df["total_market_cap"] = pd.to_numeric(df["total_market_cap"], errors="coerce")
+        if "last_price" in df.columns:
+            df["last_price"] = pd.to_numeric(df["last_price"], errors="coerce")
 
         # 筛选出最终需要的列，并保证顺序与模型一致
         final_cols = [
@@ -234,49 +220,63 @@ class DataCleaner:
         if df.empty:
             return pd.DataFrame()
 
-        df = df.copy()
-
-        # 重命名列
-        rename_map = {
-            "日期": "trade_date",
-            "开盘": "open",
-            "收盘": "close",
-            "最高": "high",
-            "最低": "low",
-            "成交量": "volume",
-            "成交额": "turnover",
-            "换手率": "turnover_rate",
-        }
-        df.rename(columns=rename_map, inplace=True)
+        df = df.rename(columns=DAILY_COLUMN_MAPPING)
 
         # 增加symbol列
         df["symbol"] = symbol
 
-        # 类型转换
-        df["trade_date"] = pd.to_datetime(df["trade_date"]).dt.date
-        numeric_cols = [
-            "open",
-            "close",
-            "high",
-            "low",
-            "volume",
-            "turnover",
-            "turnover_rate",
-        ]
-        for col in numeric_cols:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
+        return self._convert_daily_types(df)[DAILY_FINAL_COLUMNS]
 
-        # 筛选最终列
-        final_cols = [
-            "trade_date",
-            "symbol",
-            "open",
-            "close",
-            "high",
-            "low",
-            "volume",
-            "turnover",
-            "turnover_rate",
-        ]
+    def clean_daily_history_batch(
+        self, raw: pd.DataFrame | Mapping[str, pd.DataFrame]
+    ) -> pd.DataFrame:
+        """
+        一次性清洗多只股票的日线历史数据。
 
-        return df[final_cols]
+        所有股票先拼接成一个DataFrame，再对整列做一次重命名和类型转换，
+        适用于从原始数据缓存中重新清洗全市场的历史数据。
+
+        :param raw: 股票代码 -> 原始日线DataFrame 的映射；
+                    或一个已拼接好的原始DataFrame，其中用 'symbol' 列（标准代码）
+                    或 '股票代码' 列（纯数字代码）区分股票。
+        :return: 清洗后的日线数据，按 (symbol, trade_date) 排序。
+        """
+        if isinstance(raw, Mapping):
+            frames = {symbol: df for symbol, df in raw.items() if not df.empty}
+            if not frames:
+                return pd.DataFrame()
+            df = pd.concat(
+                list(frames.values()), keys=list(frames.keys()), names=["symbol", None]
+            )
+            df = df.drop(columns="symbol", errors="ignore").reset_index(level=0)
+        else:
+            if raw.empty:
+                return pd.DataFrame()
+            df = raw
+            if "symbol" not in df.columns:
+                if "股票代码" not in df.columns:
+                    raise ValueError(
+                        "A concatenated daily frame needs a 'symbol' or '股票代码' column."
+                    )
+                df = df.assign(symbol=standardize_symbols(df["股票代码"]))
+
+        df = df.rename(columns=DAILY_COLUMN_MAPPING)
+        df = self._convert_daily_types(df)[DAILY_FINAL_COLUMNS]
+
+        df.sort_values(by=["symbol", "trade_date"], inplace=True, kind="stable")
+        df.reset_index(drop=True, inplace=True)
+        return df
+
+    @staticmethod
+    def _convert_daily_types(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        对已重命名的日线数据做整列类型转换。
+
+        交易日期转换为 Arrow 的 date32 类型，与Parquet中存储的类型一致，
+        避免逐行构造Python `date` 对象。调用方传入的应是已经复制过的DataFrame。
+        """
+        df["trade_date"] = pd.to_datetime(df["trade_date"]).astype("date32[pyarrow]")
+        for col in DAILY_NUMERIC_COLUMNS:
+            if not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+        return df
@@ -0,0 +1,405 @@
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from autostock import indicators
+from autostock.datamanager.ops import tracking_ops
+from autostock.datamanager.panel import DailyPanel
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    """
+    一个可缓存的特征：由日线字段计算若干输出列的向量化函数。
+
+    `func` 的参数依次为 `inputs` 中各字段的 (日期数, 股票数) 矩阵，之后是关键字参数 `defaults`；
+    返回一个矩阵，或与 `outputs` 一一对应的矩阵元组。
+    """
+
+    name: str
+    func: Callable
+    inputs: tuple[str, ...]
+    outputs: tuple[str, ...]
+    defaults: dict = field(default_factory=dict)
+
+    def normalize(self, params: dict) -> dict:
+        """
+        补全默认值，并把参数转换为默认值的类型（例如 period=6.0 -> 6）。
+        缓存键和实际计算都使用转换后的参数，两者总是一致。
+
+        :raises ValueError: 有未知参数，或参数无法无损地转换（例如 period=6.5）。
+        """
+        unknown = set(params) - set(self.defaults)
+        if unknown:
+            raise ValueError(
+                f"Unknown parameters for feature '{self.name}': {sorted(unknown)}."
+            )
+        values = {}
+        for name, default in self.defaults.items():
+            value = params.get(name, default)
+            converted = type(default)(value)
+            if converted != value:
+                raise ValueError(
+                    f"Parameter {name}={value!r} of feature '{self.name}' "
+                    f"is not a valid {type(default).__name__}."
+                )
+            values[name] = converted
+        return values
+
+    def key(self, params: dict) -> str:
+        """
+        特征名加完整参数（未指定的取默认值），例如 "macd(fast=12,slow=26,signal=9)"。
+        同一组参数无论是否显式给出默认值，得到的键都相同。
+        """
+        values = self.normalize(params)
+        return f"{self.name}({','.join(f'{k}={v}' for k, v in values.items())})"
+
+
+FEATURES: dict[str, FeatureSpec] = {}
+
+
+def register_feature(
+    name: str,
+    func: Callable,
+    inputs: tuple[str, ...],
+    outputs: tuple[str, ...],
+    **defaults,
+) -> FeatureSpec:
+    """
+    注册一个特征，之后可以通过 `FeatureStore.get_panel(manager, name, ...)` 读取。
+
+    :param name: 特征名。
+    :param func: 向量化的计算函数，见 `FeatureSpec`。
+    :param inputs: 需要的日线字段。
+    :param outputs: 输出列名。
+    :param defaults: 全部参数及其默认值。
+    """
+    spec = FeatureSpec(name, func, tuple(inputs), tuple(outputs), dict(defaults))
+    FEATURES[name] = spec
+    return spec
+
+
+register_feature("ma", indicators.ma, ("close",), ("ma",), period=5)
+register_feature("ema", indicators.ema, ("close",), ("ema",), period=12)
+register_feature(
+    "macd",
+    indicators.macd,
+    ("close",),
+    ("dif", "dea", "hist"),
+    fast=12,
+    slow=26,
+    signal=9,
+)
+register_feature(
+    "bollinger",
+    indicators.bollinger,
+    ("close",),
+    ("upper", "middle", "lower"),
+    period=20,
+    nbdev=2.0,
+)
+register_feature("rsi", indicators.rsi, ("close",), ("rsi",), period=14)
+register_feature(
+    "kdj",
+    indicators.kdj,
+    ("high", "low", "close"),
+    ("k", "d", "j"),
+    period=9,
+    k_period=3,
+    d_period=3,
+)
+register_feature("atr", indicators.atr, ("high", "low", "close"), ("atr",), period=14)
+register_feature(
+    "true_range", indicators.true_range, ("high", "low", "close"), ("true_range",)
+)
+
+
+class FeatureStore:
+    """
+    计算好的指标/特征的磁盘缓存，保存在 `datas/features/` 下。
+
+    每个 (特征, 参数, 股票) 一个 Parquet 文件：`{特征键}/{symbol}@{数据版本}.parquet`，
+    保存该股票全部交易日的输出列。数据版本取自 DataTracking 的 daily_end_date 和 daily_last_sync，
+    日线数据被同步任务改写后版本变化，旧文件自动失效（下次写入同一股票时删除）。
+
+    批量读取时，版本一致的股票作为一个 Arrow 数据集一次读出，其余股票一次性加载日线面板、
+    向量化计算并写入缓存。缓存总大小超过上限时按最近访问时间淘汰。
+    """
+
+    def __init__(self, store_dir: Path, max_bytes: int = 4 * 1024 * 1024 * 1024):
+        """
+        :param store_dir: 缓存目录。
+        :param max_bytes: 缓存目录允许占用的最大字节数。
+        """
+        self.store_dir = Path(store_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes: int | None = None
+        self.hits = 0
+        self.misses = 0
+
+    def get_panel(
+        self,
+        manager,
+        name: str,
+        symbols: list[str] | None = None,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        calendar: np.ndarray | None = None,
+        **params,
+    ) -> DailyPanel:
+        """
+        读取多只股票的特征，返回 日期 x 股票 面板，字段为特征的各输出列。
+
+        :param manager: DataManager，缓存未命中时用于加载日线面板。
+        :param name: 特征名，见 `FEATURES`。
+        :param symbols: 股票代码列表，None 表示所有有日线数据的股票。
+        :param start_date: 开始日期。
+        :param end_date: 结束日期。
+        :param calendar: 交易日历，含义同 `DataManager.get_daily_panel`。
+        :param params: 特征参数，未给出的取默认值。
+        :return: DailyPanel，没有日线数据的股票对应全 NaN 列。
+        """
+        spec = self._spec(name)
+        params = spec.normalize(params)
+        key = spec.key(params)
+        versions = tracking_ops.get_daily_data_versions(symbols)
+        if symbols is None:
+            symbols = sorted(versions)
+
+        cached = self._entries(key)
+        hits, misses = [], []
+        for symbol in symbols:
+            if symbol not in versions:
+                continue
+            path = cached.get(symbol)
+            if path is not None and path.stem.endswith(f"@{versions[symbol]}"):
+                hits.append(path)
+            else:
+                misses.append(symbol)
+        with self._lock:
+            self.hits += len(hits)
+            self.misses += len(misses)
+        print(
+            f"INFO: Feature {key}: {len(hits)} cached, {len(misses)} to compute "
+            f"for {len(symbols)} symbols."
+        )
+
+        tables = []
+        if hits:
+            tables.append(self._read(hits, spec.outputs, start_date, end_date))
+        if misses:
+            computed = self._compute(manager, spec, key, misses, versions, params)
+            date_filter = _date_filter(start_date, end_date)
+            tables.append(
+                computed if date_filter is None else computed.filter(date_filter)
+            )
+        if not tables:
+            tables.append(
+                pa.table(
+                    {
+                        "trade_date": pa.array([], pa.date32()),
+                        "symbol": pa.array([], pa.string()),
+                    }
+                    | {output: pa.array([], pa.float64()) for output in spec.outputs}
+                )
+            )
+        table = pa.concat_tables(tables)
+        return DailyPanel.from_arrow(table, list(spec.outputs), symbols, calendar)
+
+    def invalidate(self, name: str | None = None, **params) -> None:
+        """
+        删除一个特征（指定参数时只删除这组参数）的全部缓存；不指定特征时清空整个缓存。
+        """
+        if name is None:
+            paths = self.store_dir.glob("*/*.parquet")
+        elif params:
+            paths = (self.store_dir / self._spec(name).key(params)).glob("*.parquet")
+        else:
+            paths = self.store_dir.glob(f"{name}(*)/*.parquet")
+        with self._lock:
+            for path in list(paths):
+                path.unlink(missing_ok=True)
+            self._total_bytes = None
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            self._ensure_total()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    @staticmethod
+    def _spec(name: str) -> FeatureSpec:
+        try:
+            return FEATURES[name]
+        except KeyError:
+            raise ValueError(
+                f"Unknown feature '{name}', expected one of {sorted(FEATURES)}."
+            ) from None
+
+    def _entries(self, key: str) -> dict[str, Path]:
+        entries = {}
+        key_dir = self.store_dir / key
+        if not key_dir.exists():
+            return entries
+        with os.scandir(key_dir) as it:
+            for entry in it:
+                symbol, sep, _ = entry.name.rpartition("@")
+                if sep and entry.name.endswith(".parquet"):
+                    entries[symbol] = Path(entry.path)
+        return entries
+
+    def _read(
+        self,
+        paths: list[Path],
+        outputs: tuple[str, ...],
+        start_date: date | None,
+        end_date: date | None,
+    ) -> pa.Table:
+        dataset = ds.dataset([str(p) for p in paths], format="parquet")
+        table = dataset.to_table(
+            columns=["trade_date", "symbol", *outputs],
+            filter=_date_filter(start_date, end_date),
+        )
+
+        # 记录访问时间用于淘汰
+        now = time.time()
+        for path in paths:
+            try:
+                os.utime(path, (now, path.stat().st_mtime))
+            except FileNotFoundError:
+                pass
+        return table
+
+    def _compute(
+        self,
+        manager,
+        spec: FeatureSpec,
+        key: str,
+        symbols: list[str],
+        versions: dict[str, str],
+        params: dict,
+    ) -> pa.Table:
+        """
+        加载这些股票的完整日线面板，计算特征并逐股票写入缓存，返回长表格式的结果。
+        """
+        panel = manager.get_daily_panel(symbols, fields=spec.inputs)
+        result = spec.func(*(panel[f] for f in spec.inputs), **params)
+        result = result if isinstance(result, tuple) else (result,)
+
+        # 只保留各股票的交易日（所有输入字段都有值的日期）
+        traded = np.ones(panel.shape, dtype=bool)
+        for f in spec.inputs:
+            traded &= ~np.isnan(panel[f])
+        # 按列展开，结果按 (symbol, trade_date) 排序，每只股票是连续的一段
+        rows, cols = np.nonzero(traded.T)
+        table = pa.table(
+            {
+                "trade_date": pa.array(panel.dates[cols].astype("datetime64[D]")),
+                "symbol": pa.DictionaryArray.from_arrays(
+                    rows.astype(np.int32), pa.array(panel.symbols, pa.string())
+                ).cast(pa.string()),
+            }
+            | {
+                output: pa.array(values.T[traded.T])
+                for output, values in zip(spec.outputs, result)
+            }
+        )
+        bounds = np.searchsorted(rows, np.arange(len(panel.symbols) + 1))
+        key_dir = self.store_dir / key
+        key_dir.mkdir(parents=True, exist_ok=True)
+        old = self._entries(key)
+        with self._lock:
+            # 写入前统计已有的总大小，之后只累加变化量
+            self._ensure_total()
+        written = 0
+        for i, symbol in enumerate(panel.symbols):
+            path = key_dir / f"{symbol}@{versions[symbol]}.parquet"
+            chunk = table.slice(bounds[i], bounds[i + 1] - bounds[i])
+            written += self._write(chunk, path, old.get(symbol))
+
+        with self._lock:
+            if self._total_bytes is None:
+                # 写入期间缓存被清理过，重新统计（已包含本次写入的文件）
+                self._ensure_total()
+            else:
+                self._total_bytes += written
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return table
+
+    @staticmethod
+    def _write(table: pa.Table, path: Path, previous: Path | None) -> int:
+        """
+        写入一个缓存文件并删除该股票的旧版本，返回占用字节数的变化。
+        """
+        tmp_path = path.with_name(
+            f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        try:
+            pq.write_table(table, tmp_path, compression="zstd")
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"WARN: Failed to cache feature file {path.name}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return 0
+        delta = path.stat().st_size
+        if previous is not None and previous != path:
+            try:
+                delta -= previous.stat().st_size
+                previous.unlink()
+            except FileNotFoundError:
+                pass
+        return delta
+
+    def _ensure_total(self) -> None:
+        if self._total_bytes is None:
+            self._total_bytes = sum(
+                p.stat().st_size for p in self.store_dir.glob("*/*.parquet")
+            )
+
+    def _evict(self) -> None:
+        # 按最近访问时间从旧到新删除，直到总大小降到上限的90%
+        entries = []
+        for path in self.store_dir.glob("*/*.parquet"):
+            stat = path.stat()
+            entries.append((stat.st_atime, stat.st_size, path))
+        entries.sort()
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if self._total_bytes <= target:
+                break
+            path.unlink(missing_ok=True)
+            self._total_bytes -= size
+
+
+def _date_filter(
+    start_date: date | None, end_date: date | None
+) -> pc.Expression | None:
+    conditions = []
+    if start_date:
+        conditions.append(
+            pc.field("trade_date") >= pa.scalar(pd.Timestamp(start_date).date())
+        )
+    if end_date:
+        conditions.append(
+            pc.field("trade_date") <= pa.scalar(pd.Timestamp(end_date).date())
+        )
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else conditions[0] & conditions[1]
@@ -2,8 +2,11 @@ import pandas as pd
 import akshare as ak
 from functools import lru_cache
 
+from autostock.datamanager.fetcher_base import BaseFetcher, daily_history_params
+from autostock.datamanager.raw_cache import RawResponseCache
 
-class AkshareFetcher:
+
+class AkshareFetcher(BaseFetcher):
     """
     一个使用 akshare 作为数据源的数据获取器。
 
@@ -11,9 +14,12 @@ class AkshareFetcher:
     为上层业务逻辑提供稳定、格式统一的 Pandas DataFrame。
     """
 
-    def __init__(self):
+    def __init__(self, cache: RawResponseCache | None = None):
+        """
+        :param cache: 可选的原始响应磁盘缓存。命中缓存时不发起网络请求。
+        """
         # 可以在这里添加缓存、代理等设置
-        pass
+        self.cache = cache
 
     def get_market_overview(self) -> pd.DataFrame | None:
         """
@@ -21,15 +27,35 @@ class AkshareFetcher:
 
         :return: 包含股票列表和基本信息的DataFrame，失败则返回None。
         """
+        if self.cache is not None:
+            cached = self.cache.get("stock_zh_a_spot_em", {})
+            if cached is not None:
+                print("INFO: Using cached market overview.")
+                return cached
+
         print("INFO: Fetching latest market overview from Akshare...")
         try:
             # stock_zh_a_spot_em() 是一个常用的获取A股所有股票信息的接口
             stock_df = ak.stock_zh_a_spot_em()
+            if self.cache is not None:
+                self.cache.put("stock_zh_a_spot_em", {}, stock_df)
             return stock_df
         except Exception as e:
             print(f"ERROR: Failed to fetch market overview from Akshare. Error: {e}")
             return None
 
+    def get_realtime_quotes(self) -> pd.DataFrame | None:
+        """
+        获取全市场的实时行情（不使用磁盘缓存），用于盘中监控。
+
+        :return: 实时行情DataFrame，失败则返回None。
+        """
+        try:
+            return ak.stock_zh_a_spot_em()
+        except Exception as e:
+            print(f"ERROR: Failed to fetch realtime quotes from Akshare. Error: {e}")
+            return None
+
     @staticmethod
     @lru_cache(maxsize=1)
     def fetch_stock_list() -> pd.DataFrame:
@@ -76,12 +102,13 @@ class AkshareFetcher:
                 ]
             )
 
-    @staticmethod
     def fetch_daily_history(
+        self,
         symbol: str,
         start_date: str = "19900101",
         end_date: str = "20990101",
         adjust: str = "qfq",
+        raise_on_error: bool = False,
     ) -> pd.DataFrame:
         """
         获取单个股票的日线历史数据。
@@ -90,8 +117,13 @@ class AkshareFetcher:
         :param start_date: 开始日期, 格式 "YYYYMMDD"
         :param end_date: 结束日期, 格式 "YYYYMMDD"
         :param adjust: 复权类型, "qfq" for 前复权, "hfq" for 后复权, "" for 不复权. 默认为前复权。
+        :param raise_on_error: 为True时将网络等异常抛给调用方（便于重试），而不是返回空DataFrame。
         :return: 包含日线数据的 DataFrame，如果获取失败则返回空DataFrame。
         """
+        cached = self.cached_daily_history(symbol, start_date, end_date, adjust)
+        if cached is not None:
+            return cached
+
         try:
             print(
                 f"INFO: Fetching daily history for {symbol} from {start_date} to {end_date} (adjust={adjust})..."
@@ -113,8 +145,16 @@ class AkshareFetcher:
             print(
                 f"INFO: Successfully fetched {len(history_df)} days of history for {symbol}."
             )
+            if self.cache is not None:
+                self.cache.put(
+                    "stock_zh_a_hist",
+                    daily_history_params(symbol, start_date, end_date, adjust),
+                    history_df,
+                )
             return history_df
         except Exception as e:
+            if raise_on_error:
+                raise
             print(f"ERROR: Failed to fetch daily history for {symbol}: {e}")
             return pd.DataFrame()
 
@@ -0,0 +1,92 @@
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from autostock.datamanager.raw_cache import RawResponseCache
+
+
+class BaseFetcher(ABC):
+    """
+    数据获取器接口。
+
+    DataManager 只通过这里定义的方法访问数据源，返回的DataFrame保持数据源原始的
+    （akshare 的中文）列名，由 DataCleaner 负责统一清洗。
+    因此可以用本地模拟数据源替换真实网络接口，进行离线测试和性能基准测试。
+    """
+
+    # 可选的原始响应磁盘缓存，由子类在构造时设置
+    cache: RawResponseCache | None = None
+
+    @abstractmethod
+    def get_market_overview(self) -> pd.DataFrame | None:
+        """
+        获取A股市场的实时概览数据（所有股票），列名与 ak.stock_zh_a_spot_em() 一致。
+
+        :return: 包含股票列表和基本信息的DataFrame，失败则返回None。
+        """
+
+    def get_realtime_quotes(self) -> pd.DataFrame | None:
+        """
+        获取全市场的实时行情，列名与 ak.stock_zh_a_spot_em() 一致，用于盘中监控。
+
+        与 `get_market_overview` 不同，实现不得使用缓存，每次调用都应返回最新的数据。
+        默认直接调用 `get_market_overview`。
+
+        :return: 实时行情DataFrame，失败则返回None。
+        """
+        return self.get_market_overview()
+
+    @abstractmethod
+    def fetch_daily_history(
+        self,
+        symbol: str,
+        start_date: str = "19900101",
+        end_date: str = "20990101",
+        adjust: str = "qfq",
+        raise_on_error: bool = False,
+    ) -> pd.DataFrame:
+        """
+        获取单个股票的日线历史数据，列名与 ak.stock_zh_a_hist() 一致。
+
+        :param symbol: 纯数字股票代码, e.g., "000001"
+        :param start_date: 开始日期, 格式 "YYYYMMDD"
+        :param end_date: 结束日期, 格式 "YYYYMMDD"
+        :param adjust: 复权类型。
+        :param raise_on_error: 为True时将异常抛给调用方，否则返回空DataFrame。
+        :return: 包含日线数据的 DataFrame。
+        """
+
+    def cached_daily_history(
+        self,
+        symbol: str,
+        start_date: str = "19900101",
+        end_date: str = "20990101",
+        adjust: str = "qfq",
+    ) -> pd.DataFrame | None:
+        """
+        只从磁盘缓存读取日线历史，不发起请求。参数与 `fetch_daily_history` 相同。
+
+        DataManager 在申请限速令牌之前先调用它，命中缓存的股票不占用请求配额。
+
+        :return: 未过期的缓存DataFrame，没有缓存时返回None。
+        """
+        if self.cache is None:
+            return None
+        return self.cache.get(
+            "stock_zh_a_hist",
+            daily_history_params(symbol, start_date, end_date, adjust),
+        )
+
+
+def daily_history_params(
+    symbol: str, start_date: str, end_date: str, adjust: str
+) -> dict[str, str]:
+    """
+    日线历史请求在原始响应缓存中的参数（缓存键）。
+    """
+    return {
+        "symbol": symbol,
+        "start_date": start_date,
+        "end_date": end_date,
+        "adjust": adjust,
+    }
@@ -0,0 +1,373 @@
+import threading
+import time
+import zlib
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from autostock.datamanager.cleaner import classify_market_types
+from autostock.datamanager.fetcher_base import BaseFetcher, daily_history_params
+from autostock.datamanager.raw_cache import RawResponseCache
+
+# 与 ak.stock_zh_a_spot_em() 一致的列
+SPOT_COLUMNS = [
+    "序号",
+    "代码",
+    "名称",
+    "最新价",
+    "涨跌幅",
+    "涨跌额",
+    "成交量",
+    "成交额",
+    "振幅",
+    "最高",
+    "最低",
+    "今开",
+    "昨收",
+    "量比",
+    "换手率",
+    "市盈率-动态",
+    "市净率",
+    "总市值",
+    "流通市值",
+    "涨速",
+    "5分钟涨跌",
+    "60日涨跌幅",
+    "年初至今涨跌幅",
+]
+
+# 与 ak.stock_zh_a_hist() 一致的列
+HIST_COLUMNS = [
+    "日期",
+    "股票代码",
+    "开盘",
+    "收盘",
+    "最高",
+    "最低",
+    "成交量",
+    "成交额",
+    "振幅",
+    "涨跌幅",
+    "涨跌额",
+    "换手率",
+]
+
+# 模拟股票的上市日期在 _LISTING_EPOCH 之后的 _LISTING_SPAN 个工作日内均匀分布
+_LISTING_EPOCH = pd.Timestamp("2005-01-03")
+_LISTING_SPAN = 3000
+
+# 代码段及其在模拟股票池中的占比
+_CODE_BLOCKS = [
+    (600000, 0.30),
+    (688000, 0.10),
+    (0, 0.20),
+    (2000, 0.15),
+    (300000, 0.20),
+    (830000, 0.05),
+]
+
+
+class LocalFetcher(BaseFetcher):
+    """
+    本地模拟数据源，用于离线测试和同步流程的性能基准测试。
+
+    生成的数据与 akshare 返回的格式一致（相同的中文列名和取值形式），
+    且对同一个 `seed` 完全可复现：同一只股票无论请求哪个日期区间，重叠部分的数据都相同，
+    这一点对不同的实例、不同的 `history_start` / `history_end` 和不同的运行日期同样成立。
+    可以配置网络延迟、随机错误和服务端限流，模拟真实接口的行为。
+    """
+
+    def __init__(
+        self,
+        num_symbols: int = 5000,
+        seed: int = 42,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: float = 0.0,
+        history_start: str = "20100101",
+        history_end: str | None = None,
+        cache: RawResponseCache | None = None,
+    ):
+        """
+        :param num_symbols: 模拟股票池的大小。
+        :param seed: 随机种子。
+        :param latency: 每次请求的平均延迟（秒）。
+        :param latency_jitter: 延迟的随机抖动幅度（秒）。
+        :param error_rate: 每次请求失败（抛出 ConnectionError）的概率。
+        :param rate_limit: 服务端限流阈值（次/秒），超过时请求被拒绝，<=0 表示不限流。
+        :param history_start: 模拟历史数据的最早日期, 格式 "YYYYMMDD"。
+        :param history_end: 模拟历史数据的最晚日期，默认为今天。需要逐日可复现的结果
+                            （例如跨天比较基准测试）时应显式指定。
+        :param cache: 可选的原始响应磁盘缓存，与 AkshareFetcher 相同，命中时不计入请求。
+        """
+        self.num_symbols = num_symbols
+        self.seed = seed
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.cache = cache
+        self.calendar = pd.bdate_range(
+            history_start, history_end or pd.Timestamp.today().normalize()
+        )
+        # 从 _LISTING_EPOCH（或更早的 history_start）起的完整工作日历，上市日期是其中的位置；
+        # 日期字符串只格式化一次
+        first = min(_LISTING_EPOCH, pd.Timestamp(history_start))
+        self._all_dates = pd.bdate_range(
+            first, self.calendar[-1] if len(self.calendar) else first
+        )
+        self._all_date_strings = np.asarray(self._all_dates.strftime("%Y-%m-%d"))
+        self._first_visible = int(
+            self._all_dates.searchsorted(pd.Timestamp(history_start))
+        )
+        self.codes = self._generate_codes(num_symbols)
+
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._recent_calls: deque[float] = deque()
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0
+        # 盘中实时行情的模拟状态，第一次调用 get_realtime_quotes 时初始化
+        self._spot: pd.DataFrame | None = None
+        self._spot_rng = np.random.default_rng(seed + 1)
+
+    def get_market_overview(self) -> pd.DataFrame | None:
+        # 与 AkshareFetcher 一样，请求失败时返回 None；只有 fetch_daily_history 按需抛出异常
+        try:
+            self._simulate_request()
+        except ConnectionError as e:
+            print(f"ERROR: Failed to fetch market overview. Error: {e}")
+            return None
+        rng = np.random.default_rng(self.seed)
+        n = len(self.codes)
+        last_close = rng.uniform(3, 80, n).round(2)
+        change_pct = rng.normal(0, 2, n).clip(-10, 10).round(2)
+        price = (last_close * (1 + change_pct / 100)).round(2)
+        volume = rng.integers(1_000, 2_000_000, n)
+        df = pd.DataFrame(
+            {
+                "序号": np.arange(1, n + 1),
+                "代码": self.codes,
+                "名称": [f"模拟{code}" for code in self.codes],
+                "最新价": price,
+                "涨跌幅": change_pct,
+                "涨跌额": (price - last_close).round(2),
+                "成交量": volume,
+                "成交额": (volume * price * 100).round(0),
+                "振幅": rng.uniform(0, 8, n).round(2),
+                "最高": (price * 1.02).round(2),
+                "最低": (price * 0.98).round(2),
+                "今开": last_close,
+                "昨收": last_close,
+                "量比": rng.uniform(0.3, 3, n).round(2),
+                "换手率": rng.uniform(0.1, 10, n).round(2),
+                "市盈率-动态": rng.uniform(-50, 200, n).round(2),
+                "市净率": rng.uniform(0.5, 10, n).round(2),
+                "总市值": (price * rng.uniform(1e8, 5e9, n)).round(0),
+                "流通市值": (price * rng.uniform(5e7, 3e9, n)).round(0),
+                "涨速": rng.normal(0, 0.3, n).round(2),
+                "5分钟涨跌": rng.normal(0, 0.5, n).round(2),
+                "60日涨跌幅": rng.normal(0, 15, n).round(2),
+                "年初至今涨跌幅": rng.normal(0, 20, n).round(2),
+            }
+        )
+        # 与真实接口一样，部分停牌股票的数值字段为 NaN
+        suspended = rng.random(n) < 0.01
+        df.loc[suspended, ["最新价", "涨跌幅", "涨跌额", "今开"]] = np.nan
+        return df[SPOT_COLUMNS]
+
+    def get_realtime_quotes(self) -> pd.DataFrame | None:
+        """
+        模拟盘中的实时行情。
+
+        第一次调用时以 `get_market_overview` 的数据为开盘状态，并让少数股票处于涨停或跌停；
+        之后每次调用约70%的股票有成交、约40%的股票价格随机游走一步（不超过涨跌停价），成交量和成交额相应累加，
+        偶尔有股票突然放量。与东方财富接口一样，结果按涨跌幅降序排列。
+        请求失败时返回 None，行情状态不变。
+        """
+        if self._spot is None:
+            spot = self.get_market_overview()
+            if spot is None:
+                return None
+            self._spot = self._open_spot(spot)
+        else:
+            try:
+                self._simulate_request()
+            except ConnectionError as e:
+                print(f"ERROR: Failed to fetch realtime quotes. Error: {e}")
+                return None
+            self._step_spot()
+        return self._spot.sort_values("涨跌幅", ascending=False, kind="stable")
+
+    def _open_spot(self, spot: pd.DataFrame) -> pd.DataFrame:
+        spot = spot.reset_index(drop=True)
+        rates = pd.Series(classify_market_types(spot["代码"])).map(
+            {"科创板": 0.2, "创业板": 0.2, "北交所": 0.3}
+        )
+        prev_close = spot["昨收"].to_numpy(float)
+        rates = rates.fillna(0.1).to_numpy(float)
+        self._limit_up = np.floor(prev_close * (1 + rates) * 100 + 0.5) / 100
+        self._limit_down = np.floor(prev_close * (1 - rates) * 100 + 0.5) / 100
+
+        price = spot["最新价"].to_numpy(float, copy=True)
+        draw = self._spot_rng.random(len(spot))
+        price = np.where(draw < 0.015, self._limit_up, price)
+        price = np.where(draw > 0.995, self._limit_down, price)
+        spot["最新价"] = np.where(np.isnan(spot["最新价"]), np.nan, price)
+        return self._reprice(spot)
+
+    def _step_spot(self) -> None:
+        spot, rng = self._spot, self._spot_rng
+        n = len(spot)
+        price = spot["最新价"].to_numpy(float, copy=True)
+        # 约70%的股票有成交，其中约60%的价格变动
+        traded = (rng.random(n) < 0.7) & ~np.isnan(price)
+        active = traded & (rng.random(n) < 0.6)
+        moved = np.round(price * (1 + rng.normal(0, 0.003, n)), 2)
+        moved = np.clip(moved, self._limit_down, self._limit_up)
+        price[active] = moved[active]
+        # 成交量单位为手；约千分之二的股票突然放量
+        lots = rng.integers(1, 300, n) * traded
+        lots = np.where(rng.random(n) < 0.002, lots * 50, lots)
+        spot["最新价"] = price
+        spot["成交量"] = spot["成交量"] + lots
+        spot["成交额"] = spot["成交额"] + np.nan_to_num(lots * price * 100).round(0)
+        spot["最高"] = np.fmax(spot["最高"], price)
+        spot["最低"] = np.fmin(spot["最低"], price)
+        self._spot = self._reprice(spot)
+
+    @staticmethod
+    def _reprice(spot: pd.DataFrame) -> pd.DataFrame:
+        price, prev_close = spot["最新价"], spot["昨收"]
+        spot["涨跌额"] = (price - prev_close).round(2)
+        spot["涨跌幅"] = ((price / prev_close - 1) * 100).round(2)
+        return spot
+
+    def fetch_daily_history(
+        self,
+        symbol: str,
+        start_date: str = "19900101",
+        end_date: str = "20990101",
+        adjust: str = "qfq",
+        raise_on_error: bool = False,
+    ) -> pd.DataFrame:
+        cached = self.cached_daily_history(symbol, start_date, end_date, adjust)
+        if cached is not None:
+            return cached
+        try:
+            self._simulate_request()
+        except ConnectionError:
+            if raise_on_error:
+                raise
+            return pd.DataFrame()
+
+        history = self._full_history(symbol)
+        mask = (history["日期"] >= pd.Timestamp(start_date).strftime("%Y-%m-%d")) & (
+            history["日期"] <= pd.Timestamp(end_date).strftime("%Y-%m-%d")
+        )
+        history = history[mask].reset_index(drop=True)
+        if self.cache is not None:
+            self.cache.put(
+                "stock_zh_a_hist",
+                daily_history_params(symbol, start_date, end_date, adjust),
+                history,
+            )
+        return history
+
+    def stats(self) -> dict[str, int]:
+        """
+        返回请求计数（总请求数、模拟错误数、被限流次数）。
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "rate_limited": self.rate_limited,
+            }
+
+    def _simulate_request(self) -> None:
+        with self._lock:
+            self.calls += 1
+            now = time.monotonic()
+            if self.rate_limit > 0:
+                while self._recent_calls and now - self._recent_calls[0] > 1.0:
+                    self._recent_calls.popleft()
+                if len(self._recent_calls) >= self.rate_limit:
+                    self.rate_limited += 1
+                    raise ConnectionError("Simulated rate limit exceeded.")
+                self._recent_calls.append(now)
+            delay = self.latency + self._rng.uniform(
+                -self.latency_jitter, self.latency_jitter
+            )
+            failed = self._rng.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        if failed:
+            with self._lock:
+                self.errors += 1
+            raise ConnectionError("Simulated network error.")
+
+    def _full_history(self, symbol: str) -> pd.DataFrame:
+        """
+        生成一只股票在 [history_start, history_end] 内的模拟日线历史（前复权）。
+
+        上市日期和价格路径只由 seed 和代码决定：路径总是从上市日开始生成，每个字段使用独立的
+        随机数流，因此任意两个实例（不论 history_start / history_end 或运行日期）
+        在重叠日期上返回完全相同的数据，只是较晚的 history_end 多出一段。
+        """
+        crc = zlib.crc32(symbol.encode())
+        rng = np.random.default_rng([self.seed, crc])
+        # 每只股票的上市日期不同，较新的股票历史较短
+        listed = int(rng.integers(0, _LISTING_SPAN))
+        base_price = rng.uniform(5, 50)
+        # history_start 早于 _LISTING_EPOCH 时日历前面多出的部分
+        listed += int(self._all_dates.searchsorted(_LISTING_EPOCH))
+        dates = self._all_date_strings[listed:]
+        n = len(dates) if len(self.calendar) else 0
+        if n == 0:
+            return pd.DataFrame(columns=HIST_COLUMNS)
+
+        def stream(field: int) -> np.random.Generator:
+            return np.random.default_rng([self.seed, crc, field])
+
+        limit = 0.2 if symbol.startswith(("300", "688")) else 0.1
+        returns = stream(1).normal(0.0003, 0.02, n).clip(-limit, limit)
+        close = (base_price * np.exp(np.cumsum(np.log1p(returns)))).round(2)
+        prev_close = np.concatenate([[close[0]], close[:-1]])
+        open_ = (prev_close * (1 + stream(2).normal(0, 0.005, n))).round(2)
+        high = (np.maximum(open_, close) * (1 + stream(3).uniform(0, 0.02, n))).round(2)
+        low = (np.minimum(open_, close) * (1 - stream(4).uniform(0, 0.02, n))).round(2)
+        volume = stream(5).integers(1_000, 500_000, n)
+        change = (close - prev_close).round(2)
+        history = pd.DataFrame(
+            {
+                "日期": dates,
+                "股票代码": symbol,
+                "开盘": open_,
+                "收盘": close,
+                "最高": high,
+                "最低": low,
+                "成交量": volume,
+                "成交额": (volume * close * 100).round(1),
+                "振幅": ((high - low) / prev_close * 100).round(2),
+                "涨跌幅": (change / prev_close * 100).round(2),
+                "涨跌额": change,
+                "换手率": stream(6).uniform(0.1, 10, n).round(2),
+            }
+        )
+        visible = max(0, self._first_visible - listed)
+        return history.iloc[visible:].reset_index(drop=True)
+
+    @staticmethod
+    def _generate_codes(num_symbols: int) -> list[str]:
+        codes = []
+        for i, (start, share) in enumerate(_CODE_BLOCKS):
+            if i == len(_CODE_BLOCKS) - 1:
+                count = num_symbols - len(codes)
+            else:
+                count = min(int(num_symbols * share), num_symbols - len(codes))
+            codes.extend(f"{start + j + 1:06d}" for j in range(count))
+        return sorted(codes)
@@ -1,171 +1,672 @@
-import logging
 from pathlib import Path
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from datetime import date
+from dataclasses import dataclass
 import shutil
-
-# 强制日志配置，必须在其他库（如akshare）导入前执行
-# 将sqlalchemy的日志级别设置为WARNING，以减少不必要的输出
-logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
-logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
-
-# 1. 获取根logger
-root_logger = logging.getLogger()
-# 2. 设置我们期望的最低级别
-root_logger.setLevel(logging.WARNING)
-
-# 3. 移除并替换所有现存的handler，确保我们的配置是唯一的
-for handler in root_logger.handlers[:]:
-    root_logger.removeHandler(handler)
-logging.basicConfig(level=logging.WARNING)
+import time
+from typing import Hashable
 
 from tqdm import tqdm
-from autostock.datamanager.fetcher import AkshareFetcher
+from autostock.core.logging import configure_logging
+from autostock.database.connection import get_connection_manager
+from autostock.datamanager.buffer import (
+    DailyDatasetWriteBuffer,
+    TrackingUpdateBuffer,
+)
+from autostock.datamanager.fetcher_base import BaseFetcher
+from autostock.datamanager.cache import DailyFrameCache
 from autostock.datamanager.cleaner import DataCleaner
-from autostock.datamanager.ops import market_ops, daily_ops, tracking_ops
+from autostock.datamanager.feature_store import FeatureStore
+from autostock.datamanager.market_snapshot import MarketSnapshot, get_market_snapshot
+from autostock.datamanager.ops import market_ops, daily_ops, sync_ops, tracking_ops
+from autostock.datamanager.panel import DailyPanel
+from autostock.datamanager.pipeline import Pipeline, Stage
+from autostock.datamanager.raw_cache import RawResponseCache
 from autostock.datamanager.session import get_session
+from autostock.datamanager.summary import StageTimer, SyncSummary
+from autostock.datamanager.throttle import RateLimiter, call_with_retry
 from sqlmodel import select, func, delete
 from autostock.database.models import DataTracking, MarketOverview
 
 
+@dataclass
+class _DailySyncJob:
+    """
+    日线同步流水线中一只股票的工作条目。
+    """
+
+    code: str
+    # 本地已有数据的最后交易日，给定时只获取从该日起的数据（保留一天重叠用于校验复权基准）
+    end_date: date | None = None
+    raw: pd.DataFrame | None = None
+    cleaned: pd.DataFrame | None = None
+
+    @property
+    def start_date(self) -> str:
+        return self.end_date.strftime("%Y%m%d") if self.end_date else "19900101"
+
+
 class DataManager:
     """
     数据管理器，负责协调整个数据获取、清洗和存储的流程。
     """
 
-    def __init__(self, data_path: str = "./datas"):
+    DAILY_LAYOUTS = ("per_symbol", "dataset")
+    # 日线同步在 sync_run 表中的任务类型
+    DAILY_SYNC_KIND = "daily_history"
+
+    def __init__(
+        self,
+        data_path: str = "./datas",
+        daily_layout: str = "per_symbol",
+        cache_max_bytes: int = 512 * 1024 * 1024,
+        fetcher: BaseFetcher | None = None,
+        feature_max_bytes: int = 4 * 1024 * 1024 * 1024,
+        allow_stale_cache: bool = False,
+    ):
+        """
+        :param data_path: 数据存储的根目录。
+        :param daily_layout: 日线数据的存储布局。"per_symbol" 为每只股票一个文件
+                             （`daily/{symbol}.parquet`）；"dataset" 为按年分区的合并数据集
+                             （`daily_dataset/year=YYYY/data.parquet`），适合全市场横截面扫描。
+        :param cache_max_bytes: 日线数据内存缓存的容量（字节），<=0 表示禁用缓存。
+        :param fetcher: 数据获取器，默认为带磁盘缓存（`data_path/cache`）的 AkshareFetcher。
+                        离线测试时可传入 LocalFetcher。
+        :param feature_max_bytes: 特征缓存（`data_path/features`）允许占用的最大字节数。
+        :param allow_stale_cache: 默认的 AkshareFetcher 是否使用已过期的原始响应缓存。
+                                  修改清洗逻辑后重新导入时打开，已缓存的股票不会访问网络。
+        """
+        if daily_layout not in self.DAILY_LAYOUTS:
+            raise ValueError(
+                f"Unknown daily_layout '{daily_layout}', expected one of {self.DAILY_LAYOUTS}."
+            )
         self.data_path = Path(data_path)
-        self.fetcher = AkshareFetcher()
+        self.daily_layout = daily_layout
+        if fetcher is None:
+            # akshare 导入很慢，只在真正需要访问网络时才导入
+            from autostock.datamanager.fetcher import AkshareFetcher
+
+            fetcher = AkshareFetcher(
+                cache=RawResponseCache(
+                    self.data_path / "cache", allow_stale=allow_stale_cache
+                )
+            )
+        self.fetcher = fetcher
         self.cleaner = DataCleaner()
         self.market_ops = market_ops
         self.daily_ops = daily_ops
         self.tracking_ops = tracking_ops
+        self.sync_ops = sync_ops
+        self.daily_cache = DailyFrameCache(cache_max_bytes)
+        self.feature_store = FeatureStore(
+            self.data_path / "features", max_bytes=feature_max_bytes
+        )
         self.data_path.mkdir(parents=True, exist_ok=True)
         print("INFO: DataManager initialized.")
 
-    def sync_market_overview(self):
+    def sync_market_overview(self) -> dict:
         """
         获取、清洗并更新A股市场所有股票的概览信息。
         这是一个完整的"索引数据"更新流程。
+
+        :return: 本次更新的统计信息（记录数、新增/更新数、新跟踪股票数、新的数据版本号、各阶段耗时）。
         """
         print("\n--- Starting Market Overview Update ---")
+        timer = StageTimer()
+        result = {"records": 0, "inserted": 0, "updated": 0, "tracked": 0}
+
         # 1. 获取
         print("STEP 1/3: Fetching market overview data from Akshare...")
-        raw_df = self.fetcher.get_market_overview()
+        with timer.measure("fetch"):
+            raw_df = self.fetcher.get_market_overview()
         if raw_df is None or raw_df.empty:
             print("ERROR: Failed to fetch market overview data. Aborting update.")
-            return
+            result["stage_seconds"] = timer.as_dict()
+            return result
         print(f"STEP 1/3: Fetched {len(raw_df)} raw records.")
 
         # 2. 清洗
         print("STEP 2/3: Cleaning data...")
-        cleaned_df = self.cleaner.clean_market_overview(raw_df)
+        with timer.measure("clean"):
+            cleaned_df = self.cleaner.clean_market_overview(raw_df)
         print(f"STEP 2/3: Cleaned {len(cleaned_df)} records.")
 
         # 3. 存储
         print("STEP 3/3: Upserting data into database...")
         with get_session() as session:
-            self.market_ops.upsert_market_overview(session, cleaned_df)
+            with timer.measure("upsert"):
+                counts = self.market_ops.upsert_market_overview(session, cleaned_df)
             print("Upserting tracking stocks to database...")
-            self.tracking_ops.upsert_tracking_stocks(session, cleaned_df)
+            with timer.measure("tracking"):
+                tracked = self.tracking_ops.upsert_tracking_stocks(session, cleaned_df)
+            # 通知进程内外的市场快照（MarketSnapshot）重新加载；
+            # 版本号与上面的修改由 get_session() 在同一个事务中提交
+            version = self.market_ops.bump_market_overview_version(session)
+        get_connection_manager().publish_snapshot(force=True)
         print("--- Market Overview Update Finished ---")
 
-    def sync_daily_history(self, codes: list[str]):
+        result.update(counts)
+        result["records"] = len(cleaned_df)
+        result["tracked"] = tracked
+        result["version"] = version
+        result["stage_seconds"] = timer.as_dict()
+        return result
+
+    def sync_daily_history(
+        self,
+        codes: list[str] | None = None,
+        workers: int = 8,
+        requests_per_second: float = 8.0,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        incremental: bool = False,
+        tracking_flush_every: int = 200,
+        clean_workers: int = 2,
+        write_workers: int = 2,
+        queue_size: int = 32,
+        resume: bool = False,
+    ) -> SyncSummary:
         """
         为指定的股票列表（或所有股票）获取、清洗并存储其日线历史数据。
 
+        同步以流水线方式执行：网络获取、清洗和Parquet写入是三个独立的阶段，
+        各自有线程和有界输入队列，网络等待期间CPU可以清洗其他股票的数据。
+        在途的股票数不超过 所有队列容量 + 所有工作线程数，峰值内存与股票总数无关。
+        网络请求通过一个全局限速器控制总请求速率；单只股票获取失败时按指数退避重试。
+        跟踪表的更新在主线程中收集，并按批次用一条 UPDATE 语句写入，
+        以避免多个线程同时写入 DuckDB，也避免每只股票一个事务。
+
+        增量模式下，根据 `DataTracking.daily_end_date` 只获取缺失的日期区间并合并进已有文件；
+        已经是最新的股票直接跳过，不发起任何网络请求。
+
+        每次同步都会在数据库中记录一条运行记录（`sync_run`）和每只股票的检查点
+        （`sync_checkpoint`）。检查点与跟踪信息在同一个事务中、且在数据文件写入之后提交，
+        所以同步中途崩溃或被打断后，`resume=True` 只会重新处理尚未完成（或失败）的股票。
+
         :param codes: 一个包含股票代码的列表。如果为None，则处理数据库中所有股票。
+        :param workers: 获取阶段的并发线程数。
+        :param requests_per_second: 对数据源的全局请求速率上限（次/秒），<=0 表示不限速。
+        :param max_retries: 单只股票获取失败后的最大重试次数。
+        :param backoff: 重试退避基数（秒）。
+        :param incremental: 是否启用增量同步。
+        :param tracking_flush_every: 每累计多少只股票批量提交一次跟踪信息。
+        :param clean_workers: 清洗阶段的并发线程数。
+        :param write_workers: 写入阶段的并发线程数。
+        :param queue_size: 每个阶段输入队列的容量。
+        :param resume: 是否续传最近一次未完成的同步运行。没有可续传的运行时开始一次新的同步，
+                       有可续传的运行时忽略 `codes`，`incremental` 取原运行保存的设置；
+                       原运行的存储布局与 `daily_layout` 不同时抛出 ValueError。
+        :return: 本次同步的结果汇总，`pipeline_stats` 中包含各阶段的吞吐量和队列深度。
         """
         print("\n--- Starting Daily Histories Update ---")
+        summary = SyncSummary()
+        started = time.perf_counter()
 
-        symbols_to_process: list[str]
-        if codes is None:
-            # 1. 如果未指定codes，则从数据库获取所有股票列表
-            print(
-                "STEP 1/4: No specific codes provided. Getting all stocks from database..."
-            )
-            stock_list_df = self.market_ops.get_all_market_overview()
-            if stock_list_df.empty:
+        run_id: str | None = None
+        symbols_to_process: list[str] = []
+        if resume:
+            with get_session() as session:
+                run = self.sync_ops.get_resumable_run(session, self.DAILY_SYNC_KIND)
+                if run is not None:
+                    # 续传沿用原运行的同步方式，而不是本次调用的参数
+                    params = self.sync_ops.get_run_params(run)
+                    layout = params.get("layout", self.daily_layout)
+                    if layout != self.daily_layout:
+                        raise ValueError(
+                            f"Run {run.run_id} was started with daily_layout '{layout}', "
+                            f"resume it with a DataManager using the same layout."
+                        )
+                    incremental = bool(params.get("incremental", incremental))
+                    run_id = run.run_id
+                    symbols_to_process = self.sync_ops.get_unfinished_symbols(
+                        session, run_id
+                    )
+                    run.status = "running"
+                    session.add(run)
+            if run_id is None:
+                print(
+                    "INFO: No unfinished daily sync run to resume, starting a new one."
+                )
+            else:
+                print(
+                    f"STEP 1/4: Resuming run {run_id} (incremental={incremental}): "
+                    f"{len(symbols_to_process)} unfinished stock(s)."
+                )
+
+        if run_id is None:
+            if codes is None:
+                # 1. 如果未指定codes，则从数据库获取所有股票列表
                 print(
-                    "ERROR: Market overview is empty in the database. Run `sync_market_overview` first. Aborting."
+                    "STEP 1/4: No specific codes provided. Getting all stocks from database..."
                 )
-                return
-            symbols_to_process = stock_list_df["symbol"].tolist()
-        else:
-            # 1. 如果指定了codes，则直接使用该列表
-            print(f"STEP 1/4: Processing a specific list of {len(codes)} code(s).")
-            symbols_to_process = codes
-
-        print(f"Found {len(symbols_to_process)} stocks to update.")
-
-        for i, code in enumerate(
-            tqdm(symbols_to_process, desc="Syncing Daily History")
-        ):
+                snapshot = self.get_market_snapshot()
+                if not len(snapshot):
+                    print(
+                        "ERROR: Market overview is empty in the database. Run `sync_market_overview` first. Aborting."
+                    )
+                    return summary
+                symbols_to_process = snapshot.symbols.tolist()
+            else:
+                # 1. 如果指定了codes，则直接使用该列表
+                print(f"STEP 1/4: Processing a specific list of {len(codes)} code(s).")
+                symbols_to_process = codes
+
+            with get_session() as session:
+                run_id = self.sync_ops.create_sync_run(
+                    session,
+                    self.DAILY_SYNC_KIND,
+                    symbols_to_process,
+                    {"incremental": incremental, "layout": self.daily_layout},
+                )
+        summary.run_id = run_id
+
+        print(
+            f"Found {len(symbols_to_process)} stocks to update "
+            f"(workers: fetch={workers}, clean={clean_workers}, write={write_workers}; "
+            f"rate={requests_per_second}/s)."
+        )
+
+        end_dates: dict[str, date] = {}
+        if incremental:
+            with get_session() as session:
+                end_dates = self.tracking_ops.get_daily_end_dates(
+                    session, symbols_to_process
+                )
+            latest = self.daily_ops.latest_expected_trade_date()
+            up_to_date = [
+                s for s in symbols_to_process if end_dates.get(s, date.min) >= latest
+            ]
+            summary.skipped.extend(up_to_date)
+            up_to_date_set = set(up_to_date)
+            symbols_to_process = [
+                s for s in symbols_to_process if s not in up_to_date_set
+            ]
+            print(
+                f"Incremental mode: {len(up_to_date)} stocks already up to date "
+                f"(as of {latest}), {len(symbols_to_process)} need syncing."
+            )
+
+        limiter = RateLimiter(requests_per_second, burst=max(1, workers))
+
+        def fetch(job: _DailySyncJob) -> _DailySyncJob:
             # 2. 获取原始数据
-            # print(f"--> Processing {code} ({i+1}/{len(symbols_to_process)})...")
-            raw_df = self.fetcher.fetch_daily_history(code)
+            job.raw = self._fetch_daily_raw(
+                job.code, job.start_date, limiter, max_retries, backoff
+            )
+            return job
 
+        def clean(job: _DailySyncJob) -> _DailySyncJob:
             # 3. 清洗数据
-            cleaned_df = self.cleaner.clean_daily_history(raw_df, code)
-
-            if cleaned_df.empty:
-                # print(f"No data for {code}, skipping.")
-                continue
+            job.cleaned = self.cleaner.clean_daily_history(job.raw, job.code)
+            job.raw = None
+            return job
 
+        def write(job: _DailySyncJob) -> _DailySyncJob:
             # 4. 存储
-            self.daily_ops.save_daily_to_parquet(cleaned_df, self.data_path)
+            job.cleaned = self._write_daily_history(job, limiter, max_retries, backoff)
+            return job
 
-            # 5. 更新跟踪表
-            print(f"Updating tracking info for {code}...")
+        pipeline = Pipeline(
+            [
+                Stage("fetch", fetch, workers),
+                Stage("clean", clean, clean_workers),
+                Stage("write", write, write_workers),
+            ],
+            queue_size=queue_size,
+        )
+        jobs = (_DailySyncJob(code, end_dates.get(code)) for code in symbols_to_process)
+
+        # 没有正常结束（异常、Ctrl-C）时运行被标记为 interrupted，可以续传
+        run_status = "interrupted"
+        try:
+            with TrackingUpdateBuffer(
+                flush_every=tracking_flush_every, run_id=run_id
+            ) as tracking, DailyDatasetWriteBuffer(self.data_path, tracking) as dataset:
+                for code in summary.skipped:
+                    tracking.mark(code, "skipped")
+                progress = tqdm(
+                    total=len(symbols_to_process), desc="Syncing Daily History"
+                )
+                try:
+                    for result in pipeline.run(jobs):
+                        progress.update()
+                        if progress.n % 50 == 0:
+                            progress.set_postfix(pipeline.queue_depths(), refresh=False)
+                        code = result.item.code
+                        if not result.ok:
+                            summary.failed[code] = str(result.error)
+                            tracking.mark(code, "failed", str(result.error))
+                            continue
+
+                        cleaned_df = result.value.cleaned
+                        if cleaned_df.empty:
+                            summary.skipped.append(code)
+                            tracking.mark(code, "skipped")
+                            continue
+
+                        # 5. 记录跟踪信息和检查点，按批次写入数据库
+                        #    合并存储布局下先按批次写入数据集，写入后再登记跟踪信息
+                        if self.daily_layout == "dataset":
+                            dataset.add(code, cleaned_df)
+                        else:
+                            tracking.add(code, cleaned_df)
+                        summary.succeeded.append(code)
+                        self.daily_cache.invalidate(code)
+                finally:
+                    # 被打断时流水线停止接收新股票，已完成股票的跟踪信息和检查点由缓冲区在退出时提交
+                    progress.close()
+            run_status = "failed" if summary.failed else "completed"
+        finally:
             with get_session() as session:
-                self.tracking_ops.update_daily_tracking_info(session, code, cleaned_df)
-
+                self.sync_ops.finish_sync_run(session, run_id, run_status)
+            get_connection_manager().publish_snapshot(force=True)
+
+        summary.pipeline_stats = pipeline.stats()
+        summary.stage_seconds = {
+            name: stats["busy_seconds"]
+            for name, stats in summary.pipeline_stats.items()
+        }
+        summary.tracking_commits = tracking.commits
+        summary.tracking_seconds = tracking.seconds
+        summary.stage_seconds["tracking"] = tracking.seconds
+        if dataset.seconds:
+            summary.stage_seconds["write"] += dataset.seconds
+        summary.elapsed_seconds = time.perf_counter() - started
+        print(f"Run {run_id} {run_status}.")
+        print(summary.report())
+        print(f"Bottleneck stage: {pipeline.bottleneck()}")
         print("--- Daily Histories Update Finished ---")
+        return summary
+
+    def _fetch_daily_raw(
+        self,
+        code: str,
+        start_date: str,
+        limiter: RateLimiter,
+        max_retries: int,
+        backoff: float,
+    ) -> pd.DataFrame:
+        """
+        获取单只股票的原始日线数据（带限速和重试），Akshare需要纯数字代码。
+        先查原始响应缓存，命中时不申请限速令牌。
+        """
+        numeric_code = "".join(filter(str.isdigit, code))
+        cached = self.fetcher.cached_daily_history(numeric_code, start_date=start_date)
+        if cached is not None:
+            return cached
+        return call_with_retry(
+            self.fetcher.fetch_daily_history,
+            numeric_code,
+            start_date=start_date,
+            raise_on_error=True,
+            max_retries=max_retries,
+            backoff=backoff,
+            limiter=limiter,
+        )
+
+    def _write_daily_history(
+        self,
+        job: "_DailySyncJob",
+        limiter: RateLimiter,
+        max_retries: int,
+        backoff: float,
+    ) -> pd.DataFrame:
+        """
+        在写入阶段处理单只股票的清洗结果：增量数据合并进已有文件，全量数据直接写入。
+
+        增量数据的复权基准发生变化时，在本线程中重新获取并清洗完整历史
+        （这种情况很少，不值得把条目送回获取阶段）。
+        合并存储布局下不在这里写入，而是把数据返回给主线程批量写入。
+
+        :return: 该股票写入（或待写入）的日线DataFrame；无数据时返回空DataFrame。
+        """
+        code, cleaned_df = job.code, job.cleaned
+        if cleaned_df.empty:
+            return cleaned_df
+
+        if job.end_date is not None:
+            if self.daily_layout == "dataset":
+                stored_df = self.daily_ops.read_daily_dataset(
+                    self.data_path, [code], job.end_date, job.end_date
+                )
+                if not self.daily_ops.adjustment_basis_changed(stored_df, cleaned_df):
+                    return cleaned_df
+            else:
+                merged_df = self.daily_ops.append_daily_to_parquet(
+                    cleaned_df, self.data_path
+                )
+                if merged_df is not None:
+                    return merged_df
+            print(
+                f"INFO: Adjustment basis changed for {code}, refetching full history."
+            )
+            raw_df = self._fetch_daily_raw(
+                code, "19900101", limiter, max_retries, backoff
+            )
+            cleaned_df = self.cleaner.clean_daily_history(raw_df, code)
+            if cleaned_df.empty:
+                return cleaned_df
+
+        if self.daily_layout != "dataset":
+            self.daily_ops.save_daily_to_parquet(cleaned_df, self.data_path)
+        return cleaned_df
 
     def get_stock_list(self) -> list[str]:
         """
         获取当前跟踪的所有股票代码列表。
         """
         print("Getting all tracked stocks from database...")
-        with get_session() as session:
-            symbols = self.tracking_ops.get_all_tracked_symbols(session)
+        symbols = self.tracking_ops.get_all_tracked_symbols()
         print(f"Found {len(symbols)} tracked stocks.")
         return symbols
 
-    def select_stocks(self, **kwargs) -> pd.DataFrame:
+    def select_stocks(
+        self,
+        columns: list[str] | None = None,
+        order_by: str | list[str] | None = None,
+        limit: int | None = None,
+        as_arrow: bool = False,
+        **kwargs,
+    ) -> pd.DataFrame | pa.Table:
         """
-        根据基本面数据筛选股票。
-        :param kwargs: 过滤条件，如 industry='银行', status='上市'
-        :return: 符合条件的股票DataFrame
+        根据基本面数据筛选股票，过滤、排序和行数限制都在 DuckDB 中完成。
+        :param columns: 返回的列，None 表示全部列。
+        :param order_by: 排序列，前缀 "-" 表示降序，如 "-last_price"。
+        :param limit: 最多返回的行数。
+        :param as_arrow: 返回 pyarrow.Table 而不是 DataFrame。
+        :param kwargs: 过滤条件，如 industry='银行', last_price__between=(5, 20), name__like='%银行%'，
+                       完整写法见 `market_ops.FILTER_OPERATORS`。
+        :return: 符合条件的股票DataFrame（`as_arrow=True` 时为 pyarrow.Table）
         """
         print(f"Selecting stocks with criteria: {kwargs}...")
-        with get_session() as session:
-            selected_df = self.market_ops.query_market_overview(session, **kwargs)
-        print(f"Found {len(selected_df)} stocks matching criteria.")
-        return selected_df
+        selected = self.market_ops.query_market_overview(
+            columns=columns,
+            order_by=order_by,
+            limit=limit,
+            as_arrow=as_arrow,
+            **kwargs,
+        )
+        print(f"Found {len(selected)} stocks matching criteria.")
+        return selected
 
     def get_daily_history(
-        self, symbol: str, start_date: date | None = None, end_date: date | None = None
+        self,
+        symbol: str,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        columns: list[str] | None = None,
+        use_cache: bool = True,
     ) -> pd.DataFrame:
         """
         获取指定股票、指定时间范围的日线历史数据。
-        数据源为本地Parquet文件。
+        数据源为本地Parquet文件（按 `daily_layout` 选择逐股票文件或合并数据集）。
+
+        启用缓存时，首次读取会把该股票完整的日线数据解码后放入内存缓存，
+        之后的调用（任意日期范围和列）直接从缓存切片；数据文件被修改后缓存自动失效。
+        返回的总是副本，调用方可以随意修改。
 
         :param symbol: 股票代码。
         :param start_date: 开始日期。
         :param end_date: 结束日期。
+        :param columns: 只读取这些列（'trade_date' 总会被包含），None 表示全部列。
+        :param use_cache: 是否使用内存缓存。
         :return: 包含日线数据的DataFrame。
         """
         print(f"Getting daily history for {symbol} from {start_date} to {end_date}...")
+        version = (
+            self._daily_data_version(symbol)
+            if use_cache and self.daily_cache.max_bytes > 0
+            else None
+        )
+        if version is None:
+            return self._read_daily_history(symbol, start_date, end_date, columns)
+
+        full_df = self.daily_cache.get(symbol, version)
+        if full_df is None:
+            full_df = self._read_daily_history(symbol)
+            self.daily_cache.put(symbol, version, full_df)
+        return self._slice_daily_history(full_df, start_date, end_date, columns)
+
+    def get_daily_panel(
+        self,
+        symbols: list[str] | None = None,
+        fields: list[str] | tuple[str, ...] = ("close",),
+        start_date: date | None = None,
+        end_date: date | None = None,
+        calendar: np.ndarray | None = None,
+    ) -> DailyPanel:
+        """
+        一次性加载多只股票的日线数据，返回对齐到同一交易日历的 日期 x 股票 矩阵。
+
+        数据通过一次 DuckDB `read_parquet` 扫描整个日线存储获得，不逐个文件读取。
+
+        :param symbols: 股票代码列表，None 表示存储中的全部股票。矩阵的列顺序与之一致，
+                        没有数据的股票对应全 NaN 列。
+        :param fields: 需要的字段，例如 ("open", "close", "volume")。
+        :param start_date: 开始日期。
+        :param end_date: 结束日期。
+        :param calendar: 交易日历（datetime64 数组）。None 时使用这些股票出现过的所有交易日。
+                         日历不要求有序，会被排序并去重，面板的行按日期升序排列。
+        :return: DailyPanel，停牌日为 NaN。
+        """
+        fields = list(fields)
+        print(
+            f"Loading daily panel for {len(symbols) if symbols is not None else 'all'} "
+            f"symbols, fields={fields}, from {start_date} to {end_date}..."
+        )
+        long_df = self.daily_ops.scan_daily_store(
+            self.data_path, symbols, fields, start_date, end_date, self.daily_layout
+        )
+        if long_df.empty:
+            long_df = pd.DataFrame(
+                {"trade_date": pd.Series(dtype="datetime64[ns]"), "symbol": []}
+                | {name: pd.Series(dtype=float) for name in fields}
+            )
+        return DailyPanel.from_long(long_df, fields, symbols, calendar)
+
+    def get_feature_panel(
+        self,
+        name: str,
+        symbols: list[str] | None = None,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        calendar: np.ndarray | None = None,
+        **params,
+    ) -> DailyPanel:
+        """
+        读取多只股票的指标/特征面板（例如 `get_feature_panel("macd", fast=6)`）。
+
+        结果缓存在 `data_path/features` 下，按股票的日线数据版本自动失效；
+        只有没有缓存或日线数据已更新的股票会重新计算。
+
+        :param name: 特征名，见 `feature_store.FEATURES`。
+        :param symbols: 股票代码列表，None 表示所有有日线数据的股票。
+        :param start_date: 开始日期。
+        :param end_date: 结束日期。
+        :param calendar: 交易日历，含义同 `get_daily_panel`。
+        :param params: 特征参数，未给出的取默认值。
+        :return: DailyPanel，字段为特征的各输出列（如 "dif", "dea", "hist"）。
+        """
+        return self.feature_store.get_panel(
+            self, name, symbols, start_date, end_date, calendar, **params
+        )
+
+    def get_market_snapshot(self, refresh: bool = True) -> MarketSnapshot:
+        """
+        获取进程内共享的市场快照（market_overview 的列式只读副本）。
+
+        :param refresh: 是否检查版本号，market_overview 更新过时重新加载，见 `get_market_snapshot`。
+        """
+        return get_market_snapshot(refresh)
+
+    def get_cache_stats(self) -> dict[str, int | float]:
+        """
+        获取日线数据内存缓存的命中统计。
+        """
+        return self.daily_cache.stats()
+
+    def _daily_data_version(self, symbol: str) -> Hashable | None:
+        """
+        某只股票日线数据的缓存版本号；没有数据（或无法确定版本）时返回None，此时不使用缓存。
+
+        逐股票布局下取数据文件的修改时间；合并存储布局下所有股票共用年份文件，
+        改用跟踪表中该股票的 daily_end_date 和 daily_last_sync，
+        同步其他股票不会使它的缓存失效，也不需要扫描年份文件。
+        """
+        if self.daily_layout == "dataset":
+            return self.tracking_ops.get_daily_data_versions([symbol]).get(symbol)
+        return self.daily_ops.daily_data_version(symbol, self.data_path)
+
+    def _read_daily_history(
+        self,
+        symbol: str,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        columns: list[str] | None = None,
+    ) -> pd.DataFrame:
+        if self.daily_layout == "dataset":
+            return self.daily_ops.read_daily_dataset(
+                self.data_path, [symbol], start_date, end_date, columns=columns
+            )
         return self.daily_ops.read_daily_from_parquet(
-            symbol, self.data_path, start_date, end_date
+            symbol, self.data_path, start_date, end_date, columns=columns
         )
 
+    @staticmethod
+    def _slice_daily_history(
+        df: pd.DataFrame,
+        start_date: date | None,
+        end_date: date | None,
+        columns: list[str] | None,
+    ) -> pd.DataFrame:
+        """
+        从缓存的完整日线数据（按交易日升序）中切出所需的日期范围和列，返回副本。
+        """
+        if df.empty:
+            return df.copy()
+        if start_date or end_date:
+            trade_dates = df["trade_date"].to_numpy()
+            lo = (
+                trade_dates.searchsorted(np.datetime64(start_date, "ns"), "left")
+                if start_date
+                else 0
+            )
+            hi = (
+                trade_dates.searchsorted(np.datetime64(end_date, "ns"), "right")
+                if end_date
+                else len(df)
+            )
+            df = df.iloc[lo:hi]
+        if columns is not None:
+            df = df[["trade_date"] + [c for c in columns if c != "trade_date"]]
+        return df.reset_index(drop=True).copy()
+
 
 if __name__ == "__main__":
     # 配置日志
-    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
-    logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
+    configure_logging()
 
     manager = DataManager()
 
@@ -0,0 +1,324 @@
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from autostock.datamanager.ops import market_ops
+
+# 以分类编码保存的列：取值很少、经常按其筛选
+CATEGORICAL_COLUMNS = ("industry", "market_type")
+# 内存中支持的过滤运算，写法与 `market_ops.FILTER_OPERATORS` 相同
+SNAPSHOT_FILTER_OPERATORS = (
+    "eq",
+    "ne",
+    "gt",
+    "ge",
+    "lt",
+    "le",
+    "in",
+    "not_in",
+    "between",
+    "isnull",
+)
+
+
+class MarketSnapshot:
+    """
+    market_overview 的进程内只读列式快照。
+
+    每列是一个按股票代码排序的 NumPy 数组（只读），行号由股票代码的哈希索引给出；
+    industry、market_type 保存为整数编码加类别表，按它们筛选只需比较整数，
+    取某个类别的全部股票是 O(1) 的切片。
+
+    快照带有加载时 market_overview 的版本号，`sync_market_overview` 每次更新都会使版本号加1。
+    通常不直接构造，而是通过 `get_market_snapshot()` 获取进程内共享的实例，
+    它只在版本号变化时才重新查询数据库。
+    """
+
+    def __init__(self, table, version: int | None = None):
+        """
+        :param table: market_overview 的 pyarrow.Table，至少包含 symbol 列，symbol 不能重复。
+        :param version: 数据版本号，None 表示未知。
+        """
+        self.version = version
+        self.symbols = _readonly(
+            table.column("symbol").to_numpy(zero_copy_only=False).astype(object)
+        )
+        self._rows = {symbol: row for row, symbol in enumerate(self.symbols)}
+        if len(self._rows) != len(self.symbols):
+            raise ValueError("Duplicate symbols in market overview.")
+        self._index = pd.Index(self.symbols)
+
+        self.columns: dict[str, np.ndarray] = {}
+        self.categories: dict[str, np.ndarray] = {}
+        self._category_codes: dict[str, dict[str, int]] = {}
+        self._groups: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        for name in table.column_names:
+            if name == "symbol":
+                continue
+            values = table.column(name).to_numpy(zero_copy_only=False)
+            if name in CATEGORICAL_COLUMNS:
+                self._encode(name, values)
+            else:
+                self.columns[name] = _readonly(values)
+
+    def _encode(self, name: str, values: np.ndarray) -> None:
+        # 类别按字典序排列，缺失值编码为 -1
+        codes, categories = pd.factorize(values.astype(object), sort=True)
+        codes = codes.astype(np.int32)
+        self.columns[name] = _readonly(codes)
+        self.categories[name] = _readonly(np.asarray(categories, dtype=object))
+        self._category_codes[name] = {value: i for i, value in enumerate(categories)}
+        # 稳定排序后每个类别的行号是一段连续区间（组内仍按股票代码排序）
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(-1, len(categories) + 1))
+        self._groups[name] = (_readonly(order), bounds)
+
+    @classmethod
+    def load(cls) -> "MarketSnapshot":
+        """
+        从数据库加载当前的 market_overview（数据库被同步任务占用时读取快照文件）。
+        """
+        # 先读版本号再读数据：两者之间发生同步时，下次检查会发现版本变化并重新加载
+        version = market_ops.get_market_overview_version()
+        table = market_ops.get_all_market_overview(as_arrow=True)
+        return cls(table, version)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._rows
+
+    @property
+    def nbytes(self) -> int:
+        return int(
+            sum(values.nbytes for values in self.columns.values()) + self.symbols.nbytes
+        )
+
+    def row(self, symbol: str) -> int | None:
+        """
+        股票代码对应的行号，不存在时返回 None。
+        """
+        return self._rows.get(symbol)
+
+    def rows(self, symbols) -> np.ndarray:
+        """
+        一组股票代码对应的行号数组，不存在的股票为 -1。
+        """
+        return self._index.get_indexer(pd.Index(symbols, dtype=object))
+
+    def get(self, symbol: str) -> dict | None:
+        """
+        一只股票的全部字段，不存在时返回 None。
+        """
+        row = self._rows.get(symbol)
+        if row is None:
+            return None
+        record = {"symbol": symbol}
+        for name in self.columns:
+            record[name] = self.column(name)[row]
+        return record
+
+    def column(self, name: str, rows: np.ndarray | None = None) -> np.ndarray:
+        """
+        某一列的值，分类列解码为字符串（缺失值为 None）。
+
+        :param name: 列名。
+        :param rows: 行号数组，None 表示全部行。
+        """
+        if name == "symbol":
+            return self.symbols if rows is None else self.symbols[rows]
+        if name not in self.columns:
+            raise ValueError(f"Unknown market_overview column '{name}'.")
+        values = self.columns[name] if rows is None else self.columns[name][rows]
+        if name in self.categories:
+            decoded = np.append(self.categories[name], None)
+            # 编码 -1 正好取到末尾追加的 None
+            return decoded[values]
+        return values
+
+    def codes(self, name: str) -> np.ndarray:
+        """
+        分类列的整数编码（-1 表示缺失），与 `categories[name]` 对应。
+        """
+        if name not in self.categories:
+            raise ValueError(f"Column '{name}' is not categorical.")
+        return self.columns[name]
+
+    def group(self, name: str, value: str | None) -> np.ndarray:
+        """
+        分类列取某个值的全部行号（按股票代码排序），O(1) 的数组切片。
+
+        :param name: 分类列名，如 "industry"。
+        :param value: 类别，None 表示缺失值；不存在的类别返回空数组。
+        """
+        if name not in self.categories:
+            raise ValueError(f"Column '{name}' is not categorical.")
+        code = -1 if value is None else self._category_codes[name].get(value)
+        order, bounds = self._groups[name]
+        if code is None:
+            return order[:0]
+        return order[bounds[code + 1] : bounds[code + 2]]
+
+    def mask(self, **filters) -> np.ndarray:
+        """
+        对全部股票计算过滤条件，返回布尔数组。
+
+        写法与 `market_ops.query_market_overview` 相同，支持 `SNAPSHOT_FILTER_OPERATORS` 中的运算，
+        例如 industry="银行"、market_type__in=["创业板", "科创板"]、last_price__between=(5, 20)。
+        分类列只支持相等、in 和 isnull；大小比较用于数值列和日期列。
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for key, value in filters.items():
+            name, _, op = key.partition("__")
+            op = op or "eq"
+            if name != "symbol" and name not in self.columns:
+                raise ValueError(f"Unknown market_overview column '{name}'.")
+            if op not in SNAPSHOT_FILTER_OPERATORS:
+                raise ValueError(
+                    f"Filter '{key}' is not supported in memory, "
+                    f"use market_ops.query_market_overview instead."
+                )
+            if name in self.categories:
+                mask &= self._categorical_mask(name, op, value)
+            else:
+                mask &= _column_mask(self.column(name), op, value)
+        return mask
+
+    def filter(self, **filters) -> list[str]:
+        """
+        满足过滤条件的股票代码（按代码排序），条件写法见 `mask`。
+        """
+        return self.symbols[self.mask(**filters)].tolist()
+
+    def _categorical_mask(self, name: str, op: str, value) -> np.ndarray:
+        codes = self.columns[name]
+        lookup = self._category_codes[name]
+        if op == "isnull":
+            return codes == -1 if value else codes != -1
+        if op in ("eq", "ne") and value is None:
+            return codes == -1 if op == "eq" else codes != -1
+        if op in ("eq", "ne"):
+            matched = codes == lookup.get(value, -2)
+            return matched if op == "eq" else ~matched & (codes != -1)
+        if op in ("in", "not_in"):
+            wanted = [lookup[v] for v in value if v in lookup]
+            matched = np.isin(codes, np.asarray(wanted, dtype=np.int32))
+            return matched if op == "in" else ~matched & (codes != -1)
+        raise ValueError(
+            f"Filter '{name}__{op}' is not supported on a categorical column."
+        )
+
+    def to_frame(
+        self, columns: list[str] | None = None, symbols: list[str] | None = None
+    ) -> pd.DataFrame:
+        """
+        转换为 DataFrame（按股票代码排序），分类列为 pandas 的 Categorical。
+
+        :param columns: 返回的列，None 表示全部列；总是包含 symbol。
+        :param symbols: 只返回这些股票（不存在的忽略），None 表示全部股票。
+        """
+        if symbols is None:
+            rows = np.arange(len(self))
+        else:
+            rows = np.unique(self.rows(symbols))
+            rows = rows[rows >= 0]
+        names = list(self.columns) if columns is None else columns
+        data = {"symbol": self.symbols[rows]}
+        for name in names:
+            if name == "symbol":
+                continue
+            if name in self.categories:
+                data[name] = pd.Categorical.from_codes(
+                    self.columns[name][rows], categories=self.categories[name]
+                )
+            else:
+                data[name] = self.column(name, rows)
+        return pd.DataFrame(data)
+
+
+def _column_mask(values: np.ndarray, op: str, value) -> np.ndarray:
+    missing = pd.isna(values)
+    if op == "isnull":
+        return missing if value else ~missing
+    if op in ("eq", "ne") and value is None:
+        return missing if op == "eq" else ~missing
+    if op in ("in", "not_in"):
+        choices = pd.Index(pd.unique(np.asarray(list(value), dtype=object)))
+        matched = choices.get_indexer(values.astype(object)) >= 0
+        return matched if op == "in" else ~matched & ~missing
+    if op == "between":
+        low, high = value
+        return (
+            ~missing
+            & (values >= _scalar(values, low))
+            & (values <= _scalar(values, high))
+        )
+    value = _scalar(values, value)
+    if op == "eq":
+        matched = values == value
+    elif op == "ne":
+        matched = values != value
+    elif op == "gt":
+        matched = values > value
+    elif op == "ge":
+        matched = values >= value
+    elif op == "lt":
+        matched = values < value
+    else:
+        matched = values <= value
+    return ~missing & np.asarray(matched, dtype=bool)
+
+
+def _scalar(values: np.ndarray, value):
+    # 日期列用 datetime64 比较，允许传入 date 或 "2020-01-01"
+    if np.issubdtype(values.dtype, np.datetime64) and isinstance(value, (date, str)):
+        return np.datetime64(value)
+    return value
+
+
+def _readonly(values: np.ndarray) -> np.ndarray:
+    values.flags.writeable = False
+    return values
+
+
+# ---------------------------------------------------------------------- 进程内共享
+
+_snapshot: MarketSnapshot | None = None
+_snapshot_lock = threading.Lock()
+
+
+def get_market_snapshot(refresh: bool = True) -> MarketSnapshot:
+    """
+    获取进程内共享的市场快照。
+
+    :param refresh: 是否先检查 market_overview 的版本号（一次单行查询），版本变化时重新加载。
+                    为 False 时直接返回已有的快照（第一次调用仍会加载）。
+                    数据库还没有 data_version 表时无法判断版本，每次检查都会重新加载。
+    :return: MarketSnapshot，调用方之间共享，不得修改。
+    """
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is not None and not refresh:
+            return _snapshot
+        if _snapshot is not None:
+            version = market_ops.get_market_overview_version()
+            if version is not None and version == _snapshot.version:
+                return _snapshot
+        _snapshot = MarketSnapshot.load()
+        print(
+            f"INFO: Loaded market snapshot version {_snapshot.version} "
+            f"({len(_snapshot)} stocks)."
+        )
+        return _snapshot
+
+
+def clear_market_snapshot() -> None:
+    """
+    丢弃进程内的市场快照，下次 `get_market_snapshot()` 时重新加载。
+    """
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
@@ -1,16 +1,77 @@
+import os
+import shutil
+import time
 from pathlib import Path
-from datetime import date
+from datetime import date, datetime, timedelta
+import duckdb
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 
 # 定义数据存储的根目录
 DATA_ROOT = Path("datas/daily")
 
+# 合并存储布局：`data_path/daily_dataset/year=YYYY/data.parquet`，
+# 每年一个文件，文件内按 (symbol, trade_date) 排序。
+DAILY_DATASET_DIR = "daily_dataset"
+# 同步过程中暂存的数据集分片，运行结束时合并进 DAILY_DATASET_DIR。
+# 放在数据集目录之外，读者（pyarrow / DuckDB 扫描）不会看到未合并的数据
+DAILY_DATASET_STAGING_DIR = "daily_dataset_staging"
+# 每个行组约包含两百多只股票一年的数据，按symbol过滤时可以利用行组统计信息跳过大部分数据
+DATASET_ROW_GROUP_SIZE = 64 * 1024
+# 逐股票文件的行组大小，约一年的交易日。按日期范围读取时可以跳过不相关的年份
+DAILY_FILE_ROW_GROUP_SIZE = 256
+
+
+def latest_expected_trade_date(now: datetime | None = None) -> date:
+    """
+    估算当前应该能获取到的最新一个交易日。
+
+    A股15:00收盘，收盘前当天的日线尚未生成；周末顺延到上一个周五。
+    法定节假日不在考虑范围内，此时最多多发起一次无新数据的请求。
+
+    :param now: 当前时间，默认为 datetime.now()。
+    :return: 最新的预期交易日。
+    """
+    now = now or datetime.now()
+    day = now.date()
+    if now.hour < 15:
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+def write_parquet_atomic(
+    df: pd.DataFrame | pa.Table, output_file: Path, row_group_size: int | None = None
+) -> None:
+    """
+    原子地写入Parquet文件：先写入同目录下的临时文件并落盘，再重命名覆盖目标文件。
+
+    进程在写入过程中崩溃（断网、OOM、Ctrl-C）时，目标文件要么是旧版本，要么是完整的新版本，
+    不会出现被截断的文件。临时文件名包含进程号，多个进程同时写入时不会互相覆盖。
+    `df` 也可以是 Arrow 表（保留表的 schema 元数据）。
+    """
+    tmp_file = output_file.with_name(f"{output_file.name}.{os.getpid()}.tmp")
+    try:
+        if isinstance(df, pa.Table):
+            pq.write_table(df, tmp_file, row_group_size=row_group_size)
+        else:
+            df.to_parquet(tmp_file, index=False, row_group_size=row_group_size)
+        with open(tmp_file, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_file, output_file)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+
 
 def save_daily_to_parquet(df: pd.DataFrame, data_path: Path):
     """
     将单只股票的日线历史数据DataFrame保存到Parquet文件中。
 
-    文件将被保存在 `data_path/daily/{symbol}.parquet`。
+    文件将被保存在 `data_path/daily/{symbol}.parquet`，通过临时文件+重命名原子地写入。
 
     :param df: 包含日线数据的DataFrame，必须有 'symbol' 列。
     :param data_path: 数据存储的根目录 (Path对象)。
@@ -28,7 +89,77 @@ def save_daily_to_parquet(df: pd.DataFrame, data_path: Path):
     output_file = daily_data_path / f"{symbol}.parquet"
 
     # print(f"INFO: Saving daily data for {symbol} to {output_file}")
-    df.to_parquet(output_file, index=False)
+    write_parquet_atomic(df, output_file, row_group_size=DAILY_FILE_ROW_GROUP_SIZE)
+
+
+def append_daily_to_parquet(
+    df: pd.DataFrame, data_path: Path, price_tolerance: float = 1e-4
+) -> pd.DataFrame | None:
+    """
+    将增量获取的日线数据合并到已有的Parquet文件中（按交易日去重，新数据优先）。
+
+    增量数据应与已有数据至少重叠一个交易日。前复权价格会在除权除息后整体变化，
+    因此如果重叠交易日的收盘价不一致，说明复权基准已经改变，此时不写入任何数据并返回None，
+    由调用方改为全量重新获取。
+
+    :param df: 新获取并清洗后的日线数据，必须有 'symbol' 和 'trade_date' 列。
+    :param data_path: 数据存储的根目录 (Path对象)。
+    :param price_tolerance: 判断重叠收盘价是否一致的相对误差。
+    :return: 合并后的完整DataFrame；复权基准变化时返回None。
+    """
+    if df.empty:
+        return df
+
+    symbol = df["symbol"].iloc[0]
+    output_file = data_path / "daily" / f"{symbol}.parquet"
+    if not output_file.exists():
+        save_daily_to_parquet(df, data_path)
+        return df
+
+    existing = pd.read_parquet(output_file)
+    if adjustment_basis_changed(existing, df, price_tolerance):
+        return None
+
+    new = df.copy()
+    existing["trade_date"] = pd.to_datetime(existing["trade_date"])
+    new["trade_date"] = pd.to_datetime(new["trade_date"])
+
+    merged = pd.concat([existing, new], ignore_index=True)
+    merged.drop_duplicates(subset="trade_date", keep="last", inplace=True)
+    merged.sort_values(by="trade_date", inplace=True)
+    merged["trade_date"] = merged["trade_date"].astype("date32[pyarrow]")
+    merged.reset_index(drop=True, inplace=True)
+
+    write_parquet_atomic(merged, output_file, row_group_size=DAILY_FILE_ROW_GROUP_SIZE)
+    return merged
+
+
+def adjustment_basis_changed(
+    existing: pd.DataFrame, new: pd.DataFrame, price_tolerance: float = 1e-4
+) -> bool:
+    """
+    比较已有数据与新数据在重叠交易日上的收盘价，判断前复权基准是否发生了变化。
+
+    :param existing: 本地已有的日线数据（至少包含重叠的交易日）。
+    :param new: 新获取并清洗后的日线数据。
+    :param price_tolerance: 判断收盘价是否一致的相对误差。
+    :return: 重叠交易日的收盘价不一致时返回True。
+    """
+    if existing.empty or new.empty:
+        return False
+
+    left = existing[["trade_date", "close"]].copy()
+    right = new[["trade_date", "close"]].copy()
+    left["trade_date"] = pd.to_datetime(left["trade_date"])
+    right["trade_date"] = pd.to_datetime(right["trade_date"])
+
+    overlap = left.merge(right, on="trade_date", suffixes=("_old", "_new"))
+    if overlap.empty:
+        return False
+    old_close = overlap["close_old"].astype(float)
+    new_close = overlap["close_new"].astype(float)
+    drift = ((new_close - old_close).abs() / old_close.abs().clip(lower=1e-9)).max()
+    return bool(drift > price_tolerance)
 
 
 def read_daily_data(symbol: str) -> pd.DataFrame | None:
@@ -57,35 +188,385 @@ def read_daily_from_parquet(
     data_path: Path,
     start_date: date | None = None,
     end_date: date | None = None,
+    columns: list[str] | None = None,
 ) -> pd.DataFrame:
     """
     从Parquet文件中读取单只股票的日线历史数据，并可选择按日期范围筛选。
 
+    优先读取 `daily/{symbol}.parquet`；该文件不存在时回退到合并存储布局。
+    日期范围作为过滤条件下推给Parquet读取器，利用行组统计信息跳过不相关的数据；
+    只读取 `columns` 中指定的列。
+
     :param symbol: 股票代码。
     :param data_path: 数据存储的根目录。
     :param start_date: 筛选的开始日期。
     :param end_date: 筛选的结束日期。
-    :return: 包含日线数据的DataFrame。
+    :param columns: 需要读取的列，None 表示全部列。'trade_date' 总会被包含。
+    :return: 包含日线数据的DataFrame，'trade_date' 为 datetime64 类型。
     """
     daily_data_path = data_path / "daily"
     file_path = daily_data_path / f"{symbol}.parquet"
 
     if not file_path.exists():
+        if has_daily_dataset(data_path):
+            return read_daily_dataset(
+                data_path, [symbol], start_date, end_date, columns=columns
+            )
         print(f"WARN: Data file not found for {symbol} at {file_path}")
         return pd.DataFrame()
 
-    df = pd.read_parquet(file_path)
+    if columns is not None and "trade_date" not in columns:
+        columns = ["trade_date"] + list(columns)
 
-    # 如果从文件读取的DataFrame为空，直接返回，避免KeyError
-    if df.empty:
-        return df
+    df = pd.read_parquet(
+        file_path,
+        columns=columns,
+        filters=_date_filters(start_date, end_date) or None,
+    )
+    return _normalize_trade_date(df)
+
+
+def daily_data_version(symbol: str, data_path: Path) -> int | None:
+    """
+    返回某只股票逐股票日线文件的版本号，用于判断缓存是否失效。
 
-    # 确保 'trade_date' 列是 datetime 类型以便比较
-    df["trade_date"] = pd.to_datetime(df["trade_date"]).dt.date
+    版本号取数据文件的修改时间（纳秒）。所有写入都通过"写临时文件再重命名"完成，
+    文件被替换时修改时间必然变化。合并存储布局下所有股票共用年份文件，文件的修改时间
+    不能区分股票，应改用 `tracking_ops.get_daily_data_versions`。
 
+    :param symbol: 股票代码。
+    :param data_path: 数据存储的根目录。
+    :return: 版本号；文件不存在时返回None。
+    """
+    file_path = data_path / "daily" / f"{symbol}.parquet"
+    if not file_path.exists():
+        return None
+    return file_path.stat().st_mtime_ns
+
+
+def _date_filters(
+    start_date: date | None, end_date: date | None
+) -> list[tuple[str, str, date]]:
+    """
+    构造可下推给Parquet读取器的交易日期过滤条件。
+    """
+    filters = []
     if start_date:
-        df = df[df["trade_date"] >= start_date]
+        filters.append(("trade_date", ">=", pd.Timestamp(start_date).date()))
     if end_date:
-        df = df[df["trade_date"] <= end_date]
+        filters.append(("trade_date", "<=", pd.Timestamp(end_date).date()))
+    return filters
+
 
+def _normalize_trade_date(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    将 'trade_date' 列统一为 datetime64[ns] 类型（整列转换，不构造Python对象）。
+    """
+    if "trade_date" in df.columns:
+        df["trade_date"] = pd.to_datetime(df["trade_date"]).astype("datetime64[ns]")
+    df.reset_index(drop=True, inplace=True)
     return df
+
+
+def has_daily_dataset(data_path: Path) -> bool:
+    """
+    判断数据目录下是否存在合并存储布局的日线数据集。
+    """
+    return any((data_path / DAILY_DATASET_DIR).glob("year=*/*.parquet"))
+
+
+def write_daily_dataset(
+    df: pd.DataFrame,
+    data_path: Path,
+    row_group_size: int = DATASET_ROW_GROUP_SIZE,
+):
+    """
+    将一批（可包含多只股票的）日线数据合并写入按年分区的数据集。
+
+    只有涉及到的年份文件会被重写；同一 (symbol, trade_date) 的已有记录会被新数据覆盖。
+    每个文件先写入临时文件再重命名，读者不会看到写了一半的文件。
+    需要多次写入时应先用 `stage_daily_dataset` 暂存、最后调用一次 `compact_daily_dataset`，
+    避免每次都重写整个年份文件。
+
+    :param df: 包含日线数据的DataFrame，必须有 'symbol' 和 'trade_date' 列。
+    :param data_path: 数据存储的根目录 (Path对象)。
+    :param row_group_size: Parquet 行组大小（行数）。
+    """
+    if df.empty:
+        return
+    stage_daily_dataset(df, data_path)
+    compact_daily_dataset(data_path, row_group_size)
+
+
+def stage_daily_dataset(df: pd.DataFrame, data_path: Path) -> list[int]:
+    """
+    把一批日线数据按年份写入暂存目录（`daily_dataset_staging/year=YYYY/part-*.parquet`），
+    不读取、也不重写数据集中已有的年份文件。
+
+    暂存的数据对读者不可见，直到 `compact_daily_dataset` 把它们合并进数据集。
+    分片文件名按写入时间递增，合并时后写入的分片优先。
+
+    :param df: 包含日线数据的DataFrame，必须有 'symbol' 和 'trade_date' 列。
+    :param data_path: 数据存储的根目录 (Path对象)。
+    :return: 写入了分片的年份。
+    """
+    if df.empty:
+        return []
+
+    staging_path = data_path / DAILY_DATASET_STAGING_DIR
+    frame = df.copy()
+    frame["trade_date"] = pd.to_datetime(frame["trade_date"])
+    # 同一进程内连续写入的分片也要保证文件名有序
+    stamp = f"{time.time_ns():020d}-{os.getpid()}"
+
+    years = []
+    for year, part in frame.groupby(frame["trade_date"].dt.year):
+        year_path = staging_path / f"year={year}"
+        year_path.mkdir(parents=True, exist_ok=True)
+        part = part.sort_values(by=["symbol", "trade_date"])
+        part["trade_date"] = part["trade_date"].astype("date32[pyarrow]")
+        write_parquet_atomic(part, year_path / f"part-{stamp}.parquet")
+        years.append(int(year))
+    return years
+
+
+def compact_daily_dataset(
+    data_path: Path,
+    row_group_size: int = DATASET_ROW_GROUP_SIZE,
+) -> int:
+    """
+    把暂存目录中的分片合并进按年分区的数据集，每个涉及到的年份文件只重写一次。
+
+    同一 (symbol, trade_date) 的记录以最后写入的分片为准；合并后的年份文件原子地替换旧文件，
+    之后才删除已合并的分片。进程在合并中途崩溃时分片仍然保留，下一次合并会重新处理它们。
+
+    :param data_path: 数据存储的根目录 (Path对象)。
+    :param row_group_size: Parquet 行组大小（行数）。
+    :return: 重写的年份文件数。
+    """
+    staging_path = data_path / DAILY_DATASET_STAGING_DIR
+    dataset_path = data_path / DAILY_DATASET_DIR
+
+    rewritten = 0
+    for staged_year in sorted(staging_path.glob("year=*")):
+        parts = sorted(staged_year.glob("part-*.parquet"))
+        if not parts:
+            continue
+        year_path = dataset_path / staged_year.name
+        year_path.mkdir(parents=True, exist_ok=True)
+        output_file = year_path / "data.parquet"
+
+        frames = [pd.read_parquet(f) for f in parts]
+        if output_file.exists():
+            frames.insert(0, pd.read_parquet(output_file))
+        for frame in frames:
+            frame["trade_date"] = pd.to_datetime(frame["trade_date"])
+        merged = pd.concat(frames, ignore_index=True)
+        merged.drop_duplicates(
+            subset=["symbol", "trade_date"], keep="last", inplace=True
+        )
+        merged.sort_values(by=["symbol", "trade_date"], inplace=True)
+        merged["trade_date"] = merged["trade_date"].astype("date32[pyarrow]")
+
+        write_parquet_atomic(merged, output_file, row_group_size=row_group_size)
+        for part in parts:
+            part.unlink(missing_ok=True)
+        rewritten += 1
+    return rewritten
+
+
+def read_daily_dataset(
+    data_path: Path,
+    symbols: list[str] | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    从按年分区的数据集中读取日线数据。
+
+    年份分区、symbol 和 trade_date 的过滤条件都会下推给 Parquet 读取器，
+    只会打开涉及到的年份文件，并跳过统计信息不匹配的行组。
+
+    :param data_path: 数据存储的根目录。
+    :param symbols: 股票代码列表，None 表示全部股票。
+    :param start_date: 筛选的开始日期。
+    :param end_date: 筛选的结束日期。
+    :param columns: 需要读取的列，None 表示全部列。'symbol' 和 'trade_date' 总会被包含。
+    :return: 按 (symbol, trade_date) 排序的日线数据DataFrame，'trade_date' 为 datetime64 类型。
+    """
+    dataset_path = data_path / DAILY_DATASET_DIR
+    if not has_daily_dataset(data_path):
+        return pd.DataFrame()
+
+    dataset = ds.dataset(dataset_path, format="parquet", partitioning="hive")
+    conditions = []
+    if symbols is not None:
+        conditions.append(ds.field("symbol").isin(list(symbols)))
+    for name, op, value in _date_filters(start_date, end_date):
+        field = ds.field(name)
+        if op == ">=":
+            conditions.extend([ds.field("year") >= value.year, field >= value])
+        else:
+            conditions.extend([ds.field("year") <= value.year, field <= value])
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != "year"]
+    else:
+        keys = [c for c in ("trade_date", "symbol") if c not in columns]
+        columns = keys + list(columns)
+    df = dataset.to_table(columns=columns, filter=expression).to_pandas()
+    df.sort_values(by=["symbol", "trade_date"], inplace=True)
+    return _normalize_trade_date(df)
+
+
+def migrate_daily_to_dataset(
+    data_path: Path,
+    row_group_size: int = DATASET_ROW_GROUP_SIZE,
+) -> int:
+    """
+    把 `daily/{symbol}.parquet` 逐股票文件迁移为按年分区的合并数据集。
+
+    使用 DuckDB 的 `read_parquet` 一次性扫描所有逐股票文件，按年份写出排序好的分区文件，
+    已存在的同年份文件会被整体替换，尚未合并的暂存分片（中断的同步留下的）会被丢弃，
+    以免之后的合并用旧数据覆盖迁移结果。原有的逐股票文件保持不变。
+
+    :param data_path: 数据存储的根目录。
+    :param row_group_size: Parquet 行组大小（行数）。
+    :return: 写入的总行数。
+    """
+    source = (data_path / "daily" / "*.parquet").as_posix()
+    dataset_path = data_path / DAILY_DATASET_DIR
+    if not any((data_path / "daily").glob("*.parquet")):
+        print(f"WARN: No per-symbol daily files found under {data_path / 'daily'}.")
+        return 0
+
+    staging_path = data_path / DAILY_DATASET_STAGING_DIR
+    if any(staging_path.glob("year=*/part-*.parquet")):
+        print(f"WARN: Discarding unmerged dataset parts under {staging_path}.")
+        shutil.rmtree(staging_path, ignore_errors=True)
+
+    conn = duckdb.connect()
+    try:
+        conn.execute(
+            f"CREATE TEMP VIEW daily_source AS "
+            f"SELECT * EXCLUDE (trade_date), CAST(trade_date AS DATE) AS trade_date "
+            f"FROM read_parquet('{source}', union_by_name = true)"
+        )
+        columns = [row[0] for row in conn.execute("DESCRIBE daily_source").fetchall()]
+        # 保持与逐股票文件一致的列顺序
+        select_list = ", ".join(
+            ["trade_date"] + [c for c in columns if c != "trade_date"]
+        )
+        years = [
+            row[0]
+            for row in conn.execute(
+                "SELECT DISTINCT year(trade_date) FROM daily_source ORDER BY 1"
+            ).fetchall()
+        ]
+
+        total = 0
+        for year in years:
+            year_path = dataset_path / f"year={year}"
+            year_path.mkdir(parents=True, exist_ok=True)
+            tmp_file = year_path / "data.parquet.tmp"
+            conn.execute(
+                f"COPY (SELECT {select_list} FROM daily_source "
+                f"WHERE year(trade_date) = {year} ORDER BY symbol, trade_date) "
+                f"TO '{tmp_file.as_posix()}' "
+                f"(FORMAT parquet, ROW_GROUP_SIZE {row_group_size})"
+            )
+            os.replace(tmp_file, year_path / "data.parquet")
+            rows = conn.execute(
+                f"SELECT count(*) FROM daily_source WHERE year(trade_date) = {year}"
+            ).fetchone()[0]
+            total += rows
+            print(f"INFO: Wrote {rows} rows for {year}.")
+    finally:
+        conn.close()
+    return total
+
+
+def scan_daily_store(
+    data_path: Path,
+    symbols: list[str] | None = None,
+    fields: list[str] | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    layout: str = "per_symbol",
+) -> pd.DataFrame:
+    """
+    用一次 DuckDB `read_parquet` 扫描读取多只股票的日线数据（长表格式）。
+
+    逐股票布局下一次性扫描所有相关文件，合并布局下扫描按年分区的数据集；
+    日期范围和股票代码过滤、以及列投影都由 DuckDB 下推到 Parquet 读取中。
+
+    :param data_path: 数据存储的根目录。
+    :param symbols: 股票代码列表，None 表示存储中的全部股票。
+    :param fields: 需要读取的字段，None 表示全部字段。
+    :param start_date: 开始日期。
+    :param end_date: 结束日期。
+    :param layout: "per_symbol" 或 "dataset"。
+    :return: 包含 trade_date, symbol 和所需字段的DataFrame，按 (symbol, trade_date) 排序。
+    """
+    conditions = []
+    if layout == "dataset":
+        if not has_daily_dataset(data_path):
+            return pd.DataFrame()
+        source = (
+            f"read_parquet('{(data_path / DAILY_DATASET_DIR).as_posix()}/*/*.parquet', "
+            f"hive_partitioning = true)"
+        )
+        if start_date:
+            conditions.append(f"year >= {start_date.year}")
+        if end_date:
+            conditions.append(f"year <= {end_date.year}")
+    else:
+        daily_data_path = data_path / "daily"
+        if symbols is None:
+            files = sorted(daily_data_path.glob("*.parquet"))
+        else:
+            files = [daily_data_path / f"{symbol}.parquet" for symbol in symbols]
+            files = [f for f in files if f.exists()]
+        if not files:
+            if has_daily_dataset(data_path):
+                return scan_daily_store(
+                    data_path, symbols, fields, start_date, end_date, "dataset"
+                )
+            return pd.DataFrame()
+        file_list = ", ".join(f"'{f.as_posix()}'" for f in files)
+        source = f"read_parquet([{file_list}], union_by_name = true)"
+
+    if symbols is not None:
+        if not symbols:
+            return pd.DataFrame()
+        quoted = ", ".join("'" + s.replace("'", "''") + "'" for s in symbols)
+        conditions.append(f"symbol IN ({quoted})")
+    if start_date:
+        conditions.append(f"trade_date >= DATE '{pd.Timestamp(start_date).date()}'")
+    if end_date:
+        conditions.append(f"trade_date <= DATE '{pd.Timestamp(end_date).date()}'")
+
+    select_list = "CAST(trade_date AS DATE) AS trade_date, symbol"
+    if fields is None:
+        select_list = "*"
+    else:
+        select_list += "".join(
+            f', CAST("{name}" AS DOUBLE) AS "{name}"' for name in fields
+        )
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    conn = duckdb.connect()
+    try:
+        df = conn.execute(
+            f"SELECT {select_list} FROM {source} {where} ORDER BY symbol, trade_date"
+        ).df()
+    finally:
+        conn.close()
+    if "year" in df.columns and layout == "dataset":
+        df.drop(columns="year", inplace=True)
+    return _normalize_trade_date(df)
@@ -1,60 +1,266 @@
+from datetime import datetime
+
+import duckdb
 import pandas as pd
-from sqlmodel import Session, select
-from tqdm import tqdm
+import pyarrow as pa
+from sqlmodel import Session
+from autostock.database.connection import get_connection_manager, to_arrow_table
 from autostock.database.engine import engine
 from autostock.database.models import MarketOverview
-from autostock.datamanager.session import get_session
+from autostock.datamanager.session import get_raw_connection
 
 
-def upsert_market_overview(session: Session, df: pd.DataFrame):
+def upsert_market_overview(session: Session, df: pd.DataFrame) -> dict[str, int]:
     """
-    将DataFrame中的市场总览数据插入或更新到数据库中。
+    将DataFrame中的市场总览数据批量插入或更新到数据库中。
+
+    整个DataFrame通过 DuckDB 的 `register` 直接交给数据库，
+    用一条 `INSERT ... ON CONFLICT (symbol) DO UPDATE` 语句完成写入，
+    避免逐行 `session.get` 和设置ORM属性带来的大量往返。
+
+    修改不会在这里提交，由调用方的会话（`get_session()`）统一提交，
+    这样可以和 `bump_market_overview_version` 处于同一个事务中。
+
+    :param session: 数据库会话。
+    :param df: 清洗后的市场总览数据，列名与 MarketOverview 模型对应，多余的列会被忽略。
+    :return: {"inserted": 新增行数, "updated": 更新行数}
     """
-    for _, row in df.iterrows():
-        # 尝试查找具有相同主键（symbol）的现有记录
-        existing_record = session.get(MarketOverview, row["symbol"])
-        if existing_record:
-            # 如果记录已存在，则更新它的字段
-            for key, value in row.items():
-                setattr(existing_record, key, value)
+    if df.empty:
+        return {"inserted": 0, "updated": 0}
+
+    table = MarketOverview.__table__
+    dialect = session.get_bind().dialect
+    columns = [c for c in table.columns.keys() if c in df.columns]
+    incoming = df[columns].drop_duplicates(subset="symbol", keep="last")
+
+    # 按模型的列类型显式转换，避免全为空的列被推断为错误的类型
+    select_exprs = []
+    for name in table.columns.keys():
+        col_type = table.columns[name].type.compile(dialect=dialect)
+        if name == "updated_at":
+            value = (
+                f"COALESCE(CAST({name} AS {col_type}), CURRENT_TIMESTAMP)"
+                if name in columns
+                else "CURRENT_TIMESTAMP"
+            )
+        elif name in columns:
+            value = f"CAST({name} AS {col_type})"
         else:
-            # 如果记录不存在，则创建一个新实例并添加到会话中
-            new_record = MarketOverview(**row.to_dict())
-            session.add(new_record)
+            continue
+        select_exprs.append(f"{value} AS {name}")
+    insert_columns = [expr.rsplit(" AS ", 1)[1] for expr in select_exprs]
+    update_columns = [c for c in insert_columns if c != "symbol"]
 
-    # 提交事务，将所有更改（插入和更新）保存到数据库
-    session.commit()
+    conn = get_raw_connection(session)
+    conn.register("incoming_market_overview", incoming)
+    try:
+        updated = conn.execute(
+            "SELECT count(*) FROM incoming_market_overview "
+            "JOIN market_overview USING (symbol)"
+        ).fetchone()[0]
+        conn.execute(
+            f"INSERT INTO market_overview ({', '.join(insert_columns)}) "
+            f"SELECT {', '.join(select_exprs)} FROM incoming_market_overview "
+            f"ON CONFLICT (symbol) DO UPDATE SET "
+            + ", ".join(f"{c} = excluded.{c}" for c in update_columns)
+        )
+    finally:
+        conn.unregister("incoming_market_overview")
 
+    # 不在这里提交：由调用方的 `get_session()` 与版本号一起提交
+    result = {"inserted": len(incoming) - updated, "updated": updated}
+    print(
+        f"Upserted market overview: {result['inserted']} inserted, "
+        f"{result['updated']} updated."
+    )
+    return result
 
-def get_all_market_overview() -> pd.DataFrame:
-    """从数据库获取所有市场总览数据"""
-    with get_session() as session:
-        statement = select(MarketOverview)
-        results = session.exec(statement).all()
-        if not results:
-            return pd.DataFrame()
-        # 将结果转换为字典列表，然后创建DataFrame
-        return pd.DataFrame([r.model_dump() for r in results])
 
+# data_version 表中市场总览数据集的名称
+MARKET_OVERVIEW_DATASET = "market_overview"
 
-def query_market_overview(session: Session, **kwargs) -> pd.DataFrame:
+
+def bump_market_overview_version(session: Session) -> int | None:
     """
-    根据指定条件从数据库查询市场总览数据。
-    支持基于模型字段的动态过滤。
+    将市场总览的版本号加1（第一次同步时为1），与会话中的其他修改在同一个事务中提交。
+
+    数据库中没有 data_version 表（尚未执行迁移）时不做任何修改并返回 None，
+    与 `get_market_overview_version` 一致：读取方无法判断版本，每次都会重新加载。
 
     :param session: 数据库会话。
-    :param kwargs: 过滤条件，键为字段名，值为期望值。
-    :return: 包含查询结果的DataFrame。
+    :return: 新的版本号；没有 data_version 表时为 None。
+    """
+    conn = get_raw_connection(session)
+    # 不能依赖捕获 CatalogException：出错的语句会让整个事务失效，已写入的总览数据也无法提交
+    has_table = conn.execute(
+        "SELECT count(*) FROM duckdb_tables() WHERE table_name = 'data_version'"
+    ).fetchone()[0]
+    if not has_table:
+        print(
+            "WARNING: Table data_version does not exist, market overview version "
+            "not bumped. Run `alembic upgrade head` to enable snapshot versioning."
+        )
+        return None
+    return conn.execute(
+        "INSERT INTO data_version (name, version, updated_at) VALUES (?, 1, ?) "
+        "ON CONFLICT (name) DO UPDATE SET "
+        "version = data_version.version + 1, updated_at = excluded.updated_at "
+        "RETURNING version",
+        [MARKET_OVERVIEW_DATASET, datetime.now()],
+    ).fetchone()[0]
+
+
+def get_market_overview_version() -> int | None:
+    """
+    获取市场总览的当前版本号，只是一次单行查询，适合在使用缓存前频繁检查。
+
+    通过只读连接查询，同步任务占用数据库时读取快照，不需要会话。
+
+    :return: 版本号；从未同步过时为0；数据库中没有 data_version 表（尚未执行迁移）时为 None。
+    """
+    try:
+        table = get_connection_manager().query_arrow(
+            "SELECT version FROM data_version WHERE name = ?",
+            [MARKET_OVERVIEW_DATASET],
+        )
+    except duckdb.CatalogException:
+        return None
+    return table.column("version")[0].as_py() if table.num_rows else 0
+
+
+# 过滤条件的写法：`字段=值` 表示相等（值为 None 时表示 IS NULL），
+# `字段__运算=值` 表示其他比较，例如 last_price__ge=10、industry__in=["银行", "保险"]
+FILTER_OPERATORS = {
+    "eq": "=",
+    "ne": "!=",
+    "gt": ">",
+    "ge": ">=",
+    "lt": "<",
+    "le": "<=",
+    "like": "LIKE",
+    "not_like": "NOT LIKE",
+    "ilike": "ILIKE",
+    "in": "IN",
+    "not_in": "NOT IN",
+    "between": "BETWEEN",
+    "isnull": "IS NULL",
+}
+
+
+def build_market_overview_query(
+    columns: list[str] | None = None,
+    order_by: str | list[str] | None = None,
+    limit: int | None = None,
+    **filters,
+) -> tuple[str, list]:
     """
-    statement = select(MarketOverview)
-    for key, value in kwargs.items():
-        if hasattr(MarketOverview, key):
-            statement = statement.where(getattr(MarketOverview, key) == value)
+    根据过滤条件构建 market_overview 的查询语句，所有值都作为参数传入，不拼接到SQL中。
+
+    :param columns: 返回的列，None 表示全部列。
+    :param order_by: 排序列，前缀 "-" 表示降序，例如 ["industry", "-last_price"]。
+    :param limit: 最多返回的行数。
+    :param filters: 过滤条件，见 `FILTER_OPERATORS`。
+                    in/not_in 的值为序列，between 的值为 (下限, 上限)，isnull 的值为布尔值。
+    :return: (SQL, 参数列表)。
+    :raises ValueError: 列名或运算不存在。
+    """
+    valid_columns = list(MarketOverview.__table__.columns.keys())
+    if columns is None:
+        columns = valid_columns
+    unknown = [c for c in columns if c not in valid_columns]
+    if unknown:
+        raise ValueError(f"Unknown market_overview columns: {unknown}")
+
+    table = MarketOverview.__table__
+    conditions, params = [], []
+    for key, value in filters.items():
+        name, _, op = key.partition("__")
+        op = op or "eq"
+        # 忽略写错的条件会静默地返回更多的股票，因此直接报错
+        if name not in valid_columns:
+            raise ValueError(f"Unknown market_overview column '{name}' in filters.")
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"Unknown filter operator '{op}' in '{key}'.")
+        # 参数转换为列的类型再比较（与 MarketSnapshot.mask 一致）：
+        # 否则 FLOAT 列会先转换为 DOUBLE，例如 5.2 BETWEEN 5.2 AND 20 不成立
+        col_type = table.columns[name].type.compile(dialect=engine.dialect)
+        if op == "isnull":
+            conditions.append(f"{name} IS {'' if value else 'NOT '}NULL")
+        elif op in ("eq", "ne") and value is None:
+            conditions.append(f"{name} IS {'' if op == 'eq' else 'NOT '}NULL")
+        elif op in ("in", "not_in"):
+            # 空列表时 NOT IN 对 NULL 也成立，显式排除，NULL 不满足任何比较
+            conditions.append(
+                f"({name} IS NOT NULL AND {name} {FILTER_OPERATORS[op]} "
+                f"(SELECT unnest(CAST(? AS {col_type}[]))))"
+            )
+            params.append(list(value))
+        elif op == "between":
+            low, high = value
+            conditions.append(
+                f"{name} BETWEEN CAST(? AS {col_type}) AND CAST(? AS {col_type})"
+            )
+            params.extend([low, high])
+        elif op in ("like", "not_like", "ilike"):
+            conditions.append(f"{name} {FILTER_OPERATORS[op]} ?")
+            params.append(value)
         else:
-            print(f"WARN: Invalid filter key '{key}' ignored.")
+            conditions.append(f"{name} {FILTER_OPERATORS[op]} CAST(? AS {col_type})")
+            params.append(value)
 
-    results = session.exec(statement).all()
-    if not results:
-        return pd.DataFrame()
+    sql = f"SELECT {', '.join(columns)} FROM market_overview"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if order_by:
+        terms = []
+        for term in [order_by] if isinstance(order_by, str) else order_by:
+            name = term.lstrip("-")
+            if name not in valid_columns:
+                raise ValueError(
+                    f"Unknown market_overview column '{name}' in order_by."
+                )
+            terms.append(f"{name} {'DESC' if term.startswith('-') else 'ASC'}")
+        sql += " ORDER BY " + ", ".join(terms)
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+    return sql, params
 
-    return pd.DataFrame([r.model_dump() for r in results])
+
+def query_market_overview(
+    session: Session | None = None,
+    columns: list[str] | None = None,
+    order_by: str | list[str] | None = None,
+    limit: int | None = None,
+    as_arrow: bool = False,
+    **filters,
+) -> pd.DataFrame | pa.Table:
+    """
+    根据指定条件从数据库查询市场总览数据。
+
+    过滤、排序和行数限制都在 DuckDB 中完成，结果直接以 Arrow 或 DataFrame 返回，不构造ORM对象。
+
+    :param session: 数据库会话。给出时在会话的事务中查询（能看到未提交的修改），
+                    否则通过只读连接查询（数据库被同步任务占用时读取快照）。
+    :param columns: 返回的列，None 表示全部列。
+    :param order_by: 排序列，前缀 "-" 表示降序。
+    :param limit: 最多返回的行数。
+    :param as_arrow: 返回 pyarrow.Table 而不是 DataFrame。
+    :param filters: 过滤条件，例如 industry="银行"、last_price__between=(5, 20)、
+                    name__like="%银行%"、symbol__in=[...]、industry__isnull=True，见 `FILTER_OPERATORS`。
+    :return: 查询结果（没有匹配的行时为带列名的空表）。
+    """
+    sql, params = build_market_overview_query(columns, order_by, limit, **filters)
+    if session is None:
+        manager = get_connection_manager()
+        if as_arrow:
+            return manager.query_arrow(sql, params)
+        return manager.query_df(sql, params)
+    result = get_raw_connection(session).execute(sql, params)
+    return to_arrow_table(result) if as_arrow else result.df()
+
+
+def get_all_market_overview(as_arrow: bool = False) -> pd.DataFrame | pa.Table:
+    """
+    从数据库获取所有市场总览数据（按股票代码排序）。
+    """
+    return query_market_overview(order_by="symbol", as_arrow=as_arrow)
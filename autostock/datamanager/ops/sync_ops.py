@@ -0,0 +1,161 @@
+import json
+import uuid
+from datetime import datetime
+
+import pandas as pd
+from sqlmodel import Session, select
+
+from autostock.database.models import SyncRun
+from autostock.datamanager.session import get_raw_connection
+
+# 可以被续传的运行状态。进程崩溃（OOM、kill）时运行会停留在 running 状态
+RESUMABLE_STATUSES = ("running", "interrupted", "failed")
+
+
+def create_sync_run(
+    session: Session, kind: str, symbols: list[str], params: dict | None = None
+) -> str:
+    """
+    创建一条同步运行记录，并为每只股票写入一个 pending 检查点。
+
+    :param session: 数据库会话。
+    :param kind: 同步任务类型，例如 'daily_history'。
+    :param symbols: 本次运行需要处理的股票代码。
+    :param params: 启动参数，以JSON保存。
+    :return: 新运行的 run_id。
+    """
+    run_id = uuid.uuid4().hex
+    now = datetime.now()
+    session.add(
+        SyncRun(
+            run_id=run_id,
+            kind=kind,
+            params=json.dumps(params or {}, default=str, ensure_ascii=False),
+            total=len(symbols),
+            started_at=now,
+            updated_at=now,
+        )
+    )
+    session.flush()
+
+    if symbols:
+        incoming = pd.DataFrame({"symbol": pd.unique(pd.Series(symbols, dtype=str))})
+        conn = get_raw_connection(session)
+        conn.register("incoming_checkpoints", incoming)
+        try:
+            conn.execute(
+                "INSERT INTO sync_checkpoint (run_id, symbol, status, updated_at) "
+                "SELECT $run_id, symbol, 'pending', $now FROM incoming_checkpoints",
+                {"run_id": run_id, "now": now},
+            )
+        finally:
+            conn.unregister("incoming_checkpoints")
+
+    session.commit()
+    return run_id
+
+
+def get_resumable_run(session: Session, kind: str) -> SyncRun | None:
+    """
+    获取指定类型最近一次未完成的同步运行。
+
+    :return: 运行记录；最近一次运行已经完成或从未运行过时返回None。
+    """
+    statement = (
+        select(SyncRun)
+        .where(SyncRun.kind == kind)
+        .order_by(SyncRun.started_at.desc())
+        .limit(1)
+    )
+    latest = session.exec(statement).one_or_none()
+    if latest is None or latest.status not in RESUMABLE_STATUSES:
+        return None
+    return latest
+
+
+def get_run_params(run: SyncRun) -> dict:
+    """
+    解析运行记录中保存的启动参数（`create_sync_run` 的 `params`）。
+
+    :return: 参数字典；没有保存参数或无法解析时返回空字典。
+    """
+    if not run.params:
+        return {}
+    try:
+        params = json.loads(run.params)
+    except json.JSONDecodeError:
+        print(f"WARN: Ignoring unreadable params of sync run {run.run_id}.")
+        return {}
+    return params if isinstance(params, dict) else {}
+
+
+def get_unfinished_symbols(session: Session, run_id: str) -> list[str]:
+    """
+    获取一次运行中尚未成功处理（pending 或 failed）的股票代码。
+    """
+    conn = get_raw_connection(session)
+    rows = conn.execute(
+        "SELECT symbol FROM sync_checkpoint "
+        "WHERE run_id = $run_id AND status IN ('pending', 'failed') "
+        "ORDER BY symbol",
+        {"run_id": run_id},
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def bulk_update_checkpoints(
+    session: Session, run_id: str, checkpoints: pd.DataFrame
+) -> int:
+    """
+    用一条 UPDATE 语句批量更新检查点状态。调用方负责提交事务，
+    以便与跟踪信息的更新放在同一个事务中。
+
+    :param session: 数据库会话。
+    :param run_id: 运行标识。
+    :param checkpoints: 包含 symbol, status, error, updated_at 列的DataFrame。
+    :return: 更新的记录数。
+    """
+    if checkpoints.empty:
+        return 0
+
+    incoming = checkpoints.drop_duplicates(subset="symbol", keep="last")
+    conn = get_raw_connection(session)
+    conn.register("incoming_checkpoints", incoming)
+    try:
+        conn.execute(
+            "UPDATE sync_checkpoint SET "
+            "status = i.status, "
+            "error = CAST(i.error AS VARCHAR), "
+            "updated_at = CAST(i.updated_at AS TIMESTAMP) "
+            "FROM incoming_checkpoints AS i "
+            "WHERE sync_checkpoint.run_id = $run_id "
+            "AND sync_checkpoint.symbol = i.symbol",
+            {"run_id": run_id},
+        )
+    finally:
+        conn.unregister("incoming_checkpoints")
+    return len(incoming)
+
+
+def finish_sync_run(session: Session, run_id: str, status: str) -> None:
+    """
+    结束一次同步运行：根据检查点汇总统计信息并设置最终状态。
+
+    :param status: completed / failed / interrupted。
+    """
+    conn = get_raw_connection(session)
+    now = datetime.now()
+    conn.execute(
+        "UPDATE sync_run SET "
+        "status = $status, "
+        "succeeded = c.succeeded, skipped = c.skipped, failed = c.failed, "
+        "finished_at = $now, updated_at = $now "
+        "FROM (SELECT "
+        "count(*) FILTER (WHERE status = 'done') AS succeeded, "
+        "count(*) FILTER (WHERE status = 'skipped') AS skipped, "
+        "count(*) FILTER (WHERE status = 'failed') AS failed "
+        "FROM sync_checkpoint WHERE run_id = $run_id) AS c "
+        "WHERE sync_run.run_id = $run_id",
+        {"run_id": run_id, "status": status, "now": now},
+    )
+    session.commit()
@@ -1,65 +1,163 @@
-from datetime import datetime
+from datetime import date, datetime
 
 import pandas as pd
 from sqlmodel import Session, select
 
+from autostock.database.connection import get_connection_manager
 from autostock.database.models import DataTracking
+from autostock.datamanager.session import get_raw_connection
 
 
 def upsert_tracking_stocks(session: Session, market_overview: pd.DataFrame):
     """
     根据市场总览数据，在 data_tracking 表中插入新股票的跟踪记录
-    """
-    existing_symbols_stmt = select(DataTracking.symbol)
-    existing_symbols = set(session.exec(existing_symbols_stmt).all())
 
-    incoming_symbols = set(market_overview["symbol"])
+    新股票通过一条 `INSERT ... SELECT ... ON CONFLICT DO NOTHING` 语句批量写入，
+    已存在的跟踪记录保持不变。修改由调用方的会话统一提交。
 
-    new_symbols = list(incoming_symbols - existing_symbols)
+    :return: 新增的跟踪记录数。
+    """
+    if market_overview.empty:
+        print("No new stocks to track.")
+        return 0
 
-    if not new_symbols:
+    incoming = market_overview[["symbol", "name"]].drop_duplicates(
+        subset="symbol", keep="last"
+    )
+    now = datetime.utcnow()
+
+    conn = get_raw_connection(session)
+    conn.register("incoming_tracking", incoming)
+    try:
+        new_count = conn.execute(
+            "SELECT count(*) FROM incoming_tracking "
+            "WHERE symbol NOT IN (SELECT symbol FROM data_tracking)"
+        ).fetchone()[0]
+        if new_count:
+            conn.execute(
+                "INSERT INTO data_tracking "
+                "(symbol, name, has_daily, auto_sync, created_at, updated_at) "
+                "SELECT symbol, name, false, true, $now, $now FROM incoming_tracking "
+                "ON CONFLICT (symbol) DO NOTHING",
+                {"now": now},
+            )
+    finally:
+        conn.unregister("incoming_tracking")
+
+    if not new_count:
         print("No new stocks to track.")
         return 0
 
-    print(f"Found {len(new_symbols)} new stocks to track.")
+    print(f"Successfully added {new_count} new stocks to data_tracking.")
+    return new_count
 
-    # 从总览数据中筛选出新股票的信息
-    new_stocks_df = market_overview[market_overview["symbol"].isin(new_symbols)][
-        ["symbol", "name"]
-    ]
 
-    for _, row in new_stocks_df.iterrows():
-        tracking_record = DataTracking(symbol=row["symbol"], name=row["name"])
-        session.add(tracking_record)
+def get_all_tracked_symbols() -> list[str]:
+    """
+    从 data_tracking 表中获取所有被跟踪的股票代码列表。
 
-    session.commit()
-    print(f"Successfully added {len(new_symbols)} new stocks to data_tracking.")
-    return len(new_symbols)
+    通过 `ConnectionManager.query_arrow` 只读查询，同步进程持有写锁时读取快照，
+    不会占用写连接。
+    """
+    table = get_connection_manager().query_arrow(
+        "SELECT symbol FROM data_tracking ORDER BY symbol"
+    )
+    return table.column("symbol").to_pylist()
 
 
-def update_daily_tracking_info(session: Session, symbol: str, daily_data: pd.DataFrame):
+def get_daily_end_dates(session: Session, symbols: list[str]) -> dict[str, date]:
     """
-    更新指定股票的日线数据跟踪信息
+    批量获取指定股票的日线数据结束日期。
+
+    :param session: 数据库会话。
+    :param symbols: 股票代码列表。
+    :return: 股票代码 -> daily_end_date 的字典，没有日线数据的股票不会出现在结果中。
     """
-    if daily_data.empty:
-        return
+    if not symbols:
+        return {}
+    statement = select(DataTracking.symbol, DataTracking.daily_end_date).where(
+        DataTracking.symbol.in_(symbols),
+        DataTracking.has_daily == True,  # noqa: E712
+        DataTracking.daily_end_date.is_not(None),
+    )
+    return {symbol: end_date for symbol, end_date in session.exec(statement).all()}
 
-    statement = select(DataTracking).where(DataTracking.symbol == symbol)
-    tracking_record = session.exec(statement).one_or_none()
 
-    if tracking_record:
-        tracking_record.has_daily = True
-        tracking_record.daily_start_date = daily_data["date"].min().date()
-        tracking_record.daily_end_date = daily_data["date"].max().date()
-        tracking_record.daily_last_sync = datetime.now()
-        session.add(tracking_record)
-        session.commit()
+def get_daily_data_versions(symbols: list[str] | None = None) -> dict[str, str]:
+    """
+    获取股票日线数据的版本标识，由 daily_end_date 和 daily_last_sync 组成，
+    每次同步写入日线数据（包括前复权基准变化后的整体重写）都会改变版本。
 
+    通过只读连接查询，同步任务占用数据库时读取快照，不需要会话。
 
-def get_all_tracked_symbols(session: Session) -> list[str]:
+    :param symbols: 股票代码列表，None 表示所有有日线数据的股票。
+    :return: 股票代码 -> 版本标识（如 "20240701-20240701153000123456"），没有日线数据的股票不会出现在结果中。
     """
-    从 data_tracking 表中获取所有被跟踪的股票代码列表。
+    sql = (
+        "SELECT symbol, "
+        "strftime(daily_end_date, '%Y%m%d') || '-' || "
+        "strftime(daily_last_sync, '%Y%m%d%H%M%S%f') AS version "
+        "FROM data_tracking "
+        "WHERE has_daily AND daily_end_date IS NOT NULL AND daily_last_sync IS NOT NULL"
+    )
+    params = None
+    if symbols is not None:
+        if not symbols:
+            return {}
+        # 只查询需要的股票，单只股票的查询不必扫描整个跟踪表
+        sql += " AND list_contains($symbols, symbol)"
+        params = {"symbols": list(symbols)}
+    table = get_connection_manager().query_arrow(sql, params)
+    versions = dict(
+        zip(table.column("symbol").to_pylist(), table.column("version").to_pylist())
+    )
+    if symbols is None:
+        return versions
+    return {s: versions[s] for s in symbols if s in versions}
+
+
+def get_latest_daily_date() -> date | None:
     """
-    statement = select(DataTracking.symbol)
-    symbols = session.exec(statement).all()
-    return symbols
+    获取所有股票中最新的日线数据日期，即本地数据覆盖到的最近一个交易日。
+
+    :return: 最新的 daily_end_date，没有任何日线数据时返回 None。
+    """
+    table = get_connection_manager().query_arrow(
+        "SELECT max(daily_end_date) AS latest FROM data_tracking WHERE has_daily"
+    )
+    return table.column("latest")[0].as_py()
+
+
+def bulk_update_daily_tracking_info(session: Session, updates: pd.DataFrame) -> int:
+    """
+    用一条 UPDATE 语句批量更新多只股票的日线数据跟踪信息。
+
+    增量同步时传入的可能只是新增的部分数据，因此开始日期取新旧两者中较早的一个。
+
+    :param session: 数据库会话。
+    :param updates: 包含 symbol, daily_start_date, daily_end_date, daily_last_sync 列的DataFrame。
+    :return: 本次提交的记录数。
+    """
+    if updates.empty:
+        return 0
+
+    incoming = updates.drop_duplicates(subset="symbol", keep="last")
+    conn = get_raw_connection(session)
+    conn.register("incoming_daily_tracking", incoming)
+    try:
+        conn.execute(
+            "UPDATE data_tracking SET "
+            "has_daily = true, "
+            "daily_start_date = LEAST(CAST(i.daily_start_date AS DATE), "
+            "COALESCE(data_tracking.daily_start_date, CAST(i.daily_start_date AS DATE))), "
+            "daily_end_date = CAST(i.daily_end_date AS DATE), "
+            "daily_last_sync = CAST(i.daily_last_sync AS TIMESTAMP), "
+            "updated_at = CAST(i.daily_last_sync AS TIMESTAMP) "
+            "FROM incoming_daily_tracking AS i "
+            "WHERE data_tracking.symbol = i.symbol"
+        )
+    finally:
+        conn.unregister("incoming_daily_tracking")
+
+    session.commit()
+    return len(incoming)
@@ -0,0 +1,154 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class DailyPanel:
+    """
+    对齐到同一交易日历的多股票日线面板。
+
+    每个字段是一个 (日期数, 股票数) 的 float64 矩阵，行与 `dates` 对应、列与 `symbols` 对应，
+    停牌或尚未上市的日期为 NaN。
+    """
+
+    dates: np.ndarray
+    symbols: list[str]
+    fields: dict[str, np.ndarray] = field(default_factory=dict)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.fields[name]
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return len(self.dates), len(self.symbols)
+
+    def symbol_index(self, symbol: str) -> int:
+        """
+        返回股票在矩阵中的列号。
+        """
+        return self.symbols.index(symbol)
+
+    def select(self, symbols: list[str]) -> "DailyPanel":
+        """
+        取出部分股票组成新面板（复制数据），列顺序与 `symbols` 一致。
+
+        :raises ValueError: 有股票不在面板中。
+        """
+        index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        missing = [symbol for symbol in symbols if symbol not in index]
+        if missing:
+            raise ValueError(f"Symbols not in panel: {missing[:5]}")
+        columns = np.array([index[symbol] for symbol in symbols], dtype=np.intp)
+        return DailyPanel(
+            dates=self.dates,
+            symbols=list(symbols),
+            fields={name: values[:, columns] for name, values in self.fields.items()},
+        )
+
+    def to_frame(self, name: str) -> pd.DataFrame:
+        """
+        将一个字段转换为以交易日为索引、股票代码为列的DataFrame。
+        """
+        return pd.DataFrame(
+            self.fields[name],
+            index=pd.DatetimeIndex(self.dates, name="trade_date"),
+            columns=pd.Index(self.symbols, name="symbol"),
+        )
+
+    @classmethod
+    def from_long(
+        cls,
+        long_df: pd.DataFrame,
+        fields: list[str],
+        symbols: list[str] | None = None,
+        calendar: np.ndarray | None = None,
+    ) -> "DailyPanel":
+        """
+        由 (trade_date, symbol, 字段...) 的长表构建面板，整个过程没有按股票的循环。
+
+        :param long_df: 长表格式的日线数据。
+        :param fields: 要转换为矩阵的字段。
+        :param symbols: 列顺序。None 时使用数据中出现的所有股票（排序后）。
+        :param calendar: 交易日历。None 时使用数据中出现过的所有交易日。
+                         给出的日历会被排序并去重，面板的行按日期升序排列。
+        """
+        trade_dates = pd.to_datetime(long_df["trade_date"]).to_numpy("datetime64[ns]")
+        if symbols is None:
+            symbols = sorted(pd.unique(long_df["symbol"]).tolist())
+        col = pd.Categorical(long_df["symbol"], categories=symbols).codes
+        values = {
+            name: long_df[name].to_numpy(dtype=float, na_value=np.nan)
+            for name in fields
+        }
+        return cls._from_coordinates(trade_dates, col, values, symbols, calendar)
+
+    @classmethod
+    def from_arrow(
+        cls,
+        table,
+        fields: list[str],
+        symbols: list[str] | None = None,
+        calendar: np.ndarray | None = None,
+    ) -> "DailyPanel":
+        """
+        与 `from_long` 相同，但输入是 (trade_date, symbol, 字段...) 的 pyarrow.Table，
+        股票代码的匹配在 Arrow 中完成，不构造 Python 字符串对象。
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        trade_dates = (
+            table.column("trade_date")
+            .to_numpy(zero_copy_only=False)
+            .astype("datetime64[ns]")
+        )
+        if symbols is None:
+            symbols = sorted(pc.unique(table.column("symbol")).to_pylist())
+        col = (
+            pc.index_in(
+                table.column("symbol"), value_set=pa.array(symbols, pa.string())
+            )
+            .fill_null(-1)
+            .to_numpy(zero_copy_only=False)
+        )
+        values = {
+            name: table.column(name)
+            .cast(pa.float64())
+            .fill_null(np.nan)
+            .to_numpy(zero_copy_only=False)
+            for name in fields
+        }
+        return cls._from_coordinates(trade_dates, col, values, symbols, calendar)
+
+    @classmethod
+    def _from_coordinates(
+        cls,
+        trade_dates: np.ndarray,
+        col: np.ndarray,
+        values: dict[str, np.ndarray],
+        symbols: list[str],
+        calendar: np.ndarray | None,
+    ) -> "DailyPanel":
+        """
+        把每条记录的 (交易日, 列号, 字段值) 放入矩阵，整个过程没有按股票的循环。
+        """
+        if calendar is None:
+            dates = np.unique(trade_dates)
+        else:
+            # 按行号定位依赖有序且不重复的日历；调用方给出的日历先排序去重
+            dates = np.unique(np.asarray(calendar, dtype="datetime64[ns]"))
+
+        row = np.searchsorted(dates, trade_dates)
+        # 丢弃不在日历或不在股票列表中的记录
+        valid = (row < len(dates)) & (col >= 0)
+        valid[valid] = dates[row[valid]] == trade_dates[valid]
+        row, col = row[valid], col[valid]
+
+        matrices = {}
+        for name, field_values in values.items():
+            matrix = np.full((len(dates), len(symbols)), np.nan)
+            matrix[row, col] = field_values[valid]
+            matrices[name] = matrix
+        return cls(dates=dates, symbols=list(symbols), fields=matrices)
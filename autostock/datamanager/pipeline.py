@@ -0,0 +1,314 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Iterator
+
+# 阶段之间传递的结束标记
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """
+    流水线中的一个处理阶段。
+
+    :param name: 阶段名，例如 "fetch"。
+    :param func: 处理函数，接收上一阶段的输出并返回本阶段的输出。抛出的异常会被记录到
+                 该条目上，该条目跳过后续阶段直接交给调用方。
+    :param workers: 本阶段的并发线程数。
+    """
+
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+
+
+@dataclass
+class StageStats:
+    """
+    单个阶段的运行统计，用于判断哪个阶段是瓶颈。
+    """
+
+    name: str
+    workers: int
+    # 该阶段输入队列的容量
+    queue_size: int
+    processed: int = 0
+    failed: int = 0
+    # 所有工作线程在处理函数中累计花费的时间
+    busy_seconds: float = 0.0
+    # 放入输入队列时采样到的队列深度
+    queue_max: int = 0
+    queue_total: int = 0
+    queue_samples: int = 0
+
+    @property
+    def queue_mean(self) -> float:
+        return self.queue_total / self.queue_samples if self.queue_samples else 0.0
+
+    def as_dict(self, elapsed: float) -> dict[str, float]:
+        """
+        :param elapsed: 流水线运行的墙钟时间，用于计算吞吐量和利用率。
+        """
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "failed": self.failed,
+            "busy_seconds": self.busy_seconds,
+            "throughput": self.processed / elapsed if elapsed > 0 else 0.0,
+            # 工作线程忙碌时间占比，接近1说明该阶段已经饱和
+            "utilization": (
+                self.busy_seconds / (elapsed * self.workers) if elapsed > 0 else 0.0
+            ),
+            "queue_size": self.queue_size,
+            "queue_max": self.queue_max,
+            "queue_mean": self.queue_mean,
+        }
+
+
+@dataclass
+class PipelineResult:
+    """
+    一个条目经过流水线后的结果。
+
+    :param item: 输入的原始条目。
+    :param value: 最后一个阶段的输出；失败时为None。
+    :param error: 失败时的异常。
+    :param stage: 失败发生的阶段名。
+    """
+
+    item: Any
+    value: Any = None
+    error: BaseException | None = None
+    stage: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class _Envelope:
+    item: Any
+    value: Any
+    error: BaseException | None = None
+    stage: str | None = None
+
+
+@dataclass
+class _StageRuntime:
+    stage: Stage
+    stats: StageStats
+    inbox: queue.Queue
+    remaining: int
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class Pipeline:
+    """
+    由有界队列串联的多阶段生产者/消费者流水线。
+
+    每个阶段有自己的线程和输入队列，网络I/O、CPU计算和磁盘写入可以同时进行，
+    慢的阶段会通过填满上游队列让上游阻塞（背压），而不是在内存中无限堆积。
+    同一时刻在途的条目数不超过 所有队列容量 + 所有工作线程数，
+    与输入条目的总数无关，因此峰值内存有上限。
+
+    结果由调用 `run()` 的线程逐个取出，适合在其中做不能并发的工作（例如写数据库）。
+    """
+
+    def __init__(self, stages: list[Stage], queue_size: int = 32):
+        """
+        :param stages: 按顺序执行的阶段。
+        :param queue_size: 每个阶段输入队列（以及结果队列）的容量。
+        """
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage.")
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self._runtimes = [
+            _StageRuntime(
+                stage=stage,
+                stats=StageStats(stage.name, max(1, stage.workers), self.queue_size),
+                inbox=queue.Queue(self.queue_size),
+                remaining=max(1, stage.workers),
+            )
+            for stage in stages
+        ]
+        self._outbox: queue.Queue = queue.Queue(self.queue_size)
+        self._stop = threading.Event()
+        # 工作线程中无法按条目记录的异常（输入迭代失败、阶段中的 KeyboardInterrupt 等）
+        self._error: BaseException | None = None
+        self._started: float | None = None
+        self._finished: float | None = None
+
+    def run(self, items: Iterable) -> Iterator[PipelineResult]:
+        """
+        将条目送入流水线，并按完成顺序逐个返回结果。
+
+        迭代被提前中断（break、异常或 Ctrl-C）时，所有工作线程会尽快停止，
+        尚未处理的条目被丢弃。读取输入时出错，或阶段函数抛出 `Exception` 以外的异常
+        （例如 KeyboardInterrupt）时同样停止整个流水线，并在这里重新抛出该异常。
+
+        :param items: 输入条目，按需从中读取，不会一次性全部放入内存。
+        """
+        self._started = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._feed, args=(items,), daemon=True),
+        ]
+        for index, runtime in enumerate(self._runtimes):
+            for _ in range(runtime.stats.workers):
+                threads.append(
+                    threading.Thread(target=self._work, args=(index,), daemon=True)
+                )
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                envelope = self._get(self._outbox)
+                if envelope is _DONE or envelope is None:
+                    break
+                yield PipelineResult(
+                    envelope.item, envelope.value, envelope.error, envelope.stage
+                )
+            if self._error is not None:
+                raise self._error
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            self._finished = time.perf_counter()
+
+    def queue_depths(self) -> dict[str, int]:
+        """
+        返回各阶段输入队列及结果队列当前的深度，可在运行中调用以观察瓶颈。
+        """
+        depths = {
+            runtime.stage.name: runtime.inbox.qsize() for runtime in self._runtimes
+        }
+        depths["output"] = self._outbox.qsize()
+        return depths
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """
+        返回各阶段的统计：处理数、失败数、吞吐量（条/秒）、利用率和队列深度。
+        """
+        elapsed = self.elapsed_seconds
+        return {
+            runtime.stage.name: runtime.stats.as_dict(elapsed)
+            for runtime in self._runtimes
+        }
+
+    def bottleneck(self) -> str | None:
+        """
+        返回利用率最高的阶段名，即增加其并发数最可能提升整体吞吐的阶段。
+        """
+        stats = self.stats()
+        if not stats:
+            return None
+        return max(stats, key=lambda name: stats[name]["utilization"])
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if self._started is None:
+            return 0.0
+        end = self._finished if self._finished is not None else time.perf_counter()
+        return end - self._started
+
+    def _feed(self, items: Iterable) -> None:
+        first = self._runtimes[0]
+        try:
+            for item in items:
+                if not self._put(first, _Envelope(item, item)):
+                    return
+        except BaseException as e:
+            self._abort(e)
+            return
+        finally:
+            for _ in range(first.stats.workers):
+                if not self._put_raw(first.inbox, _DONE):
+                    return
+
+    def _work(self, index: int) -> None:
+        runtime = self._runtimes[index]
+        stats = runtime.stats
+        is_last = index == len(self._runtimes) - 1
+        while True:
+            envelope = self._get(runtime.inbox)
+            if envelope is None:
+                return
+            if envelope is _DONE:
+                break
+            if envelope.error is None:
+                started = time.perf_counter()
+                try:
+                    envelope.value = runtime.stage.func(envelope.value)
+                except Exception as e:
+                    envelope.value = None
+                    envelope.error = e
+                    envelope.stage = runtime.stage.name
+                except BaseException as e:
+                    # 不能只记录在条目上，否则下游永远等不到结束标记
+                    self._abort(e)
+                    return
+                busy = time.perf_counter() - started
+                with runtime.lock:
+                    stats.busy_seconds += busy
+                    stats.processed += 1
+                    if envelope.error is not None:
+                        stats.failed += 1
+            # 失败的条目不再经过后续阶段，直接交给调用方
+            if envelope.error is not None or is_last:
+                ok = self._put_raw(self._outbox, envelope)
+            else:
+                ok = self._put(self._runtimes[index + 1], envelope)
+            if not ok:
+                return
+
+        # 本阶段最后一个退出的线程负责通知下游
+        with runtime.lock:
+            runtime.remaining -= 1
+            last_worker = runtime.remaining == 0
+        if not last_worker:
+            return
+        if is_last:
+            self._put_raw(self._outbox, _DONE)
+        else:
+            downstream = self._runtimes[index + 1]
+            for _ in range(downstream.stats.workers):
+                if not self._put_raw(downstream.inbox, _DONE):
+                    return
+
+    def _abort(self, error: BaseException) -> None:
+        # 记录第一个异常并让所有线程退出，由 `run()` 重新抛出
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+
+    def _put(self, runtime: _StageRuntime, envelope: _Envelope) -> bool:
+        depth = runtime.inbox.qsize()
+        with runtime.lock:
+            stats = runtime.stats
+            stats.queue_max = max(stats.queue_max, depth)
+            stats.queue_total += depth
+            stats.queue_samples += 1
+        return self._put_raw(runtime.inbox, envelope)
+
+    def _put_raw(self, q: queue.Queue, item: Any) -> bool:
+        # 带超时的阻塞写入，以便在流水线被取消时及时退出
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue) -> Any:
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
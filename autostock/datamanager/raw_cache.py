@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+
+from autostock.datamanager.ops.daily_ops import latest_expected_trade_date
+
+# 各接口的缓存有效期（秒），None 表示永不过期
+DEFAULT_TTLS: dict[str, float | None] = {
+    # 实时行情，只在很短的时间内有效
+    "stock_zh_a_spot_em": 60,
+    # 未结束且尚未包含最新交易日的历史区间，随时可能出现新数据
+    "stock_zh_a_hist:open": 4 * 3600,
+    # 已经结束（或已包含最新交易日）的历史区间，前复权数据会在之后的除权除息日整体变化
+    "stock_zh_a_hist:closed_qfq": 7 * 24 * 3600,
+    # 已经结束的不复权/后复权区间不会再变化
+    "stock_zh_a_hist:closed": None,
+}
+
+
+class RawResponseCache:
+    """
+    数据源原始响应的磁盘缓存，保存在 `datas/cache/` 下。
+
+    每个响应按 (接口, 参数) 生成键，以 zstd 压缩的 Parquet 文件保存原始DataFrame
+    （保留数据源的中文列名），进程退出后仍然有效。各接口有独立的有效期，
+    缓存总大小超过上限时按最近访问时间淘汰。
+
+    历史行情按响应中最后一个交易日判断是否可能出现新数据：已包含最新交易日的响应
+    在下一个交易日收盘前一直按已结束的区间处理，收盘后重新清洗/导入不会访问网络。
+    `allow_stale=True` 时忽略有效期，只要有缓存就直接使用，
+    用于修改清洗逻辑后重新清洗/导入全市场数据而不发起任何网络请求
+    （见 `Settings.cache_allow_stale` 和 DataManager 的 `allow_stale_cache`）。
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int = 2 * 1024 * 1024 * 1024,
+        ttls: dict[str, float | None] | None = None,
+        allow_stale: bool = False,
+    ):
+        """
+        :param cache_dir: 缓存目录。
+        :param max_bytes: 缓存目录允许占用的最大字节数。
+        :param ttls: 覆盖默认的有效期设置，键见 `DEFAULT_TTLS`。
+        :param allow_stale: 是否使用已过期的缓存。
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.allow_stale = allow_stale
+        self._lock = threading.Lock()
+        self._total_bytes: int | None = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, endpoint: str, params: dict) -> pd.DataFrame | None:
+        """
+        读取缓存的原始响应。
+
+        :param endpoint: 接口名，例如 "stock_zh_a_hist"。
+        :param params: 请求参数。
+        :return: 未过期的缓存DataFrame，没有则返回None。
+        """
+        path = self._path(endpoint, params)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self._count(hit=False)
+            return None
+
+        try:
+            df = pd.read_parquet(path)
+        except Exception as e:
+            print(f"WARN: Dropping unreadable cache entry {path}: {e}")
+            self._discard(path)
+            self._count(hit=False)
+            return None
+
+        # 历史行情的有效期取决于响应中实际包含的最后一个交易日，需要先读出数据
+        ttl = self.ttls.get(self._ttl_key(endpoint, params, df))
+        if (
+            not self.allow_stale
+            and ttl is not None
+            and time.time() - stat.st_mtime > ttl
+        ):
+            self._count(hit=False)
+            return None
+
+        # 记录访问时间用于淘汰，修改时间保持为写入时间用于判断有效期
+        os.utime(path, (time.time(), stat.st_mtime))
+        self._count(hit=True)
+        return df
+
+    def put(self, endpoint: str, params: dict, df: pd.DataFrame) -> None:
+        """
+        写入一个原始响应，必要时淘汰最久未访问的缓存。无法序列化的响应会被跳过。
+        """
+        if df is None or df.empty:
+            return
+        with self._lock:
+            # 在写入之前统计已有的大小，否则新文件会被重复计入
+            self._ensure_total()
+        path = self._path(endpoint, params)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        try:
+            df.to_parquet(tmp_path, index=False, compression="zstd")
+            old_size = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"WARN: Failed to cache {endpoint} response: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        with self._lock:
+            self._total_bytes += path.stat().st_size - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def clear(self) -> None:
+        """
+        删除所有缓存文件。
+        """
+        with self._lock:
+            for path in self.cache_dir.glob("*/*.parquet"):
+                path.unlink(missing_ok=True)
+            self._total_bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            self._ensure_total()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _ttl_key(self, endpoint: str, params: dict, df: pd.DataFrame) -> str:
+        """
+        响应对应的有效期类别，见 `DEFAULT_TTLS`。
+
+        请求的区间在最新预期交易日之前结束，或者响应已经包含了最新预期交易日的数据时，
+        在下一个交易日收盘前都不会出现新数据，按已结束的区间处理；
+        否则（响应缺少最新交易日，例如收盘前获取的数据）按未结束的区间处理。
+        同步总是以 end_date="20990101" 请求，因此不能只看请求的 end_date。
+        """
+        if endpoint != "stock_zh_a_hist":
+            return endpoint
+        latest = latest_expected_trade_date()
+        end_date = datetime.strptime(str(params.get("end_date", "20990101")), "%Y%m%d")
+        if end_date.date() >= latest and _last_trade_date(df) < latest:
+            return f"{endpoint}:open"
+        if params.get("adjust", "") == "qfq":
+            return f"{endpoint}:closed_qfq"
+        return f"{endpoint}:closed"
+
+    def _path(self, endpoint: str, params: dict) -> Path:
+        key = json.dumps(params, sort_keys=True, default=str)
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        symbol = params.get("symbol")
+        name = f"{symbol}_{digest[:16]}" if symbol else digest[:16]
+        return self.cache_dir / endpoint / f"{name}.parquet"
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _ensure_total(self) -> None:
+        if self._total_bytes is None:
+            self._total_bytes = sum(
+                p.stat().st_size for p in self.cache_dir.glob("*/*.parquet")
+            )
+
+    def _evict(self) -> None:
+        # 按最近访问时间从旧到新删除，直到总大小降到上限的90%
+        entries = []
+        for path in self.cache_dir.glob("*/*.parquet"):
+            stat = path.stat()
+            entries.append((stat.st_atime, stat.st_size, path))
+        entries.sort()
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if self._total_bytes <= target:
+                break
+            path.unlink(missing_ok=True)
+            self._total_bytes -= size
+
+    def _discard(self, path: Path) -> None:
+        with self._lock:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                return
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+
+def _last_trade_date(df: pd.DataFrame) -> date:
+    """
+    历史行情响应（ak.stock_zh_a_hist() 格式）中的最后一个交易日，无法确定时返回 date.min。
+    """
+    if "日期" not in df.columns or df.empty:
+        return date.min
+    last = pd.to_datetime(df["日期"], errors="coerce").max()
+    return date.min if pd.isna(last) else last.date()
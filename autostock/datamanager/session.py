@@ -1,5 +1,5 @@
 from contextlib import contextmanager
-from typing import Generator
+from typing import Any, Generator
 
 from sqlmodel import Session
 
@@ -29,3 +29,17 @@ def get_session() -> Generator[Session, None, None]:
         raise
     finally:
         db_session.close()
+
+
+def get_raw_connection(session: Session) -> Any:
+    """
+    获取会话当前事务所使用的底层 DuckDB 连接。
+
+    用于需要直接与 DuckDB 交换 DataFrame/Arrow 数据的批量操作
+    （例如 `register` 一个DataFrame后用一条SQL完成插入或更新），
+    这些操作与会话中的其他语句处于同一个事务中。
+
+    :param session: 数据库会话。
+    :return: DuckDB 连接对象（duckdb_engine 的包装器，接口与 DuckDBPyConnection 一致）。
+    """
+    return session.connection().connection.driver_connection
@@ -0,0 +1,89 @@
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+
+class StageTimer:
+    """
+    线程安全的分阶段耗时累加器。
+
+    多个工作线程中同一阶段的耗时会被累加，因此并发执行时各阶段之和可能大于总耗时。
+    """
+
+    def __init__(self):
+        self._seconds: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._seconds[stage] = self._seconds.get(stage, 0.0) + seconds
+
+    def as_dict(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._seconds)
+
+
+@dataclass
+class SyncSummary:
+    """
+    一次日线同步任务的结果汇总。
+    """
+
+    succeeded: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+    # 失败的股票代码 -> 最后一次的错误信息
+    failed: dict[str, str] = field(default_factory=dict)
+    elapsed_seconds: float = 0.0
+    # 本次同步在 sync_run 表中的运行标识
+    run_id: str | None = None
+    # 跟踪表写入的事务数和耗时
+    tracking_commits: int = 0
+    tracking_seconds: float = 0.0
+    # 各阶段（fetch/clean/write/tracking）的累计耗时
+    stage_seconds: dict[str, float] = field(default_factory=dict)
+    # 流水线各阶段的吞吐量、利用率和队列深度，见 `Pipeline.stats()`
+    pipeline_stats: dict[str, dict[str, float]] = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return len(self.succeeded) + len(self.skipped) + len(self.failed)
+
+    def report(self) -> str:
+        """
+        生成便于打印的多行汇总文本。
+        """
+        lines = [
+            f"Processed {self.total} symbols in {self.elapsed_seconds:.1f}s: "
+            f"{len(self.succeeded)} succeeded, {len(self.skipped)} skipped, "
+            f"{len(self.failed)} failed.",
+            f"Tracking writes: {self.tracking_commits} commit(s) in "
+            f"{self.tracking_seconds:.2f}s.",
+        ]
+        if self.stage_seconds:
+            lines.append(
+                "Stage time: "
+                + ", ".join(f"{k}={v:.2f}s" for k, v in self.stage_seconds.items())
+            )
+        for name, stats in self.pipeline_stats.items():
+            lines.append(
+                f"  {name:<6} workers={stats['workers']} "
+                f"throughput={stats['throughput']:.1f}/s "
+                f"utilization={stats['utilization']:.0%} "
+                f"queue max={stats['queue_max']}/{stats['queue_size']} "
+                f"mean={stats['queue_mean']:.1f}"
+            )
+        for symbol, error in list(self.failed.items())[:20]:
+            lines.append(f"  FAILED {symbol}: {error}")
+        if len(self.failed) > 20:
+            lines.append(f"  ... and {len(self.failed) - 20} more failures.")
+        return "\n".join(lines)
@@ -0,0 +1,78 @@
+import random
+import threading
+import time
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class RateLimiter:
+    """
+    线程安全的令牌桶限速器。
+
+    所有工作线程共享同一个实例，从而把对数据源的总请求速率限制在
+    `rate` 次/秒以内，避免并发同步时因请求过快而被封禁IP。
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        :param rate: 每秒允许的请求数。小于等于0表示不限速。
+        :param burst: 令牌桶容量，即允许的瞬时突发请求数。
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        获取一个令牌，如果当前没有可用令牌则阻塞等待。
+        """
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._last) * self.rate
+                )
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def call_with_retry(
+    func: Callable[..., T],
+    *args,
+    max_retries: int = 3,
+    backoff: float = 1.0,
+    limiter: RateLimiter | None = None,
+    **kwargs,
+) -> T:
+    """
+    调用 `func`，失败时按指数退避（带随机抖动）重试。
+
+    每次尝试（包括重试）之前都会先向限速器申请令牌。
+
+    :param func: 要调用的函数。
+    :param max_retries: 首次调用失败后的最大重试次数。
+    :param backoff: 退避基数（秒），第n次重试前等待 backoff * 2**(n-1) 秒左右。
+    :param limiter: 可选的全局限速器。
+    :return: `func` 的返回值。最后一次尝试仍失败时抛出其异常。
+    """
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            if attempt >= max_retries:
+                raise
+            delay = backoff * (2**attempt)
+            time.sleep(delay + random.uniform(0, delay / 2))
+            attempt += 1
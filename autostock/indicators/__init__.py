@@ -0,0 +1,37 @@
+# 向量化的基础指标，输入输出都是 (日期数, 股票数) 的矩阵，见 kernels.py 中的说明。
+# 每日增量更新使用 streaming.py 中的 Streaming* 指标和 IndicatorStateStore。
+
+from .momentum import kdj, rsi
+from .streaming import (
+    IndicatorStateStore,
+    StreamingATR,
+    StreamingBollinger,
+    StreamingEMA,
+    StreamingIndicator,
+    StreamingKDJ,
+    StreamingMA,
+    StreamingMACD,
+    StreamingRSI,
+)
+from .trend import bollinger, ema, ma, macd
+from .volatility import atr, true_range
+
+__all__ = [
+    "ma",
+    "ema",
+    "macd",
+    "bollinger",
+    "rsi",
+    "kdj",
+    "atr",
+    "true_range",
+    "StreamingIndicator",
+    "StreamingMA",
+    "StreamingEMA",
+    "StreamingMACD",
+    "StreamingBollinger",
+    "StreamingRSI",
+    "StreamingATR",
+    "StreamingKDJ",
+    "IndicatorStateStore",
+]
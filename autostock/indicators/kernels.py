@@ -0,0 +1,469 @@
+"""
+指标计算的底层向量化算子。
+
+所有算子都作用于 (日期数, 股票数) 的 float64 矩阵（即 `DailyPanel` 的字段），
+一次调用处理全部股票，没有按股票的Python循环。
+
+NaN 表示该股票当天没有数据（停牌、尚未上市或已退市）。算子会跳过这些位置：
+对某一列的计算结果，与把该列的NaN去掉、按连续序列计算后再放回原位置完全相同，
+停牌日的输出为 NaN。这与对单只股票的实际交易日序列调用 TA-Lib 的语义一致。
+
+所有算子都按日期逐行推进，每一行是对所有股票的一次向量运算：递推类（EMA、Wilder平滑）
+保存每列的当前状态，窗口类（滚动求和、最大、最小）为每列保存最近 `period` 个有效值的环形缓冲区，
+缺失位置不改变状态。运算顺序与 TA-Lib 的C实现相同，结果一致到浮点舍入误差以内。
+"""
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+# TA-Lib 判断分母为0时使用的阈值（TA_IS_ZERO）
+ZERO_EPSILON = 1e-8
+
+
+def to_panel(*arrays) -> tuple[list[np.ndarray], bool]:
+    """
+    把输入转换为二维 float64 矩阵。一维输入视为单只股票的序列。
+
+    有多个输入时（例如最高价、最低价、收盘价），任一输入为NaN的位置在所有输入中都视为缺失，
+    保证各输入跳过的是同一批交易日。
+
+    :param arrays: 一个或多个形状相同的数组（ndarray、DataFrame 等）。
+    :return: (矩阵列表, 输入是否为一维)。
+    """
+    panels = [np.asarray(a, dtype=np.float64) for a in arrays]
+    is_1d = panels[0].ndim == 1
+    if is_1d:
+        panels = [p.reshape(-1, 1) for p in panels]
+    for p in panels:
+        if p.ndim != 2 or p.shape != panels[0].shape:
+            raise ValueError(
+                f"Expected arrays of shape (dates, symbols) with the same shape, "
+                f"got {[a.shape for a in panels]}."
+            )
+    if len(panels) > 1:
+        masks = [np.isnan(p) for p in panels]
+        missing = np.logical_or.reduce(masks)
+        total = np.count_nonzero(missing)
+        # 只复制缺失位置与合并后不同的输入（通常各字段的停牌日相同，不需要复制）
+        panels = [
+            np.where(missing, np.nan, p) if np.count_nonzero(mask) < total else p
+            for p, mask in zip(panels, masks)
+        ]
+    return panels, is_1d
+
+
+def from_panel(result: np.ndarray, is_1d: bool) -> np.ndarray:
+    """
+    与 `to_panel` 对应：一维输入的结果还原为一维。
+    """
+    return result[:, 0] if is_1d else result
+
+
+def previous_valid(values: np.ndarray) -> np.ndarray:
+    """
+    每个有效值所在列的上一个有效值（例如前收盘价）。没有上一个有效值或自身缺失时为 NaN。
+    """
+    return _run(values, PreviousValue(values.shape[1]))
+
+
+def ema_recursion(
+    values: np.ndarray,
+    alpha: float,
+    seed_period: int,
+    seed_at: int | None = None,
+) -> np.ndarray:
+    """
+    指数平滑 s = (x - s) * alpha + s，初始值为前 `seed_period` 个有效值的简单平均（TA-Lib 的EMA）。
+
+    :param values: 输入矩阵。
+    :param alpha: 平滑系数，TA-Lib 的EMA为 2 / (period + 1)。
+    :param seed_period: 计算初始值所用的有效值个数。
+    :param seed_at: 在第几个有效值处给出初始值（默认等于 `seed_period`），
+                    初始值取截至该处的最后 `seed_period` 个有效值的平均，之前的输出为 NaN。
+                    TA-Lib 的MACD用它让快线与慢线从同一天开始。
+    :return: 平滑结果，停牌日和初始值之前为 NaN。
+    """
+    valid = ~np.isnan(values)
+    seeds = _seeds(values, valid, seed_period, seed_at or seed_period)
+    state = np.full(values.shape[1], np.nan)
+    return _recurse(values, valid, state, _ema_step(alpha), seeds)
+
+
+def wilder_recursion(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Wilder平滑 s = (s * (period - 1) + x) / period，初始值为前 `period` 个有效值的简单平均
+    （TA-Lib 的RSI、ATR所用的平滑方式）。
+    """
+
+    def step(x, state, buf):
+        np.multiply(state, period - 1, out=buf)
+        buf += x
+        buf /= period
+
+    valid = ~np.isnan(values)
+    seeds = _seeds(values, valid, period, period)
+    state = np.full(values.shape[1], np.nan)
+    return _recurse(values, valid, state, step, seeds)
+
+
+def ewm_from(values: np.ndarray, alpha: float, initial: float) -> np.ndarray:
+    """
+    从固定初始值开始的指数平滑 s = (x - s) * alpha + s，每列在第一个有效值处开始递推。
+    对应通达信等软件的 SMA(X, N, M)，alpha = M / N（如 KDJ 中 K、D 的初始值为50）。
+    """
+    valid = ~np.isnan(values)
+    state = np.full(values.shape[1], float(initial))
+    return _recurse(values, valid, state, _ema_step(alpha))
+
+
+def rolling_sum(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    每个有效值及其之前共 `period` 个有效值之和，不足 `period` 个时为 NaN。
+
+    与 TA-Lib 的SMA相同，使用滚动累加：先加入新值、输出，再减去即将移出窗口的值。
+    """
+    return _run(values, RollingSum(period, values.shape[1]))
+
+
+def rolling_max(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    最近 `period` 个有效值的最大值（HHV），不足 `period` 个时为 NaN。
+    """
+    return _run(values, RollingExtreme(period, values.shape[1], "max"))
+
+
+def rolling_min(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    最近 `period` 个有效值的最小值（LLV），不足 `period` 个时为 NaN。
+    """
+    return _run(values, RollingExtreme(period, values.shape[1], "min"))
+
+
+class Stepper(ABC):
+    """
+    逐日推进的计算状态，每次 `step` 处理一个交易日所有股票的数据。
+
+    状态全部保存在 `state_fields` 列出的数组属性中，数组的最后一维是股票，
+    可以通过 `get_state`/`set_state` 保存和恢复（见 `autostock.indicators.streaming`）。
+    """
+
+    state_fields: tuple[str, ...] = ()
+
+    @abstractmethod
+    def step(self, x: np.ndarray, valid: np.ndarray, out: np.ndarray) -> None:
+        """
+        处理一个交易日。
+
+        :param x: 当天各股票的数值，无数据的位置必须为 NaN。
+        :param valid: 当天各股票是否有数据（即 `~np.isnan(x)`），无数据的股票状态不变。
+        :param out: 写入当天的结果，无数据或尚未满足计算条件的位置为 NaN。
+        """
+
+    def get_state(self) -> dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in self.state_fields}
+
+    def set_state(self, state: dict[str, np.ndarray]) -> None:
+        for name in self.state_fields:
+            setattr(self, name, np.ascontiguousarray(state[name]))
+
+
+class _RingStepper(Stepper):
+    """
+    每列一个长度为 `period` 的环形缓冲区，保存该列最近的 `period` 个有效值。
+    各列的写入位置 `slot` 不同（停牌日不写入），读写时换算为扁平下标，避免二维花式索引。
+    """
+
+    def __init__(self, period: int, symbols: int, fill: float):
+        _check_period(period)
+        self.period = period
+        self.ring = np.full((period, symbols), fill)
+        self.slot = np.zeros(symbols, dtype=np.int64)
+        self._columns = np.arange(symbols)
+
+    def _push(self, x: np.ndarray, valid: np.ndarray) -> None:
+        flat = self.ring.reshape(-1)
+        index = self._flat_index()
+        flat.put(index, np.where(valid, x, flat.take(index)))
+        self.slot += valid
+        np.copyto(self.slot, 0, where=self.slot == self.period)
+
+    def _flat_index(self) -> np.ndarray:
+        index = self.slot * len(self._columns)
+        index += self._columns
+        return index
+
+
+class RollingSum(_RingStepper):
+    state_fields = ("ring", "slot", "count", "total")
+
+    def __init__(self, period: int, symbols: int):
+        super().__init__(period, symbols, fill=0.0)
+        self.count = np.zeros(symbols, dtype=np.int64)
+        self.total = np.zeros(symbols)
+
+    def step(self, x: np.ndarray, valid: np.ndarray, out: np.ndarray) -> None:
+        np.add(self.total, x, out=self.total, where=valid)
+        self._push(x, valid)
+        self.count += valid
+        full = valid & (self.count >= self.period)
+        out.fill(np.nan)
+        np.copyto(out, self.total, where=full)
+        # 窗口已满时，下一次写入的位置上正是最早的值
+        oldest = self.ring.reshape(-1).take(self._flat_index())
+        np.subtract(self.total, oldest, out=self.total, where=full)
+
+
+class RollingExtreme(_RingStepper):
+    state_fields = ("ring", "slot")
+
+    def __init__(self, period: int, symbols: int, kind: str):
+        # 缓冲区初始为NaN：有效值不足 `period` 个时结果自然为NaN
+        super().__init__(period, symbols, fill=np.nan)
+        self._reduce = {"max": np.max, "min": np.min}[kind]
+
+    def step(self, x: np.ndarray, valid: np.ndarray, out: np.ndarray) -> None:
+        self._push(x, valid)
+        self._reduce(self.ring, axis=0, out=out)
+        np.copyto(out, np.nan, where=~valid)
+
+
+class EmaStepper(Stepper):
+    """
+    `ema_recursion` 的逐日版本：前 `seed_at` 个有效值期间累加初始值窗口，之后按EMA递推。
+    """
+
+    state_fields = ("value", "count", "seed_total")
+
+    def __init__(
+        self, alpha: float, seed_period: int, symbols: int, seed_at: int | None = None
+    ):
+        seed_at = seed_at or seed_period
+        if seed_period < 1 or seed_at < seed_period:
+            raise ValueError(f"Invalid seed: period={seed_period}, at={seed_at}.")
+        self.seed_period = seed_period
+        self.seed_at = seed_at
+        self._step = self._make_step(alpha)
+        self.value = np.full(symbols, np.nan)
+        self.count = np.zeros(symbols, dtype=np.int64)
+        self.seed_total = np.zeros(symbols)
+
+    @staticmethod
+    def _make_step(alpha: float):
+        return _ema_step(alpha)
+
+    def step(self, x: np.ndarray, valid: np.ndarray, out: np.ndarray) -> None:
+        self.count += valid
+        # 按日期顺序累加初始值窗口内的值（与 `_seeds` 的累加顺序相同）
+        in_seed = (
+            valid
+            & (self.count > self.seed_at - self.seed_period)
+            & (self.count <= self.seed_at)
+        )
+        np.add(self.seed_total, x, out=self.seed_total, where=in_seed)
+
+        self._step(x, self.value, out)
+        np.copyto(self.value, out, where=valid)
+        seeded = valid & (self.count == self.seed_at)
+        if seeded.any():
+            initial = self.seed_total / self.seed_period
+            np.copyto(out, initial, where=seeded)
+            np.copyto(self.value, initial, where=seeded)
+
+
+class WilderStepper(EmaStepper):
+    """
+    `wilder_recursion` 的逐日版本。
+    """
+
+    def __init__(self, period: int, symbols: int):
+        self._period = period
+        super().__init__(1.0 / period, period, symbols)
+
+    def _make_step(self, alpha: float):
+        period = self._period
+
+        def step(x, state, buf):
+            np.multiply(state, period - 1, out=buf)
+            buf += x
+            buf /= period
+
+        return step
+
+
+class EwmStepper(Stepper):
+    """
+    `ewm_from` 的逐日版本。
+    """
+
+    state_fields = ("value",)
+
+    def __init__(self, alpha: float, initial: float, symbols: int):
+        self._step = _ema_step(alpha)
+        self.value = np.full(symbols, float(initial))
+
+    def step(self, x: np.ndarray, valid: np.ndarray, out: np.ndarray) -> None:
+        self._step(x, self.value, out)
+        np.copyto(self.value, out, where=valid)
+
+
+class PreviousValue(Stepper):
+    """
+    输出每只股票上一个有效值（如前收盘价），并用当天的有效值更新。
+    """
+
+    state_fields = ("last",)
+
+    def __init__(self, symbols: int):
+        self.last = np.full(symbols, np.nan)
+
+    def step(self, x: np.ndarray, valid: np.ndarray, out: np.ndarray) -> None:
+        np.copyto(out, self.last)
+        out[~valid] = np.nan
+        np.copyto(self.last, x, where=valid)
+
+
+def _check_period(period: int) -> None:
+    if period < 1:
+        raise ValueError(f"Invalid period: {period}.")
+
+
+def active_rows(valid: np.ndarray) -> range:
+    """
+    从第一行有数据的日期开始逐行推进（跳过所有股票都还没有数据的日期）。
+    """
+    active = np.flatnonzero(valid.any(axis=1))
+    return range(active[0] if active.size else len(valid), len(valid))
+
+
+def _run(values: np.ndarray, stepper: Stepper) -> np.ndarray:
+    """
+    用 `stepper` 逐日处理整个矩阵。
+    """
+    valid = ~np.isnan(values)
+    out = np.full(values.shape, np.nan)
+    for t in active_rows(valid):
+        stepper.step(values[t], valid[t], out[t])
+    return out
+
+
+def _ema_step(alpha: float):
+    def step(x, state, buf):
+        np.subtract(x, state, out=buf)
+        buf *= alpha
+        buf += state
+
+    return step
+
+
+def _seeds(
+    values: np.ndarray, valid: np.ndarray, seed_period: int, seed_at: int
+) -> dict[int, tuple[np.ndarray, np.ndarray]]:
+    """
+    计算每列第 `seed_at` 个有效值处的初始值（最后 `seed_period` 个有效值的平均）。
+
+    :return: 行号 -> (列号数组, 初始值数组)。有效值不足 `seed_at` 个的列没有初始值。
+    """
+    if seed_period < 1 or seed_at < seed_period:
+        raise ValueError(f"Invalid seed: period={seed_period}, at={seed_at}.")
+    columns, rows, leading = leading_valid(values, valid, seed_at)
+    # 按日期顺序累加（与 TA-Lib 计算初始均值的顺序相同）
+    seeds = np.cumsum(leading[seed_at - seed_period :], axis=0)[-1] / seed_period
+    return group_by_row(rows, columns, seeds)
+
+
+def leading_valid(
+    values: np.ndarray, valid: np.ndarray, count: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    每列最前面的 `count` 个有效值（递推的初始值只依赖这些值）。
+
+    从每列第一个有效值起取一小块，块内有效值不够（有停牌）的列再取更大的块，
+    避免在整个矩阵上做累加。
+
+    :return: (列号数组, 每列第 `count` 个有效值所在的行号, 形状为 (count, 列数) 的有效值矩阵，按日期顺序排列)。
+             有效值不足 `count` 个的列不包含在内。
+    """
+    rows = len(values)
+    columns = np.flatnonzero(np.count_nonzero(valid, axis=0) >= count)
+    first = valid.argmax(axis=0)[columns]
+    width = count
+    found_columns, found_rows, found_values = [], [], []
+    while columns.size:
+        index = first + np.arange(width)[:, None]
+        inside = index < rows
+        index = np.minimum(index, rows - 1)
+        block_valid = valid[index, columns] & inside
+        position = np.cumsum(block_valid, axis=0)
+        done = position[-1] >= count
+
+        # 已经够数的列：按列取出前 `count` 个有效值（转置后布尔索引按列、再按日期的顺序取值）
+        taken = (block_valid & (position <= count))[:, done]
+        block = values[index[:, done], columns[done]]
+        found_values.append(block.T[taken.T].reshape(-1, count).T)
+        at = (position[:, done] >= count).argmax(axis=0)
+        found_rows.append(index[:, done][at, np.arange(at.size)])
+        found_columns.append(columns[done])
+
+        columns, first = columns[~done], first[~done]
+        width *= 2
+
+    if not found_columns:
+        return (
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.int64),
+            np.empty((count, 0)),
+        )
+    return (
+        np.concatenate(found_columns),
+        np.concatenate(found_rows),
+        np.concatenate(found_values, axis=1),
+    )
+
+
+def group_by_row(
+    rows: np.ndarray, columns: np.ndarray, values: np.ndarray
+) -> dict[int, tuple[np.ndarray, np.ndarray]]:
+    """
+    把逐列给出的 (行号, 列号, 值) 按行号分组，供 `_recurse` 在对应的行上使用。
+
+    :return: 行号 -> (列号数组, 值数组)。
+    """
+    order = np.argsort(rows, kind="stable")
+    unique_rows, starts = np.unique(rows[order], return_index=True)
+    return {
+        int(row): (group_columns, group_values)
+        for row, group_columns, group_values in zip(
+            unique_rows,
+            np.split(columns[order], starts[1:]),
+            np.split(values[order], starts[1:]),
+        )
+    }
+
+
+def _recurse(
+    values: np.ndarray,
+    valid: np.ndarray,
+    state: np.ndarray,
+    step,
+    seeds: dict[int, tuple[np.ndarray, np.ndarray]] | None = None,
+) -> np.ndarray:
+    """
+    按日期逐行推进递推，`state` 为各列的初始状态（NaN 表示尚未开始）。
+
+    每一行上用 `step` 由上一状态和当前值计算新状态（当前值或状态为NaN时，`step` 的结果必须为NaN），
+    缺失位置输出 NaN 且保持状态不变；`seeds` 给出的位置直接使用给定的初始值。
+    """
+    out = np.empty(values.shape)
+    rows = active_rows(valid)
+    out[: rows.start] = np.nan
+    seeds = seeds or {}
+    for t in rows:
+        row = out[t]
+        step(values[t], state, row)
+        np.copyto(state, row, where=valid[t])
+        if t in seeds:
+            columns, initial = seeds[t]
+            row[columns] = initial
+            state[columns] = initial
+    return out
@@ -0,0 +1,131 @@
+"""
+动量类指标：RSI、KDJ。
+
+输入为 (日期数, 股票数) 的矩阵或单只股票的一维序列，返回同样形状的结果。
+停牌日（NaN）被跳过，输出为 NaN；多个输入（最高、最低、收盘价）中任一为NaN的交易日都视为停牌。
+"""
+
+import numpy as np
+
+from autostock.indicators.kernels import (
+    ZERO_EPSILON,
+    active_rows,
+    ewm_from,
+    from_panel,
+    group_by_row,
+    leading_valid,
+    rolling_max,
+    rolling_min,
+    to_panel,
+)
+
+
+def rsi(close, period: int = 14) -> np.ndarray:
+    """
+    相对强弱指标（TA-Lib RSI）：涨幅、跌幅分别做 Wilder 平滑，初始值为前 `period` 个涨跌幅的简单平均。
+
+    :param close: 收盘价矩阵。
+    :param period: 周期。
+    :return: 0~100，前 `period` 个交易日为 NaN。
+    """
+    (close,), is_1d = to_panel(close)
+    if period < 1:
+        raise ValueError(f"Invalid period: {period}.")
+    symbols = close.shape[1]
+    valid = ~np.isnan(close)
+    seeds = _rsi_seeds(close, valid, period)
+
+    # 逐日推进：当天的涨跌幅、Wilder平滑和RSI都在一行上算完，不生成整个矩阵大小的中间结果。
+    # 涨幅、跌幅放在一个数组里（左半部分为涨幅、右半部分为跌幅），一次运算同时平滑两者；
+    # 运算顺序与 `wilder_recursion` 和 `StreamingRSI` 相同，结果逐位一致
+    result = np.full(close.shape, np.nan)
+    last = np.full(symbols, np.nan)
+    moves = np.empty(2 * symbols)
+    averages = np.empty(2 * symbols)
+    state = np.full(2 * symbols, np.nan)
+    gain, loss = moves[:symbols], moves[symbols:]
+    average_gain, average_loss = averages[:symbols], averages[symbols:]
+    total = np.empty(symbols)
+    zero = np.empty(symbols, dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for t in active_rows(valid):
+            np.subtract(close[t], last, out=gain)
+            np.negative(gain, out=loss)
+            np.maximum(gain, 0.0, out=gain)
+            np.maximum(loss, 0.0, out=loss)
+            np.copyto(last, close[t], where=valid[t])
+
+            np.multiply(state, period - 1, out=averages)
+            averages += moves
+            averages /= period
+            # 停牌日保持状态不变；每列第一个交易日没有涨跌幅，状态仍为NaN
+            np.copyto(
+                state.reshape(2, symbols), averages.reshape(2, symbols), where=valid[t]
+            )
+            if t in seeds:
+                columns, initial = seeds[t]
+                averages[columns] = initial
+                state[columns] = initial
+
+            row = result[t]
+            np.add(average_gain, average_loss, out=total)
+            np.divide(average_gain, total, out=row)
+            row *= 100.0
+            # 涨跌幅都为0时 RSI 取0（与 TA-Lib 相同）；涨跌幅非负，total 不会小于0
+            np.less(total, ZERO_EPSILON, out=zero)
+            np.copyto(row, 0.0, where=zero)
+    return from_panel(result, is_1d)
+
+
+def kdj(
+    high, low, close, period: int = 9, k_period: int = 3, d_period: int = 3
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    随机指标 KDJ（国内软件的算法，TA-Lib 中没有对应函数）：
+
+        RSV = (C - LLV(L, period)) / (HHV(H, period) - LLV(L, period)) * 100
+        K = SMA(RSV, k_period, 1)，D = SMA(K, d_period, 1)，J = 3K - 2D
+
+    其中 SMA(X, N, 1) 为通达信的加权平均，K、D 的初始值为50。
+    最高价等于最低价时 RSV 取0（与 TA-Lib STOCH 相同）。
+
+    :param high: 最高价矩阵。
+    :param low: 最低价矩阵。
+    :param close: 收盘价矩阵。
+    :param period: RSV 的周期。
+    :param k_period: K 的平滑周期。
+    :param d_period: D 的平滑周期。
+    :return: (k, d, j)，前 `period - 1` 个交易日为 NaN。
+    """
+    (high, low, close), is_1d = to_panel(high, low, close)
+    highest = rolling_max(high, period)
+    lowest = rolling_min(low, period)
+    spread = highest - lowest
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsv = np.where(spread > ZERO_EPSILON, (close - lowest) / spread * 100.0, 0.0)
+    rsv[np.isnan(spread)] = np.nan
+
+    k = ewm_from(rsv, 1.0 / k_period, initial=50.0)
+    d = ewm_from(k, 1.0 / d_period, initial=50.0)
+    j = 3.0 * k - 2.0 * d
+    return from_panel(k, is_1d), from_panel(d, is_1d), from_panel(j, is_1d)
+
+
+def _rsi_seeds(
+    close: np.ndarray, valid: np.ndarray, period: int
+) -> dict[int, tuple[np.ndarray, np.ndarray]]:
+    """
+    平均涨幅、跌幅的初始值：每只股票前 `period` 个涨跌幅（前 `period + 1` 个收盘价之差）的简单平均，
+    在第 `period + 1` 个交易日给出。列号按 `rsi` 中涨幅在左、跌幅在右的数组排列。
+    """
+    symbols = close.shape[1]
+    columns, rows, leading = leading_valid(close, valid, period + 1)
+    change = np.diff(leading, axis=0)
+    # 按日期顺序累加（与 `wilder_recursion` 计算初始值的顺序相同）
+    gain = np.cumsum(np.maximum(change, 0.0), axis=0)[-1] / period
+    loss = np.cumsum(np.maximum(np.negative(change), 0.0), axis=0)[-1] / period
+    return group_by_row(
+        np.concatenate([rows, rows]),
+        np.concatenate([columns, columns + symbols]),
+        np.concatenate([gain, loss]),
+    )
@@ -0,0 +1,620 @@
+"""
+增量（流式）指标计算。
+
+每个 `StreamingIndicator` 为每只股票保存计算到最后一个交易日的状态（EMA/Wilder 平滑值、
+滚动窗口中的最近 N 个值等），新的日线到来时只需 O(1) 地把新数据折叠进状态，
+不必对全部历史重新计算。状态的每一步运算与 `trend`/`momentum`/`volatility` 中的全量计算完全相同，
+因此增量结果与对完整历史重新计算的结果一致（逐位相等）。
+
+    store = IndicatorStateStore(Path("datas"))
+    rsi = store.refresh(StreamingRSI(14), manager)   # 首次全量计算，之后只处理新的交易日
+    rsi.latest["rsi"]                                  # 每只股票最新的 RSI
+
+状态以 Parquet 文件保存在 `datas/indicator_state/{key}.parquet`，每只股票一行。
+"""
+
+import json
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from autostock.datamanager.panel import DailyPanel
+from autostock.indicators.kernels import (
+    ZERO_EPSILON,
+    EmaStepper,
+    EwmStepper,
+    PreviousValue,
+    RollingExtreme,
+    RollingSum,
+    Stepper,
+    WilderStepper,
+)
+
+# 状态文件格式版本，格式变化时旧文件作废
+STATE_FORMAT_VERSION = 1
+
+
+class StreamingIndicator(ABC):
+    """
+    增量指标的基类。
+
+    子类定义输入字段 `fields`、输出 `outputs`，在 `_build` 中创建各部分的 `Stepper`，
+    在 `_step` 中描述一个交易日的计算。
+
+    除各 `Stepper` 的状态外，每只股票还记录：
+    - `last_date`：已经处理到的最后一个交易日，之后只接受更晚的数据；
+    - `check`：该交易日的收盘价（最后一个输入字段），用于发现历史数据被修改（如前复权基准变化）；
+    - `latest`：最后一个交易日的各输出值。
+    """
+
+    name: str = ""
+    fields: tuple[str, ...] = ("close",)
+    outputs: tuple[str, ...] = ()
+
+    def __init__(self, symbols: list[str] | None = None):
+        self.symbols: list[str] = []
+        self._index: dict[str, int] = {}
+        self.last_date = np.array([], dtype="datetime64[ns]")
+        self.check = np.array([])
+        self.latest = {name: np.array([]) for name in self.outputs}
+        self.parts: dict[str, Stepper] = self._build(0)
+        if symbols:
+            self.ensure_symbols(symbols)
+
+    # ------------------------------------------------------------------ 子类接口
+
+    @property
+    def params(self) -> dict:
+        """
+        指标参数，用于生成状态文件名和校验。
+        """
+        return {}
+
+    @abstractmethod
+    def _build(self, symbols: int) -> dict[str, Stepper]:
+        """
+        为 `symbols` 只股票创建各部分的初始 `Stepper`，键为部分名。
+        """
+
+    @abstractmethod
+    def _step(
+        self, inputs: dict[str, np.ndarray], valid: np.ndarray
+    ) -> dict[str, np.ndarray]:
+        """
+        处理一个交易日，返回各输出当天的值。
+
+        :param inputs: 输入字段 -> 当天各股票的数值。
+        :param valid: 当天各股票是否有数据。
+        """
+
+    # ------------------------------------------------------------------ 公共接口
+
+    @property
+    def key(self) -> str:
+        """
+        指标名加参数，例如 "rsi(period=14)"。
+        """
+        params = ",".join(f"{k}={v}" for k, v in self.params.items())
+        return f"{self.name}({params})"
+
+    def ensure_symbols(self, symbols: list[str]) -> None:
+        """
+        加入尚未跟踪的股票（状态为空，即从第一个交易日开始计算）。
+        """
+        new_symbols = [s for s in dict.fromkeys(symbols) if s not in self._index]
+        if not new_symbols:
+            return
+        old_count = len(self.symbols)
+        count = old_count + len(new_symbols)
+        fresh = self._build(count)
+        for name, part in self.parts.items():
+            state = fresh[name].get_state()
+            for field, values in part.get_state().items():
+                state[field][..., :old_count] = values
+            fresh[name].set_state(state)
+        self.parts = fresh
+
+        self.symbols.extend(new_symbols)
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.last_date = np.concatenate(
+            [self.last_date, np.full(len(new_symbols), np.datetime64("NaT", "ns"))]
+        )
+        self.check = np.concatenate([self.check, np.full(len(new_symbols), np.nan)])
+        self.latest = {
+            name: np.concatenate([values, np.full(len(new_symbols), np.nan)])
+            for name, values in self.latest.items()
+        }
+
+    def reset(self, symbols: list[str]) -> None:
+        """
+        清空指定股票的状态，之后需要从它们的第一个交易日重新计算。
+        """
+        columns = np.array([self._index[s] for s in symbols], dtype=np.intp)
+        if not columns.size:
+            return
+        fresh = self._build(len(self.symbols))
+        for name, part in self.parts.items():
+            state = part.get_state()
+            for field, values in fresh[name].get_state().items():
+                state[field][..., columns] = values[..., columns]
+            part.set_state(state)
+        self.last_date[columns] = np.datetime64("NaT", "ns")
+        self.check[columns] = np.nan
+        for values in self.latest.values():
+            values[columns] = np.nan
+
+    def update(
+        self, dates: np.ndarray, inputs: dict[str, np.ndarray]
+    ) -> dict[str, np.ndarray]:
+        """
+        按日期顺序把新的日线数据折叠进状态。
+
+        :param dates: 交易日（升序），长度为 k。
+        :param inputs: 字段名 -> (k, 股票数) 矩阵，列顺序与 `symbols` 相同，没有数据的位置为 NaN。
+                       每只股票只处理晚于其 `last_date` 的交易日，重复提交的旧数据会被忽略。
+        :return: 输出名 -> (k, 股票数) 矩阵。
+        """
+        dates = np.asarray(dates, dtype="datetime64[ns]")
+        values = [np.asarray(inputs[f], dtype=np.float64) for f in self.fields]
+        outputs = {name: np.full(values[0].shape, np.nan) for name in self.outputs}
+        for t, date in enumerate(dates):
+            valid = np.isnat(self.last_date) | (self.last_date < date)
+            for row in values:
+                valid &= ~np.isnan(row[t])
+            row_inputs = {
+                f: np.where(valid, row[t], np.nan)
+                for f, row in zip(self.fields, values)
+            }
+            result = self._step(row_inputs, valid)
+            for name, row in result.items():
+                outputs[name][t] = row
+                np.copyto(self.latest[name], row, where=valid)
+            self.last_date[valid] = date
+            np.copyto(self.check, row_inputs[self.fields[-1]], where=valid)
+        return outputs
+
+    def update_panel(self, panel: DailyPanel) -> dict[str, np.ndarray]:
+        """
+        用一个 `DailyPanel` 更新状态（面板中的股票可以是 `symbols` 的任意子集，未跟踪的股票会被加入）。
+
+        :return: 输出名 -> (面板日期数, 面板股票数) 矩阵，列顺序与面板相同。
+        """
+        self.ensure_symbols(panel.symbols)
+        columns = np.array([self._index[s] for s in panel.symbols], dtype=np.intp)
+        rows = len(panel.dates)
+        inputs = {}
+        for field in self.fields:
+            matrix = np.full((rows, len(self.symbols)), np.nan)
+            matrix[:, columns] = panel[field]
+            inputs[field] = matrix
+        outputs = self.update(panel.dates, inputs)
+        return {name: values[:, columns] for name, values in outputs.items()}
+
+    def stale_symbols(self, panel: DailyPanel) -> list[str]:
+        """
+        找出历史数据已经变化、状态不再可信的股票：面板中该股票在 `last_date` 当天的收盘价
+        与状态中记录的不同（例如前复权数据因除权除息整体变化），或面板中没有这一天的数据。
+
+        面板需要包含各股票的 `last_date` 当天。
+        """
+        columns = np.array(
+            [self._index.get(s, -1) for s in panel.symbols], dtype=np.intp
+        )
+        known = columns >= 0
+        panel_columns = np.flatnonzero(known)
+        columns = columns[known]
+        last_date = self.last_date[columns]
+        has_state = ~np.isnat(last_date)
+        if not has_state.any() or not len(panel.dates):
+            return []
+
+        rows = np.searchsorted(panel.dates, last_date)
+        rows = np.minimum(rows, len(panel.dates) - 1)
+        found = panel.dates[rows] == last_date
+        current = panel[self.fields[-1]][rows, panel_columns]
+        stale = has_state & (~found | (current != self.check[columns]))
+        return [panel.symbols[i] for i in panel_columns[stale]]
+
+    def to_arrow(self) -> pa.Table:
+        """
+        把状态转换为每只股票一行的 Arrow 表。
+        """
+        columns = {
+            "symbol": pa.array(self.symbols, pa.string()),
+            "last_date": pa.array(self.last_date, pa.timestamp("ns")),
+            "check": pa.array(self.check),
+        }
+        for name, values in self.latest.items():
+            columns[f"latest.{name}"] = pa.array(values)
+        for part_name, part in self.parts.items():
+            for field, values in part.get_state().items():
+                columns[f"{part_name}.{field}"] = _to_arrow_column(values)
+        metadata = {
+            "indicator": self.key,
+            "format_version": str(STATE_FORMAT_VERSION),
+            "params": json.dumps(self.params),
+        }
+        return pa.table(columns).replace_schema_metadata(metadata)
+
+    def load_arrow(self, table: pa.Table) -> None:
+        """
+        从 `to_arrow` 生成的表恢复状态（覆盖当前状态）。
+        """
+        metadata = {k.decode(): v.decode() for k, v in table.schema.metadata.items()}
+        if metadata.get("indicator") != self.key or metadata.get(
+            "format_version"
+        ) != str(STATE_FORMAT_VERSION):
+            raise ValueError(
+                f"State table is for {metadata.get('indicator')} "
+                f"(format {metadata.get('format_version')}), expected {self.key}."
+            )
+        symbols = table.column("symbol").to_pylist()
+        self.symbols = symbols
+        self._index = {symbol: i for i, symbol in enumerate(symbols)}
+        self.last_date = (
+            table.column("last_date")
+            .to_numpy(zero_copy_only=False)
+            .astype("datetime64[ns]")
+        )
+        self.check = _column_to_numpy(table.column("check"))
+        self.latest = {
+            name: _column_to_numpy(table.column(f"latest.{name}"))
+            for name in self.outputs
+        }
+        self.parts = self._build(len(symbols))
+        for part_name, part in self.parts.items():
+            part.set_state(
+                {
+                    field: _column_to_numpy(table.column(f"{part_name}.{field}"))
+                    for field in part.state_fields
+                }
+            )
+
+
+class StreamingMA(StreamingIndicator):
+    name = "ma"
+    outputs = ("ma",)
+
+    def __init__(self, period: int = 5, symbols: list[str] | None = None):
+        self.period = period
+        super().__init__(symbols)
+
+    @property
+    def params(self) -> dict:
+        return {"period": self.period}
+
+    def _build(self, symbols: int) -> dict[str, Stepper]:
+        return {"sum": RollingSum(self.period, symbols)}
+
+    def _step(self, inputs, valid):
+        total = _step(self.parts["sum"], inputs["close"], valid)
+        return {"ma": total / self.period}
+
+
+class StreamingEMA(StreamingIndicator):
+    name = "ema"
+    outputs = ("ema",)
+
+    def __init__(self, period: int = 12, symbols: list[str] | None = None):
+        self.period = period
+        super().__init__(symbols)
+
+    @property
+    def params(self) -> dict:
+        return {"period": self.period}
+
+    def _build(self, symbols: int) -> dict[str, Stepper]:
+        return {"ema": EmaStepper(2.0 / (self.period + 1), self.period, symbols)}
+
+    def _step(self, inputs, valid):
+        return {"ema": _step(self.parts["ema"], inputs["close"], valid)}
+
+
+class StreamingMACD(StreamingIndicator):
+    name = "macd"
+    outputs = ("dif", "dea", "hist")
+
+    def __init__(
+        self,
+        fast: int = 12,
+        slow: int = 26,
+        signal: int = 9,
+        symbols: list[str] | None = None,
+    ):
+        self.fast, self.slow = min(fast, slow), max(fast, slow)
+        self.signal = signal
+        super().__init__(symbols)
+
+    @property
+    def params(self) -> dict:
+        return {"fast": self.fast, "slow": self.slow, "signal": self.signal}
+
+    def _build(self, symbols: int) -> dict[str, Stepper]:
+        return {
+            "fast": EmaStepper(
+                2.0 / (self.fast + 1), self.fast, symbols, seed_at=self.slow
+            ),
+            "slow": EmaStepper(2.0 / (self.slow + 1), self.slow, symbols),
+            "signal": EmaStepper(2.0 / (self.signal + 1), self.signal, symbols),
+        }
+
+    def _step(self, inputs, valid):
+        close = inputs["close"]
+        dif = _step(self.parts["fast"], close, valid) - _step(
+            self.parts["slow"], close, valid
+        )
+        dea = _step(self.parts["signal"], dif, ~np.isnan(dif))
+        dif[np.isnan(dea)] = np.nan
+        return {"dif": dif, "dea": dea, "hist": dif - dea}
+
+
+class StreamingBollinger(StreamingIndicator):
+    name = "bollinger"
+    outputs = ("upper", "middle", "lower")
+
+    def __init__(
+        self, period: int = 20, nbdev: float = 2.0, symbols: list[str] | None = None
+    ):
+        self.period = period
+        self.nbdev = nbdev
+        super().__init__(symbols)
+
+    @property
+    def params(self) -> dict:
+        return {"period": self.period, "nbdev": self.nbdev}
+
+    def _build(self, symbols: int) -> dict[str, Stepper]:
+        return {
+            "sum": RollingSum(self.period, symbols),
+            "sum_sq": RollingSum(self.period, symbols),
+        }
+
+    def _step(self, inputs, valid):
+        close = inputs["close"]
+        middle = _step(self.parts["sum"], close, valid) / self.period
+        mean_square = _step(self.parts["sum_sq"], close * close, valid) / self.period
+        variance = mean_square - middle * middle
+        deviation = np.where(
+            variance < ZERO_EPSILON, 0.0, np.sqrt(np.maximum(variance, 0.0))
+        )
+        deviation[np.isnan(variance)] = np.nan
+        deviation *= self.nbdev
+        return {
+            "upper": middle + deviation,
+            "middle": middle,
+            "lower": middle - deviation,
+        }
+
+
+class StreamingRSI(StreamingIndicator):
+    name = "rsi"
+    outputs = ("rsi",)
+
+    def __init__(self, period: int = 14, symbols: list[str] | None = None):
+        self.period = period
+        super().__init__(symbols)
+
+    @property
+    def params(self) -> dict:
+        return {"period": self.period}
+
+    def _build(self, symbols: int) -> dict[str, Stepper]:
+        return {
+            "previous": PreviousValue(symbols),
+            "gain": WilderStepper(self.period, symbols),
+            "loss": WilderStepper(self.period, symbols),
+        }
+
+    def _step(self, inputs, valid):
+        close = inputs["close"]
+        change = close - _step(self.parts["previous"], close, valid)
+        gain = np.maximum(change, 0.0)
+        loss = np.maximum(np.negative(change), 0.0)
+        moved = ~np.isnan(change)
+        gain = _step(self.parts["gain"], gain, moved)
+        loss = _step(self.parts["loss"], loss, moved)
+
+        total = gain + loss
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = np.divide(gain, total)
+        result *= 100.0
+        result[total < ZERO_EPSILON] = 0.0
+        return {"rsi": result}
+
+
+class StreamingATR(StreamingIndicator):
+    name = "atr"
+    fields = ("high", "low", "close")
+    outputs = ("atr",)
+
+    def __init__(self, period: int = 14, symbols: list[str] | None = None):
+        self.period = period
+        super().__init__(symbols)
+
+    @property
+    def params(self) -> dict:
+        return {"period": self.period}
+
+    def _build(self, symbols: int) -> dict[str, Stepper]:
+        return {
+            "previous": PreviousValue(symbols),
+            "atr": WilderStepper(self.period, symbols),
+        }
+
+    def _step(self, inputs, valid):
+        prev_close = _step(self.parts["previous"], inputs["close"], valid)
+        true_range = np.maximum(inputs["high"], prev_close) - np.minimum(
+            inputs["low"], prev_close
+        )
+        return {"atr": _step(self.parts["atr"], true_range, ~np.isnan(true_range))}
+
+
+class StreamingKDJ(StreamingIndicator):
+    name = "kdj"
+    fields = ("high", "low", "close")
+    outputs = ("k", "d", "j")
+
+    def __init__(
+        self,
+        period: int = 9,
+        k_period: int = 3,
+        d_period: int = 3,
+        symbols: list[str] | None = None,
+    ):
+        self.period = period
+        self.k_period = k_period
+        self.d_period = d_period
+        super().__init__(symbols)
+
+    @property
+    def params(self) -> dict:
+        return {
+            "period": self.period,
+            "k_period": self.k_period,
+            "d_period": self.d_period,
+        }
+
+    def _build(self, symbols: int) -> dict[str, Stepper]:
+        return {
+            "highest": RollingExtreme(self.period, symbols, "max"),
+            "lowest": RollingExtreme(self.period, symbols, "min"),
+            "k": EwmStepper(1.0 / self.k_period, 50.0, symbols),
+            "d": EwmStepper(1.0 / self.d_period, 50.0, symbols),
+        }
+
+    def _step(self, inputs, valid):
+        highest = _step(self.parts["highest"], inputs["high"], valid)
+        lowest = _step(self.parts["lowest"], inputs["low"], valid)
+        spread = highest - lowest
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsv = np.where(
+                spread > ZERO_EPSILON, (inputs["close"] - lowest) / spread * 100.0, 0.0
+            )
+        rsv[np.isnan(spread)] = np.nan
+        k = _step(self.parts["k"], rsv, ~np.isnan(rsv))
+        d = _step(self.parts["d"], k, ~np.isnan(k))
+        return {"k": k, "d": d, "j": 3.0 * k - 2.0 * d}
+
+
+class IndicatorStateStore:
+    """
+    增量指标状态的持久化，每个指标（名称+参数）一个 Parquet 文件：
+    `data_path/indicator_state/{key}.parquet`。
+    """
+
+    def __init__(self, data_path: str | Path):
+        self.state_dir = Path(data_path) / "indicator_state"
+
+    def path(self, indicator: StreamingIndicator) -> Path:
+        return self.state_dir / f"{indicator.key}.parquet"
+
+    def load(self, indicator: StreamingIndicator) -> StreamingIndicator:
+        """
+        读取已保存的状态到 `indicator` 中。没有状态文件或文件格式不符时保持空状态。
+        """
+        path = self.path(indicator)
+        if not path.exists():
+            return indicator
+        try:
+            indicator.load_arrow(pq.read_table(path))
+        except (ValueError, KeyError, pa.ArrowException) as e:
+            print(f"WARN: Ignoring indicator state {path.name}: {e}")
+        return indicator
+
+    def save(self, indicator: StreamingIndicator) -> None:
+        """
+        原子地保存状态（先写临时文件再重命名）。
+        """
+        from autostock.datamanager.ops.daily_ops import write_parquet_atomic
+
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        write_parquet_atomic(indicator.to_arrow(), self.path(indicator))
+
+    def refresh(
+        self,
+        indicator: StreamingIndicator,
+        manager,
+        symbols: list[str] | None = None,
+    ) -> StreamingIndicator:
+        """
+        加载已保存的状态，用本地日线数据把它更新到最新并保存。
+
+        - 已有状态的股票只读取 `last_date` 当天及之后的数据，计算量与新增的交易日数成正比。
+          股票按 `last_date` 分组读取，长期停牌或已退市的股票不会让其他股票重读它停牌以来的历史；
+        - 新股票，以及历史数据已变化（见 `stale_symbols`）的股票，读取完整历史重新计算。
+
+        :param indicator: 要更新的指标（通常是新建的实例，状态从文件加载）。
+        :param manager: DataManager，用于读取日线面板。
+        :param symbols: 需要的股票，默认为所有跟踪的股票。
+        :return: 更新后的 `indicator`，最新值见 `indicator.latest`。
+        """
+        self.load(indicator)
+        symbols = symbols if symbols is not None else manager.get_stock_list()
+        indicator.ensure_symbols(symbols)
+        columns = np.array([indicator._index[s] for s in symbols], dtype=np.intp)
+        last_date = indicator.last_date[columns]
+
+        rebuild = [s for s, d in zip(symbols, last_date) if np.isnat(d)]
+        groups: dict[np.datetime64, list[str]] = {}
+        for symbol, since in zip(symbols, last_date):
+            if not np.isnat(since):
+                groups.setdefault(since, []).append(symbol)
+        stale_count = 0
+        for since, group in sorted(groups.items()):
+            panel = manager.get_daily_panel(
+                group, fields=indicator.fields, start_date=_to_date(since)
+            )
+            stale = indicator.stale_symbols(panel)
+            if stale:
+                stale_count += len(stale)
+                indicator.reset(stale)
+                rebuild.extend(stale)
+                stale_set = set(stale)
+                keep = [i for i, s in enumerate(panel.symbols) if s not in stale_set]
+                panel = DailyPanel(
+                    dates=panel.dates,
+                    symbols=[panel.symbols[i] for i in keep],
+                    fields={k: v[:, keep] for k, v in panel.fields.items()},
+                )
+            indicator.update_panel(panel)
+        if stale_count:
+            print(
+                f"INFO: Daily data changed for {stale_count} symbols, "
+                f"recomputing {indicator.key} from full history."
+            )
+        if rebuild:
+            indicator.update_panel(
+                manager.get_daily_panel(rebuild, fields=indicator.fields)
+            )
+        self.save(indicator)
+        return indicator
+
+
+def _step(stepper: Stepper, x: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    out = np.empty(len(x))
+    stepper.step(x, valid, out)
+    return out
+
+
+def _to_date(value: np.datetime64):
+    return value.astype("datetime64[D]").item()
+
+
+def _to_arrow_column(values: np.ndarray) -> pa.Array:
+    # 最后一维是股票；二维状态（如环形缓冲区）按股票存为定长列表
+    if values.ndim == 1:
+        return pa.array(values)
+    flat = pa.array(np.ascontiguousarray(values.T).reshape(-1))
+    return pa.FixedSizeListArray.from_arrays(flat, values.shape[0])
+
+
+def _column_to_numpy(column: pa.ChunkedArray) -> np.ndarray:
+    array = column.combine_chunks()
+    if pa.types.is_fixed_size_list(array.type):
+        size = array.type.list_size
+        flat = array.flatten().to_numpy(zero_copy_only=False)
+        return flat.reshape(-1, size).T.copy()
+    return array.to_numpy(zero_copy_only=False).copy()
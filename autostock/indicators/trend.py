@@ -0,0 +1,100 @@
+"""
+趋势类指标：MA、EMA、MACD、布林带。
+
+输入为 (日期数, 股票数) 的矩阵（如 `DailyPanel["close"]`）或单只股票的一维序列，
+返回同样形状的结果。停牌日（NaN）被跳过，输出为 NaN；结果与对每只股票的实际交易日序列
+调用 TA-Lib 的同名函数一致（SMA、EMA、MACD、BBANDS，默认参数）。
+"""
+
+import numpy as np
+
+from autostock.indicators.kernels import (
+    ZERO_EPSILON,
+    ema_recursion,
+    from_panel,
+    rolling_sum,
+    to_panel,
+)
+
+
+def ma(close, period: int = 5) -> np.ndarray:
+    """
+    简单移动平均（TA-Lib SMA）。
+
+    :param close: 收盘价矩阵。
+    :param period: 周期。
+    :return: 前 `period - 1` 个交易日为 NaN。
+    """
+    (close,), is_1d = to_panel(close)
+    return from_panel(rolling_sum(close, period) / period, is_1d)
+
+
+def ema(close, period: int = 12) -> np.ndarray:
+    """
+    指数移动平均（TA-Lib EMA）：平滑系数 2 / (period + 1)，初始值为前 `period` 个交易日的简单平均。
+
+    :param close: 收盘价矩阵。
+    :param period: 周期。
+    :return: 前 `period - 1` 个交易日为 NaN。
+    """
+    (close,), is_1d = to_panel(close)
+    return from_panel(ema_recursion(close, 2.0 / (period + 1), period), is_1d)
+
+
+def macd(
+    close, fast: int = 12, slow: int = 26, signal: int = 9
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    MACD（TA-Lib MACD）。
+
+    与 TA-Lib 相同，快线EMA的初始值取慢线初始值当天之前 `fast` 个交易日的平均，
+    使两条EMA从同一天开始；三个输出都从第 `slow + signal - 1` 个交易日开始有值。
+    注意柱状图是 DIF - DEA，国内软件常见的 MACD 柱为它的2倍。
+
+    :param close: 收盘价矩阵。
+    :param fast: 快线周期。
+    :param slow: 慢线周期。
+    :param signal: 信号线周期。
+    :return: (dif, dea, hist)。
+    """
+    if slow < fast:
+        fast, slow = slow, fast
+    (close,), is_1d = to_panel(close)
+    fast_ema = ema_recursion(close, 2.0 / (fast + 1), fast, seed_at=slow)
+    slow_ema = ema_recursion(close, 2.0 / (slow + 1), slow)
+    dif = fast_ema - slow_ema
+    dea = ema_recursion(dif, 2.0 / (signal + 1), signal)
+    # 信号线有值之前的 DIF 也不输出
+    dif[np.isnan(dea)] = np.nan
+    hist = dif - dea
+    return from_panel(dif, is_1d), from_panel(dea, is_1d), from_panel(hist, is_1d)
+
+
+def bollinger(
+    close, period: int = 20, nbdev: float = 2.0
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    布林带（TA-Lib BBANDS，均线为SMA）：中轨为MA，上下轨为中轨加减 `nbdev` 倍总体标准差。
+
+    :param close: 收盘价矩阵。
+    :param period: 周期。
+    :param nbdev: 标准差倍数。
+    :return: (upper, middle, lower)。
+    """
+    (close,), is_1d = to_panel(close)
+    symbols = close.shape[1]
+    # 价格和价格的平方并排放在一个矩阵里，一次滚动求和得到两者
+    sums = rolling_sum(np.hstack([close, close * close]), period) / period
+    middle, mean_square = sums[:, :symbols], sums[:, symbols:]
+    variance = mean_square - middle * middle
+    # 与 TA-Lib 相同，方差小于阈值时标准差取0
+    deviation = np.where(
+        variance < ZERO_EPSILON, 0.0, np.sqrt(np.maximum(variance, 0.0))
+    )
+    deviation[np.isnan(variance)] = np.nan
+    deviation *= nbdev
+    return (
+        from_panel(middle + deviation, is_1d),
+        from_panel(middle, is_1d),
+        from_panel(middle - deviation, is_1d),
+    )
@@ -0,0 +1,44 @@
+"""
+波动类指标：ATR。
+
+输入为 (日期数, 股票数) 的矩阵或单只股票的一维序列，返回同样形状的结果。
+停牌日被跳过，真实波幅中的"前收盘价"是上一个交易日（而非上一个日历日）的收盘价。
+"""
+
+import numpy as np
+
+from autostock.indicators.kernels import (
+    from_panel,
+    previous_valid,
+    to_panel,
+    wilder_recursion,
+)
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """
+    真实波幅（TA-Lib TRANGE）：max(最高价, 前收盘价) - min(最低价, 前收盘价)。
+
+    :return: 每只股票的第一个交易日没有前收盘价，为 NaN。
+    """
+    (high, low, close), is_1d = to_panel(high, low, close)
+    return from_panel(_true_range(high, low, close), is_1d)
+
+
+def atr(high, low, close, period: int = 14) -> np.ndarray:
+    """
+    平均真实波幅（TA-Lib ATR）：真实波幅的 Wilder 平滑，初始值为前 `period` 个真实波幅的简单平均。
+
+    :param high: 最高价矩阵。
+    :param low: 最低价矩阵。
+    :param close: 收盘价矩阵。
+    :param period: 周期。
+    :return: 前 `period` 个交易日为 NaN。
+    """
+    (high, low, close), is_1d = to_panel(high, low, close)
+    return from_panel(wilder_recursion(_true_range(high, low, close), period), is_1d)
+
+
+def _true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev_close = previous_valid(close)
+    return np.maximum(high, prev_close) - np.minimum(low, prev_close)
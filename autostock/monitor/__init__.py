@@ -0,0 +1,6 @@
+# 盘中全市场监控见 market.py，快照的环形缓冲区见 ring.py。
+
+from .market import MarketMonitor, MarketStats, MonitorTick
+from .ring import SnapshotRing
+
+__all__ = ["MarketMonitor", "MarketStats", "MonitorTick", "SnapshotRing"]
@@ -0,0 +1,551 @@
+"""
+盘中全市场监控（大盘监控）。
+
+每次轮询得到约5000行的实时行情（ak.stock_zh_a_spot_em() 格式，中文列名、顺序每次不同），
+`MarketMonitor` 不重新清洗整张表，而是：
+
+- 用股票代码的哈希索引把行情的各列一次性写入按股票固定排列的数组，新股票只在第一次出现时标准化代码；
+- 与上一个快照逐列比较，只输出价格或成交量变化了的股票；
+- 最近的快照保存在固定容量的列式环形缓冲区（`SnapshotRing`）中，涨速按时间二分查找历史快照计算；
+- 涨跌家数、涨停、跌停和炸板数量只根据发生变化的股票增量更新，放量用成交速率的指数移动平均判断。
+
+处理一次全市场行情只需要几毫秒，轮询间隔主要受数据源限制。
+
+    monitor = MarketMonitor(AkshareFetcher())
+    monitor.run(interval=5, on_tick=lambda tick: print(tick.stats))
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from autostock.backtesting.vectorized import (
+    DEFAULT_PRICE_LIMIT,
+    LIMIT_PRICE_TOLERANCE,
+    price_limit_rates,
+)
+from autostock.datamanager.cleaner import standardize_symbols
+from autostock.datamanager.fetcher_base import BaseFetcher
+from autostock.monitor.ring import SnapshotRing
+
+# 实时行情原始列名 -> 监控使用的字段
+QUOTE_COLUMNS = {
+    "最新价": "price",
+    "成交量": "volume",
+    "成交额": "amount",
+    "最高": "high",
+    "最低": "low",
+    "昨收": "prev_close",
+}
+# 保存到环形缓冲区中的字段（计算涨速和放量需要历史值）
+RING_FIELDS = ("price", "volume", "amount")
+# 主板ST股票的涨跌幅限制
+ST_PRICE_LIMIT = 0.05
+
+# 涨跌状态的编码，用 np.bincount 增量更新涨跌家数
+_NO_QUOTE, _UP, _DOWN, _FLAT = 0, 1, 2, 3
+
+
+@dataclass(frozen=True)
+class MarketStats:
+    """
+    某一时刻的全市场统计。
+    """
+
+    time: datetime
+    # 有报价的股票数（停牌股票没有最新价）
+    total: int
+    advancing: int
+    declining: int
+    flat: int
+    limit_up: int
+    limit_down: int
+    # 今天触及过涨停、当前已打开的股票数（炸板）
+    limit_up_broken: int
+    # 当前处于放量状态的股票数
+    surging: int
+
+
+@dataclass
+class MonitorTick:
+    """
+    一次行情更新的结果。
+    """
+
+    time: datetime
+    # 相对上一个快照价格或成交量发生变化的股票：symbol、name、price、change（相对上一个快照的价格变化）、
+    # pct_change（相对昨收，%）、speed（`speed_window` 秒内的涨跌幅，%，历史不足时为 NaN）、
+    # volume_delta（手）、amount_delta（元）、volume_ratio（`surge_window` 秒内的成交速率相对其移动平均的倍数）
+    changes: pd.DataFrame
+    # 本次新封涨停、新封跌停、开始放量的股票
+    new_limit_up: list[str]
+    new_limit_down: list[str]
+    new_surges: list[str]
+    stats: MarketStats
+    # 处理本次行情（不含网络请求）的耗时（秒）
+    elapsed: float
+
+
+class MarketMonitor:
+    """
+    盘中全市场行情监控，见模块说明。不是线程安全的，应在一个线程中调用 `update`/`poll`/`run`。
+    """
+
+    def __init__(
+        self,
+        fetcher: BaseFetcher | None = None,
+        capacity: int = 240,
+        speed_window: float = 60.0,
+        surge_window: float = 60.0,
+        surge_ratio: float = 3.0,
+        surge_halflife: float = 300.0,
+        min_surge_amount: float = 1_000_000.0,
+    ):
+        """
+        :param fetcher: 数据源，`poll`/`run` 通过它的 `get_realtime_quotes()` 获取行情；只调用 `update` 时可以不给。
+        :param capacity: 环形缓冲区保存的快照数，5秒轮询时240个快照覆盖最近20分钟（5000只股票约29MB）。
+        :param speed_window: 涨速的时间窗口（秒）。
+        :param surge_window: 判断放量的时间窗口（秒）。
+        :param surge_ratio: 窗口内的成交速率达到其移动平均的多少倍视为放量。
+        :param surge_halflife: 成交速率移动平均的半衰期（秒）。
+        :param min_surge_amount: 放量时窗口内的成交额至少为多少元，过滤成交稀少的股票。
+        """
+        self.fetcher = fetcher
+        self.capacity = capacity
+        self.speed_window = speed_window
+        self.surge_window = surge_window
+        self.surge_ratio = surge_ratio
+        self.surge_halflife = surge_halflife
+        self.min_surge_amount = min_surge_amount
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        清空所有状态（新的交易日开始时自动调用）。
+        """
+        self.symbols = np.empty(0, dtype=object)
+        self.names = np.empty(0, dtype=object)
+        self._codes = pd.Index([], dtype=object)
+        self._quotes = {name: np.empty(0) for name in QUOTE_COLUMNS.values()}
+        self._limit_rates = np.empty(0)
+        self._limit_up = np.empty(0)
+        self._limit_down = np.empty(0)
+        self._direction = np.empty(0, dtype=np.int8)
+        self._at_limit_up = np.empty(0, dtype=bool)
+        self._at_limit_down = np.empty(0, dtype=bool)
+        self._touched_limit_up = np.empty(0, dtype=bool)
+        self._surging = np.empty(0, dtype=bool)
+        self._volume_rate = np.empty(0)
+        self._volume_rate_weight = np.empty(0)
+        self._breadth = np.zeros(4, dtype=np.int64)
+        self._limit_counts = {"up": 0, "down": 0, "broken": 0}
+        self.ring = SnapshotRing(RING_FIELDS, 0, self.capacity)
+        self.ticks = 0
+        self.day: date | None = None
+        self.stats: MarketStats | None = None
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    # ------------------------------------------------------------------ 更新
+
+    def update(self, quotes: pd.DataFrame, at: datetime | None = None) -> MonitorTick:
+        """
+        处理一次全市场实时行情。
+
+        :param quotes: ak.stock_zh_a_spot_em() 格式的行情，至少包含代码、名称和 `QUOTE_COLUMNS` 中的列。
+                       本次没有出现的股票沿用上一个快照的值。
+        :param at: 行情时间，默认为当前时间，必须晚于上一次更新。
+        :return: 本次更新的结果。
+        """
+        started = time.perf_counter()
+        at = at or datetime.now()
+        if self.day is not None and at.date() != self.day:
+            print(f"INFO: New trading day {at.date()}, resetting market monitor.")
+            self.reset()
+        self.day = at.date()
+
+        codes = quotes["代码"].to_numpy(dtype=object)
+        rows = self._codes.get_indexer(codes)
+        if (rows < 0).any():
+            self._add_symbols(quotes[rows < 0])
+            rows = self._codes.get_indexer(codes)
+
+        previous = self._quotes
+        current = {name: values.copy() for name, values in previous.items()}
+        for column, name in QUOTE_COLUMNS.items():
+            current[name][rows] = _float_values(quotes[column])
+        self._quotes = current
+
+        price, volume = current["price"], current["volume"]
+        changed = np.flatnonzero(
+            ~(_same(price, previous["price"]) & _same(volume, previous["volume"]))
+        )
+        # 昨收变化（新股票、数据源修正）时重新计算涨跌停价，这些股票的状态也要重新判断
+        reclosed = np.flatnonzero(~_same(current["prev_close"], previous["prev_close"]))
+        if len(reclosed):
+            self._set_limit_prices(reclosed)
+        touched = np.union1d(changed, reclosed) if len(reclosed) else changed
+
+        timestamp = at.timestamp()
+        interval = timestamp - self.ring.time() if len(self.ring) else None
+        self.ring.push(timestamp, current)
+        new_up, new_down = self._update_states(touched)
+        volume_delta, amount_delta, ratio, new_surges = self._update_volume_rate(
+            previous, interval
+        )
+        self.ticks += 1
+
+        self.stats = MarketStats(
+            time=at,
+            total=int(self._breadth[[_UP, _DOWN, _FLAT]].sum()),
+            advancing=int(self._breadth[_UP]),
+            declining=int(self._breadth[_DOWN]),
+            flat=int(self._breadth[_FLAT]),
+            limit_up=self._limit_counts["up"],
+            limit_down=self._limit_counts["down"],
+            limit_up_broken=self._limit_counts["broken"],
+            surging=int(self._surging.sum()),
+        )
+        prev_close = current["prev_close"][changed]
+        changes = pd.DataFrame(
+            {
+                "symbol": self.symbols[changed],
+                "name": self.names[changed],
+                "price": price[changed],
+                "change": price[changed] - previous["price"][changed],
+                "pct_change": (price[changed] / prev_close - 1) * 100,
+                "speed": self._speed(changed, self.speed_window),
+                "volume_delta": volume_delta[changed],
+                "amount_delta": amount_delta[changed],
+                "volume_ratio": ratio[changed],
+            }
+        )
+        return MonitorTick(
+            time=at,
+            changes=changes,
+            new_limit_up=self.symbols[new_up].tolist(),
+            new_limit_down=self.symbols[new_down].tolist(),
+            new_surges=self.symbols[new_surges].tolist(),
+            stats=self.stats,
+            elapsed=time.perf_counter() - started,
+        )
+
+    def _add_symbols(self, quotes: pd.DataFrame) -> None:
+        # 只对第一次出现的股票标准化代码、判断涨跌幅限制
+        quotes = quotes.drop_duplicates("代码")
+        codes = quotes["代码"].astype(str)
+        symbols = standardize_symbols(codes).to_numpy(dtype=object)
+        names = (
+            quotes["名称"].to_numpy(dtype=object)
+            if "名称" in quotes.columns
+            else symbols
+        )
+        rates = price_limit_rates(list(symbols))
+        is_st = pd.Series(names, dtype=object).astype(str).str.contains("ST")
+        rates = np.where(
+            is_st.to_numpy(bool) & (rates <= DEFAULT_PRICE_LIMIT), ST_PRICE_LIMIT, rates
+        )
+
+        count = len(symbols)
+        self._codes = self._codes.append(pd.Index(codes.to_numpy(dtype=object)))
+        self.symbols = np.concatenate([self.symbols, symbols])
+        self.names = np.concatenate([self.names, names])
+        self._limit_rates = np.concatenate([self._limit_rates, rates])
+        self._quotes = {
+            name: np.concatenate([values, np.full(count, np.nan)])
+            for name, values in self._quotes.items()
+        }
+        for attr, fill in (
+            ("_limit_up", np.nan),
+            ("_limit_down", np.nan),
+            ("_volume_rate", 0.0),
+            ("_volume_rate_weight", 0.0),
+        ):
+            setattr(
+                self, attr, np.concatenate([getattr(self, attr), np.full(count, fill)])
+            )
+        self._direction = np.concatenate(
+            [self._direction, np.full(count, _NO_QUOTE, dtype=np.int8)]
+        )
+        for attr in ("_at_limit_up", "_at_limit_down", "_touched_limit_up", "_surging"):
+            setattr(
+                self,
+                attr,
+                np.concatenate([getattr(self, attr), np.zeros(count, dtype=bool)]),
+            )
+        self.ring.resize(len(self.symbols))
+
+    def _set_limit_prices(self, rows: np.ndarray) -> None:
+        prev_close = self._quotes["prev_close"][rows]
+        rates = self._limit_rates[rows]
+        # 涨跌停价按昨收计算，四舍五入到分
+        self._limit_up[rows] = np.floor(prev_close * (1 + rates) * 100 + 0.5) / 100
+        self._limit_down[rows] = np.floor(prev_close * (1 - rates) * 100 + 0.5) / 100
+
+    def _update_states(self, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        重新判断给定股票的涨跌、涨跌停和炸板状态，按新旧状态之差增量更新计数。
+
+        :return: (新封涨停的行号, 新封跌停的行号)
+        """
+        price = self._quotes["price"][rows]
+        prev_close = self._quotes["prev_close"][rows]
+        quoted = ~np.isnan(price) & (prev_close > 0)
+        direction = np.select(
+            [~quoted, price > prev_close, price < prev_close],
+            [_NO_QUOTE, _UP, _DOWN],
+            default=_FLAT,
+        ).astype(np.int8)
+        self._breadth += np.bincount(direction, minlength=4) - np.bincount(
+            self._direction[rows], minlength=4
+        )
+        self._direction[rows] = direction
+
+        at_up = quoted & (price >= self._limit_up[rows] - LIMIT_PRICE_TOLERANCE)
+        at_down = quoted & (price <= self._limit_down[rows] + LIMIT_PRICE_TOLERANCE)
+        was_up, was_down = self._at_limit_up[rows], self._at_limit_down[rows]
+        was_broken = self._touched_limit_up[rows] & ~was_up
+        touched = self._touched_limit_up[rows] | at_up
+        broken = touched & ~at_up
+
+        counts = self._limit_counts
+        counts["up"] += int(at_up.sum()) - int(was_up.sum())
+        counts["down"] += int(at_down.sum()) - int(was_down.sum())
+        counts["broken"] += int(broken.sum()) - int(was_broken.sum())
+        self._at_limit_up[rows] = at_up
+        self._at_limit_down[rows] = at_down
+        self._touched_limit_up[rows] = touched
+        return rows[at_up & ~was_up], rows[at_down & ~was_down]
+
+    def _update_volume_rate(
+        self, previous: dict[str, np.ndarray], interval: float | None
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        判断放量并更新成交速率（手/秒）的指数移动平均。
+
+        放量指最近 `surge_window` 秒内的成交速率达到移动平均的 `surge_ratio` 倍：
+        用一个窗口而不是两个快照之间的成交量，避免零星成交造成的误报。
+
+        :return: (相对上一个快照的成交量增量, 成交额增量, 窗口内成交速率/移动平均, 开始放量的行号)
+        """
+        current = self._quotes
+        size = len(self.symbols)
+        if interval is None:
+            nothing = np.full(size, np.nan)
+            return nothing, nothing, nothing, np.empty(0, dtype=np.intp)
+
+        volume_delta = np.fmax(current["volume"] - previous["volume"], 0)
+        amount_delta = np.fmax(current["amount"] - previous["amount"], 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            baseline = self._volume_rate / self._volume_rate_weight
+        ratio = np.full(size, np.nan)
+        surging = np.zeros(size, dtype=bool)
+        age = self.ring.age_at(self.ring.time() - self.surge_window)
+        if age is not None:
+            span = self.ring.time() - self.ring.time(age)
+            ring = self.ring
+            recent_volume = ring.latest("volume") - ring.latest("volume", age)
+            recent_amount = ring.latest("amount") - ring.latest("amount", age)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = recent_volume / span / baseline
+            surging = (ratio >= self.surge_ratio) & (
+                np.nan_to_num(recent_amount) >= self.min_surge_amount
+            )
+        new_surges = np.flatnonzero(surging & ~self._surging)
+        self._surging = surging
+
+        # 半衰期按时间而不是快照数计算，轮询间隔不均匀时结果一致。
+        # 移动平均从0开始，除以累计权重做偏差修正，刚开始监控时的基准也不会偏低
+        rate = np.nan_to_num(volume_delta) / interval
+        alpha = 1 - 0.5 ** (interval / self.surge_halflife)
+        self._volume_rate += alpha * (rate - self._volume_rate)
+        self._volume_rate_weight += alpha * (1 - self._volume_rate_weight)
+        return volume_delta, amount_delta, ratio, new_surges
+
+    # ------------------------------------------------------------------ 查询
+
+    def _speed(self, rows: np.ndarray | None, window: float) -> np.ndarray:
+        size = len(self.symbols) if rows is None else len(rows)
+        if not len(self.ring):
+            return np.full(size, np.nan)
+        age = self.ring.age_at(self.ring.time() - window)
+        if age is None:
+            return np.full(size, np.nan)
+        now, then = self.ring.latest("price"), self.ring.latest("price", age)
+        if rows is not None:
+            now, then = now[rows], then[rows]
+        return (now / then - 1) * 100
+
+    def speed(self, window: float | None = None) -> np.ndarray:
+        """
+        全部股票在最近 `window` 秒内的涨跌幅（%），与 `symbols` 对应；缓冲区中的历史不足一个窗口时为 NaN。
+
+        :param window: 时间窗口（秒），默认为 `speed_window`。
+        """
+        return self._speed(None, window or self.speed_window)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        全部股票的当前状态：价格、涨跌幅、涨速、累计成交，以及涨停、跌停、放量标记。
+        """
+        quotes = self._quotes
+        return pd.DataFrame(
+            {
+                "symbol": self.symbols,
+                "name": self.names,
+                "price": quotes["price"],
+                "pct_change": (quotes["price"] / quotes["prev_close"] - 1) * 100,
+                "speed": self.speed(),
+                "volume": quotes["volume"],
+                "amount": quotes["amount"],
+                "limit_up": self._at_limit_up,
+                "limit_down": self._at_limit_down,
+                "surging": self._surging,
+            }
+        )
+
+    def top_movers(
+        self, n: int = 10, window: float | None = None, ascending: bool = False
+    ) -> pd.DataFrame:
+        """
+        涨速最快（`ascending=True` 时为跌速最快）的 n 只股票。
+        """
+        speed = self.speed(window)
+        valid = np.flatnonzero(~np.isnan(speed))
+        key = speed[valid] if ascending else -speed[valid]
+        if len(valid) > n:
+            picked = np.argpartition(key, n)[:n]
+            valid, key = valid[picked], key[picked]
+        rows = valid[np.argsort(key, kind="stable")]
+        quotes = self._quotes
+        return pd.DataFrame(
+            {
+                "symbol": self.symbols[rows],
+                "name": self.names[rows],
+                "price": quotes["price"][rows],
+                "pct_change": (quotes["price"][rows] / quotes["prev_close"][rows] - 1)
+                * 100,
+                "speed": speed[rows],
+            }
+        )
+
+    def group_stats(self, column: str = "industry", snapshot=None) -> pd.DataFrame:
+        """
+        按行业或市场类型汇总当前行情（板块轮动）：股票数、上涨和下跌家数、涨停数、平均涨跌幅。
+
+        :param column: 市场快照中的分类列，"industry" 或 "market_type"。
+        :param snapshot: MarketSnapshot，默认使用进程内共享的市场快照。
+        :return: 以类别为索引、按平均涨跌幅降序排列的 DataFrame，没有分类的股票归入 "未知"。
+        """
+        if snapshot is None:
+            from autostock.datamanager.market_snapshot import get_market_snapshot
+
+            snapshot = get_market_snapshot()
+        rows = snapshot.rows(self.symbols)
+        codes = np.where(rows >= 0, snapshot.codes(column)[rows], -1)
+        labels = np.append(snapshot.categories[column], "未知")
+        # 编码 -1（未知）放在最后一个桶
+        bins = np.where(codes < 0, len(labels) - 1, codes)
+        pct = (self._quotes["price"] / self._quotes["prev_close"] - 1) * 100
+        quoted = ~np.isnan(pct)
+
+        def count(mask: np.ndarray) -> np.ndarray:
+            return np.bincount(bins[mask], minlength=len(labels))
+
+        total = count(quoted)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = (
+                np.bincount(bins[quoted], weights=pct[quoted], minlength=len(labels))
+                / total
+            )
+        frame = pd.DataFrame(
+            {
+                "count": total,
+                "advancing": count(self._direction == _UP),
+                "declining": count(self._direction == _DOWN),
+                "limit_up": count(self._at_limit_up),
+                "mean_pct_change": mean,
+            },
+            index=pd.Index(labels, name=column),
+        )
+        frame = frame[frame["count"] > 0]
+        return frame.sort_values("mean_pct_change", ascending=False, kind="stable")
+
+    # ------------------------------------------------------------------ 轮询
+
+    def poll(self) -> MonitorTick | None:
+        """
+        从数据源获取一次实时行情并更新，获取失败时返回 None。
+        """
+        if self.fetcher is None:
+            raise ValueError("MarketMonitor needs a fetcher to poll quotes.")
+        quotes = self.fetcher.get_realtime_quotes()
+        if quotes is None or quotes.empty:
+            print("WARN: No realtime quotes received, skipping this tick.")
+            return None
+        return self.update(quotes)
+
+    def run(
+        self,
+        interval: float = 5.0,
+        max_ticks: int | None = None,
+        on_tick=None,
+        stop: threading.Event | None = None,
+    ) -> int:
+        """
+        按固定间隔轮询，直到达到 `max_ticks`、`stop` 被设置或被 Ctrl+C 中断。
+
+        间隔从每次轮询开始时计算，网络请求和处理的耗时不会累积成漂移；
+        一次轮询超过间隔时立即开始下一次并打印警告。
+
+        :param interval: 轮询间隔（秒）。
+        :param max_ticks: 最多轮询次数，None 表示不限。
+        :param on_tick: 每次成功更新后的回调，参数为 MonitorTick。
+        :param stop: 用于从其他线程停止监控的事件。
+        :return: 成功处理的行情次数。
+        """
+        print(f"INFO: Market monitor started, polling every {interval:g}s.")
+        stop = stop or threading.Event()
+        polls = processed = 0
+        next_poll = time.monotonic()
+        try:
+            while not stop.is_set() and (max_ticks is None or polls < max_ticks):
+                tick = self.poll()
+                polls += 1
+                if tick is not None:
+                    processed += 1
+                    if on_tick is not None:
+                        on_tick(tick)
+                if max_ticks is not None and polls >= max_ticks:
+                    break
+                next_poll += interval
+                delay = next_poll - time.monotonic()
+                if delay < 0:
+                    print(
+                        f"WARN: Market monitor is {-delay:.1f}s behind its "
+                        f"{interval:g}s interval."
+                    )
+                    next_poll = time.monotonic()
+                    continue
+                stop.wait(delay)
+        except KeyboardInterrupt:
+            print("INFO: Market monitor interrupted.")
+        print(f"INFO: Market monitor stopped after {processed} update(s).")
+        return processed
+
+
+def _float_values(series: pd.Series) -> np.ndarray:
+    # 数据源偶尔用 "-" 表示缺失值，这时整列是字符串
+    if not pd.api.types.is_numeric_dtype(series):
+        series = pd.to_numeric(series, errors="coerce")
+    return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _same(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # 两边都是 NaN 也算没有变化
+    return (a == b) | (np.isnan(a) & np.isnan(b))
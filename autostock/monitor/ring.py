@@ -0,0 +1,111 @@
+import numpy as np
+
+
+class SnapshotRing:
+    """
+    固定容量的列式环形缓冲区，保存最近 `capacity` 个全市场快照。
+
+    每个字段是一个 (capacity, size) 的 float64 数组，一行是一个快照、一列是一只股票。
+    写入新快照只覆盖最旧的一行，不分配内存，因此无论运行多久，内存占用和每次写入的耗时都不变。
+    快照的时间戳必须单调递增，按时间查找历史快照用二分查找。
+    """
+
+    def __init__(self, fields: tuple[str, ...], size: int, capacity: int):
+        """
+        :param fields: 字段名，如 ("price", "volume")。
+        :param size: 股票数量（列数）。
+        :param capacity: 保存的快照数量。
+        """
+        if capacity < 2:
+            raise ValueError("A snapshot ring needs a capacity of at least 2.")
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self.size = size
+        self.times = np.full(capacity, np.nan)
+        self.data = {name: np.full((capacity, size), np.nan) for name in self.fields}
+        # 累计写入的快照数，最新快照位于 (count - 1) % capacity
+        self.count = 0
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    @property
+    def nbytes(self) -> int:
+        return self.times.nbytes + sum(values.nbytes for values in self.data.values())
+
+    def push(self, time: float, values: dict[str, np.ndarray]) -> None:
+        """
+        写入一个快照。
+
+        :param time: 时间戳（秒），必须大于上一个快照的时间戳。
+        :param values: 字段名 -> 长度为 `size` 的数组。
+        """
+        if self.count and time <= self.times[self._slot(0)]:
+            raise ValueError("Snapshot times must be increasing.")
+        slot = self.count % self.capacity
+        self.times[slot] = time
+        for name in self.fields:
+            self.data[name][slot] = values[name]
+        self.count += 1
+
+    def latest(self, name: str, age: int = 0) -> np.ndarray:
+        """
+        倒数第 `age` 个快照（0 为最新）中某个字段的值，返回缓冲区中的视图。
+        """
+        if not 0 <= age < len(self):
+            raise IndexError(f"Snapshot age {age} out of range ({len(self)} stored).")
+        return self.data[name][self._slot(age)]
+
+    def time(self, age: int = 0) -> float:
+        """
+        倒数第 `age` 个快照的时间戳。
+        """
+        if not 0 <= age < len(self):
+            raise IndexError(f"Snapshot age {age} out of range ({len(self)} stored).")
+        return float(self.times[self._slot(age)])
+
+    def age_at(self, time: float) -> int | None:
+        """
+        时间戳不晚于 `time` 的最新快照的 age；所有快照都晚于 `time` 时返回 None。
+        """
+        times = self.times[self._order()]
+        position = int(np.searchsorted(times, time, side="right"))
+        if position == 0:
+            return None
+        return len(times) - position
+
+    def window(self, name: str, length: int | None = None) -> np.ndarray:
+        """
+        最近 `length` 个快照中某个字段的值，按时间先后排列，形状为 (length, size)（副本）。
+
+        :param length: 快照数量，None 表示全部已保存的快照。
+        """
+        order = self._order()
+        if length is not None:
+            order = order[len(order) - min(length, len(order)) :]
+        return self.data[name][order]
+
+    def resize(self, size: int) -> None:
+        """
+        扩大列数（新增的股票），新列的历史值为 NaN。
+        """
+        if size <= self.size:
+            return
+        for name in self.fields:
+            grown = np.full((self.capacity, size), np.nan)
+            grown[:, : self.size] = self.data[name]
+            self.data[name] = grown
+        self.size = size
+
+    def clear(self) -> None:
+        self.times[:] = np.nan
+        for values in self.data.values():
+            values[:] = np.nan
+        self.count = 0
+
+    def _slot(self, age: int) -> int:
+        return (self.count - 1 - age) % self.capacity
+
+    def _order(self) -> np.ndarray:
+        # 已保存快照的槽位，按时间先后排列
+        return (self.count - len(self) + np.arange(len(self))) % self.capacity
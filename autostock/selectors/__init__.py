@@ -0,0 +1,37 @@
+# 选股器：表达式与基类见 base.py，示例选股器见 high_momentum.py。
+
+from .base import (
+    Expr,
+    ExpressionSelector,
+    SelectionContext,
+    Selector,
+    change,
+    col,
+    feature,
+    last,
+    lit,
+    mean,
+    rolling_max,
+    rolling_min,
+    std,
+    volatility,
+)
+from .high_momentum import HighMomentumSelector
+
+__all__ = [
+    "Selector",
+    "ExpressionSelector",
+    "SelectionContext",
+    "Expr",
+    "col",
+    "lit",
+    "last",
+    "change",
+    "mean",
+    "std",
+    "rolling_max",
+    "rolling_min",
+    "volatility",
+    "feature",
+    "HighMomentumSelector",
+]
@@ -0,0 +1,992 @@
+"""
+选股器框架。
+
+筛选条件和打分都写成可组合的表达式，例如::
+
+    momentum = change(20)
+    conditions = [
+        ~col("name").like("%ST%"),
+        momentum > 0,
+        last("close") > mean("close", 60),
+    ]
+    score = 0.7 * momentum.rank(pct=True) + 0.3 * (-volatility(20)).rank(pct=True)
+
+表达式的叶子节点有两类：
+
+- 基本面字段 `col(...)`：market_overview 表中的列；
+- 行情字段 `last/change/mean/...` 和指标 `feature(...)`：由 日期 x 股票 面板在选股日的截面计算得到。
+
+只用到基本面字段的选股器编译为一条 DuckDB 查询；用到行情的选股器一次加载整个股票池的面板，
+每个节点对全部股票做一次数组运算得到 (股票数,) 的向量，没有按股票的 Python 循环。
+
+排名、标准化等截面运算在整个股票池上进行（在筛选之前），然后应用筛选条件、按得分排序并取前 N 名。
+"""
+
+import re
+import warnings
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from autostock.database.connection import get_connection_manager
+from autostock.datamanager.feature_store import FEATURES
+from autostock.datamanager.market_snapshot import get_market_snapshot
+from autostock.datamanager.ops import tracking_ops
+from autostock.datamanager.panel import DailyPanel
+
+# 行情表达式按交易日计算窗口，换算成加载面板用的自然日时留出周末和长假的余量
+CALENDAR_DAYS_PER_TRADING_DAY = 1.6
+CALENDAR_DAYS_MARGIN = 30
+
+
+@dataclass
+class SelectionContext:
+    """
+    一次选股的截面数据：股票列表、与之对齐的基本面列，以及截止到选股日的行情面板。
+
+    同一个表达式（按文本表示）在一个上下文中只计算一次，条件和打分共用的子表达式不会重复计算。
+    """
+
+    symbols: list[str]
+    columns: dict[str, np.ndarray] = field(default_factory=dict)
+    panel: DailyPanel | None = None
+    cache: dict[str, np.ndarray] = field(default_factory=dict)
+
+    @classmethod
+    def from_data(
+        cls,
+        panel: DailyPanel | None = None,
+        fundamentals: pd.DataFrame | None = None,
+        symbols: list[str] | None = None,
+        as_of: date | np.datetime64 | None = None,
+    ) -> "SelectionContext":
+        """
+        由内存中的数据构建上下文，例如在回测中按调仓日反复选股。
+
+        :param panel: 行情面板。
+        :param fundamentals: 基本面数据，需要包含 symbol 列。
+        :param symbols: 股票池，None 时使用面板（或基本面数据）中的全部股票。
+        :param as_of: 选股日，面板只保留该日及之前的行（视图，不复制）。
+        """
+        if symbols is None:
+            if panel is not None:
+                symbols = list(panel.symbols)
+            elif fundamentals is not None:
+                symbols = fundamentals["symbol"].tolist()
+            else:
+                raise ValueError("Either a panel or fundamentals is required.")
+        if panel is not None:
+            if as_of is not None:
+                end = np.searchsorted(
+                    panel.dates, np.datetime64(as_of, "ns"), side="right"
+                )
+                panel = DailyPanel(
+                    dates=panel.dates[:end],
+                    symbols=panel.symbols,
+                    fields={
+                        name: values[:end] for name, values in panel.fields.items()
+                    },
+                )
+            if list(panel.symbols) != list(symbols):
+                panel = panel.select(symbols)
+        columns = {}
+        if fundamentals is not None:
+            aligned = fundamentals.drop_duplicates("symbol").set_index("symbol")
+            aligned = aligned.reindex(symbols)
+            columns = {name: _column_values(aligned[name]) for name in aligned.columns}
+        return cls(symbols=list(symbols), columns=columns, panel=panel)
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self.columns:
+            raise ValueError(f"Unknown fundamental column '{name}'.")
+        return self.columns[name]
+
+    def field_window(self, name: str, rows: int) -> np.ndarray:
+        """
+        行情字段最后 `rows` 个交易日的 (行数, 股票数) 矩阵，历史不足时在前面补 NaN。
+        """
+        if self.panel is None:
+            raise ValueError("This expression needs daily price data.")
+        values = self.panel[name][-rows:]
+        if len(values) < rows:
+            padding = np.full((rows - len(values), len(self.symbols)), np.nan)
+            values = np.concatenate([padding, values])
+        return values
+
+
+def _column_values(series: pd.Series) -> np.ndarray:
+    # 数值列转换为带 NaN 的 float64，日期列转换为 datetime64[D]，其余保持为对象数组
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.to_numpy().astype("datetime64[D]")
+    values = series.to_numpy(dtype=object)
+    if series.notna().any() and isinstance(series.dropna().iloc[0], date):
+        return pd.to_datetime(series).to_numpy().astype("datetime64[D]")
+    return values
+
+
+# ---------------------------------------------------------------------- 表达式
+
+
+class Expr(ABC):
+    """
+    选股表达式的基类。
+
+    支持算术运算（+ - * /）、比较（> >= < <= == !=）和逻辑组合（& | ~），
+    以及 `rank`、`zscore`、`isin`、`like`、`between` 等方法。
+    每个节点既可以对 SelectionContext 求值得到 (股票数,) 的数组，
+    只由基本面字段组成时也可以编译为 SQL 表达式。
+    """
+
+    # 能否编译为 SQL（只涉及基本面字段）
+    sql_compatible = True
+
+    def children(self) -> tuple["Expr", ...]:
+        return ()
+
+    def walk(self):
+        """
+        深度优先遍历表达式树中的全部节点。
+        """
+        yield self
+        for child in self.children():
+            yield from child.walk()
+
+    def evaluate(self, ctx: SelectionContext) -> np.ndarray:
+        key = repr(self)
+        if key not in ctx.cache:
+            ctx.cache[key] = self._evaluate(ctx)
+        return ctx.cache[key]
+
+    @abstractmethod
+    def _evaluate(self, ctx: SelectionContext) -> np.ndarray:
+        """
+        对选股上下文求值，返回 (股票数,) 的数组；结果由 `evaluate` 按表达式缓存。
+        """
+
+    def to_sql(self) -> str:
+        raise ValueError(f"{self!r} cannot be compiled to SQL.")
+
+    # ---- 组合
+
+    def __add__(self, other):
+        return Arithmetic("+", self, wrap(other))
+
+    def __radd__(self, other):
+        return Arithmetic("+", wrap(other), self)
+
+    def __sub__(self, other):
+        return Arithmetic("-", self, wrap(other))
+
+    def __rsub__(self, other):
+        return Arithmetic("-", wrap(other), self)
+
+    def __mul__(self, other):
+        return Arithmetic("*", self, wrap(other))
+
+    def __rmul__(self, other):
+        return Arithmetic("*", wrap(other), self)
+
+    def __truediv__(self, other):
+        return Arithmetic("/", self, wrap(other))
+
+    def __rtruediv__(self, other):
+        return Arithmetic("/", wrap(other), self)
+
+    def __neg__(self):
+        return Arithmetic("*", Literal(-1), self)
+
+    def __gt__(self, other):
+        return Compare(">", self, wrap(other))
+
+    def __ge__(self, other):
+        return Compare(">=", self, wrap(other))
+
+    def __lt__(self, other):
+        return Compare("<", self, wrap(other))
+
+    def __le__(self, other):
+        return Compare("<=", self, wrap(other))
+
+    def __eq__(self, other):
+        return Compare("==", self, wrap(other))
+
+    def __ne__(self, other):
+        return Compare("!=", self, wrap(other))
+
+    def __and__(self, other):
+        return Logical("AND", self, wrap(other))
+
+    def __rand__(self, other):
+        return Logical("AND", wrap(other), self)
+
+    def __or__(self, other):
+        return Logical("OR", self, wrap(other))
+
+    def __ror__(self, other):
+        return Logical("OR", wrap(other), self)
+
+    def __invert__(self):
+        return Not(self)
+
+    # 重载了 == 之后表达式不能作为字典键，缓存使用文本表示
+    __hash__ = None
+
+    def __bool__(self):
+        raise TypeError(
+            "Selector expressions have no truth value, use & | ~ instead of and/or/not."
+        )
+
+    # ---- 截面运算
+
+    def rank(self, ascending: bool = True, pct: bool = False) -> "Expr":
+        """
+        截面排名（并列取最小名次），缺失值不参与排名。
+
+        :param ascending: True 表示最小值排第1（与 pandas 相同），此时 pct 排名越大数值越大。
+        :param pct: 返回名次 / 有效股票数，取值 (0, 1]。
+        """
+        return Rank(self, ascending, pct)
+
+    def zscore(self) -> "Expr":
+        """
+        截面标准化：(x - 均值) / 样本标准差。
+        """
+        return ZScore(self)
+
+    def isin(self, values) -> "Expr":
+        return IsIn(self, tuple(values))
+
+    def like(self, pattern: str) -> "Expr":
+        """
+        SQL LIKE 匹配，`%` 匹配任意字符串，`_` 匹配单个字符，区分大小写。
+        """
+        return Like(self, pattern)
+
+    def between(self, low, high) -> "Expr":
+        """
+        low <= x <= high。
+        """
+        return (self >= low) & (self <= high)
+
+    def isnull(self) -> "Expr":
+        return IsNull(self)
+
+    def notnull(self) -> "Expr":
+        return Not(IsNull(self))
+
+    def fillna(self, value) -> "Expr":
+        return FillNa(self, wrap(value))
+
+    def abs(self) -> "Expr":
+        return Abs(self)
+
+
+def wrap(value) -> Expr:
+    return value if isinstance(value, Expr) else Literal(value)
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class Column(Expr):
+    name: str
+
+    def __repr__(self):
+        return f"col({self.name!r})"
+
+    def _evaluate(self, ctx):
+        return ctx.column(self.name)
+
+    def to_sql(self):
+        return _quote(self.name)
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class Literal(Expr):
+    value: Any
+
+    def __repr__(self):
+        return repr(self.value)
+
+    def _evaluate(self, ctx):
+        if isinstance(self.value, date):
+            return np.datetime64(self.value, "D")
+        return self.value
+
+    def to_sql(self):
+        value = self.value
+        if value is None:
+            return "NULL"
+        if isinstance(value, bool):
+            return "TRUE" if value else "FALSE"
+        if isinstance(value, date):
+            return f"DATE '{value.isoformat()}'"
+        if isinstance(value, str):
+            return "'" + value.replace("'", "''") + "'"
+        return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class _Node(Expr):
+    """
+    有子节点的表达式：能否编译为 SQL 取决于全部子节点。
+    """
+
+    def children(self):
+        return tuple(
+            value for value in self.__dict__.values() if isinstance(value, Expr)
+        )
+
+    @property
+    def sql_compatible(self):
+        return all(child.sql_compatible for child in self.children())
+
+
+_ARITHMETIC = {"+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide}
+_COMPARE = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class Arithmetic(_Node):
+    op: str
+    left: Expr
+    right: Expr
+
+    def __repr__(self):
+        return f"({self.left!r} {self.op} {self.right!r})"
+
+    def _evaluate(self, ctx):
+        left = _as_float(self.left.evaluate(ctx))
+        right = _as_float(self.right.evaluate(ctx))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return _ARITHMETIC[self.op](left, right)
+
+    def to_sql(self):
+        # 与 numpy 后端一样按 float64 计算，条件（布尔值）也可以参与运算
+        left, right = self.left.to_sql(), self.right.to_sql()
+        return f"(CAST({left} AS DOUBLE) {self.op} CAST({right} AS DOUBLE))"
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class Compare(_Node):
+    op: str
+    left: Expr
+    right: Expr
+
+    def __repr__(self):
+        return f"({self.left!r} {self.op} {self.right!r})"
+
+    def _evaluate(self, ctx):
+        left, right = self.left.evaluate(ctx), self.right.evaluate(ctx)
+        with np.errstate(invalid="ignore"):
+            result = _COMPARE[self.op](left, right)
+        # 缺失值参与的比较为 False（与 SQL 中的 COALESCE(..., FALSE) 一致）
+        return np.asarray(result, dtype=bool) & _present(left) & _present(right)
+
+    def to_sql(self):
+        op = "=" if self.op == "==" else self.op
+        return f"COALESCE({self.left.to_sql()} {op} {self.right.to_sql()}, FALSE)"
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class Logical(_Node):
+    op: str
+    left: Expr
+    right: Expr
+
+    def __repr__(self):
+        symbol = "&" if self.op == "AND" else "|"
+        return f"({self.left!r} {symbol} {self.right!r})"
+
+    def _evaluate(self, ctx):
+        func = np.logical_and if self.op == "AND" else np.logical_or
+        return func(
+            _as_bool(self.left.evaluate(ctx)), _as_bool(self.right.evaluate(ctx))
+        )
+
+    def to_sql(self):
+        return f"({self.left.to_sql()} {self.op} {self.right.to_sql()})"
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class Not(_Node):
+    operand: Expr
+
+    def __repr__(self):
+        return f"~{self.operand!r}"
+
+    def _evaluate(self, ctx):
+        return ~_as_bool(self.operand.evaluate(ctx))
+
+    def to_sql(self):
+        return f"(NOT {self.operand.to_sql()})"
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class IsNull(_Node):
+    operand: Expr
+
+    def __repr__(self):
+        return f"{self.operand!r}.isnull()"
+
+    def _evaluate(self, ctx):
+        return ~_present(self.operand.evaluate(ctx))
+
+    def to_sql(self):
+        return f"({self.operand.to_sql()} IS NULL)"
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class FillNa(_Node):
+    operand: Expr
+    value: Expr
+
+    def __repr__(self):
+        return f"{self.operand!r}.fillna({self.value!r})"
+
+    def _evaluate(self, ctx):
+        values = self.operand.evaluate(ctx)
+        fill = self.value.evaluate(ctx)
+        return np.where(_present(values), values, fill)
+
+    def to_sql(self):
+        return f"COALESCE({self.operand.to_sql()}, {self.value.to_sql()})"
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class Abs(_Node):
+    operand: Expr
+
+    def __repr__(self):
+        return f"{self.operand!r}.abs()"
+
+    def _evaluate(self, ctx):
+        return np.abs(_as_float(self.operand.evaluate(ctx)))
+
+    def to_sql(self):
+        return f"abs({self.operand.to_sql()})"
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class IsIn(_Node):
+    operand: Expr
+    values: tuple
+
+    def __repr__(self):
+        return f"{self.operand!r}.isin({list(self.values)!r})"
+
+    def _evaluate(self, ctx):
+        values = self.operand.evaluate(ctx)
+        return pd.Series(values).isin(self.values).to_numpy() & _present(values)
+
+    def to_sql(self):
+        if not self.values:
+            return "FALSE"
+        items = ", ".join(Literal(value).to_sql() for value in self.values)
+        return f"COALESCE({self.operand.to_sql()} IN ({items}), FALSE)"
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class Like(_Node):
+    operand: Expr
+    pattern: str
+
+    def __repr__(self):
+        return f"{self.operand!r}.like({self.pattern!r})"
+
+    def _evaluate(self, ctx):
+        regex = "".join(
+            ".*" if ch == "%" else "." if ch == "_" else re.escape(ch)
+            for ch in self.pattern
+        )
+        values = pd.Series(self.operand.evaluate(ctx), dtype=object)
+        return (
+            values.str.fullmatch(regex, flags=re.DOTALL)
+            .fillna(False)
+            .to_numpy(dtype=bool)
+        )
+
+    def to_sql(self):
+        return f"COALESCE({self.operand.to_sql()} LIKE {Literal(self.pattern).to_sql()}, FALSE)"
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class Rank(_Node):
+    operand: Expr
+    ascending: bool = True
+    pct: bool = False
+
+    def __repr__(self):
+        return f"{self.operand!r}.rank(ascending={self.ascending}, pct={self.pct})"
+
+    def _evaluate(self, ctx):
+        values = _as_float(self.operand.evaluate(ctx))
+        values = np.broadcast_to(values, (len(ctx.symbols),))
+        valid = ~np.isnan(values)
+        keys = values[valid] if self.ascending else -values[valid]
+        ranks = np.full(len(values), np.nan)
+        # 并列取最小名次：在排好序的数组中查找第一个相等元素的位置
+        ranks[valid] = np.searchsorted(np.sort(keys), keys, side="left") + 1
+        if self.pct:
+            ranks /= max(int(valid.sum()), 1)
+        return ranks
+
+    def to_sql(self):
+        operand = self.operand.to_sql()
+        order = "ASC" if self.ascending else "DESC"
+        rank = f"rank() OVER (ORDER BY {operand} {order} NULLS LAST)"
+        if self.pct:
+            rank = f"{rank} / count({operand}) OVER ()"
+        return f"(CASE WHEN {operand} IS NULL THEN NULL ELSE {rank} END)"
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class ZScore(_Node):
+    operand: Expr
+
+    def __repr__(self):
+        return f"{self.operand!r}.zscore()"
+
+    def _evaluate(self, ctx):
+        values = _as_float(self.operand.evaluate(ctx))
+        valid = ~np.isnan(values)
+        if valid.sum() < 2:
+            return np.full(values.shape, np.nan)
+        mean = values[valid].mean()
+        std = values[valid].std(ddof=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (values - mean) / std if std > 0 else np.full(values.shape, np.nan)
+
+    def to_sql(self):
+        operand = self.operand.to_sql()
+        return (
+            f"(({operand} - avg({operand}) OVER ()) "
+            f"/ NULLIF(stddev_samp({operand}) OVER (), 0))"
+        )
+
+
+# ---------------------------------------------------------------------- 行情表达式
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class Window(Expr):
+    """
+    行情字段在选股日之前一段交易日上的截面统计。
+
+    - last: 选股日的值；
+    - change: 相对 `window` 个交易日前的涨跌幅；
+    - mean/std/max/min: 最近 `window` 个交易日的统计量；
+    - volatility: 最近 `window` 个日收益率的标准差。
+
+    窗口内有效值少于 `min_periods`（默认为整个窗口）时结果为 NaN，例如期间停牌过的股票。
+    """
+
+    how: str
+    field: str
+    window: int = 1
+    min_periods: int | None = None
+
+    sql_compatible = False
+
+    def __repr__(self):
+        return (
+            f"{self.how}({self.field!r}, {self.window}, min_periods={self.min_periods})"
+        )
+
+    @property
+    def rows(self) -> int:
+        return self.window + 1 if self.how in ("change", "volatility") else self.window
+
+    def _evaluate(self, ctx):
+        values = ctx.field_window(self.field, self.rows)
+        if self.how == "last":
+            return values[-1]
+        if self.how == "change":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return values[-1] / values[0] - 1.0
+        if self.how == "volatility":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                values = values[1:] / values[:-1] - 1.0
+        count = np.sum(~np.isnan(values), axis=0)
+        with warnings.catch_warnings(), np.errstate(invalid="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)
+            if self.how == "mean":
+                result = np.nanmean(values, axis=0)
+            elif self.how == "max":
+                result = np.nanmax(values, axis=0)
+            elif self.how == "min":
+                result = np.nanmin(values, axis=0)
+            elif self.how in ("std", "volatility"):
+                result = np.nanstd(values, axis=0, ddof=1)
+            else:
+                raise ValueError(f"Unknown window statistic '{self.how}'.")
+        required = self.window if self.min_periods is None else self.min_periods
+        return np.where(count >= max(required, 1), result, np.nan)
+
+
+@dataclass(frozen=True, eq=False, repr=False)
+class Feature(Expr):
+    """
+    已注册特征（见 `feature_store.FEATURES`）在选股日的值。
+
+    只用最近 `lookback` 个交易日计算，EMA 类指标需要足够长的窗口才能与全历史的结果一致。
+    """
+
+    name: str
+    output: str
+    params: tuple = ()
+    lookback: int = 250
+
+    sql_compatible = False
+
+    def __repr__(self):
+        params = "".join(f", {k}={v!r}" for k, v in self.params)
+        return (
+            f"feature({self.name!r}, {self.output!r}{params}, lookback={self.lookback})"
+        )
+
+    @property
+    def rows(self) -> int:
+        return self.lookback
+
+    @property
+    def inputs(self) -> tuple[str, ...]:
+        return FEATURES[self.name].inputs
+
+    def _evaluate(self, ctx):
+        spec = FEATURES[self.name]
+        inputs = [ctx.field_window(name, self.lookback) for name in spec.inputs]
+        result = spec.func(*inputs, **dict(self.params))
+        result = result if isinstance(result, tuple) else (result,)
+        return result[spec.outputs.index(self.output)][-1]
+
+
+def col(name: str) -> Expr:
+    """
+    market_overview 中的基本面字段，例如 col("industry")、col("list_date")。
+    """
+    return Column(name)
+
+
+def lit(value) -> Expr:
+    return Literal(value)
+
+
+def last(field: str = "close") -> Expr:
+    """
+    选股日的行情字段值。
+    """
+    return Window("last", field, 1)
+
+
+def change(window: int, field: str = "close") -> Expr:
+    """
+    最近 `window` 个交易日的涨跌幅。
+    """
+    return Window("change", field, window)
+
+
+def mean(field: str, window: int, min_periods: int | None = None) -> Expr:
+    return Window("mean", field, window, min_periods)
+
+
+def std(field: str, window: int, min_periods: int | None = None) -> Expr:
+    return Window("std", field, window, min_periods)
+
+
+def rolling_max(field: str, window: int, min_periods: int | None = None) -> Expr:
+    return Window("max", field, window, min_periods)
+
+
+def rolling_min(field: str, window: int, min_periods: int | None = None) -> Expr:
+    return Window("min", field, window, min_periods)
+
+
+def volatility(
+    window: int, field: str = "close", min_periods: int | None = None
+) -> Expr:
+    """
+    最近 `window` 个日收益率的标准差（不年化）。
+    """
+    return Window("volatility", field, window, min_periods)
+
+
+def feature(
+    name: str, output: str | None = None, lookback: int = 250, **params
+) -> Expr:
+    """
+    已注册特征在选股日的值，例如 feature("rsi", period=6)、feature("macd", "hist")。
+
+    :param name: 特征名。
+    :param output: 输出列名，特征只有一个输出时可以省略。
+    :param lookback: 计算时使用的交易日数。
+    :param params: 特征参数，未给出的取默认值。
+    """
+    if name not in FEATURES:
+        raise ValueError(f"Unknown feature '{name}', available: {sorted(FEATURES)}.")
+    spec = FEATURES[name]
+    spec.key(params)  # 检查参数名
+    if output is None:
+        if len(spec.outputs) > 1:
+            raise ValueError(f"Feature '{name}' has outputs {spec.outputs}, pick one.")
+        output = spec.outputs[0]
+    elif output not in spec.outputs:
+        raise ValueError(f"Feature '{name}' has no output '{output}'.")
+    return Feature(name, output, tuple(sorted(params.items())), lookback)
+
+
+def _present(values) -> np.ndarray:
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        return ~np.isnan(values)
+    if values.dtype.kind in "mM":
+        return ~np.isnat(values)
+    if values.dtype.kind == "O":
+        return pd.notna(values)
+    return np.ones(values.shape, dtype=bool)
+
+
+def _as_float(values) -> np.ndarray | float:
+    return np.asarray(values, dtype=np.float64)
+
+
+def _as_bool(values) -> np.ndarray:
+    values = np.asarray(values)
+    if values.dtype.kind == "b":
+        return values
+    # 数值作为条件时，非零且非缺失为真
+    return _present(values) & (np.nan_to_num(_as_float(values)) != 0)
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+# ---------------------------------------------------------------------- 选股器
+
+
+class Selector:
+    """
+    选股器基类。
+
+    子类通过 `conditions()` 给出筛选条件（全部满足才入选），`score()` 给出打分表达式（越大越好，
+    `ascending=True` 时越小越好），`outputs()` 给出需要一并输出的列，`top_n` 限制入选数量。
+    """
+
+    name = "base"
+    top_n: int | None = None
+    ascending = False
+
+    def conditions(self) -> list[Expr]:
+        return []
+
+    def score(self) -> Expr | None:
+        return None
+
+    def outputs(self) -> dict[str, Expr]:
+        return {}
+
+    def expressions(self) -> list[Expr]:
+        score = self.score()
+        return (
+            self.conditions()
+            + ([score] if score is not None else [])
+            + list(self.outputs().values())
+        )
+
+    @property
+    def sql_compatible(self) -> bool:
+        """
+        只涉及基本面字段时可以编译为一条 DuckDB 查询。
+        """
+        return all(expr.sql_compatible for expr in self.expressions())
+
+    def requirements(self) -> tuple[set[str], set[str], int]:
+        """
+        返回需要的基本面列、行情字段，以及需要的交易日数。
+        """
+        columns, fields, rows = set(), set(), 0
+        for expr in self.expressions():
+            for node in expr.walk():
+                if isinstance(node, Column):
+                    columns.add(node.name)
+                elif isinstance(node, Window):
+                    fields.add(node.field)
+                    rows = max(rows, node.rows)
+                elif isinstance(node, Feature):
+                    fields.update(node.inputs)
+                    rows = max(rows, node.rows)
+        return columns, fields, rows
+
+    def select(
+        self,
+        manager=None,
+        as_of: date | None = None,
+        universe: list[str] | None = None,
+        backend: str | None = None,
+    ) -> pd.DataFrame:
+        """
+        运行选股。
+
+        :param manager: DataManager，用到行情字段时用于加载面板。
+        :param as_of: 选股日，None 表示本地数据的最新交易日。基本面字段总是 market_overview 的当前值。
+        :param universe: 股票池，None 表示 market_overview 中的全部股票。
+        :param backend: "duckdb" 或 "numpy"，None 时自动选择（只涉及基本面字段时用 duckdb）。
+        :return: 入选股票的 DataFrame：symbol、score、rank（从1开始）以及 `outputs()` 中的列，按名次排序。
+        """
+        backend = backend or ("duckdb" if self.sql_compatible else "numpy")
+        print(f"INFO: Running selector '{self.name}' with the {backend} backend...")
+        if backend == "duckdb":
+            sql, params = self.to_sql(universe)
+            result = get_connection_manager().query_df(sql, params)
+        elif backend == "numpy":
+            result = self.evaluate(self.load_context(manager, as_of, universe))
+        else:
+            raise ValueError(f"Unknown backend '{backend}'.")
+        print(f"INFO: Selector '{self.name}' selected {len(result)} stocks.")
+        return result
+
+    def load_context(
+        self, manager, as_of: date | None = None, universe: list[str] | None = None
+    ) -> SelectionContext:
+        """
+        从共享的市场快照取需要的基本面列，一次扫描加载股票池在选股日之前的行情面板。
+        """
+        columns, fields, rows = self.requirements()
+        fundamentals = get_market_snapshot().to_frame(
+            sorted(columns - {"symbol"}), universe
+        )
+        symbols = fundamentals["symbol"].tolist()
+
+        panel = None
+        if fields:
+            if manager is None:
+                raise ValueError(
+                    f"Selector '{self.name}' needs a DataManager for price data."
+                )
+            end_date = as_of or tracking_ops.get_latest_daily_date() or date.today()
+            start_date = end_date - timedelta(
+                days=int(rows * CALENDAR_DAYS_PER_TRADING_DAY) + CALENDAR_DAYS_MARGIN
+            )
+            panel = manager.get_daily_panel(
+                symbols, sorted(fields), start_date, end_date
+            )
+            if not len(panel.dates):
+                print(f"WARN: No daily data between {start_date} and {end_date}.")
+        return SelectionContext.from_data(panel, fundamentals, symbols)
+
+    def evaluate(self, ctx: SelectionContext) -> pd.DataFrame:
+        """
+        在给定的截面数据上运行选股，每个表达式对全部股票做一次数组运算。
+        """
+        size = len(ctx.symbols)
+        mask = np.ones(size, dtype=bool)
+        for condition in self.conditions():
+            mask &= np.broadcast_to(_as_bool(condition.evaluate(ctx)), (size,))
+
+        score = self.score()
+        if score is not None:
+            values = np.broadcast_to(_as_float(score.evaluate(ctx)), (size,))
+            mask &= ~np.isnan(values)
+        else:
+            values = np.full(size, np.nan)
+
+        selected = np.flatnonzero(mask)
+        if score is not None:
+            keys = values[selected] if self.ascending else -values[selected]
+            # 稳定排序：得分相同时按股票代码顺序
+            selected = selected[np.argsort(keys, kind="stable")]
+        selected = selected[: self.top_n]
+
+        result = pd.DataFrame(
+            {
+                "symbol": np.asarray(ctx.symbols, dtype=object)[selected],
+                "score": values[selected],
+                "rank": np.arange(1, len(selected) + 1),
+            }
+        )
+        for name, expr in self.outputs().items():
+            result[name] = np.broadcast_to(expr.evaluate(ctx), (size,))[selected]
+        return result
+
+    def to_sql(self, universe: list[str] | None = None) -> tuple[str, list | None]:
+        """
+        编译为一条 DuckDB 查询：内层在整个股票池上计算条件、得分和输出列（窗口函数在这里计算），
+        外层筛选、排序并取前 N 名。
+
+        :return: (SQL, 参数)。
+        """
+        conditions = self.conditions()
+        score = self.score()
+        outputs = self.outputs()
+        inner = [f"{expr.to_sql()} AS _c{i}" for i, expr in enumerate(conditions)] + [
+            f"{score.to_sql() if score is not None else 'NULL'} AS score"
+        ]
+        inner += [
+            f"{expr.to_sql()} AS {_quote(name)}" for name, expr in outputs.items()
+        ]
+        sql = f"SELECT symbol, {', '.join(inner)} FROM market_overview"
+        params = None
+        if universe is not None:
+            sql += " WHERE symbol IN (SELECT unnest(?::VARCHAR[]))"
+            params = [list(universe)]
+
+        where = [f"_c{i}" for i in range(len(conditions))]
+        if score is not None:
+            where.append("score IS NOT NULL")
+        order = "score " + ("ASC" if self.ascending else "DESC") + ", symbol"
+        if score is None:
+            order = "symbol"
+        columns = ["symbol", "score", f'row_number() OVER (ORDER BY {order}) AS "rank"']
+        columns += [_quote(name) for name in outputs]
+        sql = f"SELECT {', '.join(columns)} FROM ({sql})"
+        if where:
+            sql += f" WHERE {' AND '.join(where)}"
+        sql += ' ORDER BY "rank"'
+        if self.top_n is not None:
+            sql += f" LIMIT {int(self.top_n)}"
+        return sql, params
+
+
+class ExpressionSelector(Selector):
+    """
+    直接由表达式构造的选股器，适合在 Notebook 中临时筛选::
+
+        ExpressionSelector([col("industry") == "银行"], score=col("last_price"), top_n=10)
+    """
+
+    def __init__(
+        self,
+        conditions: list[Expr] | None = None,
+        score: Expr | None = None,
+        outputs: dict[str, Expr] | None = None,
+        top_n: int | None = None,
+        ascending: bool = False,
+        name: str = "expression",
+    ):
+        self._conditions = list(conditions or [])
+        self._score = score
+        self._outputs = dict(outputs or {})
+        self.top_n = top_n
+        self.ascending = ascending
+        self.name = name
+
+    def conditions(self) -> list[Expr]:
+        return self._conditions
+
+    def score(self) -> Expr | None:
+        return self._score
+
+    def outputs(self) -> dict[str, Expr]:
+        return self._outputs
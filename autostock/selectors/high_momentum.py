@@ -0,0 +1,71 @@
+from autostock.selectors.base import (
+    Expr,
+    Selector,
+    change,
+    col,
+    feature,
+    last,
+    mean,
+    volatility,
+)
+
+
+class HighMomentumSelector(Selector):
+    """
+    高动量选股：中短期涨幅靠前、趋势向上、成交放量、波动不过大的股票。
+
+    筛选条件：
+    - 排除 ST 股票；
+    - 最近 `period` 日上涨，且收盘价站上 `trend` 日均线；
+    - 最近5日平均成交量高于 `trend` 日平均成交量（放量）；
+    - RSI 未进入超买区（< `max_rsi`）。
+
+    得分为三个截面百分位排名的加权和：`period` 日涨幅、`trend` 日涨幅、波动率（越低越好）。
+    """
+
+    name = "high_momentum"
+
+    def __init__(
+        self,
+        period: int = 20,
+        trend: int = 60,
+        max_rsi: float = 80.0,
+        top_n: int | None = 50,
+        weights: tuple[float, float, float] = (0.5, 0.3, 0.2),
+    ):
+        """
+        :param period: 短期动量的交易日数。
+        :param trend: 趋势（均线、中期动量、成交量基准）的交易日数。
+        :param max_rsi: RSI(14) 的上限。
+        :param top_n: 入选数量，None 表示不限。
+        :param weights: 短期动量、中期动量、低波动三项得分的权重。
+        """
+        self.period = period
+        self.trend = trend
+        self.max_rsi = max_rsi
+        self.top_n = top_n
+        self.weights = weights
+
+    def conditions(self) -> list[Expr]:
+        return [
+            ~col("name").like("%ST%"),
+            change(self.period) > 0,
+            last("close") > mean("close", self.trend),
+            mean("volume", 5) > mean("volume", self.trend),
+            feature("rsi", period=14) < self.max_rsi,
+        ]
+
+    def score(self) -> Expr:
+        short, medium, calm = self.weights
+        return (
+            short * change(self.period).rank(pct=True)
+            + medium * change(self.trend).rank(pct=True)
+            + calm * volatility(self.period).rank(ascending=False, pct=True)
+        )
+
+    def outputs(self) -> dict[str, Expr]:
+        return {
+            "name": col("name"),
+            "momentum": change(self.period),
+            "volatility": volatility(self.period),
+        }
@@ -0,0 +1,157 @@
+"""
+Startup-time benchmark of the `autostock` command line.
+
+Builds a small offline data directory with the LocalFetcher, then runs each
+read-only command in a fresh interpreter several times and reports wall-clock
+times. It also reports which heavy modules each command ended up importing,
+so an accidental eager import shows up immediately. For comparison it times a
+bare `import autostock.datamanager.manager`, which is what every command used
+to pay before the CLI existed.
+
+    python scripts/benchmark_cli_startup.py --repeat 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# 只读命令不应导入的模块
+HEAVY_MODULES = ["pandas", "sqlalchemy", "sqlmodel", "akshare", "tqdm"]
+
+COMMANDS = [
+    ["--help"],
+    ["query", "history", "sz000001"],
+    ["query", "history", "sz000001", "--start", "2024-01-01", "--csv"],
+    ["query", "overview", "--limit", "5"],
+    ["health"],
+]
+
+# 在子进程中运行命令，并报告加载了哪些重量级模块
+PROBE = """
+import contextlib, io, json, sys
+from autostock.cli import main
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        main(json.loads(sys.argv[1]))
+    except SystemExit:
+        pass
+print(json.dumps([m for m in {heavy} if m in sys.modules]))
+"""
+
+
+def prepare_data(num_symbols: int) -> None:
+    """Syncs a small offline universe into ./datas, then releases the database."""
+    from sqlmodel import SQLModel
+
+    from autostock.database.connection import get_connection_manager
+    from autostock.database.engine import engine
+    from autostock.datamanager.local_fetcher import LocalFetcher
+    from autostock.datamanager.manager import DataManager
+
+    SQLModel.metadata.create_all(engine)
+    manager = DataManager(
+        fetcher=LocalFetcher(num_symbols=num_symbols, history_start="20150101")
+    )
+    manager.sync_market_overview()
+    manager.sync_daily_history(
+        codes=["sz000001"] + manager.get_stock_list()[: num_symbols - 1],
+        requests_per_second=0,
+    )
+    # DuckDB 同一时间只允许一个进程以写模式打开数据库，释放后子进程才能只读连接
+    engine.dispose()
+    get_connection_manager().close()
+
+
+def time_command(argv: list[str], repeat: int, env: dict) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "autostock.cli", *argv],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def loaded_heavy_modules(argv: list[str], env: dict) -> list[str]:
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            PROBE.format(heavy=HEAVY_MODULES),
+            json.dumps(argv),
+        ],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--keep", action="store_true", help="keep the temp directory")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="autostock_cli_bench_")
+    # 数据库路径是相对路径，切换到临时目录后所有数据都写在那里
+    os.chdir(workdir)
+    Path("datas").mkdir()
+    print(f"🚀 Benchmarking CLI startup in {workdir}")
+    prepare_data(args.symbols)
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(PROJECT_ROOT)] + [p for p in [env.get("PYTHONPATH")] if p]
+    )
+
+    baseline = [
+        "-c",
+        "import autostock.datamanager.manager",
+    ]
+    rows = []
+    for argv in COMMANDS:
+        timings = time_command(argv, args.repeat, env)
+        rows.append((" ".join(argv), timings, loaded_heavy_modules(argv, env)))
+
+    baseline_timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *baseline], env=env, check=False)
+        baseline_timings.append(time.perf_counter() - started)
+
+    print("\n================ CLI startup benchmark ================")
+    print(f"{'command':<50} {'min':>8} {'median':>8}  heavy modules")
+    for name, timings, heavy in rows:
+        print(
+            f"{'autostock ' + name:<50} {min(timings) * 1000:>6.0f}ms "
+            f"{statistics.median(timings) * 1000:>6.0f}ms  {', '.join(heavy) or '-'}"
+        )
+    print(
+        f"{'python -c ' + repr(baseline[1]):<50} "
+        f"{min(baseline_timings) * 1000:>6.0f}ms "
+        f"{statistics.median(baseline_timings) * 1000:>6.0f}ms  (DataManager import)"
+    )
+
+    if not args.keep:
+        import shutil
+
+        os.chdir(PROJECT_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("🏁 Benchmark finished.")
@@ -0,0 +1,111 @@
+"""
+Benchmark of the preloaded array-backed backtrader datafeed against PandasData.
+
+Builds an offline data directory with the LocalFetcher, then runs the same
+empty strategy several times with (1) PandasData feeds built from
+`DataManager.get_daily_history` for every run, and (2) `ArrayData` feeds from
+`load_market_data`, where the first run loads the daily panel and later runs
+reuse the in-process buffers. With an empty strategy the timings are dominated
+by data loading.
+
+    python scripts/benchmark_datafeed.py --symbols 200 --runs 3
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def quiet(func, *args, **kwargs):
+    # DataManager 的进度输出会淹没结果表
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="keep the temp directory")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="autostock_datafeed_bench_")
+    # 数据库路径是相对路径，切换到临时目录后所有数据都写在那里
+    os.chdir(workdir)
+    Path("datas").mkdir()
+    print(f"🚀 Preparing {args.symbols} symbols in {workdir}...")
+
+    import backtrader as bt
+    import pandas as pd
+    from sqlmodel import SQLModel
+
+    from autostock.backtesting.datafeed import load_market_data
+    from autostock.database.engine import engine
+    from autostock.datamanager.local_fetcher import LocalFetcher
+    from autostock.datamanager.manager import DataManager
+
+    SQLModel.metadata.create_all(engine)
+    manager = DataManager(
+        fetcher=LocalFetcher(
+            num_symbols=args.symbols, history_start="20100101", history_end="20240531"
+        )
+    )
+    quiet(manager.sync_market_overview)
+    quiet(manager.sync_daily_history, requests_per_second=0)
+    symbols = quiet(manager.get_stock_list)
+
+    def pandas_feeds() -> list:
+        feeds = []
+        for symbol in symbols:
+            df = manager.get_daily_history(symbol, use_cache=False)
+            df = df.set_index(pd.to_datetime(df["trade_date"]))
+            feeds.append(
+                bt.feeds.PandasData(
+                    dataname=df[["open", "high", "low", "close", "volume"]],
+                    name=symbol,
+                    openinterest=None,
+                )
+            )
+        return feeds
+
+    def array_feeds() -> list:
+        return load_market_data(manager, symbols).feeds()
+
+    def run(make_feeds) -> tuple[float, int]:
+        started = time.perf_counter()
+        cerebro = bt.Cerebro(stdstats=False)
+        for feed in make_feeds():
+            cerebro.adddata(feed)
+        cerebro.addstrategy(bt.Strategy)
+        strategy = cerebro.run()[0]
+        bars = sum(len(data) for data in strategy.datas)
+        return time.perf_counter() - started, bars
+
+    print("\n================ Datafeed benchmark ================")
+    print(f"{'run':<6} {'PandasData':>12} {'ArrayData':>12} {'speedup':>8}")
+    for i in range(args.runs):
+        pandas_time, pandas_bars = quiet(run, pandas_feeds)
+        array_time, array_bars = quiet(run, array_feeds)
+        print(
+            f"{i + 1:<6} {pandas_time:>11.2f}s {array_time:>11.2f}s "
+            f"{pandas_time / array_time:>7.1f}x"
+        )
+        if pandas_bars != array_bars:
+            print(f"❌ Bar count mismatch: {pandas_bars} vs {array_bars}")
+    print(f"ℹ️  {array_bars} bars per run across {len(symbols)} symbols.")
+
+    if not args.keep:
+        import shutil
+
+        engine.dispose()
+        os.chdir(PROJECT_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("🏁 Benchmark finished.")
@@ -0,0 +1,120 @@
+"""
+Benchmark of the persistent feature store against recomputing indicators.
+
+Builds an offline data directory with the LocalFetcher, then for each feature
+times (1) loading the daily panel and computing the indicator from scratch,
+(2) the first `get_feature_panel` call, which computes and writes the cache,
+and (3) a repeated call, which only reads the cache. Finally it re-syncs a
+fraction of the symbols with one more month of data and times the next call,
+which recomputes only the symbols whose daily data version changed.
+
+    python scripts/benchmark_feature_store.py --symbols 1000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# 特征名 -> 参数
+FEATURES = {
+    "rsi": {"period": 14},
+    "macd": {},
+    "kdj": {},
+    "bollinger": {"period": 20},
+}
+
+
+def quiet(func, *args, **kwargs):
+    # DataManager 的进度输出会淹没结果表
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def timed(func, *args, **kwargs) -> float:
+    started = time.perf_counter()
+    quiet(func, *args, **kwargs)
+    return time.perf_counter() - started
+
+
+def make_manager(num_symbols: int, history_end: str):
+    from autostock.datamanager.local_fetcher import LocalFetcher
+    from autostock.datamanager.manager import DataManager
+
+    return DataManager(
+        fetcher=LocalFetcher(
+            num_symbols=num_symbols, history_start="20100101", history_end=history_end
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=1000)
+    parser.add_argument(
+        "--resync", type=float, default=0.05, help="fraction of symbols to re-sync"
+    )
+    parser.add_argument("--keep", action="store_true", help="keep the temp directory")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="autostock_feature_bench_")
+    # 数据库路径是相对路径，切换到临时目录后所有数据都写在那里
+    os.chdir(workdir)
+    Path("datas").mkdir()
+    print(f"🚀 Preparing {args.symbols} symbols in {workdir}...")
+
+    from sqlmodel import SQLModel
+
+    from autostock.database.engine import engine
+    from autostock.datamanager.feature_store import FEATURES as SPECS
+
+    SQLModel.metadata.create_all(engine)
+    manager = make_manager(args.symbols, "20240531")
+    quiet(manager.sync_market_overview)
+    quiet(manager.sync_daily_history, requests_per_second=0)
+    symbols = quiet(manager.get_stock_list)
+
+    def recompute(name: str, params: dict) -> None:
+        spec = SPECS[name]
+        panel = manager.get_daily_panel(symbols, fields=spec.inputs)
+        spec.func(*(panel[f] for f in spec.inputs), **params)
+
+    print("\n================ Feature store benchmark ================")
+    print(f"{'feature':<12} {'recompute':>10} {'cold':>8} {'warm':>8} {'speedup':>8}")
+    for name, params in FEATURES.items():
+        baseline = timed(recompute, name, params)
+        cold = timed(manager.get_feature_panel, name, symbols, **params)
+        warm = timed(manager.get_feature_panel, name, symbols, **params)
+        print(
+            f"{name:<12} {baseline:>9.2f}s {cold:>7.2f}s {warm:>7.2f}s "
+            f"{baseline / warm:>7.1f}x"
+        )
+
+    # 部分股票同步了新数据，它们的数据版本变化，其余股票仍然命中缓存
+    resynced = symbols[: max(1, int(len(symbols) * args.resync))]
+    newer = make_manager(args.symbols, "20240630")
+    quiet(newer.sync_daily_history, codes=resynced, requests_per_second=0)
+    print(f"\nRe-synced {len(resynced)} symbols with one more month of data:")
+    for name, params in FEATURES.items():
+        elapsed = timed(newer.get_feature_panel, name, symbols, **params)
+        print(f"  {name:<12} {elapsed:>6.2f}s")
+    stats = newer.feature_store.stats()
+    print(
+        f"ℹ️  {stats['hits']} cached / {stats['misses']} recomputed, "
+        f"{stats['bytes'] / 1024 / 1024:.1f} MB on disk"
+    )
+
+    if not args.keep:
+        import shutil
+
+        engine.dispose()
+        os.chdir(PROJECT_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("🏁 Benchmark finished.")
@@ -0,0 +1,196 @@
+"""
+Benchmark of the vectorized indicator library on a full-market panel.
+
+Builds a synthetic dates x symbols OHLC panel (random walks with staggered
+listing dates and random suspension days), times every indicator on the whole
+panel in one call, and, when TA-Lib is installed, checks a sample of symbols
+against TA-Lib run on each symbol's trading-day series.
+
+It then times the incremental (streaming) indicators: state is built on all
+but the last day, and folding in that one new bar for every symbol is timed
+and checked to be bit-identical to the full recomputation.
+
+    python scripts/benchmark_indicators.py --symbols 5000 --days 4860
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from autostock import indicators  # noqa: E402
+from autostock.indicators import streaming  # noqa: E402
+
+# 指标名 -> (调用方式, 对应的 TA-Lib 调用)，TA-Lib 中没有 KDJ
+CASES = {
+    "ma(20)": (
+        lambda p: indicators.ma(p["close"], 20),
+        lambda talib, s: talib.SMA(s["close"], 20),
+    ),
+    "ema(12)": (
+        lambda p: indicators.ema(p["close"], 12),
+        lambda talib, s: talib.EMA(s["close"], 12),
+    ),
+    "rsi(14)": (
+        lambda p: indicators.rsi(p["close"], 14),
+        lambda talib, s: talib.RSI(s["close"], 14),
+    ),
+    "macd(12,26,9)": (
+        lambda p: indicators.macd(p["close"]),
+        lambda talib, s: talib.MACD(s["close"]),
+    ),
+    "atr(14)": (
+        lambda p: indicators.atr(p["high"], p["low"], p["close"], 14),
+        lambda talib, s: talib.ATR(s["high"], s["low"], s["close"], 14),
+    ),
+    "bollinger(20,2)": (
+        lambda p: indicators.bollinger(p["close"], 20, 2.0),
+        lambda talib, s: talib.BBANDS(s["close"], 20, 2.0, 2.0),
+    ),
+    "kdj(9,3,3)": (
+        lambda p: indicators.kdj(p["high"], p["low"], p["close"]),
+        None,
+    ),
+}
+
+# 增量指标 -> 对应的全量计算
+STREAMING_CASES = {
+    "ma(20)": (lambda: streaming.StreamingMA(20), CASES["ma(20)"][0]),
+    "ema(12)": (lambda: streaming.StreamingEMA(12), CASES["ema(12)"][0]),
+    "rsi(14)": (lambda: streaming.StreamingRSI(14), CASES["rsi(14)"][0]),
+    "macd(12,26,9)": (lambda: streaming.StreamingMACD(), CASES["macd(12,26,9)"][0]),
+    "atr(14)": (lambda: streaming.StreamingATR(14), CASES["atr(14)"][0]),
+    "bollinger(20,2)": (
+        lambda: streaming.StreamingBollinger(20, 2.0),
+        CASES["bollinger(20,2)"][0],
+    ),
+    "kdj(9,3,3)": (lambda: streaming.StreamingKDJ(), CASES["kdj(9,3,3)"][0]),
+}
+
+
+def make_panel(days: int, symbols: int, suspend_rate: float, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (days, symbols)), axis=0))
+    spread = close * rng.uniform(0, 0.03, (days, symbols))
+    high = close + spread * rng.random((days, symbols))
+    low = close - spread * rng.random((days, symbols))
+
+    # 上市日期错开，另有随机停牌日
+    missing = rng.random((days, symbols)) < suspend_rate
+    listing = rng.integers(0, days // 2, symbols)
+    missing |= np.arange(days)[:, None] < listing[None, :]
+    for field in (close, high, low):
+        field[missing] = np.nan
+    return {"close": close, "high": high, "low": low}
+
+
+def compare_with_talib(panel: dict, sample: int) -> None:
+    try:
+        import talib
+    except ImportError:
+        print("ℹ️  TA-Lib is not installed, skipping the accuracy check.")
+        return
+
+    print(f"\nComparing {sample} symbols with TA-Lib (max relative error):")
+    columns = np.linspace(0, panel["close"].shape[1] - 1, sample).astype(int)
+    for name, (ours, theirs) in CASES.items():
+        if theirs is None:
+            continue
+        result = ours(panel)
+        result = result if isinstance(result, tuple) else (result,)
+        worst = 0.0
+        for j in columns:
+            trading = ~np.isnan(panel["close"][:, j])
+            series = {k: np.ascontiguousarray(v[trading, j]) for k, v in panel.items()}
+            expected = theirs(talib, series)
+            expected = expected if isinstance(expected, tuple) else (expected,)
+            for mine, ref in zip(result, expected):
+                mine = mine[trading, j]
+                both = ~np.isnan(ref) & ~np.isnan(mine)
+                if (np.isnan(ref) != np.isnan(mine)).any():
+                    worst = np.inf
+                    continue
+                if both.any():
+                    error = np.abs(mine[both] - ref[both]) / np.maximum(
+                        1.0, np.abs(ref[both])
+                    )
+                    worst = max(worst, float(error.max()))
+        status = "✅" if worst < 1e-8 else "❌"
+        print(f"  {status} {name:<16} {worst:.2e}")
+
+
+def benchmark_streaming(panel: dict, repeat: int) -> None:
+    days, symbols = panel["close"].shape
+    dates = np.datetime64("2000-01-01", "ns") + np.arange(days).astype("timedelta64[D]")
+    names = [f"s{i}" for i in range(symbols)]
+    print("\n================ Streaming: one new bar ================")
+    print(f"{'indicator':<18} {'update':>9} {'full':>9} {'exact':>6}")
+    for name, (make, full) in STREAMING_CASES.items():
+        indicator = make()
+        indicator.ensure_symbols(names)
+        inputs = {field: panel[field] for field in indicator.fields}
+        indicator.update(dates[:-1], {k: v[:-1] for k, v in inputs.items()})
+        # 每次计时都从同一个状态开始
+        state = indicator.to_arrow()
+        timings = []
+        for _ in range(repeat):
+            indicator.load_arrow(state)
+            started = time.perf_counter()
+            outputs = indicator.update(
+                dates[-1:], {k: v[-1:] for k, v in inputs.items()}
+            )
+            timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        expected = full(panel)
+        full_time = time.perf_counter() - started
+        expected = expected if isinstance(expected, tuple) else (expected,)
+        exact = all(
+            np.array_equal(outputs[output][0], values[-1], equal_nan=True)
+            for output, values in zip(indicator.outputs, expected)
+        )
+        print(
+            f"{name:<18} {min(timings) * 1000:>7.2f}ms {full_time * 1000:>7.0f}ms "
+            f"{'✅' if exact else '❌':>5}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=4860, help="about 20 years")
+    parser.add_argument("--suspend-rate", type=float, default=0.02)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sample", type=int, default=50, help="symbols to check")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(
+        f"🚀 Building a {args.days} x {args.symbols} panel "
+        f"({args.suspend_rate:.0%} suspended days)..."
+    )
+    panel = make_panel(args.days, args.symbols, args.suspend_rate, args.seed)
+
+    print("\n================ Indicator benchmark ================")
+    print(f"{'indicator':<18} {'best':>9} {'median':>9} {'cells/s':>10}")
+    cells = args.days * args.symbols
+    for name, (func, _) in CASES.items():
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            func(panel)
+            timings.append(time.perf_counter() - started)
+        best, median = min(timings), sorted(timings)[len(timings) // 2]
+        print(
+            f"{name:<18} {best * 1000:>7.0f}ms {median * 1000:>7.0f}ms "
+            f"{cells / best / 1e6:>8.1f}M"
+        )
+
+    compare_with_talib(panel, args.sample)
+    benchmark_streaming(panel, args.repeat)
+    print("🏁 Benchmark finished.")
@@ -0,0 +1,146 @@
+"""
+Benchmark of the real-time market monitor on simulated full-market quotes.
+
+Replays intraday ticks from the LocalFetcher (ak.stock_zh_a_spot_em() format,
+re-sorted on every tick like the real endpoint) and times the per-tick work of
+(1) a pandas implementation that re-cleans the whole table, merges it with the
+previous snapshot and recomputes every statistic, against (2) MarketMonitor,
+which scatters the columns into fixed arrays, diffs them and updates the
+statistics incrementally. Both must agree on the emitted changes and counts.
+
+    python scripts/benchmark_market_monitor.py --symbols 5000 --ticks 200
+"""
+
+import argparse
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from autostock.backtesting.vectorized import (  # noqa: E402
+    LIMIT_PRICE_TOLERANCE,
+    price_limit_rates,
+)
+from autostock.datamanager.cleaner import standardize_symbols  # noqa: E402
+from autostock.datamanager.local_fetcher import LocalFetcher  # noqa: E402
+from autostock.monitor import MarketMonitor  # noqa: E402
+
+RENAME = {
+    "代码": "code",
+    "名称": "name",
+    "最新价": "price",
+    "成交量": "volume",
+    "成交额": "amount",
+    "昨收": "prev_close",
+}
+
+
+class PandasMonitor:
+    """
+    逐个快照重新处理整张表的实现，作为正确性和速度的基准。
+    """
+
+    def __init__(self, speed_window: float):
+        self.speed_window = speed_window
+        self.history: deque[tuple[float, pd.DataFrame]] = deque(maxlen=240)
+        self.touched: set[str] = set()
+
+    def update(self, quotes: pd.DataFrame, at: datetime) -> tuple[pd.DataFrame, dict]:
+        df = quotes[list(RENAME)].rename(columns=RENAME)
+        df["symbol"] = standardize_symbols(df["code"])
+        rates = price_limit_rates(df["symbol"].tolist())
+        df["limit_up"] = np.floor(df["prev_close"] * (1 + rates) * 100 + 0.5) / 100
+        df["limit_down"] = np.floor(df["prev_close"] * (1 - rates) * 100 + 0.5) / 100
+        df = df.set_index("symbol").sort_index()
+
+        changes = df
+        if self.history:
+            previous = self.history[-1][1]
+            moved = df["price"].ne(previous["price"]) & ~(
+                df["price"].isna() & previous["price"].isna()
+            )
+            changes = df[moved | df["volume"].ne(previous["volume"])]
+        # 涨速：与 speed_window 秒之前的快照合并
+        past = [
+            frame
+            for t, frame in self.history
+            if t <= at.timestamp() - self.speed_window
+        ]
+        speed = (
+            (changes["price"] / past[-1]["price"].reindex(changes.index) - 1) * 100
+            if past
+            else pd.Series(np.nan, index=changes.index)
+        )
+        changes = changes.assign(speed=speed)
+
+        at_up = df["price"] >= df["limit_up"] - LIMIT_PRICE_TOLERANCE
+        at_down = df["price"] <= df["limit_down"] + LIMIT_PRICE_TOLERANCE
+        self.touched |= set(df.index[at_up])
+        stats = {
+            "advancing": int((df["price"] > df["prev_close"]).sum()),
+            "declining": int((df["price"] < df["prev_close"]).sum()),
+            "limit_up": int(at_up.sum()),
+            "limit_down": int(at_down.sum()),
+            "limit_up_broken": len(self.touched - set(df.index[at_up])),
+        }
+        self.history.append((at.timestamp(), df))
+        return changes, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=5000)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds")
+    args = parser.parse_args()
+
+    print(f"🚀 Simulating {args.ticks} ticks of {args.symbols} symbols...")
+    fetcher = LocalFetcher(num_symbols=args.symbols)
+    ticks = [fetcher.get_realtime_quotes().copy() for _ in range(args.ticks)]
+    opening = datetime.now().replace(hour=9, minute=30, second=0, microsecond=0)
+    times = [opening + timedelta(seconds=args.interval * i) for i in range(args.ticks)]
+
+    baseline = PandasMonitor(speed_window=60)
+    pandas_times, expected = [], []
+    for quotes, at in zip(ticks, times):
+        started = time.perf_counter()
+        expected.append(baseline.update(quotes, at))
+        pandas_times.append(time.perf_counter() - started)
+
+    monitor = MarketMonitor(speed_window=60)
+    monitor_times, same = [], True
+    for (changes, stats), quotes, at in zip(expected, ticks, times):
+        started = time.perf_counter()
+        tick = monitor.update(quotes, at)
+        monitor_times.append(time.perf_counter() - started)
+        got = tick.changes.set_index("symbol").sort_index()
+        same = same and got.index.equals(changes.index)
+        same = same and np.allclose(got["speed"], changes["speed"], equal_nan=True)
+        same = same and all(getattr(tick.stats, k) == v for k, v in stats.items())
+
+    pandas_ms = np.array(pandas_times[1:]) * 1000
+    monitor_ms = np.array(monitor_times[1:]) * 1000
+    print("\n================ Per-tick processing ================")
+    print(f"{'':<16} {'mean':>8} {'p99':>8} {'max':>8}")
+    for label, values in (("pandas", pandas_ms), ("MarketMonitor", monitor_ms)):
+        print(
+            f"{label:<16} {values.mean():>6.2f}ms {np.percentile(values, 99):>6.2f}ms "
+            f"{values.max():>6.2f}ms"
+        )
+    print(f"speedup          {pandas_ms.mean() / monitor_ms.mean():>7.1f}x")
+    changed = np.mean([len(changes) for changes, _ in expected[1:]])
+    print(f"ℹ️  {changed:.0f} of {args.symbols} symbols changed per tick on average")
+    print(
+        f"ℹ️  Ring buffer: {len(monitor.ring)} snapshots, "
+        f"{monitor.ring.nbytes / 1024 / 1024:.1f} MB"
+    )
+    print(f"ℹ️  Last tick: {monitor.stats}")
+    print(f"{'✅' if same else '❌'} Changes and statistics identical: {same}")
+    print("🏁 Benchmark finished.")
@@ -0,0 +1,120 @@
+"""
+Benchmark of market_overview queries: ORM hydration versus columnar results.
+
+Builds an offline database with the LocalFetcher's market overview, then times
+(1) the previous implementation, which loads every row as a MarketOverview ORM
+object and calls model_dump() per row, against (2) `query_market_overview`
+returning a DataFrame and (3) an Arrow table straight from DuckDB, for the full
+table and for a filtered, ordered and limited query.
+
+    python scripts/benchmark_market_overview.py --symbols 5000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def quiet(func, *args, **kwargs):
+    # DataManager 的进度输出会淹没结果表
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def best_of(repeat: int, func, *args, **kwargs) -> tuple[float, object]:
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = quiet(func, *args, **kwargs)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="keep the temp directory")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="autostock_overview_bench_")
+    # 数据库路径是相对路径，切换到临时目录后所有数据都写在那里
+    os.chdir(workdir)
+    Path("datas").mkdir()
+    print(f"🚀 Preparing {args.symbols} symbols in {workdir}...")
+
+    import pandas as pd
+    from sqlmodel import SQLModel, select
+
+    from autostock.database.engine import engine
+    from autostock.database.models import MarketOverview
+    from autostock.datamanager.local_fetcher import LocalFetcher
+    from autostock.datamanager.manager import DataManager
+    from autostock.datamanager.ops import market_ops
+    from autostock.datamanager.session import get_session
+
+    SQLModel.metadata.create_all(engine)
+    manager = DataManager(fetcher=LocalFetcher(num_symbols=args.symbols))
+    quiet(manager.sync_market_overview)
+
+    def orm_query(**kwargs) -> pd.DataFrame:
+        # 之前的实现：逐行构造ORM对象，再逐行 model_dump()
+        with get_session() as session:
+            statement = select(MarketOverview)
+            for key, value in kwargs.items():
+                statement = statement.where(getattr(MarketOverview, key) == value)
+            results = session.exec(statement).all()
+            return pd.DataFrame([r.model_dump() for r in results])
+
+    rich = dict(
+        last_price__between=(10, 50),
+        name__like="%0%",
+        industry__isnull=True,
+        market_type__in=["沪市主板", "深市主板", "创业板"],
+        order_by="-last_price",
+        limit=100,
+    )
+    cases = [
+        ("full table", orm_query, {}, {}),
+        (
+            "market_type == 沪市主板",
+            orm_query,
+            {"market_type": "沪市主板"},
+            {"market_type": "沪市主板"},
+        ),
+        ("range/IN/LIKE/null + top 100", None, None, rich),
+    ]
+
+    print("\n================ market_overview queries ================")
+    print(f"{'query':<30} {'ORM':>9} {'DataFrame':>10} {'Arrow':>9} {'rows':>6}")
+    for label, baseline, orm_filters, filters in cases:
+        orm_time = "-"
+        if baseline is not None:
+            elapsed, orm_df = best_of(args.repeat, baseline, **orm_filters)
+            orm_time = f"{elapsed * 1000:.1f}ms"
+        df_time, df = best_of(args.repeat, market_ops.query_market_overview, **filters)
+        arrow_time, table = best_of(
+            args.repeat, market_ops.query_market_overview, as_arrow=True, **filters
+        )
+        if baseline is not None and len(orm_df) != len(df):
+            print(f"❌ Row count mismatch: {len(orm_df)} vs {len(df)}")
+        print(
+            f"{label:<30} {orm_time:>9} {df_time * 1000:>8.1f}ms "
+            f"{arrow_time * 1000:>7.1f}ms {table.num_rows:>6}"
+        )
+
+    if not args.keep:
+        import shutil
+
+        engine.dispose()
+        os.chdir(PROJECT_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("🏁 Benchmark finished.")
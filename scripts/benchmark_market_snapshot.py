@@ -0,0 +1,133 @@
+"""
+Benchmark of the shared in-memory market snapshot versus per-call DuckDB queries.
+
+Builds an offline database with the LocalFetcher's market overview, then times
+what consumers do repeatedly: fetch the full symbol list, look up a single
+stock, filter by market type and by price range. Each is done once with a
+`query_market_overview` round trip and once against `get_market_snapshot()`,
+including the version check that decides whether the snapshot is reloaded.
+
+    python scripts/benchmark_market_snapshot.py --symbols 5000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def quiet(func, *args, **kwargs):
+    # DataManager 的进度输出会淹没结果表
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def per_call(repeat: int, func) -> tuple[float, object]:
+    result = func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - started) / repeat, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="keep the temp directory")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="autostock_snapshot_bench_")
+    # 数据库路径是相对路径，切换到临时目录后所有数据都写在那里
+    os.chdir(workdir)
+    Path("datas").mkdir()
+    print(f"🚀 Preparing {args.symbols} symbols in {workdir}...")
+
+    from sqlmodel import SQLModel
+
+    import autostock.database.models  # noqa: F401  注册所有表
+    from autostock.database.engine import engine
+    from autostock.datamanager.local_fetcher import LocalFetcher
+    from autostock.datamanager.manager import DataManager
+    from autostock.datamanager.ops import market_ops
+
+    SQLModel.metadata.create_all(engine)
+    manager = DataManager(fetcher=LocalFetcher(num_symbols=args.symbols))
+    quiet(manager.sync_market_overview)
+
+    started = time.perf_counter()
+    snapshot = quiet(manager.get_market_snapshot)
+    load_time = time.perf_counter() - started
+    print(
+        f"ℹ️  Snapshot version {snapshot.version}: {len(snapshot)} stocks, "
+        f"{snapshot.nbytes / 1024:.0f} KiB, loaded in {load_time * 1000:.1f} ms"
+    )
+    symbol = snapshot.symbols[len(snapshot) // 2]
+
+    cases = [
+        (
+            "symbol list",
+            lambda: market_ops.get_all_market_overview()["symbol"].tolist(),
+            lambda get: get().symbols.tolist(),
+        ),
+        (
+            "lookup one symbol",
+            lambda: market_ops.query_market_overview(symbol=symbol),
+            lambda get: get().get(symbol),
+        ),
+        (
+            "market_type == 创业板",
+            lambda: market_ops.query_market_overview(
+                market_type="创业板", order_by="symbol"
+            )["symbol"].tolist(),
+            lambda get: get().filter(market_type="创业板"),
+        ),
+        (
+            "last_price 10..50",
+            lambda: market_ops.query_market_overview(
+                last_price__between=(10, 50), order_by="symbol"
+            )["symbol"].tolist(),
+            lambda get: get().filter(last_price__between=(10, 50)),
+        ),
+    ]
+
+    print("\n================ per call ================")
+    print(f"{'consumer':<24} {'DuckDB':>9} {'snapshot':>9} {'no check':>9}")
+    for label, query, cached in cases:
+        query_time, expected = per_call(args.repeat, query)
+        cached_time, result = per_call(
+            args.repeat, lambda cached=cached: cached(manager.get_market_snapshot)
+        )
+        # refresh=False 时不检查版本号，只剩内存中的查找
+        local_time, _ = per_call(
+            args.repeat,
+            lambda cached=cached: cached(lambda: manager.get_market_snapshot(False)),
+        )
+        if isinstance(expected, list) and expected != result:
+            print(f"❌ Result mismatch for {label}")
+        print(
+            f"{label:<24} {query_time * 1000:>7.2f}ms {cached_time * 1000:>7.2f}ms "
+            f"{local_time * 1000:>7.3f}ms"
+        )
+
+    version = quiet(manager.sync_market_overview)["version"]
+    reloaded = quiet(manager.get_market_snapshot)
+    print(
+        f"\n{'✅' if reloaded.version == version else '❌'} After a new sync the snapshot "
+        f"was reloaded at version {reloaded.version}."
+    )
+
+    if not args.keep:
+        import shutil
+
+        engine.dispose()
+        os.chdir(PROJECT_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("🏁 Benchmark finished.")
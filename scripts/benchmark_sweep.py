@@ -0,0 +1,123 @@
+"""
+Benchmark of the multi-process parameter sweep on a shared-memory panel.
+
+Builds a synthetic dates x symbols panel (see benchmark_indicators.py) and
+sweeps a moving-average crossover strategy over a fast x slow grid, first with
+one worker and then with the requested number of workers, reporting trials per
+second and the speedup. It then re-runs the sweep to show that finished trials
+are skipped, and runs a second sweep with early stopping.
+
+    python scripts/benchmark_sweep.py --symbols 1000 --days 1200 --workers 8
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from autostock import indicators  # noqa: E402
+from autostock.backtesting import (  # noqa: E402
+    ParameterSweep,
+    SharedPanel,
+    equal_weights,
+    hold_from_signals,
+    parameter_grid,
+    run_backtest,
+)
+from autostock.datamanager.panel import DailyPanel  # noqa: E402
+from benchmark_indicators import make_panel  # noqa: E402
+
+
+def ma_cross(panel: DailyPanel, fast: int, slow: int, max_positions: int) -> dict:
+    # 目标函数在工作进程中执行，必须定义在模块顶层
+    fast_ma = indicators.ma(panel["close"], fast)
+    slow_ma = indicators.ma(panel["close"], slow)
+    held = hold_from_signals(fast_ma > slow_ma, fast_ma < slow_ma)
+    weights = equal_weights(held, max_positions=max_positions)
+    return run_backtest(panel, weights, record_positions=False).metrics()
+
+
+def quiet(func, *args, **kwargs):
+    # 扫描的进度输出会淹没结果表
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=1200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"🚀 Building a {args.days} x {args.symbols} panel...")
+    fields = make_panel(args.days, args.symbols, 0.02, args.seed)
+    rng = np.random.default_rng(args.seed)
+    fields["open"] = fields["close"] * (1 + rng.normal(0, 0.005, fields["close"].shape))
+    dates = np.datetime64("2019-01-02", "ns") + np.arange(args.days).astype(
+        "timedelta64[D]"
+    )
+    symbols = [f"sz{i:06d}" for i in range(args.symbols)]
+    panel = DailyPanel(dates=dates, symbols=symbols, fields=fields)
+    grid = parameter_grid(
+        fast=[3, 5, 10, 15], slow=[20, 30, 60, 120], max_positions=[20, 50]
+    )
+    results_path = (
+        Path(tempfile.mkdtemp(prefix="autostock_sweep_bench_")) / "sweeps.duckdb"
+    )
+
+    with SharedPanel(panel) as shared:
+        print(
+            f"ℹ️  Shared panel: {shared.nbytes / 1024 / 1024:.1f} MB, {len(grid)} trials"
+        )
+        print("\n================ Parameter sweep ================")
+        print(f"{'workers':<8} {'time':>8} {'trials/s':>9} {'speedup':>8}")
+        baseline = None
+        for workers in dict.fromkeys([1, args.workers]):
+            sweep = ParameterSweep(
+                f"ma_cross_w{workers}",
+                ma_cross,
+                shared,
+                workers=workers,
+                results_path=results_path,
+            )
+            started = time.perf_counter()
+            results = quiet(sweep.run, grid)
+            elapsed = time.perf_counter() - started
+            baseline = baseline or elapsed
+            print(
+                f"{workers:<8} {elapsed:>7.2f}s {len(grid) / elapsed:>9.2f} "
+                f"{baseline / elapsed:>7.1f}x"
+            )
+
+        # 再次运行同名扫描：所有试验都已完成，直接返回结果
+        started = time.perf_counter()
+        quiet(sweep.run, grid)
+        print(
+            f"\nResumed run:     {time.perf_counter() - started:>6.2f}s (0 new trials)"
+        )
+
+        stopping = ParameterSweep(
+            "ma_cross_patience",
+            ma_cross,
+            shared,
+            workers=args.workers,
+            results_path=results_path,
+        )
+        quiet(stopping.run, grid, patience=8)
+        print(f"Early stopping:  {len(stopping.results())}/{len(grid)} trials run")
+
+    ok = (results["status"] == "ok").all()
+    print(f"Best parameters: {sweep.best()}")
+    print(f"{'✅' if ok else '❌'} {len(results)} results in {results_path}")
+    print("🏁 Benchmark finished.")
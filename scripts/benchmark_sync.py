@@ -0,0 +1,146 @@
+"""
+Offline end-to-end benchmark of the sync pipeline.
+
+Runs `sync_market_overview` and `sync_daily_history` against the deterministic
+LocalFetcher (no network) at several universe sizes, each in a fresh temporary
+data directory and DuckDB file, and prints wall-clock and per-stage timings.
+
+    python scripts/benchmark_sync.py --sizes 100 1000 5000 --latency 0.05
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def run_benchmark(size: int, args: argparse.Namespace) -> dict:
+    """Runs one full sync at the given universe size and returns its timings."""
+    from sqlmodel import SQLModel
+
+    from autostock.core.config import get_settings
+    from autostock.database.connection import get_connection_manager
+    from autostock.database.engine import engine
+    from autostock.datamanager.local_fetcher import LocalFetcher
+    from autostock.datamanager.manager import DataManager
+
+    # 每次基准测试使用全新的数据库文件（先释放本进程持有的写锁）
+    engine.dispose()
+    get_connection_manager().close()
+    db_file = Path(get_settings().database_path)
+    for path in (db_file, db_file.with_suffix(".db.wal")):
+        if path.exists():
+            path.unlink()
+    SQLModel.metadata.create_all(engine)
+
+    fetcher = LocalFetcher(
+        num_symbols=size,
+        seed=args.seed,
+        latency=args.latency,
+        latency_jitter=args.latency / 2,
+        error_rate=args.error_rate,
+        rate_limit=args.server_rate_limit,
+        history_start=args.history_start,
+    )
+    manager = DataManager(
+        data_path=f"./datas/bench_{size}",
+        daily_layout=args.layout,
+        fetcher=fetcher,
+    )
+
+    started = time.perf_counter()
+    overview = manager.sync_market_overview()
+    overview_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    summary = manager.sync_daily_history(
+        workers=args.workers,
+        requests_per_second=args.rps,
+        max_retries=args.max_retries,
+        backoff=args.backoff,
+        clean_workers=args.clean_workers,
+        write_workers=args.write_workers,
+        queue_size=args.queue_size,
+    )
+    daily_seconds = time.perf_counter() - started
+
+    return {
+        "size": size,
+        "overview_seconds": overview_seconds,
+        "overview_stages": overview["stage_seconds"],
+        "daily_seconds": daily_seconds,
+        "daily_stages": summary.stage_seconds,
+        "succeeded": len(summary.succeeded),
+        "failed": len(summary.failed),
+        "skipped": len(summary.skipped),
+        "tracking_commits": summary.tracking_commits,
+        "pipeline": summary.pipeline_stats,
+        "fetcher": fetcher.stats(),
+    }
+
+
+def print_report(results: list[dict]) -> None:
+    """Prints one block of timings per universe size."""
+    print("\n================ Sync benchmark ================")
+    for r in results:
+        print(f"\n# {r['size']} symbols")
+        stages = ", ".join(f"{k}={v:.3f}s" for k, v in r["overview_stages"].items())
+        print(f"  sync_market_overview: {r['overview_seconds']:.3f}s ({stages})")
+        stages = ", ".join(f"{k}={v:.3f}s" for k, v in r["daily_stages"].items())
+        print(f"  sync_daily_history:   {r['daily_seconds']:.3f}s ({stages})")
+        print(
+            f"  symbols/s: {r['size'] / r['daily_seconds']:.1f}; "
+            f"{r['succeeded']} succeeded, {r['skipped']} skipped, {r['failed']} failed; "
+            f"{r['tracking_commits']} tracking commit(s)"
+        )
+        for name, stats in r["pipeline"].items():
+            print(
+                f"  {name:<6} x{stats['workers']}: {stats['throughput']:.1f}/s, "
+                f"utilization {stats['utilization']:.0%}, "
+                f"queue max {stats['queue_max']}/{stats['queue_size']}"
+            )
+        print(f"  fetcher: {r['fetcher']}")
+    print("\nNote: stage times are summed across worker threads.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--workers", type=int, default=8, help="fetch workers")
+    parser.add_argument("--clean-workers", type=int, default=2)
+    parser.add_argument("--write-workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=32)
+    parser.add_argument("--rps", type=float, default=0.0, help="client rate limit")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--server-rate-limit", type=float, default=0.0)
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--backoff", type=float, default=0.05)
+    parser.add_argument("--history-start", default="20150101")
+    parser.add_argument(
+        "--layout", choices=["per_symbol", "dataset"], default="per_symbol"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="keep the temp directory")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="autostock_bench_")
+    # 数据库路径是相对路径，切换到临时目录后所有数据都写在那里
+    os.chdir(workdir)
+    Path("datas").mkdir()
+    print(f"🚀 Benchmarking in {workdir}")
+
+    results = [run_benchmark(size, args) for size in args.sizes]
+    print_report(results)
+
+    if not args.keep:
+        import shutil
+
+        os.chdir(PROJECT_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("🏁 Benchmark finished.")
@@ -0,0 +1,40 @@
+import argparse
+import time
+from pathlib import Path
+
+from autostock.datamanager.ops import daily_ops
+
+
+def migrate(data_path: Path, row_group_size: int) -> bool:
+    """Migrates per-symbol daily files into the year-partitioned dataset."""
+    started = time.perf_counter()
+    try:
+        rows = daily_ops.migrate_daily_to_dataset(data_path, row_group_size)
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return False
+    if rows == 0:
+        print("❌ Nothing to migrate.")
+        return False
+
+    files = sorted((data_path / daily_ops.DAILY_DATASET_DIR).glob("year=*/*.parquet"))
+    print(
+        f"✅ Migrated {rows} rows into {len(files)} partition files "
+        f"in {time.perf_counter() - started:.1f}s."
+    )
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Migrate datas/daily/{symbol}.parquet into datas/daily_dataset/."
+    )
+    parser.add_argument("--data-path", default="./datas")
+    parser.add_argument(
+        "--row-group-size", type=int, default=daily_ops.DATASET_ROW_GROUP_SIZE
+    )
+    args = parser.parse_args()
+
+    print("🚀 Migrating daily bars to the partitioned dataset...")
+    migrate(Path(args.data_path), args.row_group_size)
+    print("🏁 Migration finished.")
@@ -19,6 +19,7 @@ setup(
     ],
     entry_points={
         "console_scripts": [
+            "autostock=autostock.cli:main",
             "autostock_app=autostock.app:main",
             "autostock_worker=autostock.main:main",
         ],
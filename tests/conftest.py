@@ -0,0 +1,45 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# 数据库和快照目录来自全局配置，必须在导入 autostock.database 之前指向临时目录
+_TEST_ROOT = tempfile.mkdtemp(prefix="autostock_test_")
+os.environ["AUTOSTOCK_DATABASE_URL"] = f"duckdb:///{_TEST_ROOT}/market.db"
+os.environ["AUTOSTOCK_DATA_PATH"] = _TEST_ROOT
+
+from sqlmodel import SQLModel  # noqa: E402
+
+import autostock.database.models  # noqa: E402, F401  注册所有表
+from autostock.database.engine import engine  # noqa: E402
+from autostock.datamanager.market_snapshot import clear_market_snapshot  # noqa: E402
+from autostock.datamanager.session import get_raw_connection, get_session  # noqa: E402
+
+TABLES = (
+    "sync_checkpoint",
+    "sync_run",
+    "data_tracking",
+    "market_overview",
+    "data_version",
+)
+
+
+@pytest.fixture(scope="session")
+def database():
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+    shutil.rmtree(_TEST_ROOT, ignore_errors=True)
+
+
+@pytest.fixture
+def clean_tables(database):
+    """
+    清空所有表和进程内的市场快照。
+    """
+    with get_session() as session:
+        conn = get_raw_connection(session)
+        for table in TABLES:
+            conn.execute(f"DELETE FROM {table}")
+    clear_market_snapshot()
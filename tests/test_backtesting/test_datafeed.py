@@ -0,0 +1,211 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+bt = pytest.importorskip("backtrader")
+
+from autostock.backtesting.datafeed import (  # noqa: E402
+    MarketData,
+    clear_market_data_cache,
+    date_numbers,
+    load_market_data,
+)
+from autostock.datamanager.local_fetcher import LocalFetcher  # noqa: E402
+from autostock.datamanager.manager import DataManager  # noqa: E402
+from autostock.datamanager.ops import tracking_ops  # noqa: E402
+from autostock.datamanager.panel import DailyPanel  # noqa: E402
+from autostock.datamanager.session import get_session  # noqa: E402
+
+FIELDS = ("open", "high", "low", "close", "volume")
+SYMBOLS = ["sh600000", "sz000001", "sz300750", "bj830799"]
+
+
+@pytest.fixture(scope="module")
+def panel() -> DailyPanel:
+    """
+    60个工作日、4只股票：sz000001 中间停牌5天，sz300750 第8天才上市，bj830799 没有数据。
+    """
+    rng = np.random.default_rng(11)
+    dates = pd.bdate_range("2024-01-01", periods=60).to_numpy(dtype="datetime64[ns]")
+    shape = (len(dates), len(SYMBOLS))
+    close = (10 * np.exp(np.cumsum(rng.normal(0, 0.02, shape), axis=0))).round(2)
+    open_ = (close * (1 + rng.normal(0, 0.005, shape))).round(2)
+    fields = {
+        "open": open_,
+        "high": np.fmax(open_, close) + 0.05,
+        "low": np.fmin(open_, close) - 0.05,
+        "close": close,
+        "volume": rng.integers(1_000, 100_000, shape).astype(np.float64),
+    }
+    missing = np.zeros(shape, dtype=bool)
+    missing[20:25, 1] = True
+    missing[:8, 2] = True
+    missing[:, 3] = True
+    for values in fields.values():
+        values[missing] = np.nan
+    return DailyPanel(dates=dates, symbols=SYMBOLS, fields=fields)
+
+
+def pandas_feed(panel: DailyPanel, symbol: str, **kwargs) -> bt.feeds.PandasData:
+    j = panel.symbols.index(symbol)
+    valid = ~np.isnan(panel["close"][:, j])
+    frame = pd.DataFrame(
+        {name: panel[name][valid, j] for name in FIELDS},
+        index=pd.DatetimeIndex(panel.dates[valid]),
+    )
+    return bt.feeds.PandasData(dataname=frame, name=symbol, openinterest=None, **kwargs)
+
+
+class Recorder(bt.Strategy):
+    """
+    记录每只股票的每根新K线，并按均线交叉买卖，比较两种数据源下的K线和交易结果。
+    """
+
+    params = (("period", 5),)
+
+    def __init__(self):
+        self.bars = {data._name: [] for data in self.datas}
+        self.trades = []
+        self._seen = {data._name: 0 for data in self.datas}
+        self.sma = {
+            data._name: bt.ind.SMA(data.close, period=self.p.period)
+            for data in self.datas
+        }
+
+    def next(self):
+        for data in self.datas:
+            name = data._name
+            if len(data) == self._seen[name]:
+                continue
+            self._seen[name] = len(data)
+            self.bars[name].append(
+                (data.datetime.date(0),)
+                + tuple(float(getattr(data, field)[0]) for field in FIELDS)
+            )
+            if len(self.sma[name]) < self.p.period:
+                continue
+            position = self.getposition(data).size
+            if data.close[0] > self.sma[name][0] and not position:
+                self.buy(data=data, size=100)
+            elif data.close[0] < self.sma[name][0] and position:
+                self.close(data=data)
+
+    def notify_trade(self, trade):
+        if trade.isclosed:
+            self.trades.append((trade.data._name, round(trade.pnlcomm, 6)))
+
+
+def run(feeds, **run_kwargs):
+    cerebro = bt.Cerebro(stdstats=False)
+    for feed in feeds:
+        cerebro.adddata(feed)
+    cerebro.addstrategy(Recorder)
+    cerebro.broker.setcash(100_000)
+    strategy = cerebro.run(**run_kwargs)[0]
+    return strategy.bars, strategy.trades, cerebro.broker.getvalue()
+
+
+@pytest.mark.parametrize(
+    "run_kwargs",
+    [{}, {"preload": False}, {"runonce": False}],
+    ids=["preload", "no_preload", "no_runonce"],
+)
+@pytest.mark.parametrize(
+    "dates",
+    [{}, {"fromdate": datetime(2024, 1, 15), "todate": datetime(2024, 3, 8)}],
+    ids=["all_dates", "date_range"],
+)
+def test_matches_pandas_data(panel, run_kwargs, dates):
+    symbols = SYMBOLS[:3]
+    data = MarketData(panel)
+    expected = run([pandas_feed(panel, s, **dates) for s in symbols], **run_kwargs)
+    actual = run([data.feed(s, **dates) for s in symbols], **run_kwargs)
+
+    bars, trades, value = actual
+    assert bars == expected[0]
+    assert trades == expected[1]
+    assert value == pytest.approx(expected[2])
+    assert trades
+    if dates:
+        first = min(bar[0] for rows in bars.values() for bar in rows)
+        last = max(bar[0] for rows in bars.values() for bar in rows)
+        assert first >= date(2024, 1, 15) and last <= date(2024, 3, 8)
+
+    # 数组在多次回测之间共享，回测不会修改它们
+    assert run([data.feed(s, **dates) for s in symbols], **run_kwargs)[0] == bars
+
+
+def test_offsets_and_symbols_without_data(panel):
+    data = MarketData(panel)
+    valid = (~np.isnan(panel["close"])).sum(axis=0)
+    assert data.offsets.tolist() == [0, *np.cumsum(valid).tolist()]
+    assert data.offsets[-1] == data.offsets[-2]
+    assert len(data) == len(SYMBOLS) and "bj830799" in data
+
+    empty = data.arrays_for("bj830799")
+    assert set(empty) == {"datetime", *FIELDS}
+    assert all(len(values) == 0 for values in empty.values())
+
+    late = data.arrays_for("sz300750")
+    assert len(late["close"]) == len(panel.dates) - 8
+    assert late["datetime"][0] == date_numbers(panel.dates[8:9])[0]
+    np.testing.assert_array_equal(late["close"], panel["close"][8:, 2])
+    # 切片是共享数组的视图
+    assert np.shares_memory(late["close"], data.arrays["close"])
+
+    with pytest.raises(KeyError):
+        data.arrays_for("sz999999")
+
+
+def test_date_numbers_match_backtrader(panel):
+    expected = [bt.date2num(pd.Timestamp(d).to_pydatetime()) for d in panel.dates]
+    assert date_numbers(panel.dates).tolist() == expected
+
+
+@pytest.fixture
+def manager(tmp_path, clean_tables) -> DataManager:
+    manager = DataManager(
+        data_path=tmp_path,
+        fetcher=LocalFetcher(
+            num_symbols=4, history_start="20230101", history_end="20231215"
+        ),
+    )
+    manager.sync_market_overview()
+    manager.sync_daily_history(workers=2, requests_per_second=0)
+    clear_market_data_cache()
+    yield manager
+    clear_market_data_cache()
+
+
+def test_load_market_data_is_reused_until_a_version_changes(manager):
+    symbols = manager.get_stock_list()
+    first = load_market_data(manager, symbols)
+    assert load_market_data(manager, symbols) is first
+    assert load_market_data(manager) is first
+    assert load_market_data(manager, symbols, use_cache=False) is not first
+    # 不同的日期范围是不同的缓存项
+    ranged = load_market_data(manager, symbols, start_date=date(2023, 6, 1))
+    assert ranged is not first
+    assert ranged.arrays["close"].size < first.arrays["close"].size
+
+    # 一只股票同步了新数据，版本变化
+    end_date = tracking_ops.get_latest_daily_date()
+    with get_session() as session:
+        tracking_ops.bulk_update_daily_tracking_info(
+            session,
+            pd.DataFrame(
+                {
+                    "symbol": [symbols[0]],
+                    "daily_start_date": [end_date],
+                    "daily_end_date": [end_date],
+                    "daily_last_sync": [datetime.now()],
+                }
+            ),
+        )
+    reloaded = load_market_data(manager, symbols)
+    assert reloaded is not first
+    assert load_market_data(manager, symbols) is reloaded
+    for name, values in first.arrays.items():
+        np.testing.assert_array_equal(reloaded.arrays[name], values)
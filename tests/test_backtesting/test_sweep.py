@@ -0,0 +1,135 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from autostock.backtesting.sweep import ParameterSweep, parameter_grid
+from autostock.datamanager.panel import DailyPanel
+
+# 目标函数定义在模块顶层，spawn 启动的工作进程按名字导入
+
+
+def score(panel, x, gate=None):
+    """
+    sharpe 等于 x；给出 gate 时，gate 文件不存在则 x=2 的试验失败。
+    """
+    if gate is not None and x == 2 and not Path(gate).exists():
+        raise RuntimeError("gate closed")
+    return {"sharpe": float(x), "mean_close": float(np.nanmean(panel["close"]))}
+
+
+def negative_score(panel, x):
+    return {"sharpe": -float(x)}
+
+
+def misnamed_metric(panel, x):
+    return {"shrpe": float(x)}
+
+
+def describe_panel(panel, x):
+    # 股票池的子面板：股票数和各列的收盘价之和，检查收到的是只读的正确子集
+    assert not panel["close"].flags.writeable
+    return {
+        "sharpe": float(x),
+        "symbols": float(len(panel.symbols)),
+        "close_sum": float(np.nansum(panel["close"])),
+    }
+
+
+@pytest.fixture
+def panel() -> DailyPanel:
+    close = np.arange(20, dtype=np.float64).reshape(5, 4) + 1
+    return DailyPanel(
+        dates=np.datetime64("2024-01-01", "ns") + np.arange(5) * np.timedelta64(1, "D"),
+        symbols=["a", "b", "c", "d"],
+        fields={"close": close},
+    )
+
+
+def make_sweep(tmp_path, objective, panel, **kwargs) -> ParameterSweep:
+    return ParameterSweep(
+        "test",
+        objective,
+        panel,
+        workers=2,
+        results_path=tmp_path / "sweeps.duckdb",
+        mp_context="spawn",
+        **kwargs,
+    )
+
+
+def finished_at(results) -> dict[str, object]:
+    return dict(zip(results["trial"], results["finished_at"]))
+
+
+def test_resume_skips_completed_trials(tmp_path, panel, capsys):
+    sweep = make_sweep(tmp_path, score, panel)
+    first = sweep.run(parameter_grid(x=[1, 2, 3, 4]))
+    assert len(first) == 4 and (first["status"] == "ok").all()
+    assert first["param_x"].tolist() == [4, 3, 2, 1]
+    assert sweep.best() == {"x": 4}
+
+    capsys.readouterr()
+    second = make_sweep(tmp_path, score, panel).run(parameter_grid(x=[1, 2, 3, 4]))
+    assert "4 already done, running 0" in capsys.readouterr().out
+    assert finished_at(second) == finished_at(first)
+
+
+def test_errored_trials_are_rerun(tmp_path, panel):
+    gate = tmp_path / "gate"
+    grid = parameter_grid(x=[1, 2, 3], gate=str(gate))
+    first = make_sweep(tmp_path, score, panel).run(grid)
+    status = dict(zip(first["param_x"], first["status"]))
+    assert status == {1: "ok", 2: "error", 3: "ok"}
+    assert "gate closed" in first.loc[first["param_x"] == 2, "error"].item()
+
+    gate.touch()
+    second = make_sweep(tmp_path, score, panel).run(grid)
+    assert (second["status"] == "ok").all()
+    before, after = finished_at(first), finished_at(second)
+    rerun = [key for key in after if after[key] != before[key]]
+    assert rerun == first.loc[first["param_x"] == 2, "trial"].tolist()
+
+
+def test_patience_stops_early(tmp_path, panel, capsys):
+    sweep = make_sweep(tmp_path, negative_score, panel)
+    results = sweep.run(parameter_grid(x=list(range(1, 41))), patience=3)
+    assert "stopped early" in capsys.readouterr().out
+    # 已提交的试验（最多 workers*2 个在排队）会完成，但远少于全部40个
+    assert 4 <= len(results) < 40
+    assert sweep.best() == {"x": 1}
+
+    # 提前停止的状态从已有结果恢复，不再运行新的试验
+    again = make_sweep(tmp_path, negative_score, panel).run(
+        parameter_grid(x=list(range(1, 41))), patience=3
+    )
+    assert len(again) == len(results)
+
+
+def test_target_stops_early(tmp_path, panel):
+    sweep = make_sweep(tmp_path, score, panel)
+    results = sweep.run(parameter_grid(x=list(range(1, 41))), target=3)
+    assert results["sharpe"].max() >= 3
+    assert len(results) < 40
+
+
+def test_missing_metric_raises_and_is_recorded_as_error(tmp_path, panel):
+    sweep = make_sweep(tmp_path, misnamed_metric, panel)
+    with pytest.raises(ValueError, match="did not return metric 'sharpe'"):
+        sweep.run(parameter_grid(x=[1, 2, 3]))
+    results = sweep.results()
+    assert len(results) >= 1
+    assert "error" in set(results["status"])
+    assert sweep.best() is None
+
+
+def test_universes_get_shared_sub_panels(tmp_path, panel):
+    universes = {"ab": ["a", "b"], "d": ["d"]}
+    sweep = make_sweep(tmp_path, describe_panel, panel, universes=universes)
+    results = sweep.run(parameter_grid(x=[1, 2]))
+    assert len(results) == 4 and (results["status"] == "ok").all()
+    for universe, symbols in universes.items():
+        rows = results[results["universe"] == universe]
+        columns = [panel.symbol_index(s) for s in symbols]
+        assert (rows["symbols"] == len(symbols)).all()
+        assert (rows["close_sum"] == panel["close"][:, columns].sum()).all()
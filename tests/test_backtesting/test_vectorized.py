@@ -0,0 +1,182 @@
+import numpy as np
+import pytest
+
+from autostock.backtesting.vectorized import (
+    TradingRules,
+    _price_limit_blocked,
+    run_backtest,
+)
+from autostock.datamanager.panel import DailyPanel
+
+
+def make_panel(open_, close, symbols=None) -> DailyPanel:
+    open_ = np.asarray(open_, dtype=np.float64).reshape(len(open_), -1)
+    close = np.asarray(close, dtype=np.float64).reshape(len(close), -1)
+    symbols = symbols or [f"sz00000{j + 1}" for j in range(close.shape[1])]
+    return DailyPanel(
+        dates=np.datetime64("2024-01-01", "ns")
+        + np.arange(len(close)) * np.timedelta64(1, "D"),
+        symbols=symbols,
+        fields={"open": open_, "close": close},
+    )
+
+
+def scaled(panel: DailyPanel, factor: float) -> DailyPanel:
+    # 前复权：整体乘以复权因子后四舍五入到分
+    return DailyPanel(
+        dates=panel.dates,
+        symbols=panel.symbols,
+        fields={k: (v * factor).round(2) for k, v in panel.fields.items()},
+    )
+
+
+def column(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64).reshape(-1, 1)
+
+
+def test_two_day_equity_by_hand():
+    panel = make_panel(open_=[10.0, 10.0], close=[10.0, 10.5])
+    result = run_backtest(panel, column([1.0, 1.0]), initial_cash=10_000)
+    # 1000股加费用超过现金，缩减到900股：佣金 max(9000*0.00025, 5)=5，过户费 0.09
+    assert result.positions[:, 0].tolist() == [0, 900]
+    np.testing.assert_allclose(result.fees, [0.0, 5.09])
+    np.testing.assert_allclose(result.cash, [10_000, 10_000 - 9000 - 5.09])
+    np.testing.assert_allclose(result.equity, [10_000, 994.91 + 900 * 10.5])
+    assert result.turnover.tolist() == [0.0, 9000.0]
+    assert result.trades.tolist() == [0, 1]
+
+
+def test_buys_round_down_to_whole_lots():
+    panel = make_panel(open_=[33.0] * 2, close=[33.0] * 2)
+    result = run_backtest(panel, column([1.0, 1.0]), initial_cash=100_000)
+    # floor(100000 / 3300) = 30手
+    assert result.positions[-1, 0] == 3000
+
+    prices = np.full((2, 3), [7.77, 13.13, 51.9])
+    panel = make_panel(prices, prices)
+    weights = np.full((2, 3), 0.3)
+    result = run_backtest(panel, weights, initial_cash=1_000_000)
+    assert (result.positions % 100 == 0).all()
+    assert (result.positions[-1] > 0).all()
+
+
+def test_fees_minimum_commission_and_stamp_duty_on_sells_only():
+    panel = make_panel(open_=[10.0, 10.0, 11.0], close=[10.0, 10.0, 11.0])
+    rules = TradingRules()
+    # 买入100股后全部卖出
+    weights = column([0.1, 0.0, 0.0])
+    result = run_backtest(panel, weights, initial_cash=10_000, rules=rules)
+    assert result.positions[:, 0].tolist() == [0, 100, 0]
+    buy = max(1000 * rules.commission_rate, rules.min_commission) + 1000 * 0.00001
+    sell = max(1100 * rules.commission_rate, rules.min_commission) + 1100 * 0.00001
+    sell += 1100 * rules.stamp_duty_rate
+    np.testing.assert_allclose(result.fees, [0.0, buy, sell])
+    np.testing.assert_allclose(result.cash[-1], 10_000 - 1000 - buy + 1100 - sell)
+    assert rules.buy_fees(np.array([1000.0]))[0] == pytest.approx(5.01)
+    assert rules.sell_fees(np.array([1100.0]))[0] == pytest.approx(5.561)
+
+
+def limit_up_case() -> tuple[DailyPanel, np.ndarray]:
+    # 第1天开盘涨停（10.00 -> 11.00），第2天开盘 11.50 未涨停
+    panel = make_panel(open_=[10.0, 11.0, 11.5], close=[10.0, 11.0, 11.5])
+    return panel, column([0.5, 0.5, 0.5])
+
+
+def limit_down_case() -> tuple[DailyPanel, np.ndarray]:
+    # 第1天买入；第2天开盘跌停（10.00 -> 9.00），第3天开盘 9.20 未跌停
+    panel = make_panel(open_=[10.0, 10.0, 9.0, 9.2], close=[10.0, 10.0, 9.0, 9.2])
+    return panel, column([0.5, 0.0, 0.0, 0.0])
+
+
+@pytest.mark.parametrize("adjustment", ["raw", "qfq", "qfq_with_unadjusted"])
+def test_buy_blocked_at_limit_up_and_carried_over(adjustment):
+    raw, weights = limit_up_case()
+    panel = raw if adjustment == "raw" else scaled(raw, 0.37)
+    unadjusted = raw if adjustment == "qfq_with_unadjusted" else None
+    result = run_backtest(panel, weights, initial_cash=10_000, unadjusted=unadjusted)
+    assert result.blocked.tolist() == [0, 1, 0]
+    assert result.positions[1, 0] == 0
+    # 目标权重没有变化，被阻止的买入在下一个交易日执行
+    assert result.positions[2, 0] > 0
+    assert result.trades.tolist() == [0, 0, 1]
+
+
+@pytest.mark.parametrize("adjustment", ["raw", "qfq", "qfq_with_unadjusted"])
+def test_sell_blocked_at_limit_down_and_carried_over(adjustment):
+    raw, weights = limit_down_case()
+    panel = raw if adjustment == "raw" else scaled(raw, 0.37)
+    unadjusted = raw if adjustment == "qfq_with_unadjusted" else None
+    result = run_backtest(panel, weights, initial_cash=10_000, unadjusted=unadjusted)
+    held = result.positions[1, 0]
+    assert held > 0
+    assert result.blocked.tolist() == [0, 0, 1, 0]
+    assert result.positions[2:, 0].tolist() == [held, 0]
+
+
+def test_unadjusted_prices_avoid_qfq_rounding_misjudgment():
+    # 不复权 10.00 -> 10.90 没有涨停；复权因子很小时前复权价格 0.50 -> 0.55 看起来涨了10%
+    raw = make_panel(open_=[10.0, 10.9], close=[10.0, 10.9])
+    qfq = scaled(raw, 0.05)
+    weights = column([0.5, 0.5])
+    assert run_backtest(qfq, weights).blocked.tolist() == [0, 1]
+    result = run_backtest(qfq, weights, unadjusted=raw)
+    assert result.blocked.tolist() == [0, 0]
+    assert result.positions[1, 0] > 0
+
+
+def test_one_tick_inside_the_limit_is_not_blocked():
+    # 昨收 10.00 的涨停价 11.00、跌停价 9.00，10.99 和 9.01 仍可成交
+    at_up, at_down = _price_limit_blocked(
+        np.array([10.99, 11.0, 9.01, 9.0]),
+        np.full(4, 10.0),
+        np.full(4, 0.1),
+        unadjusted=True,
+    )
+    assert at_up.tolist() == [False, True, False, False]
+    assert at_down.tolist() == [False, False, False, True]
+
+    buy = make_panel(open_=[10.0, 10.99], close=[10.0, 10.99])
+    result = run_backtest(buy, column([0.5, 0.5]), initial_cash=10_000, unadjusted=buy)
+    assert result.blocked.tolist() == [0, 0]
+    assert result.positions[1, 0] > 0
+
+    sell = make_panel(open_=[10.0, 10.0, 9.01], close=[10.0, 10.0, 9.01])
+    weights = column([0.5, 0.0, 0.0])
+    result = run_backtest(sell, weights, initial_cash=10_000, unadjusted=sell)
+    assert result.blocked.tolist() == [0, 0, 0]
+    assert result.positions[1, 0] > 0
+    assert result.positions[2, 0] == 0
+
+
+def test_price_limits_can_be_disabled():
+    raw, weights = limit_up_case()
+    rules = TradingRules(enforce_price_limits=False)
+    result = run_backtest(raw, weights, initial_cash=10_000, rules=rules)
+    assert result.blocked.tolist() == [0, 0, 0]
+    assert result.positions[1, 0] > 0
+
+
+def test_unadjusted_panel_shape_must_match():
+    raw, weights = limit_up_case()
+    with pytest.raises(ValueError):
+        run_backtest(raw, weights, unadjusted=make_panel([10.0], [10.0]))
+
+
+def test_cash_never_negative():
+    rng = np.random.default_rng(3)
+    days, symbols = 120, 30
+    close = (5 * np.exp(np.cumsum(rng.normal(0, 0.03, (days, symbols)), axis=0))).round(
+        2
+    )
+    open_ = (close * (1 + rng.normal(0, 0.01, close.shape))).round(2)
+    close[rng.random(close.shape) < 0.05] = np.nan
+    open_[np.isnan(close)] = np.nan
+    weights = rng.random((days, symbols)) * (rng.random((days, symbols)) < 0.3)
+    weights /= np.maximum(weights.sum(axis=1, keepdims=True), 1e-12)
+    panel = make_panel(open_, close, [f"sz{j:06d}" for j in range(symbols)])
+    for cash in (20_000, 1_000_000):
+        result = run_backtest(panel, weights, initial_cash=cash, rebalance_every=5)
+        assert (result.cash >= -1e-6).all()
+        assert (result.positions >= 0).all()
+        assert (result.positions % 100 == 0).all()
+        assert result.trades.sum() > 0
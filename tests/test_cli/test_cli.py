@@ -0,0 +1,171 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from autostock import cli
+from autostock.core.config import Settings, database_url_for, get_settings
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+# 只读命令不应导入的重量级模块
+HEAVY_MODULES = ("akshare", "sqlmodel", "tqdm", "pandas")
+ENV_NAMES = (
+    "AUTOSTOCK_DATA_PATH",
+    "AUTOSTOCK_DATABASE_URL",
+    "AUTOSTOCK_CACHE_ALLOW_STALE",
+)
+
+
+@pytest.fixture(autouse=True)
+def restore_settings(monkeypatch):
+    """
+    main() 会把命令行参数写回环境变量并重新读取全局配置，用例结束后恢复原来的环境变量和配置。
+    """
+    for name in ENV_NAMES:
+        if name in os.environ:
+            monkeypatch.setenv(name, os.environ[name])
+        else:
+            monkeypatch.delenv(name, raising=False)
+    yield
+    monkeypatch.undo()
+    get_settings.cache_clear()
+
+
+@pytest.fixture
+def data_path(tmp_path) -> Path:
+    daily = tmp_path / "daily"
+    daily.mkdir()
+    pd.DataFrame(
+        {
+            "trade_date": pd.date_range("2024-01-01", periods=5).date,
+            "open": [10.0, 10.1, 10.2, 10.3, 10.4],
+            "close": [10.5, 10.6, 10.7, 10.8, 10.9],
+            "volume": [100.0, 200.0, 300.0, 400.0, 500.0],
+        }
+    ).to_parquet(daily / "sz000001.parquet", index=False)
+    return tmp_path
+
+
+def record_handler(monkeypatch, name: str) -> list:
+    # 替换命令的处理函数，记录收到的参数和配置
+    calls = []
+    monkeypatch.setattr(
+        cli, name, lambda args, settings: calls.append((args, settings)) or 0
+    )
+    return calls
+
+
+def test_parser_dispatches_to_commands(monkeypatch):
+    calls = record_handler(monkeypatch, "cmd_sync_daily")
+    argv = ["sync", "daily", "--codes", "sz000001", "sh600000", "--incremental"]
+    assert cli.main(argv + ["--layout", "dataset", "--rps", "2"]) == 0
+    ((args, settings),) = calls
+    assert args.codes == ["sz000001", "sh600000"]
+    assert args.incremental and not args.resume
+    assert (args.layout, args.workers, args.rps) == ("dataset", 8, 2.0)
+
+    for name, argv in [
+        ("cmd_sync_overview", ["sync", "overview"]),
+        (
+            "cmd_query_history",
+            ["query", "history", "sz000001", "--start", "2024-01-02"],
+        ),
+        ("cmd_query_overview", ["query", "overview", "--industry", "银行"]),
+        ("cmd_monitor", ["monitor", "--ticks", "3"]),
+        ("cmd_health", ["health"]),
+    ]:
+        calls = record_handler(monkeypatch, name)
+        assert cli.main(argv) == 0
+        assert len(calls) == 1, name
+
+    with pytest.raises(SystemExit):
+        cli.main(["query", "history", "sz000001", "--start", "01/02/2024"])
+
+
+def test_no_command_prints_help(capsys):
+    assert cli.main([]) == 1
+    assert "usage: autostock" in capsys.readouterr().out
+
+
+def test_data_path_moves_data_and_database(monkeypatch, tmp_path):
+    calls = record_handler(monkeypatch, "cmd_health")
+    monkeypatch.delenv("AUTOSTOCK_DATABASE_URL", raising=False)
+    cli.main(["--data-path", str(tmp_path), "--allow-stale-cache", "health"])
+    ((_, settings),) = calls
+    assert settings.data_path == str(tmp_path)
+    assert Path(settings.database_path) == tmp_path / "market.db"
+    assert settings.cache_allow_stale
+    # 全局配置同样更新，命令中按需导入的模块读取的是同一份配置
+    assert get_settings() == settings
+
+    # 显式设置的数据库地址不随数据目录移动
+    monkeypatch.setenv("AUTOSTOCK_DATABASE_URL", "duckdb:///elsewhere/market.db")
+    cli.main(["--data-path", str(tmp_path), "health"])
+    assert calls[-1][1].database_path == "elsewhere/market.db"
+
+
+def test_default_database_url_is_unchanged():
+    assert database_url_for(Settings().data_path) == Settings().database_url
+
+
+def test_query_history(data_path, capsys):
+    argv = ["--data-path", str(data_path), "query", "history", "sz000001"]
+    assert cli.main(argv + ["--limit", "2"]) == 0
+    out = capsys.readouterr().out
+    assert "2024-01-04" in out and "2024-01-05" in out and "2024-01-03" not in out
+    assert "(2 rows)" in out
+
+    window = ["--start", "2024-01-02", "--end", "2024-01-03"]
+    assert cli.main(argv + window + ["--columns", "close", "--csv"]) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        "trade_date,close",
+        "2024-01-02,10.6",
+        "2024-01-03,10.7",
+    ]
+
+    missing = ["--data-path", str(data_path), "query", "history", "sz999999"]
+    assert cli.main(missing) == 1
+    assert "No daily data" in capsys.readouterr().out
+
+
+def run_isolated(argv: list[str], data_path: Path) -> dict:
+    """
+    在新的解释器中执行 main(argv)，返回退出码和此时已导入的重量级模块。
+    """
+    code = (
+        "import json, sys\n"
+        "from autostock.cli import main\n"
+        f"status = main({argv!r})\n"
+        f"loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'status': status, 'loaded': loaded}))\n"
+    )
+    env = {k: v for k, v in os.environ.items() if k not in ENV_NAMES}
+    env["AUTOSTOCK_DATA_PATH"] = str(data_path)
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "argv, status",
+    [
+        (["query", "history", "sz000001", "--start", "2024-01-02"], 0),
+        # 没有数据库文件，检查失败，但仍然只用到 DuckDB
+        (["health"], 1),
+    ],
+    ids=["query_history", "health"],
+)
+def test_read_only_commands_import_no_heavy_modules(data_path, argv, status):
+    result = run_isolated(argv, data_path)
+    assert result["status"] == status
+    assert result["loaded"] == []
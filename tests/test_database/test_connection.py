@@ -0,0 +1,128 @@
+import subprocess
+import sys
+
+import duckdb
+import pytest
+
+from autostock.database.connection import ConnectionManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ConnectionManager(
+        tmp_path / "market.db", tmp_path / "snapshot", snapshot_interval=3600
+    )
+    manager.writer().execute(
+        "CREATE TABLE market_overview (symbol VARCHAR PRIMARY KEY, last_price DOUBLE)"
+    )
+    insert(manager, "sh600000", "sz000001")
+    yield manager
+    manager.close()
+
+
+def insert(manager: ConnectionManager, *symbols: str) -> None:
+    for symbol in symbols:
+        manager.writer().execute(
+            "INSERT INTO market_overview VALUES (?, 10.0)", [symbol]
+        )
+
+
+def count(manager: ConnectionManager) -> int:
+    table = manager.query_arrow("SELECT count(*) AS n FROM market_overview")
+    return table.column("n")[0].as_py()
+
+
+def snapshot_rows(manager: ConnectionManager) -> int:
+    path = (manager.snapshot_dir / "market_overview.parquet").as_posix()
+    return duckdb.sql(f"SELECT count(*) FROM read_parquet('{path}')").fetchone()[0]
+
+
+class LockHolder:
+    """
+    在另一个进程中以读写模式打开数据库（模拟正在运行的同步任务），直到 `release()`。
+    """
+
+    def __init__(self, database_path):
+        code = (
+            "import sys, duckdb\n"
+            f"conn = duckdb.connect({str(database_path)!r})\n"
+            "conn.execute(\"INSERT INTO market_overview VALUES ('sz300750', 1.0)\")\n"
+            "print('locked', flush=True)\n"
+            "sys.stdin.read()\n"
+        )
+        self.process = subprocess.Popen(
+            [sys.executable, "-c", code],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        assert self.process.stdout.readline().strip() == "locked"
+
+    def release(self) -> None:
+        self.process.stdin.close()
+        self.process.wait(timeout=30)
+
+
+def test_publish_snapshot_respects_interval_unless_forced(manager):
+    assert manager.publish_snapshot()
+    assert snapshot_rows(manager) == 2
+    # 只导出存在的表
+    assert [p.name for p in manager.snapshot_dir.iterdir()] == [
+        "market_overview.parquet"
+    ]
+
+    insert(manager, "sh688981")
+    assert not manager.publish_snapshot()
+    assert snapshot_rows(manager) == 2
+    assert manager.publish_snapshot(force=True)
+    assert snapshot_rows(manager) == 3
+
+    # 没有读写连接的进程不导出快照
+    other = ConnectionManager(manager.database_path, manager.snapshot_dir)
+    assert not other.publish_snapshot(force=True)
+
+
+def test_readers_fall_back_to_snapshot_while_another_process_writes(manager):
+    manager.publish_snapshot(force=True)
+    insert(manager, "sh688981")
+    manager.close()
+
+    reader = ConnectionManager(manager.database_path, manager.snapshot_dir)
+    with reader.reader() as conn:
+        assert ConnectionManager.source_of(conn) == "database"
+    assert count(reader) == 3
+
+    holder = LockHolder(manager.database_path)
+    try:
+        # 数据库被占用：读取快照，看不到快照之后写入的数据
+        with reader.reader() as conn:
+            assert ConnectionManager.source_of(conn) == "snapshot"
+        assert count(reader) == 2
+        df = reader.query_df(
+            "SELECT symbol FROM market_overview WHERE last_price > ? ORDER BY symbol",
+            [5],
+        )
+        assert df["symbol"].tolist() == ["sh600000", "sz000001"]
+
+        # 没有快照时无法回退，抛出原来的错误
+        empty = ConnectionManager(
+            manager.database_path, manager.snapshot_dir.with_name("empty")
+        )
+        with pytest.raises((duckdb.IOException, duckdb.ConnectionException)):
+            empty.query_arrow("SELECT 1")
+    finally:
+        holder.release()
+
+    # 写入进程退出后重新读取数据库文件
+    with reader.reader() as conn:
+        assert ConnectionManager.source_of(conn) == "database"
+    assert count(reader) == 4
+
+
+def test_writer_process_reads_the_database_not_the_snapshot(manager):
+    # 持有读写连接的进程通过 cursor() 读取，看到的是已提交的最新数据，不使用快照
+    manager.publish_snapshot(force=True)
+    insert(manager, "sh688981")
+    with manager.reader() as conn:
+        assert ConnectionManager.source_of(conn) == "database"
+    assert count(manager) == 3
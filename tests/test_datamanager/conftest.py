@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _clean_tables(clean_tables):
+    """
+    每个用例开始前清空所有表和进程内的市场快照（见 tests/conftest.py）。
+    """
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from autostock.datamanager.cleaner import (
+    DataCleaner,
+    classify_market_types,
+    standardize_symbols,
+)
+from autostock.datamanager.local_fetcher import LocalFetcher
+
+# 每一类代码前缀：沪市主板、科创板、深市主板、中小板、创业板（300/301）、北交所（8xx/4xx/920）、
+# B股（900/200）以及无法识别的代码
+CODES = [
+    "600000",
+    "601398",
+    "603000",
+    "688981",
+    "689009",
+    "000001",
+    "001979",
+    "002594",
+    "300750",
+    "301236",
+    "830799",
+    "871981",
+    "430047",
+    "920002",
+    "900901",
+    "200002",
+    "",
+    "abc",
+    "12",
+    "5",
+]
+
+
+def standardize_symbol(symbol: str) -> str:
+    # 向量化之前逐个调用的实现
+    if symbol.startswith("6"):
+        return f"sh{symbol}"
+    elif symbol.startswith("0") or symbol.startswith("3"):
+        return f"sz{symbol}"
+    elif symbol.startswith("8") or symbol.startswith("4"):
+        return f"bj{symbol}"
+    else:
+        return symbol
+
+
+def get_market_type(symbol: str) -> str:
+    # 向量化之前逐个调用的实现
+    if symbol.startswith("688"):
+        return "科创板"
+    if symbol.startswith("300"):
+        return "创业板"
+    if symbol.startswith("8") or symbol.startswith("4"):
+        return "北交所"
+    if symbol.startswith("60"):
+        return "沪市主板"
+    if symbol.startswith("00"):
+        return "深市主板"
+    return "未知"
+
+
+def test_standardize_symbols_matches_per_code_version():
+    codes = pd.Series(CODES, index=np.arange(len(CODES)) * 10)
+    result = standardize_symbols(codes)
+    assert result.index.equals(codes.index)
+    assert result.tolist() == [standardize_symbol(c) for c in CODES]
+    # 整数代码按字符串处理
+    assert standardize_symbols(pd.Series([600000, 830799])).tolist() == [
+        "sh600000",
+        "bj830799",
+    ]
+
+
+def test_classify_market_types_matches_per_code_version():
+    codes = pd.Series(CODES)
+    expected = [get_market_type(c) for c in CODES]
+    assert classify_market_types(codes).tolist() == expected
+    # 带交易所前缀或 .SH/.SZ 后缀的代码结果相同
+    assert classify_market_types(standardize_symbols(codes)).tolist() == expected
+    suffixed = codes + np.where(codes.str.startswith("6"), ".SH", ".SZ")
+    assert classify_market_types(suffixed).tolist() == expected
+
+
+@pytest.fixture(scope="module")
+def raw_histories() -> dict[str, pd.DataFrame]:
+    fetcher = LocalFetcher(
+        num_symbols=5, history_start="20230101", history_end="20230630"
+    )
+    raw = {
+        standardize_symbol(code): fetcher.fetch_daily_history(code)
+        for code in fetcher.codes
+    }
+    # 数据源偶尔用 "-" 表示缺失值，这时整列是字符串
+    first = next(iter(raw))
+    raw[first] = raw[first].astype({"换手率": object})
+    raw[first].loc[3, "换手率"] = "-"
+    return raw
+
+
+def per_symbol(raw: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    cleaner = DataCleaner()
+    frames = [cleaner.clean_daily_history(df.copy(), s) for s, df in raw.items()]
+    df = pd.concat(frames).sort_values(["symbol", "trade_date"], kind="stable")
+    return df.reset_index(drop=True)
+
+
+def test_batch_cleaning_matches_per_symbol_cleaning(raw_histories):
+    expected = per_symbol(raw_histories)
+    assert np.isnan(expected["turnover_rate"]).sum() == 1
+    cleaner = DataCleaner()
+
+    # 股票代码 -> 原始DataFrame，空的DataFrame被忽略
+    mapping = dict(raw_histories) | {"sz000000": pd.DataFrame()}
+    pd.testing.assert_frame_equal(cleaner.clean_daily_history_batch(mapping), expected)
+
+    # 拼接好的原始DataFrame，用纯数字的 '股票代码' 列区分股票
+    concatenated = pd.concat(list(raw_histories.values()), ignore_index=True)
+    pd.testing.assert_frame_equal(
+        cleaner.clean_daily_history_batch(concatenated), expected
+    )
+
+    # 或者用标准代码的 'symbol' 列
+    with_symbols = pd.concat(
+        [df.assign(symbol=s) for s, df in raw_histories.items()], ignore_index=True
+    ).drop(columns="股票代码")
+    pd.testing.assert_frame_equal(
+        cleaner.clean_daily_history_batch(with_symbols), expected
+    )
+
+    # 输入不被修改
+    assert "trade_date" not in concatenated.columns
+
+
+def test_batch_cleaning_edge_cases():
+    cleaner = DataCleaner()
+    assert cleaner.clean_daily_history_batch({}).empty
+    assert cleaner.clean_daily_history_batch(pd.DataFrame()).empty
+    with pytest.raises(ValueError):
+        cleaner.clean_daily_history_batch(pd.DataFrame({"日期": ["2024-01-02"]}))
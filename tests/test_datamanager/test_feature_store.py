@@ -0,0 +1,190 @@
+import os
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from autostock import indicators
+from autostock.datamanager.local_fetcher import LocalFetcher
+from autostock.datamanager.manager import DataManager
+from autostock.datamanager.ops import tracking_ops
+from autostock.datamanager.session import get_session
+
+NUM_SYMBOLS = 6
+HISTORY_START = "20230101"
+EARLIER_END = "20231215"
+LATER_END = "20240131"
+
+
+def make_manager(tmp_path, history_end: str = EARLIER_END) -> DataManager:
+    manager = DataManager(
+        data_path=tmp_path,
+        fetcher=LocalFetcher(
+            num_symbols=NUM_SYMBOLS,
+            history_start=HISTORY_START,
+            history_end=history_end,
+        ),
+    )
+    manager.sync_market_overview()
+    manager.sync_daily_history(workers=2, requests_per_second=0)
+    return manager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch) -> DataManager:
+    manager = make_manager(tmp_path)
+    # 记录缓存未命中时加载日线面板的股票
+    manager.loaded = []
+    get_daily_panel = manager.get_daily_panel
+
+    def recording(symbols=None, *args, **kwargs):
+        manager.loaded.append(list(symbols))
+        return get_daily_panel(symbols, *args, **kwargs)
+
+    monkeypatch.setattr(manager, "get_daily_panel", recording)
+    return manager
+
+
+def entries(manager: DataManager, key: str) -> dict[str, str]:
+    # 缓存目录中的 股票 -> 版本
+    paths = (manager.feature_store.store_dir / key).glob("*.parquet")
+    return dict(path.stem.rsplit("@", 1) for path in paths)
+
+
+def bump_version(symbol: str) -> None:
+    # 模拟同步任务改写了一只股票的日线数据
+    end_date = tracking_ops.get_latest_daily_date()
+    with get_session() as session:
+        tracking_ops.bulk_update_daily_tracking_info(
+            session,
+            pd.DataFrame(
+                {
+                    "symbol": [symbol],
+                    "daily_start_date": [end_date],
+                    "daily_end_date": [end_date],
+                    "daily_last_sync": [datetime.now()],
+                }
+            ),
+        )
+
+
+def test_cached_feature_is_reused_while_version_is_unchanged(manager):
+    symbols = manager.get_market_snapshot().symbols.tolist()
+    first = manager.get_feature_panel("rsi", period=6)
+    assert manager.loaded == [symbols]
+    assert sorted(entries(manager, "rsi(period=6)")) == symbols
+
+    manager.loaded.clear()
+    second = manager.get_feature_panel("rsi", period=6)
+    assert manager.loaded == []
+    np.testing.assert_array_equal(second.dates, first.dates)
+    np.testing.assert_array_equal(second["rsi"], first["rsi"])
+    stats = manager.feature_store.stats()
+    assert stats["misses"] == NUM_SYMBOLS and stats["hits"] == NUM_SYMBOLS
+
+    # 结果与直接在日线面板上计算一致（停牌日为 NaN）
+    close = manager.get_daily_panel(symbols, ("close",))["close"]
+    expected = indicators.rsi(close, period=6)
+    expected[np.isnan(close)] = np.nan
+    np.testing.assert_allclose(first["rsi"], expected, equal_nan=True)
+
+
+def test_version_bump_recomputes_and_evicts_stale_file(manager):
+    symbols = manager.get_market_snapshot().symbols.tolist()
+    first = manager.get_feature_panel("rsi", symbols, period=6)
+    before = entries(manager, "rsi(period=6)")
+
+    bump_version(symbols[2])
+    manager.loaded.clear()
+    second = manager.get_feature_panel("rsi", symbols, period=6)
+    assert manager.loaded == [[symbols[2]]]
+    np.testing.assert_array_equal(second["rsi"], first["rsi"])
+
+    # 只有这只股票换成了新版本的文件，旧版本的文件被删除
+    after = entries(manager, "rsi(period=6)")
+    assert after.keys() == before.keys()
+    assert [s for s in symbols if after[s] != before[s]] == [symbols[2]]
+    assert after == tracking_ops.get_daily_data_versions(symbols)
+    files = list((manager.feature_store.store_dir / "rsi(period=6)").iterdir())
+    assert len(files) == NUM_SYMBOLS
+
+    stats = manager.feature_store.stats()
+    assert stats["bytes"] == sum(path.stat().st_size for path in files)
+
+
+def test_sync_bumps_versions_for_all_symbols(manager):
+    symbols = manager.get_market_snapshot().symbols.tolist()
+    manager.get_feature_panel("macd", fast=6)
+    manager.fetcher = LocalFetcher(
+        num_symbols=NUM_SYMBOLS, history_start=HISTORY_START, history_end=LATER_END
+    )
+    manager.sync_daily_history(workers=2, requests_per_second=0, incremental=True)
+
+    manager.loaded.clear()
+    panel = manager.get_feature_panel("macd", fast=6)
+    assert manager.loaded == [symbols]
+    assert panel.dates[-1] == np.datetime64("2024-01-31", "ns")
+    key = "macd(fast=6,slow=26,signal=9)"
+    assert entries(manager, key) == tracking_ops.get_daily_data_versions()
+    assert len(list((manager.feature_store.store_dir / key).iterdir())) == len(symbols)
+
+
+def test_normalized_params_share_a_key(manager):
+    store = manager.feature_store
+    default = manager.get_feature_panel("rsi")
+    explicit = manager.get_feature_panel("rsi", period=14)
+    converted = manager.get_feature_panel("rsi", period=14.0)
+    assert len(manager.loaded) == 1
+    np.testing.assert_array_equal(explicit["rsi"], default["rsi"])
+    np.testing.assert_array_equal(converted["rsi"], default["rsi"])
+
+    short = manager.get_feature_panel("rsi", period=6)
+    assert len(manager.loaded) == 2
+    assert not np.allclose(short["rsi"], default["rsi"], equal_nan=True)
+    assert sorted(path.name for path in store.store_dir.iterdir()) == [
+        "rsi(period=14)",
+        "rsi(period=6)",
+    ]
+
+    with pytest.raises(ValueError, match="not a valid int"):
+        manager.get_feature_panel("rsi", period=6.5)
+    with pytest.raises(ValueError, match="Unknown parameters"):
+        manager.get_feature_panel("rsi", window=6)
+
+
+def test_date_range_is_the_same_for_cached_and_computed(manager):
+    start, end = date(2023, 6, 1), date(2023, 9, 30)
+    computed = manager.get_feature_panel("atr", start_date=start, end_date=end)
+    cached = manager.get_feature_panel("atr", start_date=start, end_date=end)
+    assert len(manager.loaded) == 1
+    np.testing.assert_array_equal(cached.dates, computed.dates)
+    np.testing.assert_array_equal(cached["atr"], computed["atr"])
+    assert computed.dates[0] >= np.datetime64(start, "ns")
+    assert computed.dates[-1] <= np.datetime64(end, "ns")
+
+
+def test_eviction_removes_least_recently_read_feature(manager):
+    store = manager.feature_store
+    manager.get_feature_panel("rsi", period=6)
+    size = store.stats()["bytes"]
+
+    # 上限只够放下两组多一点：计算第三组时淘汰最久没有读取的一组
+    store.max_bytes = int(size * 2.5)
+    store._total_bytes = None
+    manager.get_feature_panel("rsi", period=9)
+    # 两组都刚写入，把 period=6 的访问时间改早
+    for path in (store.store_dir / "rsi(period=6)").iterdir():
+        stamp = path.stat().st_mtime
+        os.utime(path, (stamp - 1000, stamp))
+    manager.get_feature_panel("rsi", period=12)
+
+    # 按文件淘汰到上限的90%以下：只删除 period=6 的文件，后两组完整保留
+    counts = {
+        path.name: len(list(path.iterdir())) for path in store.store_dir.iterdir()
+    }
+    assert counts["rsi(period=9)"] == counts["rsi(period=12)"] == NUM_SYMBOLS
+    assert counts["rsi(period=6)"] < NUM_SYMBOLS
+    files = list(store.store_dir.glob("*/*.parquet"))
+    assert store.stats()["bytes"] == sum(path.stat().st_size for path in files)
+    assert store.stats()["bytes"] <= store.max_bytes * 0.9
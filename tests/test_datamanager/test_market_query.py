@@ -0,0 +1,194 @@
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from autostock.database.connection import get_connection_manager
+from autostock.datamanager.market_snapshot import (
+    SNAPSHOT_FILTER_OPERATORS,
+    get_market_snapshot,
+)
+from autostock.datamanager.ops import market_ops
+from autostock.datamanager.ops.market_ops import (
+    FILTER_OPERATORS,
+    build_market_overview_query,
+    query_market_overview,
+)
+from autostock.datamanager.session import get_session
+
+ROWS = pd.DataFrame(
+    [
+        ("sh600000", "浦发银行", "银行", "主板", date(1999, 11, 10), "正常", 8.5),
+        ("sh601398", "工商银行", "银行", "主板", date(2006, 10, 27), "正常", 5.2),
+        ("sz000001", "平安银行", "银行", "主板", date(1991, 4, 3), "停牌", None),
+        ("sz300750", "宁德时代", "电池", "创业板", date(2018, 6, 11), "正常", 180.0),
+        ("sh688981", "中芯国际", None, "科创板", None, "正常", 45.0),
+        ("bj830799", "艾融软件", "软件", "北交所", date(2019, 12, 30), None, 20.0),
+    ],
+    columns=[
+        "symbol",
+        "name",
+        "industry",
+        "market_type",
+        "list_date",
+        "status",
+        "last_price",
+    ],
+)
+ALL = sorted(ROWS["symbol"])
+
+# (过滤条件, 期望的股票)；NULL 不满足任何比较
+CASES = [
+    ({"industry": "银行"}, ["sh600000", "sh601398", "sz000001"]),
+    ({"industry__eq": "电池"}, ["sz300750"]),
+    ({"industry__ne": "银行"}, ["bj830799", "sz300750"]),
+    ({"industry": None}, ["sh688981"]),
+    (
+        {"industry__ne": None},
+        ["bj830799", "sh600000", "sh601398", "sz000001", "sz300750"],
+    ),
+    ({"last_price__gt": 20}, ["sh688981", "sz300750"]),
+    ({"last_price__ge": 20}, ["bj830799", "sh688981", "sz300750"]),
+    ({"last_price__lt": 8.5}, ["sh601398"]),
+    ({"last_price__le": 8.5}, ["sh600000", "sh601398"]),
+    ({"last_price__between": (5.2, 20)}, ["bj830799", "sh600000", "sh601398"]),
+    ({"list_date__ge": date(2006, 10, 27)}, ["bj830799", "sh601398", "sz300750"]),
+    ({"list_date__lt": "1995-01-01"}, ["sz000001"]),
+    (
+        {"list_date__between": (date(1995, 1, 1), date(2010, 1, 1))},
+        ["sh600000", "sh601398"],
+    ),
+    ({"market_type__in": ["创业板", "科创板"]}, ["sh688981", "sz300750"]),
+    ({"market_type__in": []}, []),
+    ({"symbol__in": ["sz000001", "sh000000"]}, ["sz000001"]),
+    ({"last_price__in": [8.5, 45.0]}, ["sh600000", "sh688981"]),
+    ({"industry__not_in": ["银行"]}, ["bj830799", "sz300750"]),
+    (
+        {"industry__not_in": []},
+        ["bj830799", "sh600000", "sh601398", "sz000001", "sz300750"],
+    ),
+    ({"status__not_in": ["停牌"]}, ["sh600000", "sh601398", "sh688981", "sz300750"]),
+    ({"last_price__isnull": True}, ["sz000001"]),
+    (
+        {"status__isnull": False},
+        ["sh600000", "sh601398", "sh688981", "sz000001", "sz300750"],
+    ),
+    ({"industry": "银行", "last_price__lt": 6}, ["sh601398"]),
+    ({"name__like": "%银行"}, ["sh600000", "sh601398", "sz000001"]),
+    ({"name__not_like": "%银行"}, ["bj830799", "sh688981", "sz300750"]),
+    ({"market_type__ilike": "创%"}, ["sz300750"]),
+]
+
+
+@pytest.fixture
+def overview():
+    with get_session() as session:
+        market_ops.upsert_market_overview(session, ROWS)
+        market_ops.bump_market_overview_version(session)
+        session.commit()
+    get_connection_manager().publish_snapshot(force=True)
+
+
+def query_symbols(**filters) -> list[str]:
+    df = query_market_overview(columns=["symbol"], order_by="symbol", **filters)
+    return df["symbol"].tolist()
+
+
+def test_cases_cover_every_operator():
+    used = {key.partition("__")[2] or "eq" for filters, _ in CASES for key in filters}
+    assert used == set(FILTER_OPERATORS)
+
+
+@pytest.mark.parametrize("filters, expected", CASES, ids=lambda v: str(v))
+def test_filter_operators(overview, filters, expected):
+    assert query_symbols(**filters) == expected
+    with get_session() as session:
+        df = query_market_overview(session, columns=["symbol"], **filters)
+    assert sorted(df["symbol"]) == expected
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        case
+        for case in CASES
+        if all(
+            (key.partition("__")[2] or "eq") in SNAPSHOT_FILTER_OPERATORS
+            for key in case[0]
+        )
+    ],
+    ids=lambda v: str(v),
+)
+def test_snapshot_mask_agrees_with_sql(overview, filters, expected):
+    assert get_market_snapshot().filter(**filters) == expected
+
+
+def test_order_by_limit_and_columns(overview):
+    df = query_market_overview(
+        columns=["symbol", "last_price"],
+        order_by=["-last_price"],
+        limit=2,
+        last_price__isnull=False,
+    )
+    assert list(df.columns) == ["symbol", "last_price"]
+    assert df["symbol"].tolist() == ["sz300750", "sh688981"]
+
+    df = query_market_overview(columns=["symbol"], order_by=["industry", "-symbol"])
+    assert df["symbol"].tolist()[:4] == ["sz300750", "bj830799", "sz000001", "sh601398"]
+
+
+def test_as_arrow(overview):
+    table = query_market_overview(
+        columns=["symbol", "list_date"], industry="银行", as_arrow=True
+    )
+    assert isinstance(table, pa.Table)
+    assert table.column_names == ["symbol", "list_date"]
+    assert table.num_rows == 3
+
+    empty = query_market_overview(columns=["symbol"], industry="不存在", as_arrow=True)
+    assert empty.num_rows == 0 and empty.column_names == ["symbol"]
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"columns": ["symbol", "price"]},
+        {"order_by": "-price"},
+        {"price__gt": 1},
+        {"last_price__gte": 1},
+        {"industry__startswith": "银"},
+        {"symbol; DROP TABLE market_overview": 1},
+    ],
+)
+def test_rejects_unknown_columns_and_operators(kwargs):
+    with pytest.raises(ValueError):
+        build_market_overview_query(**kwargs)
+
+
+def test_values_are_bound_as_parameters(overview):
+    hostile = "银行' OR '1'='1"
+    sql, params = build_market_overview_query(
+        columns=["symbol"],
+        industry=hostile,
+        name__like="%'--",
+        symbol__in=["sh600000", "x'y"],
+        last_price__between=(1, 100),
+        limit=5,
+    )
+    assert "'" not in sql
+    assert hostile not in sql
+    assert params == [hostile, "%'--", ["sh600000", "x'y"], 1, 100]
+    assert sql.count("?") == 5
+    assert query_symbols(industry=hostile) == []
+    assert len(query_symbols()) == len(ALL)
+
+
+def test_failed_sync_rolls_back_overview_with_version():
+    with pytest.raises(RuntimeError):
+        with get_session() as session:
+            market_ops.upsert_market_overview(session, ROWS)
+            assert market_ops.bump_market_overview_version(session) == 1
+            raise RuntimeError("crash before commit")
+    assert market_ops.get_market_overview_version() == 0
+    assert query_symbols() == []
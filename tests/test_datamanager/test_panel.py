@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from autostock.datamanager.panel import DailyPanel
+
+LONG = pd.DataFrame(
+    {
+        "trade_date": pd.to_datetime(
+            ["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-03", "2024-01-05"]
+        ),
+        "symbol": ["sh600000", "sh600000", "sh600000", "sz000001", "sz000001"],
+        "close": [10.0, 10.1, 10.2, 12.0, 12.2],
+    }
+)
+
+
+def test_from_long_aligns_symbols_to_dates():
+    panel = DailyPanel.from_long(LONG, ["close"])
+    assert panel.shape == (4, 2)
+    assert panel.symbols == ["sh600000", "sz000001"]
+    np.testing.assert_array_equal(
+        panel["close"],
+        [[10.0, np.nan], [10.1, 12.0], [10.2, np.nan], [np.nan, 12.2]],
+    )
+    arrow = DailyPanel.from_arrow(pa.Table.from_pandas(LONG), ["close"])
+    np.testing.assert_array_equal(arrow.dates, panel.dates)
+    np.testing.assert_array_equal(arrow["close"], panel["close"])
+
+
+def test_unsorted_calendar_is_sorted_and_deduplicated():
+    calendar = np.array(
+        ["2024-01-05", "2024-01-03", "2024-01-02", "2024-01-03", "2024-01-08"],
+        dtype="datetime64[D]",
+    )
+    panel = DailyPanel.from_long(LONG, ["close"], ["sz000001", "sh600000"], calendar)
+    expected_dates = np.array(
+        ["2024-01-02", "2024-01-03", "2024-01-05", "2024-01-08"],
+        dtype="datetime64[ns]",
+    )
+    np.testing.assert_array_equal(panel.dates, expected_dates)
+    # 没有记录被丢弃，只有不在日历中的 2024-01-04
+    np.testing.assert_array_equal(
+        panel["close"],
+        [[np.nan, 10.0], [12.0, 10.1], [12.2, np.nan], [np.nan, np.nan]],
+    )
@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+
+from autostock.datamanager.pipeline import Pipeline, Stage
+
+# 流水线卡住时用例在这段时间后失败，而不是一直挂起
+TIMEOUT = 10
+
+
+def drain(pipeline: Pipeline, items, stop_after: int | None = None):
+    """
+    在另一个线程中消费流水线，返回 (结果列表, 抛出的异常)。
+
+    :param stop_after: 取到这么多个结果后在消费方抛出 KeyboardInterrupt，模拟 Ctrl-C。
+    """
+    results, errors = [], []
+
+    def consume():
+        try:
+            for result in pipeline.run(items):
+                results.append(result)
+                if stop_after is not None and len(results) >= stop_after:
+                    raise KeyboardInterrupt
+        except BaseException as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=consume, daemon=True)
+    thread.start()
+    thread.join(TIMEOUT)
+    assert not thread.is_alive(), "pipeline deadlocked"
+    return results, errors[0] if errors else None
+
+
+def stages(middle, slow: float = 0.0) -> list[Stage]:
+    def fetch(item):
+        time.sleep(slow)
+        return item * 10
+
+    return [
+        Stage("fetch", fetch, workers=2),
+        Stage("parse", middle, workers=2),
+        Stage("write", lambda value: value + 1),
+    ]
+
+
+def test_failing_middle_stage_skips_later_stages():
+    def parse(value):
+        if value % 30 == 0:
+            raise ValueError(f"bad {value}")
+        return value
+
+    pipeline = Pipeline(stages(parse), queue_size=1)
+    results, error = drain(pipeline, range(100))
+    assert error is None
+    assert len(results) == 100
+
+    failed = [r for r in results if not r.ok]
+    assert sorted(r.item for r in failed) == [i for i in range(100) if i % 3 == 0]
+    assert all(r.stage == "parse" and r.value is None for r in failed)
+    assert all(isinstance(r.error, ValueError) for r in failed)
+    assert sorted(r.value for r in results if r.ok) == [
+        i * 10 + 1 for i in range(100) if i % 3
+    ]
+
+    stats = pipeline.stats()
+    assert list(stats) == ["fetch", "parse", "write"]
+    assert stats["fetch"]["processed"] == 100 and stats["fetch"]["failed"] == 0
+    assert stats["parse"]["processed"] == 100 and stats["parse"]["failed"] == 34
+    assert stats["write"]["processed"] == 66
+    for values in stats.values():
+        assert values["queue_size"] == 1
+        assert values["queue_max"] <= 1
+        assert 0.0 <= values["utilization"] <= 1.0 + 1e-6
+    assert pipeline.bottleneck() in stats
+
+
+def test_bottleneck_is_the_busiest_stage():
+    def parse(value):
+        time.sleep(0.01)
+        return value
+
+    pipeline = Pipeline(stages(parse), queue_size=1)
+    results, error = drain(pipeline, range(40))
+    assert error is None and all(r.ok for r in results)
+    assert pipeline.bottleneck() == "parse"
+    stats = pipeline.stats()
+    assert stats["parse"]["busy_seconds"] >= 40 * 0.01
+    assert stats["parse"]["throughput"] > 0
+    assert pipeline.elapsed_seconds > 0
+
+
+def test_keyboard_interrupt_in_a_stage_stops_the_pipeline():
+    def parse(value):
+        if value == 50:
+            raise KeyboardInterrupt
+        return value
+
+    pipeline = Pipeline(stages(parse), queue_size=1)
+    results, error = drain(pipeline, range(1000))
+    assert isinstance(error, KeyboardInterrupt)
+    assert len(results) < 1000
+    assert pipeline.stats()["fetch"]["processed"] < 1000
+
+
+def test_keyboard_interrupt_in_the_consumer_stops_all_stages():
+    def parse(value):
+        time.sleep(0.001)
+        return value
+
+    fed = []
+
+    def items():
+        for i in range(10_000):
+            fed.append(i)
+            yield i
+
+    pipeline = Pipeline(stages(parse, slow=0.001), queue_size=1)
+    results, error = drain(pipeline, items(), stop_after=5)
+    assert isinstance(error, KeyboardInterrupt)
+    assert len(results) == 5
+    # 有界队列限制了在途条目数：4个容量为1的队列、5个工作线程和输入线程手上的一个
+    assert len(fed) <= len(results) + 4 + 5 + 1
+    count = len(fed)
+    time.sleep(0.3)
+    assert len(fed) == count
+
+
+def test_failing_input_iterator_is_raised():
+    def items():
+        yield from range(10)
+        raise RuntimeError("source failed")
+
+    pipeline = Pipeline(stages(lambda value: value), queue_size=1)
+    results, error = drain(pipeline, items())
+    assert isinstance(error, RuntimeError) and str(error) == "source failed"
+    assert len(results) <= 10
+
+
+def test_needs_a_stage():
+    with pytest.raises(ValueError):
+        Pipeline([])
@@ -0,0 +1,151 @@
+import os
+import time
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from autostock.datamanager import raw_cache
+from autostock.datamanager.raw_cache import RawResponseCache
+
+LATEST = date(2024, 1, 31)
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+@pytest.fixture(autouse=True)
+def latest_trade_date(monkeypatch):
+    monkeypatch.setattr(raw_cache, "latest_expected_trade_date", lambda: LATEST)
+
+
+def history(last_date: str, days: int = 5) -> pd.DataFrame:
+    dates = pd.bdate_range(end=last_date, periods=days)
+    return pd.DataFrame(
+        {"日期": dates.strftime("%Y-%m-%d"), "收盘": [10.0 + i for i in range(days)]}
+    )
+
+
+def hist_params(end_date: str = "20990101", adjust: str = "qfq") -> dict:
+    return {
+        "symbol": "000001",
+        "start_date": "19900101",
+        "end_date": end_date,
+        "adjust": adjust,
+    }
+
+
+def age(cache: RawResponseCache, endpoint: str, params: dict, seconds: float) -> None:
+    # 把缓存文件的写入时间改到 `seconds` 秒之前
+    path = cache._path(endpoint, params)
+    written = time.time() - seconds
+    os.utime(path, (written, written))
+
+
+@pytest.mark.parametrize(
+    "endpoint, params, payload, fresh, expired",
+    [
+        ("stock_zh_a_spot_em", {}, history("2024-01-31"), 50, 70),
+        # 同步的请求区间不结束，响应缺少最新交易日
+        ("stock_zh_a_hist", hist_params(), history("2024-01-30"), 3 * HOUR, 5 * HOUR),
+        # 响应已包含最新交易日：按已结束的前复权区间处理
+        ("stock_zh_a_hist", hist_params(), history("2024-01-31"), 6 * DAY, 8 * DAY),
+        # 请求区间在最新交易日之前结束
+        (
+            "stock_zh_a_hist",
+            hist_params(end_date="20231229"),
+            history("2023-12-29"),
+            6 * DAY,
+            8 * DAY,
+        ),
+    ],
+    ids=["spot", "open", "closed_qfq_latest", "closed_qfq_ended"],
+)
+def test_ttl_by_endpoint_and_last_trade_date(
+    tmp_path, endpoint, params, payload, fresh, expired
+):
+    cache = RawResponseCache(tmp_path)
+    cache.put(endpoint, params, payload)
+
+    age(cache, endpoint, params, fresh)
+    pd.testing.assert_frame_equal(cache.get(endpoint, params), payload)
+    age(cache, endpoint, params, expired)
+    assert cache.get(endpoint, params) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_closed_unadjusted_history_never_expires(tmp_path):
+    cache = RawResponseCache(tmp_path)
+    params = hist_params(end_date="20231229", adjust="")
+    cache.put("stock_zh_a_hist", params, history("2023-12-29"))
+    age(cache, "stock_zh_a_hist", params, 1000 * DAY)
+    assert cache.get("stock_zh_a_hist", params) is not None
+
+
+def test_ttl_classification(tmp_path):
+    cache = RawResponseCache(tmp_path)
+    key = cache._ttl_key
+    assert key("stock_zh_a_spot_em", {}, pd.DataFrame()) == "stock_zh_a_spot_em"
+    assert (
+        key("stock_zh_a_hist", hist_params(), history("2024-01-30"))
+        == "stock_zh_a_hist:open"
+    )
+    assert (
+        key("stock_zh_a_hist", hist_params(), pd.DataFrame()) == "stock_zh_a_hist:open"
+    )
+    assert (
+        key("stock_zh_a_hist", hist_params(), history("2024-01-31"))
+        == "stock_zh_a_hist:closed_qfq"
+    )
+    assert (
+        key("stock_zh_a_hist", hist_params(adjust="hfq"), history("2024-01-31"))
+        == "stock_zh_a_hist:closed"
+    )
+    assert (
+        key("stock_zh_a_hist", hist_params("20231229", "qfq"), history("2023-12-01"))
+        == "stock_zh_a_hist:closed_qfq"
+    )
+
+
+def test_allow_stale_ignores_ttl(tmp_path):
+    params = hist_params()
+    RawResponseCache(tmp_path).put("stock_zh_a_hist", params, history("2024-01-30"))
+    strict = RawResponseCache(tmp_path)
+    stale = RawResponseCache(tmp_path, allow_stale=True)
+    age(strict, "stock_zh_a_hist", params, 30 * DAY)
+    assert strict.get("stock_zh_a_hist", params) is None
+    assert stale.get("stock_zh_a_hist", params) is not None
+
+
+def test_get_updates_access_time_but_not_write_time(tmp_path):
+    cache = RawResponseCache(tmp_path)
+    params = hist_params()
+    cache.put("stock_zh_a_hist", params, history("2024-01-30"))
+    path = cache._path("stock_zh_a_hist", params)
+    os.utime(path, (1_000_000, time.time() - HOUR))
+    written = path.stat().st_mtime
+
+    assert cache.get("stock_zh_a_hist", params) is not None
+    assert path.stat().st_mtime == written
+    assert path.stat().st_atime > 1_000_000
+
+
+def test_eviction_removes_least_recently_accessed(tmp_path):
+    probe = RawResponseCache(tmp_path / "probe")
+    probe.put("stock_zh_a_spot_em", {"n": 0}, history("2024-01-31"))
+    size = probe._path("stock_zh_a_spot_em", {"n": 0}).stat().st_size
+
+    # 放入第4个条目时超过上限，按访问时间淘汰到上限的90%以下（剩2个条目）
+    cache = RawResponseCache(tmp_path / "cache", max_bytes=int(size * 3.2))
+    for n in range(3):
+        cache.put("stock_zh_a_spot_em", {"n": n}, history("2024-01-31"))
+    now = time.time()
+    for n, accessed in enumerate([now - 300, now - 100, now - 200]):
+        path = cache._path("stock_zh_a_spot_em", {"n": n})
+        os.utime(path, (accessed, now))
+
+    cache.put("stock_zh_a_spot_em", {"n": 3}, history("2024-01-31"))
+    remaining = {
+        n for n in range(4) if cache._path("stock_zh_a_spot_em", {"n": n}).exists()
+    }
+    assert remaining == {1, 3}
+    assert cache.stats()["bytes"] == 2 * size
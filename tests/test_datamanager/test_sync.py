@@ -0,0 +1,201 @@
+import pandas as pd
+import pytest
+
+from autostock.datamanager.local_fetcher import LocalFetcher
+from autostock.datamanager.manager import DataManager
+from autostock.datamanager.ops import sync_ops
+from autostock.datamanager.raw_cache import RawResponseCache
+from autostock.datamanager.session import get_session
+from autostock.datamanager.throttle import RateLimiter
+
+NUM_SYMBOLS = 24
+HISTORY_START = "20200101"
+# 第一次同步截止的日期，之后的增量同步补到 LATER_END
+EARLIER_END = "20231215"
+LATER_END = "20240131"
+PRICE_COLUMNS = ["开盘", "收盘", "最高", "最低", "涨跌额"]
+
+
+class RecordingFetcher(LocalFetcher):
+    """
+    记录每次 fetch_daily_history 请求的 (代码, start_date)。
+    """
+
+    def __init__(self, history_end: str, **kwargs):
+        super().__init__(
+            num_symbols=NUM_SYMBOLS,
+            history_start=HISTORY_START,
+            history_end=history_end,
+            **kwargs,
+        )
+        self.requests: list[tuple[str, str]] = []
+
+    def fetch_daily_history(self, symbol: str, start_date: str = "19900101", **kwargs):
+        self.requests.append((symbol, start_date))
+        return super().fetch_daily_history(symbol, start_date=start_date, **kwargs)
+
+
+class RescaledFetcher(RecordingFetcher):
+    """
+    模拟除权除息后前复权基准变化：所有历史价格整体乘以一个系数。
+    """
+
+    factor = 0.9
+
+    def fetch_daily_history(self, symbol: str, start_date: str = "19900101", **kwargs):
+        df = super().fetch_daily_history(symbol, start_date=start_date, **kwargs)
+        df[PRICE_COLUMNS] = (df[PRICE_COLUMNS] * self.factor).round(2)
+        return df
+
+
+def make_manager(tmp_path, fetcher, layout="per_symbol") -> DataManager:
+    manager = DataManager(
+        data_path=tmp_path / layout, daily_layout=layout, fetcher=fetcher
+    )
+    manager.sync_market_overview()
+    return manager
+
+
+def sync(manager: DataManager, **kwargs):
+    return manager.sync_daily_history(workers=2, requests_per_second=0, **kwargs)
+
+
+def stored_history(manager: DataManager) -> dict[str, pd.DataFrame]:
+    return {
+        symbol: manager.get_daily_history(symbol, use_cache=False)
+        for symbol in manager.get_market_snapshot().symbols
+    }
+
+
+def interrupt_after(monkeypatch, manager: DataManager, count: int) -> None:
+    # 主线程每登记一只成功的股票就会调用一次 invalidate，在这里模拟 Ctrl-C
+    calls = []
+
+    def invalidate(key=None):
+        calls.append(key)
+        if len(calls) >= count:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(manager.daily_cache, "invalidate", invalidate)
+
+
+def latest_run() -> tuple[str | None, str | None, list[str]]:
+    """
+    最近一次可续传的运行：(run_id, status, 未完成的股票)。
+    """
+    with get_session() as session:
+        run = sync_ops.get_resumable_run(session, DataManager.DAILY_SYNC_KIND)
+        if run is None:
+            return None, None, []
+        unfinished = sync_ops.get_unfinished_symbols(session, run.run_id)
+        return run.run_id, run.status, unfinished
+
+
+@pytest.mark.parametrize("layout", ["per_symbol", "dataset"])
+def test_resume_processes_only_unfinished_symbols(tmp_path, monkeypatch, layout):
+    manager = make_manager(tmp_path, RecordingFetcher(LATER_END), layout)
+    interrupt_after(monkeypatch, manager, 10)
+    with pytest.raises(KeyboardInterrupt):
+        sync(manager)
+    monkeypatch.undo()
+
+    run_id, status, unfinished = latest_run()
+    assert status == "interrupted"
+    assert 0 < len(unfinished) < NUM_SYMBOLS
+
+    manager.fetcher = RecordingFetcher(LATER_END)
+    summary = sync(manager, resume=True)
+    assert summary.run_id == run_id
+    assert sorted(summary.succeeded) == unfinished
+    assert len(manager.fetcher.requests) == len(unfinished)
+    assert latest_run() == (None, None, [])
+
+    assert not list(manager.data_path.rglob("*.tmp"))
+    assert not list(manager.data_path.rglob("part-*.parquet"))
+    assert all(not df.empty for df in stored_history(manager).values())
+
+
+def test_resume_restores_incremental_mode(tmp_path, monkeypatch):
+    manager = make_manager(tmp_path, RecordingFetcher(EARLIER_END))
+    sync(manager)
+
+    manager.fetcher = RecordingFetcher(LATER_END)
+    interrupt_after(monkeypatch, manager, 5)
+    with pytest.raises(KeyboardInterrupt):
+        sync(manager, incremental=True)
+    monkeypatch.undo()
+
+    # 续传时不再传 incremental=True，应沿用原运行保存的设置
+    manager.fetcher = RecordingFetcher(LATER_END)
+    summary = sync(manager, resume=True)
+    assert summary.succeeded
+    assert manager.fetcher.requests
+    assert all(start != "19900101" for _, start in manager.fetcher.requests)
+
+
+@pytest.mark.parametrize("layout", ["per_symbol", "dataset"])
+def test_incremental_sync_matches_full_refetch(tmp_path, layout):
+    incremental = make_manager(
+        tmp_path / "incremental", RecordingFetcher(EARLIER_END), layout
+    )
+    sync(incremental)
+    incremental.fetcher = RecordingFetcher(LATER_END)
+    sync(incremental, incremental=True)
+    assert all(start != "19900101" for _, start in incremental.fetcher.requests)
+
+    full = make_manager(tmp_path / "full", RecordingFetcher(LATER_END), layout)
+    sync(full)
+
+    expected = stored_history(full)
+    got = stored_history(incremental)
+    assert got.keys() == expected.keys()
+    for symbol, df in expected.items():
+        assert df["trade_date"].max() == pd.Timestamp("2024-01-31")
+        pd.testing.assert_frame_equal(got[symbol], df, obj=symbol)
+
+
+@pytest.mark.parametrize("layout", ["per_symbol", "dataset"])
+def test_adjustment_basis_change_triggers_full_refetch(tmp_path, layout):
+    manager = make_manager(tmp_path, RecordingFetcher(EARLIER_END), layout)
+    sync(manager)
+
+    manager.fetcher = RescaledFetcher(LATER_END)
+    summary = sync(manager, incremental=True)
+    requests = manager.fetcher.requests
+    assert summary.succeeded
+    # 每只股票先增量请求，发现重叠日的收盘价不一致后重新获取完整历史
+    assert {code for code, start in requests if start == "19900101"} == {
+        code for code, start in requests if start != "19900101"
+    }
+
+    reference = RescaledFetcher(LATER_END)
+    for symbol, df in stored_history(manager).items():
+        raw = reference.fetch_daily_history(symbol[2:])
+        assert len(df) == len(raw)
+        assert df["close"].tolist() == raw["收盘"].tolist()
+
+
+def test_warm_cache_sync_takes_no_limiter_tokens(tmp_path, monkeypatch):
+    acquired = []
+    monkeypatch.setattr(RateLimiter, "acquire", lambda self: acquired.append(self))
+    cache = RawResponseCache(tmp_path / "cache")
+    manager = make_manager(tmp_path, RecordingFetcher(LATER_END, cache=cache))
+    sync(manager)
+    assert len(acquired) == NUM_SYMBOLS
+
+    # 重新导入全部股票：全部命中原始响应缓存，既不请求也不等待令牌
+    acquired.clear()
+    manager.fetcher = RecordingFetcher(LATER_END, cache=cache)
+    summary = sync(manager)
+    assert len(summary.succeeded) == NUM_SYMBOLS
+    assert acquired == []
+    assert manager.fetcher.stats()["calls"] == 0
+
+
+def test_failed_market_overview_request_returns_none(tmp_path):
+    fetcher = RecordingFetcher(LATER_END, error_rate=1.0)
+    assert fetcher.get_market_overview() is None
+    manager = DataManager(data_path=tmp_path, fetcher=fetcher)
+    result = manager.sync_market_overview()
+    assert result["records"] == 0
+    assert fetcher.errors == 2
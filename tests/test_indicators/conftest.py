@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+DATES = 260
+SYMBOLS = 6
+
+
+@pytest.fixture(scope="session")
+def prices() -> dict[str, np.ndarray]:
+    """
+    (日期, 股票) 的最高、最低、收盘价矩阵，包含各种缺失情况：
+    不同的上市日期（前导NaN）、停牌（中间的连续NaN）、一段不变的价格、
+    数据少于周期的股票、全部缺失的股票，以及只有最高价缺失的一天。
+    """
+    rng = np.random.default_rng(7)
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, (DATES, SYMBOLS)), axis=0))
+    close = close.round(2)
+    high = (close * (1 + rng.uniform(0, 0.03, close.shape))).round(2)
+    low = (close * (1 - rng.uniform(0, 0.03, close.shape))).round(2)
+
+    missing = np.zeros(close.shape, dtype=bool)
+    missing[:15, 1] = True
+    missing[40:55, 1] = True
+    missing[100:101, 2] = True
+    missing[150:170, 2] = True
+    missing[:, 3] = True
+    missing[:-8, 4] = True
+    close[60:90, 5] = close[59, 5]
+    high[60:90, 5] = close[59, 5]
+    low[60:90, 5] = close[59, 5]
+    close[missing] = high[missing] = low[missing] = np.nan
+    high[120, 0] = np.nan
+    return {"high": high, "low": low, "close": close}
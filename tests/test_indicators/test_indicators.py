@@ -0,0 +1,197 @@
+import numpy as np
+import pytest
+
+from autostock.indicators import atr, bollinger, ema, kdj, ma, macd, rsi, true_range
+
+
+def columnwise(func, *arrays) -> tuple[np.ndarray, ...]:
+    """
+    对每只股票去掉缺失日（任一输入为NaN）后调用 `func`，再把结果放回原来的位置。
+    """
+    outputs = None
+    for j in range(arrays[0].shape[1]):
+        columns = [a[:, j] for a in arrays]
+        valid = ~np.logical_or.reduce([np.isnan(c) for c in columns])
+        results = func(*[c[valid] for c in columns])
+        results = results if isinstance(results, tuple) else (results,)
+        if outputs is None:
+            outputs = tuple(np.full(arrays[0].shape, np.nan) for _ in results)
+        for out, result in zip(outputs, results):
+            out[valid, j] = result
+    return outputs
+
+
+# ---------------------------------------------------------------- 逐日循环的参考实现
+
+
+def ref_sma(x, period):
+    out = np.full(len(x), np.nan)
+    for i in range(period - 1, len(x)):
+        out[i] = sum(x[i - period + 1 : i + 1]) / period
+    return out
+
+
+def ref_ema(x, period, seed_at=None):
+    # seed_at：第一个输出所在的位置，初始值为它之前（含）`period` 个值的平均
+    seed_at = period - 1 if seed_at is None else seed_at
+    k = 2.0 / (period + 1)
+    out = np.full(len(x), np.nan)
+    if len(x) <= seed_at:
+        return out
+    value = sum(x[seed_at - period + 1 : seed_at + 1]) / period
+    out[seed_at] = value
+    for i in range(seed_at + 1, len(x)):
+        value = (x[i] - value) * k + value
+        out[i] = value
+    return out
+
+
+def ref_macd(x, fast=12, slow=26, signal=9):
+    slow_ema = ref_ema(x, slow)
+    fast_ema = ref_ema(x, fast, seed_at=slow - 1)
+    dif = fast_ema - slow_ema
+    dea = np.full(len(x), np.nan)
+    start = slow - 1
+    if len(x) > start:
+        dea[start:] = ref_ema(dif[start:], signal)
+    dif[np.isnan(dea)] = np.nan
+    return dif, dea, dif - dea
+
+
+def ref_bbands(x, period=20, nbdev=2.0):
+    middle = ref_sma(x, period)
+    deviation = np.full(len(x), np.nan)
+    for i in range(period - 1, len(x)):
+        window = x[i - period + 1 : i + 1]
+        variance = sum((v - middle[i]) ** 2 for v in window) / period
+        deviation[i] = 0.0 if variance < 1e-8 else np.sqrt(variance)
+    return middle + nbdev * deviation, middle, middle - nbdev * deviation
+
+
+def ref_wilder(values, period):
+    # values[0] 没有意义（没有前一天），平滑从 values[1] 开始
+    out = np.full(len(values), np.nan)
+    if len(values) <= period:
+        return out
+    value = sum(values[1 : period + 1]) / period
+    out[period] = value
+    for i in range(period + 1, len(values)):
+        value = (value * (period - 1) + values[i]) / period
+        out[i] = value
+    return out
+
+
+def ref_rsi(x, period=14):
+    gains = np.zeros(len(x))
+    losses = np.zeros(len(x))
+    for i in range(1, len(x)):
+        change = x[i] - x[i - 1]
+        gains[i] = max(change, 0.0)
+        losses[i] = max(-change, 0.0)
+    gain, loss = ref_wilder(gains, period), ref_wilder(losses, period)
+    out = np.full(len(x), np.nan)
+    for i in range(len(x)):
+        if np.isnan(gain[i]):
+            continue
+        total = gain[i] + loss[i]
+        out[i] = 0.0 if total < 1e-8 else 100.0 * gain[i] / total
+    return out
+
+
+def ref_true_range(high, low, close):
+    out = np.full(len(close), np.nan)
+    for i in range(1, len(close)):
+        out[i] = max(high[i], close[i - 1]) - min(low[i], close[i - 1])
+    return out
+
+
+def ref_atr(high, low, close, period=14):
+    return ref_wilder(ref_true_range(high, low, close), period)
+
+
+def ref_kdj(high, low, close, period=9, k_period=3, d_period=3):
+    k_out, d_out = np.full(len(close), np.nan), np.full(len(close), np.nan)
+    k = d = 50.0
+    for i in range(period - 1, len(close)):
+        highest = max(high[i - period + 1 : i + 1])
+        lowest = min(low[i - period + 1 : i + 1])
+        spread = highest - lowest
+        rsv = (close[i] - lowest) / spread * 100.0 if spread > 1e-8 else 0.0
+        k = (k * (k_period - 1) + rsv) / k_period
+        d = (d * (d_period - 1) + k) / d_period
+        k_out[i], d_out[i] = k, d
+    return k_out, d_out, 3 * k_out - 2 * d_out
+
+
+# ---------------------------------------------------------------- 用例
+
+
+def assert_same(got, expected):
+    got = got if isinstance(got, tuple) else (got,)
+    assert len(got) == len(expected)
+    for g, e in zip(got, expected):
+        assert g.shape == e.shape
+        np.testing.assert_array_equal(np.isnan(g), np.isnan(e))
+        np.testing.assert_allclose(g, e, rtol=0, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("period", [1, 5, 20])
+def test_ma(prices, period):
+    close = prices["close"]
+    assert_same(ma(close, period), columnwise(lambda x: ref_sma(x, period), close))
+
+
+@pytest.mark.parametrize("period", [3, 12, 26])
+def test_ema(prices, period):
+    close = prices["close"]
+    assert_same(ema(close, period), columnwise(lambda x: ref_ema(x, period), close))
+
+
+@pytest.mark.parametrize("params", [(12, 26, 9), (6, 13, 5), (26, 12, 9)])
+def test_macd(prices, params):
+    close = prices["close"]
+    fast, slow, signal = params
+    expected = columnwise(
+        lambda x: ref_macd(x, min(fast, slow), max(fast, slow), signal), close
+    )
+    assert_same(macd(close, fast, slow, signal), expected)
+
+
+@pytest.mark.parametrize("period, nbdev", [(20, 2.0), (10, 1.5)])
+def test_bollinger(prices, period, nbdev):
+    close = prices["close"]
+    expected = columnwise(lambda x: ref_bbands(x, period, nbdev), close)
+    assert_same(bollinger(close, period, nbdev), expected)
+
+
+@pytest.mark.parametrize("period", [6, 14])
+def test_rsi(prices, period):
+    close = prices["close"]
+    assert_same(rsi(close, period), columnwise(lambda x: ref_rsi(x, period), close))
+
+
+def test_true_range(prices):
+    hlc = prices["high"], prices["low"], prices["close"]
+    assert_same(true_range(*hlc), columnwise(ref_true_range, *hlc))
+
+
+@pytest.mark.parametrize("period", [5, 14])
+def test_atr(prices, period):
+    hlc = prices["high"], prices["low"], prices["close"]
+    expected = columnwise(lambda h, l, c: ref_atr(h, l, c, period), *hlc)
+    assert_same(atr(*hlc, period), expected)
+
+
+@pytest.mark.parametrize("params", [(9, 3, 3), (5, 2, 4)])
+def test_kdj(prices, params):
+    hlc = prices["high"], prices["low"], prices["close"]
+    expected = columnwise(lambda h, l, c: ref_kdj(h, l, c, *params), *hlc)
+    assert_same(kdj(*hlc, *params), expected)
+
+
+def test_one_dimensional_input(prices):
+    close = prices["close"][:, 1]
+    expected = columnwise(lambda x: ref_rsi(x, 14), close.reshape(-1, 1))[0][:, 0]
+    result = rsi(close, 14)
+    assert result.shape == close.shape
+    assert_same(result, (expected,))
@@ -0,0 +1,187 @@
+import numpy as np
+import pytest
+
+from autostock.datamanager.panel import DailyPanel
+from autostock.indicators import (
+    IndicatorStateStore,
+    StreamingATR,
+    StreamingBollinger,
+    StreamingEMA,
+    StreamingKDJ,
+    StreamingMA,
+    StreamingMACD,
+    StreamingRSI,
+    atr,
+    bollinger,
+    ema,
+    kdj,
+    ma,
+    macd,
+    rsi,
+)
+
+# (增量指标, 对同一面板做全量计算的函数)
+CASES = {
+    "ma": (lambda: StreamingMA(5), lambda p: {"ma": ma(p["close"], 5)}),
+    "ema": (lambda: StreamingEMA(12), lambda p: {"ema": ema(p["close"], 12)}),
+    "macd": (
+        lambda: StreamingMACD(12, 26, 9),
+        lambda p: dict(zip(("dif", "dea", "hist"), macd(p["close"], 12, 26, 9))),
+    ),
+    "rsi": (lambda: StreamingRSI(14), lambda p: {"rsi": rsi(p["close"], 14)}),
+    "atr": (
+        lambda: StreamingATR(14),
+        lambda p: {"atr": atr(p["high"], p["low"], p["close"], 14)},
+    ),
+    "kdj": (
+        lambda: StreamingKDJ(9, 3, 3),
+        lambda p: dict(zip(("k", "d", "j"), kdj(p["high"], p["low"], p["close"]))),
+    ),
+    "bollinger": (
+        lambda: StreamingBollinger(20, 2.0),
+        lambda p: dict(
+            zip(("upper", "middle", "lower"), bollinger(p["close"], 20, 2.0))
+        ),
+    ),
+}
+# 分批提交的行区间：包含只有一天的批次
+CHUNKS = [(0, 12), (12, 13), (13, 120), (120, 200), (200, None)]
+
+
+def make_panel(prices, rows=slice(None), symbols=None) -> DailyPanel:
+    names = [f"s{j}" for j in range(prices["close"].shape[1])]
+    columns = list(range(len(names))) if symbols is None else symbols
+    return DailyPanel(
+        dates=(
+            np.datetime64("2020-01-01", "ns")
+            + np.arange(len(prices["close"])) * np.timedelta64(1, "D")
+        )[rows],
+        symbols=[names[j] for j in columns],
+        fields={name: values[rows][:, columns] for name, values in prices.items()},
+    )
+
+
+def stitch(chunks: list[dict[str, np.ndarray]]) -> dict[str, np.ndarray]:
+    return {name: np.vstack([c[name] for c in chunks]) for name in chunks[0]}
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_incremental_updates_equal_full_recompute(prices, name):
+    create, compute = CASES[name]
+    panel = make_panel(prices)
+    expected = compute(panel)
+
+    indicator = create()
+    chunks = []
+    for i, (start, stop) in enumerate(CHUNKS):
+        rows = slice(start, stop)
+        if i == 0:
+            # 第一批中没有数据的股票不提交，之后第一次出现时才加入
+            present = np.flatnonzero(~np.isnan(prices["close"][rows]).all(axis=0))
+            part = make_panel(prices, rows, present.tolist())
+            outputs = indicator.update_panel(part)
+            full = {
+                n: np.full((len(part.dates), len(panel.symbols)), np.nan)
+                for n in outputs
+            }
+            for n, values in outputs.items():
+                full[n][:, present] = values
+            chunks.append(full)
+            continue
+        if i == 2:
+            # 中途把状态保存为 Arrow 表，用新对象恢复后继续
+            table = indicator.to_arrow()
+            indicator = create()
+            indicator.load_arrow(table)
+        part = make_panel(prices, rows)
+        outputs = indicator.update_panel(part)
+        chunks.append(outputs)
+
+    got = stitch(chunks)
+    assert got.keys() == expected.keys()
+    for output, values in expected.items():
+        np.testing.assert_array_equal(got[output], values, err_msg=output)
+        last = {
+            j: values[np.flatnonzero(~np.isnan(panel["close"][:, j]))[-1], j]
+            for j in range(len(panel.symbols))
+            if not np.isnan(panel["close"][:, j]).all()
+        }
+        for j, value in last.items():
+            column = indicator.symbols.index(panel.symbols[j])
+            np.testing.assert_array_equal(indicator.latest[output][column], value)
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_rescaled_history_is_detected_and_recomputed(prices, name):
+    create, compute = CASES[name]
+    cut = 150
+    indicator = create()
+    indicator.update_panel(make_panel(prices, slice(0, cut)))
+
+    # s0 除权除息：前复权历史整体变化
+    rescaled = {field: values.copy() for field, values in prices.items()}
+    for values in rescaled.values():
+        values[:, 0] = (values[:, 0] * 0.9).round(2)
+    assert indicator.stale_symbols(make_panel(rescaled, slice(0, cut))) == ["s0"]
+    assert indicator.stale_symbols(make_panel(prices, slice(0, cut))) == []
+
+    indicator.reset(["s0"])
+    panel = make_panel(rescaled)
+    outputs = indicator.update_panel(panel)
+    expected = compute(panel)
+    for output, values in expected.items():
+        # s0 从第一个交易日重新计算，其他股票只处理新的交易日
+        np.testing.assert_array_equal(outputs[output][:, 0], values[:, 0])
+        np.testing.assert_array_equal(outputs[output][cut:], values[cut:])
+        assert np.isnan(outputs[output][:cut, 1:]).all()
+
+
+class PanelManager:
+    """
+    只提供 `refresh` 用到的接口：面板的前 `end` 行，记录每次请求的 (股票, start_date)。
+    """
+
+    def __init__(self, prices, end: int):
+        self.panel = make_panel(prices, slice(0, end))
+        self.requests = []
+
+    def get_stock_list(self):
+        return list(self.panel.symbols)
+
+    def get_daily_panel(self, symbols, fields, start_date=None):
+        self.requests.append((list(symbols), start_date))
+        rows = slice(None)
+        if start_date is not None:
+            rows = slice(
+                np.searchsorted(self.panel.dates, np.datetime64(start_date)), None
+            )
+        columns = [self.panel.symbol_index(s) for s in symbols]
+        return DailyPanel(
+            dates=self.panel.dates[rows],
+            symbols=list(symbols),
+            fields={f: self.panel[f][rows][:, columns] for f in fields},
+        )
+
+
+def test_refresh_reads_each_symbol_from_its_own_last_date(prices, tmp_path):
+    store = IndicatorStateStore(tmp_path)
+    store.refresh(StreamingMA(5), PanelManager(prices, 160))
+
+    # s2 从第150行起停牌，其他股票处理到了第159行；s3、s4 还没有数据
+    manager = PanelManager(prices, 200)
+    indicator = store.refresh(StreamingMA(5), manager)
+    dates = manager.panel.dates
+    assert manager.requests == [
+        (["s2"], dates[149].astype("datetime64[D]").item()),
+        (["s0", "s1", "s5"], dates[159].astype("datetime64[D]").item()),
+        (["s3", "s4"], None),
+    ]
+
+    expected = ma(manager.panel["close"], 5)
+    for j, symbol in enumerate(manager.panel.symbols):
+        valid = np.flatnonzero(~np.isnan(manager.panel["close"][:, j]))
+        column = indicator.symbols.index(symbol)
+        if valid.size:
+            np.testing.assert_array_equal(
+                indicator.latest["ma"][column], expected[valid[-1], j]
+            )
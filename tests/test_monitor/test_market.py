@@ -0,0 +1,289 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from autostock.backtesting.vectorized import LIMIT_PRICE_TOLERANCE, price_limit_rates
+from autostock.datamanager.local_fetcher import LocalFetcher
+from autostock.monitor import MarketMonitor
+from autostock.monitor.market import ST_PRICE_LIMIT
+
+START = datetime(2024, 7, 1, 9, 30)
+
+# 代码 -> (名称, 昨收)；涵盖 10%、20%、30% 和 ST 5% 的涨跌幅限制
+STOCKS = {
+    "600000": ("浦发银行", 10.0),
+    "000001": ("平安银行", 12.34),
+    "300750": ("宁德时代", 180.0),
+    "688981": ("中芯国际", 45.0),
+    "830799": ("艾融软件", 20.0),
+    "000004": ("*ST国华", 8.0),
+}
+
+
+def quotes(prices: dict, volumes: dict | None = None, order=None) -> pd.DataFrame:
+    """
+    按 ak.stock_zh_a_spot_em() 的列名构造行情，`order` 给出行的顺序（默认与 prices 相同）。
+    成交额按 成交量(手) * 100 * 价格 计算。
+    """
+    codes = list(order or prices)
+    volumes = volumes or {}
+    price = np.array([prices[c] for c in codes], dtype=float)
+    volume = np.array([volumes.get(c, 1000) for c in codes], dtype=float)
+    return pd.DataFrame(
+        {
+            "代码": codes,
+            "名称": [STOCKS[c][0] if c in STOCKS else f"新股{c}" for c in codes],
+            "最新价": price,
+            "成交量": volume,
+            "成交额": volume * 100 * np.nan_to_num(price),
+            "最高": price,
+            "最低": price,
+            "昨收": [STOCKS[c][1] if c in STOCKS else 10.0 for c in codes],
+        }
+    )
+
+
+def opening() -> dict:
+    return {code: prev for code, (_, prev) in STOCKS.items()}
+
+
+def at(seconds: float) -> datetime:
+    return START + timedelta(seconds=seconds)
+
+
+def test_only_changed_symbols_are_emitted():
+    monitor = MarketMonitor()
+    first = monitor.update(quotes(opening()), at(0))
+    assert len(first.changes) == len(STOCKS)
+
+    prices = opening() | {"600000": 10.1}
+    volumes = {"000001": 1500}
+    tick = monitor.update(quotes(prices, volumes), at(5))
+    changes = tick.changes.set_index("symbol")
+    assert sorted(changes.index) == ["sh600000", "sz000001"]
+    assert changes.loc["sh600000", "change"] == pytest.approx(0.1)
+    assert changes.loc["sh600000", "pct_change"] == pytest.approx(1.0)
+    assert changes.loc["sz000001", "change"] == 0
+    assert changes.loc["sz000001", "volume_delta"] == 500
+    assert changes.loc["sz000001", "amount_delta"] == pytest.approx(500 * 100 * 12.34)
+
+    assert monitor.update(quotes(prices, volumes), at(10)).changes.empty
+
+
+def test_partial_and_reordered_frames():
+    monitor = MarketMonitor()
+    monitor.update(quotes(opening()), at(0))
+    # 只有两只股票、顺序与第一次不同
+    tick = monitor.update(
+        quotes({"830799": 21.0, "600000": 10.0}, order=["830799", "600000"]), at(5)
+    )
+    assert tick.changes["symbol"].tolist() == ["bj830799"]
+
+    frame = monitor.to_frame().set_index("symbol")
+    assert frame.loc["bj830799", "price"] == 21.0
+    # 本次没有出现的股票沿用上一个快照的值
+    assert frame.loc["sz300750", "price"] == 180.0
+    assert frame.loc["sh688981", "volume"] == 1000
+    assert monitor.stats.total == len(STOCKS)
+    assert monitor.stats.advancing == 1
+    assert monitor.stats.flat == len(STOCKS) - 1
+
+
+def test_new_symbols_mid_session_grow_the_ring():
+    monitor = MarketMonitor(speed_window=5)
+    monitor.update(quotes(opening()), at(0))
+    monitor.update(quotes(opening() | {"600000": 10.2}), at(5))
+    assert monitor.ring.size == len(STOCKS)
+
+    tick = monitor.update(quotes(opening() | {"600000": 10.2, "301000": 11.0}), at(10))
+    assert len(monitor) == len(STOCKS) + 1
+    assert monitor.ring.size == len(STOCKS) + 1
+    assert tick.changes["symbol"].tolist() == ["sz301000"]
+    row = monitor.symbols.tolist().index("sz301000")
+    assert monitor.ring.latest("price")[row] == 11.0
+    assert np.isnan(monitor.ring.latest("price", 1)[row])
+    # 新股票没有窗口起点的价格，涨速为 NaN；其他股票正常计算
+    speed = dict(zip(monitor.symbols, monitor.speed()))
+    assert np.isnan(speed["sz301000"])
+    assert speed["sh600000"] == pytest.approx(0.0)
+    assert monitor.stats.advancing == 2
+
+
+def test_new_codes_are_standardized_once_and_get_their_price_limits():
+    monitor = MarketMonitor()
+    monitor.update(quotes(opening()), at(0))
+    assert monitor.symbols.tolist() == [
+        "sh600000",
+        "sz000001",
+        "sz300750",
+        "sh688981",
+        "bj830799",
+        "sz000004",
+    ]
+    expected = price_limit_rates(monitor.symbols.tolist())
+    expected[-1] = ST_PRICE_LIMIT
+    np.testing.assert_allclose(monitor._limit_rates, expected)
+
+
+def recount(prices: dict, touched: set[str]) -> dict:
+    """
+    从头统计涨跌家数、涨跌停和炸板数量，更新 `touched`（今天触及过涨停的股票）。
+    触及过涨停、当前不在涨停价（包括没有报价）的股票算作炸板。
+    """
+    counts = dict.fromkeys(
+        ["up", "down", "flat", "limit_up", "limit_down", "broken"], 0
+    )
+    for code, price in prices.items():
+        name, prev = STOCKS[code]
+        if np.isnan(price):
+            counts["broken"] += int(code in touched)
+            continue
+        rate = 0.05 if "ST" in name else price_limit_rates([symbol(code)])[0]
+        limit_up = np.floor(prev * (1 + rate) * 100 + 0.5) / 100
+        limit_down = np.floor(prev * (1 - rate) * 100 + 0.5) / 100
+        key = "up" if price > prev else "down" if price < prev else "flat"
+        counts[key] += 1
+        at_up = price >= limit_up - LIMIT_PRICE_TOLERANCE
+        if at_up:
+            counts["limit_up"] += 1
+            touched.add(code)
+        elif code in touched:
+            counts["broken"] += 1
+        counts["limit_down"] += int(price <= limit_down + LIMIT_PRICE_TOLERANCE)
+    return counts
+
+
+def symbol(code: str) -> str:
+    return {"6": "sh", "8": "bj"}.get(code[0], "sz") + code
+
+
+def test_incremental_counts_match_a_full_recount():
+    rng = np.random.default_rng(7)
+    codes = list(STOCKS)
+    limits = {}
+    for code in codes:
+        name, prev = STOCKS[code]
+        rate = 0.05 if "ST" in name else price_limit_rates([symbol(code)])[0]
+        limits[code] = (
+            np.floor(prev * (1 - rate) * 100 + 0.5) / 100,
+            np.floor(prev * (1 + rate) * 100 + 0.5) / 100,
+        )
+
+    monitor = MarketMonitor()
+    prices = opening()
+    touched: set[str] = set()
+    for i in range(300):
+        # 每次只有部分股票出现，顺序随机；价格常落在涨跌停价和离涨跌停一个价位上
+        shown = [c for c in codes if i == 0 or rng.random() < 0.7] or codes[:1]
+        shown = list(rng.permutation(shown))
+        for code in shown:
+            low, high = limits[code]
+            prev = STOCKS[code][1]
+            prices[code] = rng.choice(
+                [low, low + 0.01, high - 0.01, high, prev, np.nan]
+                + [round(rng.uniform(low, high), 2)] * 3
+            )
+        monitor.update(quotes({c: prices[c] for c in shown}, order=shown), at(5 * i))
+
+        expected = recount(prices, touched)
+        stats = monitor.stats
+        assert stats.advancing == expected["up"]
+        assert stats.declining == expected["down"]
+        assert stats.flat == expected["flat"]
+        assert stats.total == expected["up"] + expected["down"] + expected["flat"]
+        assert stats.limit_up == expected["limit_up"]
+        assert stats.limit_down == expected["limit_down"]
+        assert stats.limit_up_broken == expected["broken"]
+
+
+def test_limit_up_opened_by_one_tick_counts_as_broken():
+    monitor = MarketMonitor()
+    tick = monitor.update(quotes(opening() | {"600000": 11.0}), at(0))
+    assert tick.new_limit_up == ["sh600000"]
+    assert (monitor.stats.limit_up, monitor.stats.limit_up_broken) == (1, 0)
+
+    monitor.update(quotes(opening() | {"600000": 10.99}), at(5))
+    assert (monitor.stats.limit_up, monitor.stats.limit_up_broken) == (0, 1)
+
+    tick = monitor.update(quotes(opening() | {"600000": 11.0}), at(10))
+    assert tick.new_limit_up == ["sh600000"]
+    assert (monitor.stats.limit_up, monitor.stats.limit_up_broken) == (1, 0)
+
+
+def test_new_trading_day_resets_state():
+    monitor = MarketMonitor()
+    monitor.update(quotes(opening() | {"600000": 11.0}), at(0))
+    monitor.update(quotes(opening() | {"600000": 10.5}), at(5))
+    assert monitor.stats.limit_up_broken == 1
+
+    tick = monitor.update(quotes(opening()), at(5) + timedelta(days=1))
+    assert monitor.day == (START + timedelta(days=1)).date()
+    assert monitor.ticks == 1
+    assert len(monitor.ring) == 1
+    assert len(tick.changes) == len(STOCKS)
+    assert monitor.stats.limit_up_broken == 0
+    assert monitor.stats.flat == len(STOCKS)
+
+
+def test_surge_detection():
+    monitor = MarketMonitor(
+        surge_window=60, surge_ratio=3, surge_halflife=300, min_surge_amount=1e6
+    )
+    volumes = {code: 0 for code in STOCKS}
+    # 每5秒每只股票成交100手，持续10分钟
+    for i in range(120):
+        volumes = {code: v + 100 for code, v in volumes.items()}
+        tick = monitor.update(quotes(opening(), volumes), at(5 * i))
+        assert tick.new_surges == []
+    assert monitor.stats.surging == 0
+
+    # 一只股票突然成交10000手
+    volumes = {code: v + 100 for code, v in volumes.items()}
+    volumes["600000"] += 10_000
+    tick = monitor.update(quotes(opening(), volumes), at(600))
+    assert tick.new_surges == ["sh600000"]
+    assert monitor.stats.surging == 1
+    ratio = tick.changes.set_index("symbol")["volume_ratio"]
+    assert ratio["sh600000"] >= 3
+    assert ratio.drop("sh600000").between(0.5, 2).all()
+
+    # 仍在放量中，不重复报告；窗口过去之后恢复
+    volumes = {code: v + 100 for code, v in volumes.items()}
+    assert monitor.update(quotes(opening(), volumes), at(605)).new_surges == []
+    for i in range(2, 20):
+        volumes = {code: v + 100 for code, v in volumes.items()}
+        monitor.update(quotes(opening(), volumes), at(600 + 5 * i))
+    assert monitor.stats.surging == 0
+
+
+def test_small_amounts_do_not_count_as_surges():
+    monitor = MarketMonitor(min_surge_amount=1e9)
+    volumes = {code: 0 for code in STOCKS}
+    for i in range(30):
+        volumes = {
+            code: v + (10_000 if i == 29 else 100) for code, v in volumes.items()
+        }
+        tick = monitor.update(quotes(opening(), volumes), at(5 * i))
+    assert tick.new_surges == []
+
+
+def test_poll_skips_failed_requests():
+    fetcher = LocalFetcher(num_symbols=50)
+    monitor = MarketMonitor(fetcher)
+    assert monitor.poll() is not None
+
+    fetcher.error_rate = 1.0
+    assert fetcher.get_realtime_quotes() is None
+    assert monitor.poll() is None
+    assert monitor.run(interval=0, max_ticks=3) == 0
+    assert monitor.ticks == 1
+
+    fetcher.error_rate = 0.0
+    assert monitor.run(interval=0, max_ticks=2) == 2
+
+
+def test_poll_without_fetcher():
+    with pytest.raises(ValueError):
+        MarketMonitor().poll()
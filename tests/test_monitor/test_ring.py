@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from autostock.monitor import SnapshotRing
+
+
+def filled_ring(pushes: int, capacity: int = 3, size: int = 2) -> SnapshotRing:
+    # 第 i 个快照的时间为 10*i，price 为 [i, 100+i]
+    ring = SnapshotRing(("price",), size, capacity)
+    for i in range(pushes):
+        ring.push(10.0 * i, {"price": np.array([i, 100 + i], dtype=float)})
+    return ring
+
+
+def test_wrap_around_keeps_the_latest_snapshots_in_order():
+    ring = filled_ring(5)
+    assert len(ring) == 3
+    assert ring.count == 5
+    assert ring.latest("price").tolist() == [4, 104]
+    assert ring.latest("price", 2).tolist() == [2, 102]
+    assert [ring.time(age) for age in range(3)] == [40.0, 30.0, 20.0]
+    assert ring.window("price")[:, 0].tolist() == [2, 3, 4]
+    assert ring.window("price", 2)[:, 1].tolist() == [103, 104]
+    assert ring.window("price", 10).shape == (3, 2)
+    with pytest.raises(IndexError):
+        ring.latest("price", 3)
+    with pytest.raises(IndexError):
+        ring.time(-1)
+
+
+def test_age_at_finds_the_latest_snapshot_not_after_a_time():
+    ring = filled_ring(5)
+    assert ring.age_at(40.0) == 0
+    assert ring.age_at(100.0) == 0
+    assert ring.age_at(35.0) == 1
+    assert ring.age_at(30.0) == 1
+    assert ring.age_at(20.0) == 2
+    # 早于最旧的快照（10 已被覆盖）
+    assert ring.age_at(19.9) is None
+    assert filled_ring(0).age_at(0.0) is None
+
+
+def test_times_must_increase():
+    ring = filled_ring(2)
+    with pytest.raises(ValueError):
+        ring.push(10.0, {"price": np.zeros(2)})
+    with pytest.raises(ValueError):
+        SnapshotRing(("price",), 2, 1)
+
+
+def test_resize_keeps_history_and_fills_new_columns_with_nan():
+    ring = filled_ring(4)
+    ring.resize(3)
+    assert ring.size == 3
+    window = ring.window("price")
+    assert window[:, :2].tolist() == [[1, 101], [2, 102], [3, 103]]
+    assert np.isnan(window[:, 2]).all()
+    ring.push(40.0, {"price": np.array([4.0, 104.0, 7.0])})
+    assert ring.latest("price").tolist() == [4, 104, 7]
+    # 缩小不生效
+    ring.resize(1)
+    assert ring.size == 3
+
+
+def test_clear():
+    ring = filled_ring(4)
+    ring.clear()
+    assert len(ring) == 0
+    assert ring.age_at(100.0) is None
+    ring.push(0.0, {"price": np.array([1.0, 2.0])})
+    assert ring.latest("price").tolist() == [1, 2]
@@ -0,0 +1,302 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from autostock.database.connection import get_connection_manager
+from autostock.datamanager.ops import market_ops
+from autostock.datamanager.panel import DailyPanel
+from autostock.datamanager.session import get_session
+from autostock.selectors import (
+    ExpressionSelector,
+    HighMomentumSelector,
+    SelectionContext,
+    change,
+    col,
+    last,
+    mean,
+    rolling_max,
+    rolling_min,
+    std,
+    volatility,
+)
+
+pytestmark = pytest.mark.usefixtures("clean_tables")
+
+# 价格有并列和缺失，名称、行业、上市日期也有缺失
+ROWS = pd.DataFrame(
+    [
+        ("sh600000", "浦发银行", "银行", "主板", date(1999, 11, 10), 8.5),
+        ("sh600001", "*ST邯钢", "钢铁", "主板", date(1998, 1, 22), 2.5),
+        ("sh601398", "工商银行", "银行", "主板", date(2006, 10, 27), 5.25),
+        ("sh688981", "中芯国际", None, "科创板", None, 45.0),
+        ("sz000001", "平安银行", "银行", "主板", date(1991, 4, 3), None),
+        ("sz000002", None, "房地产", "主板", date(1991, 1, 29), 8.5),
+        ("sz000003", "ST金田", "房地产", "主板", None, None),
+        ("sz300750", "宁德时代", "电池", "创业板", date(2018, 6, 11), 180.0),
+        ("sz300751", "迈为股份", "电池", "创业板", date(2018, 11, 9), 8.5),
+        ("bj830799", "艾融软件", "软件", "北交所", date(2019, 12, 30), 20.0),
+    ],
+    columns=["symbol", "name", "industry", "market_type", "list_date", "last_price"],
+)
+
+price = col("last_price")
+
+SELECTORS = {
+    "rank_pct_ties": ExpressionSelector(score=price.rank(pct=True)),
+    "rank_desc_top_n": ExpressionSelector(
+        score=price.rank(ascending=False), ascending=True, top_n=4
+    ),
+    "zscore": ExpressionSelector(score=price.zscore(), top_n=6),
+    "compare_nulls": ExpressionSelector(
+        [col("industry") != "银行", price >= 8.5, col("list_date") < date(2019, 1, 1)],
+        score=price.rank(pct=True) + price.zscore(),
+    ),
+    "like_nulls": ExpressionSelector(
+        [~col("name").like("%ST%"), col("market_type").isin(["主板", "创业板"])],
+        score=price.fillna(0).rank(ascending=False, pct=True),
+        ascending=True,
+        top_n=5,
+    ),
+    "like_matches": ExpressionSelector(
+        [col("name").like("%银行") | col("name").like("_ST%")],
+        score=price.fillna(-1).zscore(),
+    ),
+    "isnull_no_score": ExpressionSelector(
+        [price.isnull() | col("industry").isnull()], outputs={"name": col("name")}
+    ),
+    "arithmetic_ties": ExpressionSelector(
+        [price.notnull()],
+        score=(price * 2 - 17).abs() + price.between(5, 20),
+        outputs={"industry": col("industry")},
+        top_n=7,
+    ),
+}
+
+
+@pytest.fixture
+def overview():
+    with get_session() as session:
+        market_ops.upsert_market_overview(session, ROWS)
+        market_ops.bump_market_overview_version(session)
+        session.commit()
+    get_connection_manager().publish_snapshot(force=True)
+
+
+def assert_backends_agree(selector, universe=None) -> pd.DataFrame:
+    assert selector.sql_compatible
+    sql = selector.select(universe=universe, backend="duckdb")
+    numpy = selector.select(universe=universe, backend="numpy")
+    assert sql["symbol"].tolist() == numpy["symbol"].tolist()
+    assert sql["rank"].tolist() == numpy["rank"].tolist()
+    np.testing.assert_allclose(
+        sql["score"].to_numpy(dtype=float),
+        numpy["score"].to_numpy(dtype=float),
+        rtol=1e-9,
+    )
+    assert list(sql.columns) == list(numpy.columns)
+    for name in sql.columns[3:]:
+        assert sql[name].astype(object).where(sql[name].notna(), None).tolist() == (
+            numpy[name].astype(object).where(numpy[name].notna(), None).tolist()
+        )
+    return sql
+
+
+@pytest.mark.parametrize("name", SELECTORS)
+def test_duckdb_and_numpy_backends_agree(overview, name):
+    assert_backends_agree(SELECTORS[name])
+
+
+@pytest.mark.parametrize("name", SELECTORS)
+def test_backends_agree_on_a_universe(overview, name):
+    universe = ["sz300751", "sh600000", "sz000001", "sz000002", "sh688981", "xx"]
+    result = assert_backends_agree(SELECTORS[name], universe)
+    assert set(result["symbol"]) <= set(universe)
+
+
+def test_rank_ties_nulls_and_top_n(overview):
+    result = assert_backends_agree(SELECTORS["rank_pct_ties"])
+    # 8个有价格的股票；三个8.5并列第3名，缺失价格的股票不入选
+    scores = dict(zip(result["symbol"], result["score"]))
+    assert len(result) == 8
+    assert scores["sh600000"] == scores["sz000002"] == scores["sz300751"] == 3 / 8
+    assert scores["sh600001"] == 1 / 8 and scores["sz300750"] == 1.0
+    # 得分相同时按股票代码排序
+    assert result["symbol"].tolist()[3:6] == ["sh600000", "sz000002", "sz300751"]
+    assert result["rank"].tolist() == list(range(1, 9))
+
+    top = assert_backends_agree(SELECTORS["rank_desc_top_n"])
+    assert top["symbol"].tolist() == ["sz300750", "sh688981", "bj830799", "sh600000"]
+    assert top["score"].tolist() == [1, 2, 3, 4]
+
+
+def test_zscore_ignores_nulls(overview):
+    result = assert_backends_agree(SELECTORS["zscore"])
+    prices = ROWS["last_price"].dropna()
+    expected = ((prices - prices.mean()) / prices.std(ddof=1)).sort_values(
+        ascending=False, kind="stable"
+    )
+    np.testing.assert_allclose(result["score"], expected.iloc[:6], rtol=1e-6)
+
+
+def test_null_handling_in_conditions(overview):
+    # 行业缺失不满足 !=，价格缺失不满足 >=，上市日期缺失不满足 <；bj830799 在2019年上市
+    compare = assert_backends_agree(SELECTORS["compare_nulls"])
+    assert sorted(compare["symbol"]) == ["sz000002", "sz300750", "sz300751"]
+
+    # 名称缺失的股票不匹配 LIKE，取反后入选
+    like = assert_backends_agree(SELECTORS["like_nulls"])
+    assert "sz000002" in set(like["symbol"])
+    assert not {"sh600001", "sz000003"} & set(like["symbol"])
+
+    matches = assert_backends_agree(SELECTORS["like_matches"])
+    # "_" 恰好匹配一个字符："*ST邯钢" 匹配 "_ST%"，"ST金田" 不匹配
+    assert sorted(matches["symbol"]) == ["sh600000", "sh600001", "sh601398", "sz000001"]
+
+    isnull = assert_backends_agree(SELECTORS["isnull_no_score"])
+    assert isnull["symbol"].tolist() == ["sh688981", "sz000001", "sz000003"]
+    assert isnull["score"].isna().all()
+
+
+# ---------------------------------------------------------------------- 行情表达式
+
+
+def window_context(close: np.ndarray) -> SelectionContext:
+    close = np.asarray(close, dtype=np.float64)
+    panel = DailyPanel(
+        dates=np.datetime64("2024-01-01", "ns")
+        + np.arange(len(close)) * np.timedelta64(1, "D"),
+        symbols=[f"s{i}" for i in range(close.shape[1])],
+        fields={"close": close},
+    )
+    return SelectionContext.from_data(panel)
+
+
+def test_window_min_periods_and_padding():
+    nan = np.nan
+    ctx = window_context(
+        [
+            [1.0, nan, nan],
+            [2.0, 5.0, nan],
+            [4.0, nan, nan],
+            [8.0, 7.0, 3.0],
+        ]
+    )
+    np.testing.assert_array_equal(mean("close", 3).evaluate(ctx), [14 / 3, nan, nan])
+    np.testing.assert_array_equal(
+        mean("close", 3, min_periods=1).evaluate(ctx), [14 / 3, 6.0, 3.0]
+    )
+    np.testing.assert_array_equal(
+        rolling_max("close", 4, min_periods=2).evaluate(ctx), [8.0, 7.0, nan]
+    )
+    np.testing.assert_array_equal(
+        rolling_min("close", 2, min_periods=1).evaluate(ctx), [4.0, 7.0, 3.0]
+    )
+    np.testing.assert_allclose(
+        std("close", 4, min_periods=2).evaluate(ctx),
+        [np.std([1, 2, 4, 8], ddof=1), np.std([5, 7], ddof=1), nan],
+    )
+    np.testing.assert_array_equal(last().evaluate(ctx), [8.0, 7.0, 3.0])
+    np.testing.assert_array_equal(change(3).evaluate(ctx), [7.0, nan, nan])
+
+    # 窗口超过面板长度时在前面补 NaN，不足 min_periods 的结果为 NaN
+    np.testing.assert_array_equal(mean("close", 10).evaluate(ctx), [nan, nan, nan])
+    np.testing.assert_array_equal(
+        mean("close", 10, min_periods=4).evaluate(ctx), [15 / 4, nan, nan]
+    )
+    np.testing.assert_array_equal(change(10).evaluate(ctx), [nan, nan, nan])
+    np.testing.assert_allclose(
+        volatility(3).evaluate(ctx), [0.0, nan, nan], equal_nan=True
+    )
+    np.testing.assert_allclose(
+        volatility(3, min_periods=1).evaluate(ctx), [0.0, nan, nan], equal_nan=True
+    )
+
+
+# 高动量选股：每只股票的 (名称, 收盘价, 成交量)
+DAYS = 40
+
+
+def zigzag(up: float, down: float = 1.0, start: float = 50.0) -> np.ndarray:
+    moves = np.where(np.arange(DAYS) % 2 == 0, up, -down)
+    moves[0] = 0.0
+    return start + np.cumsum(moves)
+
+
+def momentum_data() -> tuple[DailyPanel, pd.DataFrame]:
+    rising_volume = np.linspace(1e5, 3e5, DAYS)
+    stocks = {
+        # 上涨、站上均线、放量、RSI 在70左右：入选
+        "sz000010": ("强势一号", zigzag(2.0), rising_volume),
+        "sz000011": ("强势二号", zigzag(1.6), rising_volume),
+        "sz000012": ("强势三号", zigzag(3.0, 1.5), rising_volume),
+        # 单边上涨，RSI 为100：超买
+        "sz000013": ("单边上涨", 50.0 + np.arange(DAYS), rising_volume),
+        # 下跌
+        "sz000014": ("持续下跌", zigzag(1.0, 2.0, start=100.0), rising_volume),
+        # 缩量
+        "sz000015": ("缩量上涨", zigzag(2.0), rising_volume[::-1]),
+        # ST
+        "sh600016": ("*ST强势", zigzag(2.0), rising_volume),
+        # 只有最近8个交易日：均线和中期动量不可用
+        "sz000017": (
+            "次新股",
+            np.r_[np.full(DAYS - 8, np.nan), zigzag(2.0)[-8:]],
+            rising_volume,
+        ),
+    }
+    symbols = list(stocks)
+    close = np.column_stack([stocks[s][1] for s in symbols])
+    volume = np.column_stack([stocks[s][2] for s in symbols])
+    volume[np.isnan(close)] = np.nan
+    panel = DailyPanel(
+        dates=np.datetime64("2024-01-01", "ns")
+        + np.arange(DAYS) * np.timedelta64(1, "D"),
+        symbols=symbols,
+        fields={"close": close, "volume": volume},
+    )
+    fundamentals = pd.DataFrame(
+        {"symbol": symbols, "name": [stocks[s][0] for s in symbols]}
+    )
+    return panel, fundamentals
+
+
+def test_high_momentum_selector_on_hand_built_panel():
+    panel, fundamentals = momentum_data()
+    selector = HighMomentumSelector(period=5, trend=10, top_n=2)
+    assert not selector.sql_compatible
+    result = selector.evaluate(SelectionContext.from_data(panel, fundamentals))
+
+    # 百分位排名在整个股票池上计算（筛选之前），与 pandas 的 min 排名一致
+    close = pd.DataFrame(panel["close"], columns=panel.symbols)
+    short = close.iloc[-1] / close.iloc[-6] - 1
+    medium = close.iloc[-1] / close.iloc[-11] - 1
+    calm = close.pct_change(fill_method=None).iloc[-5:].std()
+    expected = (
+        0.5 * short.rank(pct=True, method="min")
+        + 0.3 * medium.rank(pct=True, method="min")
+        + 0.2 * calm.rank(ascending=False, pct=True, method="min")
+    )
+    expected = expected[["sz000010", "sz000011", "sz000012"]].sort_values(
+        ascending=False, kind="stable"
+    )
+
+    assert result["symbol"].tolist() == expected.index[:2].tolist()
+    np.testing.assert_allclose(result["score"], expected.iloc[:2])
+    assert result["rank"].tolist() == [1, 2]
+    assert list(result.columns) == [
+        "symbol",
+        "score",
+        "rank",
+        "name",
+        "momentum",
+        "volatility",
+    ]
+    np.testing.assert_allclose(result["momentum"], short[result["symbol"]])
+    np.testing.assert_allclose(result["volatility"], calm[result["symbol"]])
+
+    everyone = HighMomentumSelector(period=5, trend=10, top_n=None).evaluate(
+        SelectionContext.from_data(panel, fundamentals)
+    )
+    assert sorted(everyone["symbol"]) == ["sz000010", "sz000011", "sz000012"]